@@ -4,6 +4,7 @@ from app.tools.memory_tools import get_memory_tools
 from app.tools.supabase_tools import get_supabase_tools
 from app.tools.books_tools import get_books_tools
 from app.tools.research_tools import get_research_tools
+from app.tools.trends_tools import recommend_hashtag_set
 from app.agents.memory_config import create_db, create_memory_manager
 
 
@@ -47,7 +48,8 @@ def create_content_writer() -> Agent:
             "    - Alterne entre informacao e storytelling",
             "  **LEGENDA/CAPTION**: Resumo emocional ou reflexao complementar ao corpo",
             "  **CTA**: Pergunta ou convite claro a acao (comentar, salvar, compartilhar)",
-            "  **HASHTAGS**: 5-15 hashtags organizadas em 3 grupos:",
+            "  **HASHTAGS**: 5-15 hashtags organizadas em 3 grupos "
+            "(monte com recommend_hashtag_set(topic=tema do post); complete se vier vazio):",
             "    - 3-5 de alto volume (500k+ posts)",
             "    - 3-5 de medio volume (50k-500k posts)",
             "    - 2-5 de nicho (< 50k posts, alta relevancia)",
@@ -138,7 +140,13 @@ def create_content_writer() -> Agent:
             "",
             "Responda SEMPRE em portugues brasileiro.",
         ],
-        tools=[*get_memory_tools(), *get_supabase_tools(), *get_books_tools(), *get_research_tools()],
+        tools=[
+            *get_memory_tools(),
+            *get_supabase_tools(),
+            *get_books_tools(),
+            *get_research_tools(),
+            recommend_hashtag_set,
+        ],
         markdown=True,
         store_history_messages=True,
         add_history_to_context=True,
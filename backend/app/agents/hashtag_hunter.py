@@ -71,7 +71,11 @@ def create_hashtag_hunter() -> Agent:
             "- Siga hashtags do seu nicho para monitorar tendencias",
             "",
             "## Pesquisa Real de Hashtags",
-            "ANTES de recomendar hashtags, use suas ferramentas de pesquisa:",
+            "PRIMEIRO consulte get_rising_hashtags(niche) — indice interno de hashtags em alta por nicho, "
+            "ja calculado a partir das pesquisas e posts recentes (resposta imediata, sem busca na web).",
+            "Para montar o conjunto, use recommend_hashtag_set(seeds, topic) — ja devolve as hashtags "
+            "que co-ocorrem com as sementes, separadas em alto/medio/nicho.",
+            "So use as ferramentas abaixo para complementar quando o indice vier vazio ou insuficiente:",
             "- web_search() para pesquisar hashtags trending do nicho",
             "- search_trending_content(topic, platform) para descobrir hashtags virais",
             "- scrape_instagram_profile(username) para ver hashtags usadas por concorrentes",
@@ -3,6 +3,12 @@ Configuracao centralizada de PostgresDb e MemoryManager para AGNO 2.5.2.
 
 Degradacao graciosa: retorna None se DATABASE_URL nao estiver configurado.
 
+Todos os agentes, teams e memory managers do processo compartilham um unico
+engine SQLAlchemy (e seu pool de conexoes) por DATABASE_URL, e um unico
+PostgresDb por par de tabelas. O pool e configurado por AGNO_DB_POOL_SIZE,
+AGNO_DB_MAX_OVERFLOW, AGNO_DB_POOL_PRE_PING, AGNO_DB_POOL_RECYCLE e
+AGNO_DB_POOL_TIMEOUT; get_db_pool_stats() expoe o uso em /health e /admin/metrics.
+
 Uso em agentes:
     from app.agents.memory_config import create_db, create_memory_manager
 
@@ -14,10 +20,21 @@ Uso em agentes:
 """
 
 import logging
-from typing import Optional
+import threading
+from typing import TYPE_CHECKING, Any, Optional
+
+if TYPE_CHECKING:
+    from agno.db.postgres import PostgresDb
+    from agno.memory.manager import MemoryManager
+    from sqlalchemy.engine import Engine
 
 logger = logging.getLogger("agentesocial.memory_config")
 
+# Registro do processo: um engine por URL, um PostgresDb por (url, tabelas)
+_engines: dict[str, "Engine"] = {}
+_dbs: dict[tuple[str, str, str], "PostgresDb"] = {}
+_lock = threading.Lock()
+
 
 def _get_database_url() -> str:
     """Obtem DATABASE_URL das settings."""
@@ -28,14 +45,52 @@ def _get_database_url() -> str:
         return ""
 
 
+def get_engine(db_url: Optional[str] = None) -> Optional["Engine"]:
+    """Engine SQLAlchemy compartilhado do processo para a URL (criado no primeiro uso).
+
+    Retorna None se DATABASE_URL nao estiver configurado.
+    """
+    db_url = db_url or _get_database_url()
+    if not db_url:
+        return None
+
+    engine = _engines.get(db_url)
+    if engine is not None:
+        return engine
+
+    with _lock:
+        engine = _engines.get(db_url)
+        if engine is None:
+            from sqlalchemy import create_engine
+
+            from app.config import get_settings
+
+            settings = get_settings()
+            engine = create_engine(
+                db_url,
+                pool_size=settings.AGNO_DB_POOL_SIZE,
+                max_overflow=settings.AGNO_DB_MAX_OVERFLOW,
+                pool_pre_ping=settings.AGNO_DB_POOL_PRE_PING,
+                pool_recycle=settings.AGNO_DB_POOL_RECYCLE,
+                pool_timeout=settings.AGNO_DB_POOL_TIMEOUT,
+            )
+            _engines[db_url] = engine
+            logger.info(
+                "Engine Postgres criado (pool_size=%d, max_overflow=%d)",
+                settings.AGNO_DB_POOL_SIZE, settings.AGNO_DB_MAX_OVERFLOW,
+            )
+    return engine
+
+
 def create_db(
     session_table: str = "agno_sessions",
     memory_table: str = "agno_memories",
 ) -> Optional["PostgresDb"]:
-    """Cria PostgresDb para storage de sessoes e memoria.
+    """Retorna o PostgresDb compartilhado para storage de sessoes e memoria.
 
     AGNO 2.5.2 auto-cria tabelas no schema 'ai' com create_schema=True (default).
     Tabelas padrao: ai.agno_sessions, ai.agno_memories, etc.
+    Chamadas com as mesmas tabelas recebem a mesma instancia (mesmo engine).
 
     Args:
         session_table: Tabela para sessoes de agente/team.
@@ -46,21 +101,32 @@ def create_db(
         logger.info("DATABASE_URL nao configurado — agentes rodarao sem persistencia")
         return None
 
+    key = (db_url, session_table, memory_table)
+    db = _dbs.get(key)
+    if db is not None:
+        return db
+
     try:
         from agno.db.postgres import PostgresDb
 
-        return PostgresDb(
-            db_url=db_url,
-            session_table=session_table,
-            memory_table=memory_table,
-        )
+        engine = get_engine(db_url)
+        with _lock:
+            db = _dbs.get(key)
+            if db is None:
+                db = PostgresDb(
+                    db_engine=engine,
+                    session_table=session_table,
+                    memory_table=memory_table,
+                )
+                _dbs[key] = db
+        return db
     except Exception as e:
         logger.warning(f"Falha ao criar PostgresDb: {e}")
         return None
 
 
 def create_memory_manager() -> Optional["MemoryManager"]:
-    """Cria MemoryManager com PostgresDb para memoria agentesocial.
+    """Cria MemoryManager com o PostgresDb compartilhado para memoria agentesocial.
 
     Retorna None se DATABASE_URL nao estiver configurado.
     """
@@ -75,3 +141,37 @@ def create_memory_manager() -> Optional["MemoryManager"]:
     except Exception as e:
         logger.warning(f"Falha ao criar MemoryManager: {e}")
         return None
+
+
+def get_db_pool_stats() -> dict[str, Any]:
+    """Uso do pool de cada engine compartilhado (sem expor credenciais da URL)."""
+    with _lock:
+        engines = list(_engines.values())
+        dbs = len(_dbs)
+
+    pools = []
+    for engine in engines:
+        pool = engine.pool
+        stats: dict[str, Any] = {
+            "url": engine.url.render_as_string(hide_password=True),
+            "pool": type(pool).__name__,
+        }
+        for name in ("size", "checkedin", "checkedout", "overflow"):
+            fn = getattr(pool, name, None)
+            if callable(fn):
+                stats[name] = fn()
+        pools.append(stats)
+    return {"engines": len(engines), "databases": dbs, "pools": pools}
+
+
+def dispose_engines() -> None:
+    """Fecha as conexoes de todos os engines (shutdown do processo ou testes)."""
+    with _lock:
+        engines = list(_engines.values())
+        _engines.clear()
+        _dbs.clear()
+    for engine in engines:
+        try:
+            engine.dispose()
+        except Exception as e:
+            logger.warning(f"Falha ao fechar engine Postgres: {e}")
@@ -4,7 +4,6 @@ from agno.agent import Agent
 from agno.models.openai import OpenAIResponses
 from agno.team import Team
 
-from app.constants import TABLES
 from app.agents.memory_config import create_db, create_memory_manager
 
 logger = logging.getLogger("agentesocial.team")
@@ -92,68 +91,131 @@ def get_team() -> Team:
     return _team
 
 
+def build_team_message(message: str, user_id: str, context: dict = None) -> str:
+    """Prefixa a mensagem com o contexto do usuario para o roteador."""
+    if context:
+        context_str = ", ".join(f"{k}: {v}" for k, v in context.items())
+        return f"[Contexto: user_id={user_id}, {context_str}] {message}"
+    return f"[Contexto: user_id={user_id}] {message}"
+
+
+async def save_conversation(
+    conversation_id: str,
+    user_id: str,
+    agent_type: str,
+    message: str,
+    response_text: str,
+) -> None:
+    """Agenda a gravacao do turno na fila write-behind (append-only, em lote).
+
+    A resposta ja foi entregue; se a fila estiver cheia, grava inline.
+    """
+    from app.services.write_queue import get_write_queue
+
+    await get_write_queue().submit("conversation_turn", {
+        "conversation_id": conversation_id,
+        "user_id": user_id,
+        "agent_type": agent_type,
+        "message": message,
+        "response_text": response_text,
+    })
+
+
+async def run_team(message: str, session_id: str, user_id: str):
+    """Roda team.run no executor dedicado, sem bloquear o event loop."""
+    from app.services.team_executor import get_team_executor
+
+    team = get_team()
+    return await get_team_executor().run(
+        team.run,
+        message,
+        session_id=session_id,
+        user_id=user_id,
+    )
+
+
+async def lookup_cached_response(
+    message: str,
+    user_id: str,
+    conversation_id: str = None,
+    agent_type: str = None,
+    context: dict = None,
+    use_cache: bool = True,
+):
+    """Consulta o cache semantico para um pedido do chat.
+
+    Retorna None quando o cache nao se aplica: desligado, use_cache=False ou
+    conversa ja existente — follow-ups ("continue", "mais 3") dependem do
+    historico, e um hit nao passaria pela memoria de sessao do agno.
+    """
+    if not use_cache or conversation_id:
+        return None
+    from app.services import semantic_cache
+
+    return await semantic_cache.lookup(message, user_id, agent_type, context)
+
+
 async def get_team_response(
     message: str,
     user_id: str,
     conversation_id: str = None,
     agent_type: str = None,
     context: dict = None,
+    use_cache: bool = True,
 ) -> dict:
-    """Envia mensagem para o team e retorna resposta."""
+    """Envia mensagem para o team e retorna resposta.
+
+    O team roda no TeamExecutor (threads dedicadas), entao o event loop segue
+    atendendo outras requisicoes durante o round trip do LLM. Com
+    SEMANTIC_CACHE_ENABLED, pedidos equivalentes ja respondidos voltam do
+    cache semantico (metadata["semantic_cache"]); use_cache=False ignora o cache.
+    Mensagens de uma conversa ja existente sempre vao para o team.
+    """
+    from app.services.team_executor import TeamExecutorBusy
+
+    cached = await lookup_cached_response(message, user_id, conversation_id, agent_type, context, use_cache)
     if not conversation_id:
         conversation_id = str(uuid.uuid4())
 
+    if cached is not None and cached.hit is not None:
+        try:
+            await save_conversation(conversation_id, user_id, agent_type, message, cached.hit.response)
+        except Exception as e:
+            logger.warning(f"Failed to save conversation: {e}")
+        return {
+            "response": cached.hit.response,
+            "conversation_id": conversation_id,
+            "agent_type": agent_type or "master",
+            "metadata": {**(context or {}), "semantic_cache": cached.hit.metadata()},
+        }
+
     try:
         # Set user context for Instagram tools to pick up automatically
+        # (ContextVar copiado para a thread do executor)
         from app.services.token_manager import set_current_user_id, clear_current_user_id
         set_current_user_id(user_id)
 
-        team = get_team()
-
-        # Adiciona contexto ao prompt
-        full_message = message
-        if context:
-            context_str = ", ".join(f"{k}: {v}" for k, v in context.items())
-            full_message = f"[Contexto: user_id={user_id}, {context_str}] {message}"
-        else:
-            full_message = f"[Contexto: user_id={user_id}] {message}"
-
         # Executa o team com session_id e user_id para persistencia nativa AGNO
-        response = team.run(
-            full_message,
+        response = await run_team(
+            build_team_message(message, user_id, context),
             session_id=conversation_id,
             user_id=user_id,
         )
         response_text = response.content if hasattr(response, "content") else str(response)
+        if cached is not None and response_text:
+            cached.store(response_text)
 
+    except TeamExecutorBusy as e:
+        logger.warning(f"Team executor busy: {e}")
+        response_text = "Estamos com muitas conversas em andamento. Por favor, tente novamente em alguns instantes."
     except Exception as e:
         logger.error(f"Team execution error: {e}")
         response_text = "Desculpe, ocorreu um erro ao processar sua mensagem. Por favor, tente novamente em alguns instantes."
     finally:
         clear_current_user_id()
 
-    # Salva conversa no Supabase (usa admin client para bypass RLS no server-side)
     try:
-        from app.database.supabase_client import get_supabase_admin
-        supabase = get_supabase_admin()
-
-        existing = supabase.table(TABLES["agent_conversations"]).select("messages").eq("id", conversation_id).maybe_single().execute()
-        messages = existing.data["messages"] if existing and existing.data else []
-        messages.append({"role": "user", "content": message})
-        messages.append({"role": "assistant", "content": response_text})
-
-        if existing and existing.data:
-            supabase.table(TABLES["agent_conversations"]).update({
-                "messages": messages,
-                "updated_at": "now()",
-            }).eq("id", conversation_id).execute()
-        else:
-            supabase.table(TABLES["agent_conversations"]).insert({
-                "id": conversation_id,
-                "user_id": user_id,
-                "agent_type": agent_type or "master",
-                "messages": messages,
-            }).execute()
+        await save_conversation(conversation_id, user_id, agent_type, message, response_text)
     except Exception as e:
         logger.warning(f"Failed to save conversation: {e}")
 
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from fastapi import APIRouter, Depends, Query
 from pydantic import BaseModel
@@ -39,18 +40,72 @@ async def search_trends(
     request: TrendSearchRequest,
     user: dict = Depends(get_current_user),
 ):
+    """Tendencias do nicho: servidas do indice de hashtags em alta quando ele tem dados.
+
+    O trend_analyst (com busca na web) so roda se o indice estiver vazio ou
+    com research=true; nesse caso as hashtags do indice entram no prompt.
+    """
+    from app.services.hashtag_trends import get_rising_hashtags
+
+    context = {"keywords": request.keywords}
+    if request.niche:
+        context["niche"] = request.niche
+    rising = get_rising_hashtags(request.niche, limit=10)
+    if rising and not request.research:
+        scope = f" no nicho {request.niche}" if request.niche else ""
+        lines = [f"- {r['hashtag']}: {r['recent_count']:g} mencoes recentes ({r['lift']:g}x a base)" for r in rising]
+        return {
+            "response": f"Hashtags em alta{scope}:\n" + "\n".join(lines),
+            "conversation_id": None,
+            "agent_type": "trend_analyst",
+            "metadata": {**context, "source": "index"},
+            "rising_hashtags": rising,
+        }
+
     from app.agents.team import get_team_response
     keywords_str = ", ".join(request.keywords)
     prompt = f"Pesquise tendencias para: {keywords_str}. Pais: {request.country}."
     if request.platform:
         prompt += f" Plataforma: {request.platform}."
+    if rising:
+        prompt += f" Hashtags em alta no indice interno: {', '.join(r['hashtag'] for r in rising)}."
     result = await get_team_response(
         message=prompt,
         user_id=user["id"],
         agent_type="trend_analyst",
-        context={"keywords": request.keywords},
+        context=context,
     )
-    return result
+    return {**result, "rising_hashtags": rising}
+
+
+@router.get("/trends/hashtags")
+async def rising_hashtags(
+    user: dict = Depends(get_current_user),
+    niche: Optional[str] = Query(None, description="Nicho (vazio = todos os nichos)"),
+    limit: int = Query(20, ge=1, le=100),
+):
+    """Hashtags em alta por nicho, servidas do indice em memoria (sem LLM nem busca na web)."""
+    from app.services.hashtag_trends import get_rising_hashtags
+
+    return {"niche": niche, "rising_hashtags": get_rising_hashtags(niche, limit)}
+
+
+@router.get("/hashtags/recommend")
+async def recommend_hashtags(
+    user: dict = Depends(get_current_user),
+    seeds: list[str] = Query([], description="Hashtags semente (repita o parametro)"),
+    topic: Optional[str] = Query(None, description="Tema, usado quando nao ha sementes conhecidas"),
+    count: int = Query(15, ge=1, le=30),
+):
+    """Conjunto de hashtags balanceado por volume (alto/medio/nicho) a partir do indice de co-ocorrencia.
+
+    Com HASHTAG_GRAPH_ENABLED desligado devolve lista vazia.
+    """
+    from app.services.hashtag_graph import recommend_hashtags as recommend
+
+    # O primeiro uso carrega o .npz do disco; recommend() segura o lock do grafo
+    hashtags = await asyncio.to_thread(recommend, seeds, topic, count)
+    return {"seeds": seeds, "topic": topic, "hashtags": hashtags}
 
 
 @router.get("/viral")
@@ -1,14 +1,25 @@
+import asyncio
 import json
+import threading
 import uuid
 import logging
-from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect
 from fastapi.responses import StreamingResponse
 from jose import jwt, JWTError
 from app.dependencies import get_current_user
 from app.models.schemas import ChatRequest, ChatResponse
-from app.agents.team import get_team, get_team_response
+from app.agents.team import (
+    build_team_message,
+    get_team,
+    get_team_response,
+    lookup_cached_response,
+    save_conversation,
+)
+from app.services import conversation_store
+from app.services.team_executor import TeamExecutorBusy
+from app.services.team_stream import StreamMetrics, stream_team
+from app.services.token_manager import clear_current_user_id, set_current_user_id
 from app.config import get_settings
-from app.constants import TABLES
 
 logger = logging.getLogger("agentesocial.chat")
 
@@ -26,10 +37,57 @@ async def send_message(
         conversation_id=request.conversation_id,
         agent_type=request.agent_type,
         context=request.context,
+        use_cache=request.use_cache,
     )
     return result
 
 
+async def _team_events(
+    user_id: str,
+    message: str,
+    context: dict | None,
+    conversation_id: str,
+    stop: threading.Event | None = None,
+):
+    """Eventos do team em streaming (routed_to/chunk) e um "done" final.
+
+    O "done" traz o texto final da resposta, o sub-team escolhido e as
+    metricas (TTFB, tokens/s). Compartilhado pelo SSE e pelo WebSocket.
+    """
+    metrics = StreamMetrics()
+    root_name = get_team().name
+    routed_to = None
+    root_chunks: list[str] = []
+    response_text = ""
+    set_current_user_id(user_id)
+    try:
+        async for event in stream_team(
+            build_team_message(message, user_id, context),
+            session_id=conversation_id,
+            user_id=user_id,
+            stop=stop,
+        ):
+            if event["type"] == "chunk":
+                metrics.chunk()
+                if event["agent"] == root_name:
+                    root_chunks.append(event["content"])
+                yield event
+            elif event["type"] == "routed_to":
+                routed_to = event["member"]
+                yield event
+            elif event["type"] == "completed":
+                response_text = event["content"]
+    finally:
+        clear_current_user_id()
+
+    yield {
+        "type": "done",
+        "response": response_text or "".join(root_chunks),
+        "routed_to": routed_to,
+        "metrics": metrics.finish(),
+    }
+
+
 @router.post("/stream")
 async def chat_stream(request: ChatRequest, user: dict = Depends(get_current_user)):
     """SSE streaming endpoint for chat responses."""
@@ -39,69 +97,30 @@ async def chat_stream(request: ChatRequest, user: dict = Depends(get_current_use
         yield f"data: {json.dumps({'type': 'typing', 'content': ''})}\n\n"
 
         try:
-            team = get_team()
             user_id = user.get("id", user.get("sub", "anonymous"))
             conversation_id = request.conversation_id or str(uuid.uuid4())
 
-            full_message = request.message
-            if request.context:
-                context_str = ", ".join(f"{k}: {v}" for k, v in request.context.items())
-                full_message = f"[Contexto: user_id={user_id}, {context_str}] {request.message}"
-            else:
-                full_message = f"[Contexto: user_id={user_id}] {request.message}"
-
-            # Run the team (non-streaming, then stream the response in chunks)
-            response = team.run(
-                full_message,
-                session_id=conversation_id,
-                user_id=user_id,
-            )
-            response_text = response.content if hasattr(response, "content") else str(response)
-
-            # Stream response in chunks for better UX
-            words = response_text.split(" ")
-            chunk_size = 3  # Send 3 words at a time
-            for i in range(0, len(words), chunk_size):
-                chunk = " ".join(words[i : i + chunk_size])
-                if i > 0:
-                    chunk = " " + chunk
-                yield f"data: {json.dumps({'type': 'chunk', 'content': chunk})}\n\n"
+            # Stream real: cada delta do modelo vira um chunk assim que chega
+            done = {}
+            async for event in _team_events(user_id, request.message, request.context, conversation_id):
+                if event["type"] == "done":
+                    done = event
+                else:
+                    yield f"data: {json.dumps(event)}\n\n"
 
             # Send done event with metadata
-            yield f"data: {json.dumps({'type': 'done', 'conversation_id': conversation_id, 'agent_type': request.agent_type or 'master'})}\n\n"
+            yield f"data: {json.dumps({'type': 'done', 'conversation_id': conversation_id, 'agent_type': request.agent_type or 'master', 'routed_to': done['routed_to'], 'metrics': done['metrics']})}\n\n"
 
-            # Save conversation (usa admin client para bypass RLS no server-side)
             try:
-                from app.database.supabase_client import get_supabase_admin
-
-                supabase = get_supabase_admin()
-                existing = (
-                    supabase.table(TABLES["agent_conversations"])
-                    .select("messages")
-                    .eq("id", conversation_id)
-                    .maybe_single()
-                    .execute()
+                await save_conversation(
+                    conversation_id, user_id, request.agent_type, request.message, done["response"],
                 )
-                messages = existing.data["messages"] if existing and existing.data else []
-                messages.append({"role": "user", "content": request.message})
-                messages.append({"role": "assistant", "content": response_text})
-
-                if existing and existing.data:
-                    supabase.table(TABLES["agent_conversations"]).update(
-                        {"messages": messages, "updated_at": "now()"}
-                    ).eq("id", conversation_id).execute()
-                else:
-                    supabase.table(TABLES["agent_conversations"]).insert(
-                        {
-                            "id": conversation_id,
-                            "user_id": user_id,
-                            "agent_type": request.agent_type or "master",
-                            "messages": messages,
-                        }
-                    ).execute()
             except Exception:
                 logger.warning(f"Failed to save conversation in stream endpoint: {conversation_id}")
 
+        except TeamExecutorBusy as e:
+            logger.warning(f"SSE stream rejected, team executor busy: {e}")
+            yield f"data: {json.dumps({'type': 'error', 'content': 'Muitas conversas em andamento. Tente novamente em instantes.'})}\n\n"
         except Exception as e:
             logger.error(f"SSE stream error for user {user.get('id', 'unknown')}: {e}")
             yield f"data: {json.dumps({'type': 'error', 'content': 'Desculpe, ocorreu um erro. Tente novamente.'})}\n\n"
@@ -119,54 +138,27 @@ async def chat_stream(request: ChatRequest, user: dict = Depends(get_current_use
 
 @router.get("/conversations")
 async def list_conversations(
+    limit: int = Query(50, ge=1, le=conversation_store.MAX_PAGE_SIZE),
+    cursor: str | None = Query(None, description="next_cursor da pagina anterior"),
     user: dict = Depends(get_current_user),
 ):
-    from app.database.supabase_client import get_supabase_admin
-    supabase = get_supabase_admin()
-    result = (
-        supabase.table(TABLES["agent_conversations"])
-        .select("id,user_id,agent_type,messages,created_at,updated_at")
-        .eq("user_id", user["id"])
-        .order("updated_at", desc=True)
-        .execute()
-    )
-    conversations = []
-    for row in result.data or []:
-        msgs = row.get("messages") or []
-        first_msg = ""
-        for m in msgs:
-            if m.get("role") == "user":
-                first_msg = m.get("content", "")[:100]
-                break
-        conversations.append({
-            "id": row["id"],
-            "first_message": first_msg or "Conversa sem mensagem",
-            "agent_type": row.get("agent_type"),
-            "created_at": row.get("created_at"),
-            "updated_at": row.get("updated_at"),
-        })
-    return {"conversations": conversations}
+    try:
+        return await asyncio.to_thread(conversation_store.list_conversations, user["id"], limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/conversations/{conversation_id}/messages")
 async def get_conversation(
     conversation_id: str,
+    limit: int = Query(50, ge=1, le=conversation_store.MAX_PAGE_SIZE),
+    before_seq: int | None = Query(None, ge=1),
     user: dict = Depends(get_current_user),
 ):
-    from app.database.supabase_client import get_supabase_admin
-    supabase = get_supabase_admin()
-    result = (
-        supabase.table(TABLES["agent_conversations"])
-        .select("messages")
-        .eq("id", conversation_id)
-        .eq("user_id", user["id"])
-        .maybe_single()
-        .execute()
+    """Mensagens mais recentes da conversa; use next_before_seq para paginar para tras."""
+    return await asyncio.to_thread(
+        conversation_store.get_messages, conversation_id, user["id"], limit=limit, before_seq=before_seq,
     )
-    if not result.data:
-        return {"messages": []}
-    messages = result.data.get("messages") or []
-    return {"messages": messages}
 
 
 def _authenticate_ws_token(token: str) -> dict | None:
@@ -195,37 +187,159 @@ def _authenticate_ws_token(token: str) -> dict | None:
         return None
 
 
+async def _ws_generate(
+    send,
+    user: dict,
+    message_data: dict,
+    user_message: str,
+    conversation_id: str,
+    stop: threading.Event,
+    streaming: bool,
+) -> None:
+    """Uma geracao do WebSocket (roda como task; cancelavel pelo cliente).
+
+    Como no POST /chat, mensagens que abrem conversa consultam o cache
+    semantico (desligavel com "use_cache": false); um hit vira a resposta
+    inteira, sem deltas.
+    """
+    agent_type = message_data.get("agent_type")
+    context = message_data.get("context")
+    await send({"type": "typing", "status": True, "conversation_id": conversation_id})
+    try:
+        cached = await lookup_cached_response(
+            user_message, user["id"], message_data.get("conversation_id"), agent_type, context,
+            use_cache=message_data.get("use_cache", True) is not False,
+        )
+        if cached is not None and cached.hit is not None:
+            result = {
+                "response": cached.hit.response,
+                "conversation_id": conversation_id,
+                "agent_type": agent_type or "master",
+                "metadata": {**(context or {}), "semantic_cache": cached.hit.metadata()},
+            }
+            await send({"type": "final" if streaming else "message", "conversation_id": conversation_id, "data": result})
+            try:
+                await save_conversation(conversation_id, user["id"], agent_type, user_message, cached.hit.response)
+            except Exception as e:
+                logger.warning(f"Failed to save conversation in websocket: {e}")
+            return
+
+        done = {}
+        async for event in _team_events(user["id"], user_message, context, conversation_id, stop=stop):
+            if event["type"] == "done":
+                done = event
+            elif streaming and event["type"] == "chunk":
+                await send({
+                    "type": "delta",
+                    "conversation_id": conversation_id,
+                    "content": event["content"],
+                    "agent": event["agent"],
+                })
+            elif streaming:
+                await send({**event, "conversation_id": conversation_id})
+
+        result = {
+            "response": done["response"],
+            "conversation_id": conversation_id,
+            "agent_type": agent_type or "master",
+            "metadata": context,
+            "routed_to": done["routed_to"],
+            "metrics": done["metrics"],
+        }
+        await send({"type": "final" if streaming else "message", "conversation_id": conversation_id, "data": result})
+        if cached is not None and done["response"]:
+            cached.store(done["response"])
+
+        try:
+            await save_conversation(conversation_id, user["id"], agent_type, user_message, done["response"])
+        except Exception as e:
+            logger.warning(f"Failed to save conversation in websocket: {e}")
+
+    except asyncio.CancelledError:
+        logger.info(f"WebSocket generation cancelled: {conversation_id}")
+        await _safe_send(send, {"type": "cancelled", "conversation_id": conversation_id})
+    except TeamExecutorBusy as e:
+        logger.warning(f"WebSocket generation rejected, team executor busy: {e}")
+        await _safe_send(send, {
+            "type": "error",
+            "conversation_id": conversation_id,
+            "message": "Muitas conversas em andamento. Tente novamente em instantes.",
+        })
+    except Exception as e:
+        logger.error(f"WebSocket agent error for user {user['id']}: {e}")
+        await _safe_send(send, {
+            "type": "error",
+            "conversation_id": conversation_id,
+            "message": "Erro ao processar mensagem. Tente novamente.",
+        })
+    finally:
+        await _safe_send(send, {"type": "typing", "status": False, "conversation_id": conversation_id})
+
+
+async def _safe_send(send, payload: dict) -> None:
+    # Socket pode ja estar fechado (desconexao durante a geracao)
+    try:
+        await send(payload)
+    except Exception:
+        pass
+
+
 @router.websocket("/ws")
 async def chat_websocket(websocket: WebSocket):
     """WebSocket endpoint for real-time chat with AI agents.
 
     Authentication: Send a token in the first message or as a query parameter.
-    Message format (JSON):
+    Several conversations can generate at the same time on one socket
+    (multiplexed by conversation_id, up to WS_MAX_GENERATIONS).
+
+    Client frames (JSON):
         {
             "token": "jwt-token" (required on first message if not in query params),
             "message": "user message text",
             "conversation_id": "optional-uuid",
             "agent_type": "optional-agent-name",
-            "context": { optional context dict }
+            "context": { optional context dict },
+            "stream": true (optional: delta/final frames instead of a single message),
+            "use_cache": false (optional: skip the semantic cache for a new conversation)
         }
-    Response types:
+        {"type": "cancel", "conversation_id": "optional-uuid"}  (sem id: cancela todas)
+    Response types (all carry conversation_id once a generation starts):
         {"type": "authenticated", "user_id": "..."}
         {"type": "typing", "status": true/false}
-        {"type": "message", "data": { response object }}
+        {"type": "routed_to", "member_id": "...", "member": "..."}     (stream)
+        {"type": "delta", "content": "...", "agent": "..."}            (stream)
+        {"type": "final", "data": { response object }}                  (stream)
+        {"type": "message", "data": { response object }}                (sem stream)
+        {"type": "cancelled"}
         {"type": "error", "message": "error description"}
     """
     await websocket.accept()
 
     user: dict | None = None
+    generations: dict[str, tuple[asyncio.Task, threading.Event]] = {}
+    send_lock = asyncio.Lock()
+
+    async def send(payload: dict) -> None:
+        async with send_lock:
+            await websocket.send_json(payload)
+
+    def cancel(conversation_id: str) -> bool:
+        entry = generations.get(conversation_id)
+        if entry is None:
+            return False
+        task, stop = entry
+        stop.set()
+        task.cancel()
+        return True
 
     # Check for token in query params for immediate auth
     query_token = websocket.query_params.get("token")
     if query_token:
         user = _authenticate_ws_token(query_token)
         if user:
-            await websocket.send_json({"type": "authenticated", "user_id": user["id"]})
+            await send({"type": "authenticated", "user_id": user["id"]})
         else:
-            await websocket.send_json({"type": "error", "message": "Invalid token"})
+            await send({"type": "error", "message": "Invalid token"})
             await websocket.close(code=4001, reason="Invalid token")
             return
 
@@ -236,56 +350,70 @@ async def chat_websocket(websocket: WebSocket):
             try:
                 message_data = json.loads(raw_data)
             except json.JSONDecodeError:
-                await websocket.send_json({"type": "error", "message": "Invalid JSON"})
+                await send({"type": "error", "message": "Invalid JSON"})
                 continue
 
             # Authenticate from message token if not yet authenticated
             if user is None:
                 msg_token = message_data.get("token")
                 if not msg_token:
-                    await websocket.send_json({
+                    await send({
                         "type": "error",
                         "message": "Authentication required. Send a token field.",
                     })
                     continue
                 user = _authenticate_ws_token(msg_token)
                 if not user:
-                    await websocket.send_json({"type": "error", "message": "Invalid token"})
+                    await send({"type": "error", "message": "Invalid token"})
                     await websocket.close(code=4001, reason="Invalid token")
                     return
-                await websocket.send_json({"type": "authenticated", "user_id": user["id"]})
+                await send({"type": "authenticated", "user_id": user["id"]})
+
+            if message_data.get("type") == "cancel":
+                target = message_data.get("conversation_id")
+                targets = [target] if target else list(generations)
+                cancelled = [cancel(cid) for cid in targets]
+                if not any(cancelled):
+                    await send({
+                        "type": "error",
+                        "conversation_id": target,
+                        "message": "Nenhuma geracao em andamento para cancelar.",
+                    })
+                continue
 
             # Validate message content
             user_message = message_data.get("message", "").strip()
             if not user_message:
-                await websocket.send_json({
+                await send({
                     "type": "error",
                     "message": "Empty message. Send a 'message' field with text.",
                 })
                 continue
 
-            # Send typing indicator ON
-            await websocket.send_json({"type": "typing", "status": True})
-
-            # Process through agent team
-            try:
-                result = await get_team_response(
-                    message=user_message,
-                    user_id=user["id"],
-                    conversation_id=message_data.get("conversation_id"),
-                    agent_type=message_data.get("agent_type"),
-                    context=message_data.get("context"),
-                )
-                await websocket.send_json({"type": "message", "data": result})
-            except Exception as e:
-                logger.error(f"WebSocket agent error for user {user['id']}: {e}")
-                await websocket.send_json({
+            conversation_id = message_data.get("conversation_id") or str(uuid.uuid4())
+            if conversation_id in generations:
+                await send({
                     "type": "error",
-                    "message": "Erro ao processar mensagem. Tente novamente.",
+                    "conversation_id": conversation_id,
+                    "message": "Ja existe uma resposta em andamento nesta conversa.",
                 })
-            finally:
-                # Send typing indicator OFF
-                await websocket.send_json({"type": "typing", "status": False})
+                continue
+            if len(generations) >= get_settings().WS_MAX_GENERATIONS:
+                await send({
+                    "type": "error",
+                    "conversation_id": conversation_id,
+                    "message": "Limite de respostas simultaneas atingido nesta conexao.",
+                })
+                continue
+
+            # Process through agent team (em task: o socket segue lendo cancel/novas mensagens)
+            stop = threading.Event()
+            task = asyncio.create_task(_ws_generate(
+                send, user, message_data, user_message, conversation_id, stop,
+                streaming=bool(message_data.get("stream")),
+            ))
+            generations[conversation_id] = (task, stop)
+            task.add_done_callback(lambda _, cid=conversation_id: generations.pop(cid, None))
 
     except WebSocketDisconnect:
         logger.info(f"WebSocket disconnected for user {user['id'] if user else 'unauthenticated'}")
@@ -295,3 +423,7 @@ async def chat_websocket(websocket: WebSocket):
             await websocket.close(code=1011, reason="Internal error")
         except Exception:
             pass
+    finally:
+        # Geracoes abandonadas param de consumir tokens
+        for conversation_id in list(generations):
+            cancel(conversation_id)
@@ -1,5 +1,8 @@
 import logging
+from datetime import datetime
+from typing import Optional
 from fastapi import APIRouter, Depends
+from pydantic import BaseModel
 from app.dependencies import get_current_user
 from app.constants import TABLES
 
@@ -7,6 +10,21 @@ router = APIRouter()
 logger = logging.getLogger("agentesocial.insights")
 
 
+class EngagementSnapshot(BaseModel):
+    post_id: str
+    likes: int = 0
+    comments: int = 0
+    shares: int = 0
+    saves: int = 0
+    followers: int = 0
+    posted_at: Optional[datetime] = None
+    captured_at: Optional[datetime] = None
+
+
+class VelocitySnapshotsRequest(BaseModel):
+    snapshots: list[EngagementSnapshot]
+
+
 @router.get("/dashboard")
 async def insights_dashboard(
     user: dict = Depends(get_current_user),
@@ -47,3 +65,89 @@ async def top_content(
     except Exception as e:
         logger.error(f"Error fetching top content: {e}")
         return {"content": []}
+
+
+@router.post("/velocity")
+async def record_velocity_snapshots(
+    request: VelocitySnapshotsRequest,
+    user: dict = Depends(get_current_user),
+):
+    """Registra snapshots de engajamento (pulls de insights) e re-pontua os posts.
+
+    O score de viralidade usa a velocidade recente da serie do post (menor
+    janela com dados) em vez da media desde a publicacao.
+    """
+    import numpy as np
+    from app.services.velocity_tracker import epoch_seconds, get_velocity_tracker
+    from app.services.viral_detection import score_virality_arrays
+
+    tracker = get_velocity_tracker()
+    received_at = epoch_seconds(None)
+    snapshots = request.snapshots
+    # Grava em ordem de captured_at (snapshots do mesmo post fora de ordem no
+    # lote seriam descartados), mas responde na ordem do pedido
+    order = sorted(
+        range(len(snapshots)),
+        key=lambda i: epoch_seconds(snapshots[i].captured_at) if snapshots[i].captured_at else received_at,
+    )
+    velocities = [None] * len(snapshots)
+    for i in order:
+        s = snapshots[i]
+        velocities[i] = tracker.record(
+            s.post_id,
+            s.likes + s.comments + s.shares + s.saves,
+            s.captured_at or received_at,
+            owner=user["id"],
+        )
+
+    now = datetime.utcnow()
+    # Sem posted_at = agora, como em classify_content_batch
+    posted_us = [int(epoch_seconds(s.posted_at or now) * 1_000_000) for s in snapshots]
+    recent = [v.recent_rate if v is not None and v.recent_rate is not None else np.nan for v in velocities]
+    scores = score_virality_arrays(
+        [s.likes for s in snapshots],
+        [s.comments for s in snapshots],
+        [s.shares for s in snapshots],
+        [s.saves for s in snapshots],
+        [s.followers for s in snapshots],
+        np.array(posted_us, dtype=np.int64),
+        now=now,
+        engagement_velocity=recent,
+    )
+
+    posts = []
+    for i, (snapshot, velocity) in enumerate(zip(snapshots, velocities)):
+        posts.append({
+            "post_id": snapshot.post_id,
+            "recorded": velocity is not None,
+            "velocity": velocity.to_dict() if velocity is not None else None,
+            "virality_score": float(scores["virality_score"][i]),
+            "classification": scores["classification"][i],
+        })
+    return {"recorded": sum(p["recorded"] for p in posts), "posts": posts}
+
+
+@router.get("/velocity")
+async def accelerating_posts(
+    user: dict = Depends(get_current_user),
+    limit: int = 20,
+):
+    """Posts do usuario acelerando agora (EWMA curta da taxa acima da longa)."""
+    from app.services.velocity_tracker import get_velocity_tracker
+
+    posts = get_velocity_tracker().accelerating(owner=user["id"], limit=limit)
+    return {"accelerating": [p.to_dict() for p in posts]}
+
+
+@router.get("/velocity/{post_id}")
+async def post_velocity(
+    post_id: str,
+    user: dict = Depends(get_current_user),
+):
+    """Velocidade de engajamento de um post (janelas de 1h/6h/24h e EWMAs)."""
+    from app.services.velocity_tracker import get_velocity_tracker
+
+    velocity = get_velocity_tracker().get(post_id, owner=user["id"])
+    if velocity is None:
+        return {"post_id": post_id, "velocity": None}
+    return {"post_id": post_id, "velocity": velocity.to_dict()}
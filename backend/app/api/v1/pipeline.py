@@ -5,21 +5,24 @@ Endpoints:
 - POST /generate/stream  — SSE streaming com progresso por step
 - GET  /runs             — Lista runs do usuario (paginado)
 - GET  /runs/{pipeline_id} — Detalhe de uma run
+- POST /runs/{pipeline_id}/resume — Retoma uma run interrompida ou parcial a partir do checkpoint
 """
 
 import asyncio
 import json
 import logging
 import uuid
+from datetime import datetime, timedelta
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
+from app.config import get_settings
 from app.constants import TABLES
 from app.dependencies import get_current_user
-from app.services.pipeline_service import PipelineService
+from app.services.pipeline_service import PipelineService, is_run_active
 
 router = APIRouter()
 logger = logging.getLogger("agentesocial.pipeline_api")
@@ -30,6 +33,7 @@ class PipelineRequest(BaseModel):
     platforms: list[str] = ["instagram", "youtube", "tiktok", "linkedin"]
     focus_topics: Optional[list[str]] = None
     include_video: bool = True
+    parallel: bool = True
 
 
 @router.post("/generate")
@@ -168,3 +172,61 @@ async def get_pipeline_run(
     except Exception as e:
         logger.error("Error getting pipeline run %s: %s", pipeline_id, e)
         raise HTTPException(status_code=500, detail="Erro ao buscar pipeline run")
+
+
+@router.post("/runs/{pipeline_id}/resume")
+async def resume_pipeline_run(
+    pipeline_id: str,
+    user: dict = Depends(get_current_user),
+):
+    """Retoma uma run interrompida ou parcial a partir do ultimo step/slot salvo.
+
+    Runs "partial" (slots de CONTENT/SCRIPTS falharam) regeram so esses slots.
+    A run e reivindicada com um UPDATE condicional (status != 'running', ou
+    'running' sem checkpoint ha PIPELINE_RESUME_STALE_SECONDS): so um worker
+    consegue retomar a mesma run.
+    """
+    from app.database.supabase_client import get_supabase_admin
+    supabase = get_supabase_admin()
+
+    try:
+        run = (
+            supabase.table(TABLES["pipeline_runs"])
+            .select("*")
+            .eq("id", pipeline_id)
+            .eq("user_id", user["id"])
+            .maybe_single()
+            .execute()
+        )
+    except Exception as e:
+        logger.error("Error loading pipeline run %s for resume: %s", pipeline_id, e)
+        raise HTTPException(status_code=500, detail="Erro ao buscar pipeline run")
+
+    if not run or not run.data:
+        raise HTTPException(status_code=404, detail="Pipeline run nao encontrada")
+    if run.data.get("status") == "completed":
+        raise HTTPException(status_code=409, detail="Pipeline run ja concluida")
+    if is_run_active(pipeline_id):
+        raise HTTPException(status_code=409, detail="Pipeline run ainda em execucao")
+
+    now = datetime.utcnow()
+    stale_before = (now - timedelta(seconds=get_settings().PIPELINE_RESUME_STALE_SECONDS)).isoformat()
+    try:
+        claim = (
+            supabase.table(TABLES["pipeline_runs"])
+            .update({"status": "running", "updated_at": now.isoformat()})
+            .eq("id", pipeline_id)
+            .eq("user_id", user["id"])
+            .neq("status", "completed")
+            .or_(f"status.neq.running,updated_at.lt.{stale_before}")
+            .execute()
+        )
+    except Exception as e:
+        logger.error("Error claiming pipeline run %s for resume: %s", pipeline_id, e)
+        raise HTTPException(status_code=500, detail="Erro ao retomar pipeline run")
+    if not claim.data:
+        raise HTTPException(status_code=409, detail="Pipeline run ainda em execucao")
+
+    service = PipelineService()
+    result = await service.resume(run.data)
+    return result.model_dump()
@@ -20,9 +20,35 @@ class Settings(BaseSettings):
 
     # Postgres (AGNO Memory + Storage — conexao direta ao Supabase)
     DATABASE_URL: str = ""
+    # Pool do engine compartilhado por todos os agentes/teams (memory_config)
+    AGNO_DB_POOL_SIZE: int = 5
+    AGNO_DB_MAX_OVERFLOW: int = 5
+    AGNO_DB_POOL_PRE_PING: bool = True
+    AGNO_DB_POOL_RECYCLE: int = 1800
+    AGNO_DB_POOL_TIMEOUT: int = 30
+
+    # Embeddings (OpenAI): cliente compartilhado com pool, timeouts, retry
+    # com jitter e limite de requisicoes simultaneas por processo
+    EMBEDDING_MAX_CONCURRENCY: int = 4
+    EMBEDDING_MAX_CONNECTIONS: int = 20
+    EMBEDDING_TIMEOUT: float = 30.0
+    EMBEDDING_CONNECT_TIMEOUT: float = 5.0
+    EMBEDDING_MAX_RETRIES: int = 3
+    EMBEDDING_BACKOFF_BASE: float = 0.5
+    EMBEDDING_BACKOFF_CAP: float = 8.0
+    # Cache de embeddings por conteudo: LRU em memoria + SQLite local
+    # (path vazio = so memoria)
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 10000
+    EMBEDDING_CACHE_PATH: str = ".cache/embeddings.sqlite3"
 
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
+    # Cache de respostas: "memory" (LRU por worker) ou "redis" (compartilhado)
+    CACHE_BACKEND: str = "memory"
+    CACHE_MAX_ENTRIES: int = 1024
+    # Single-flight entre workers: tempo maximo do lock de recomputo (s)
+    CACHE_LOCK_TIMEOUT: float = 10.0
 
     # CORS
     CORS_ORIGINS: list[str] = [
@@ -55,6 +81,72 @@ class Settings(BaseSettings):
     # Storage
     MAX_UPLOAD_SIZE_MB: int = 50
 
+    # Pipeline (fan-out de slots em CONTENT/SCRIPTS)
+    PIPELINE_MAX_CONCURRENCY: int = 8
+    PIPELINE_MAX_CONCURRENCY_PER_USER: int = 4
+    # Run em 'running' sem checkpoint ha mais que isso (s) e considerada interrompida
+    PIPELINE_RESUME_STALE_SECONDS: int = 600
+
+    # Contratos: schema compacto (sem title/description, minificado) nos prompts
+    CONTRACT_SCHEMA_COMPACT: bool = True
+    # Reparo parcial: re-prompta so os sub-objetos invalidos (ate N por tentativa)
+    CONTRACT_PARTIAL_REPAIR: bool = True
+    CONTRACT_REPAIR_MAX_TARGETS: int = 5
+
+    # Chat: team.run em threads dedicadas (por worker do uvicorn) + fila limitada
+    TEAM_MAX_CONCURRENCY: int = 8
+    TEAM_MAX_QUEUE: int = 32
+    # WebSocket do chat: respostas simultaneas (conversation_ids) por conexao
+    WS_MAX_GENERATIONS: int = 4
+    # Cache semantico do POST /chat (opt-in): similaridade minima, TTLs (s) e
+    # particao global compartilhada entre usuarios (so se as respostas nao
+    # dependem de dados do usuario)
+    SEMANTIC_CACHE_ENABLED: bool = False
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95
+    SEMANTIC_CACHE_TTL: int = 3600
+    SEMANTIC_CACHE_GLOBAL: bool = False
+    SEMANTIC_CACHE_GLOBAL_TTL: int = 86400
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 256
+
+    # Velocidade de engajamento por post (snapshots de insights): amostras por
+    # post, intervalo minimo entre amostras (s), constantes de tempo (s) das
+    # EWMAs e margem da curta sobre a longa para "acelerando"
+    VELOCITY_BUFFER_SIZE: int = 300
+    VELOCITY_MIN_SAMPLE_INTERVAL: int = 300
+    VELOCITY_FAST_TAU: int = 1800
+    VELOCITY_SLOW_TAU: int = 21600
+    VELOCITY_ACCEL_MARGIN: float = 0.25
+    VELOCITY_MAX_POSTS: int = 50000
+
+    # Hashtags em alta (indice em memoria por nicho): leitura periodica das
+    # tabelas (s), historico inicial (dias), bucket de contagem (min), meia-vida
+    # da base EWMA (buckets) e criterios de pico (z-score, lift, contagem)
+    HASHTAG_TRENDS_ENABLED: bool = True
+    HASHTAG_TRENDS_REFRESH_SECONDS: int = 300
+    HASHTAG_TRENDS_BACKFILL_DAYS: int = 14
+    HASHTAG_TRENDS_BUCKET_MINUTES: int = 60
+    HASHTAG_TRENDS_HALFLIFE_BUCKETS: float = 72
+    HASHTAG_TRENDS_Z_THRESHOLD: float = 3.0
+    HASHTAG_TRENDS_LIFT_THRESHOLD: float = 2.0
+    HASHTAG_TRENDS_MIN_COUNT: float = 3
+
+    # Indice de co-ocorrencia de hashtags (alimentado pelo feed acima):
+    # arquivo .npz (vazio = so memoria) e pares pendentes antes de compactar
+    HASHTAG_GRAPH_ENABLED: bool = True
+    HASHTAG_GRAPH_PATH: str = ".cache/hashtag_graph.npz"
+    HASHTAG_GRAPH_PENDING_MAX: int = 100000
+
+    # Pool de agentes por factory (reusa instancias ja montadas com DB/memoria)
+    AGENT_POOL_ENABLED: bool = True
+    AGENT_POOL_MAX_IDLE: int = 8
+
+    # Fila write-behind (conversas, memoria): buffer limitado, lotes e retry
+    WRITE_QUEUE_MAX_SIZE: int = 1000
+    WRITE_QUEUE_BATCH_SIZE: int = 50
+    WRITE_QUEUE_FLUSH_INTERVAL_MS: int = 50
+    WRITE_QUEUE_MAX_RETRIES: int = 3
+    WRITE_QUEUE_SHUTDOWN_TIMEOUT: float = 10.0
+
     # JWT
     SUPABASE_JWT_SECRET: str = ""
 
@@ -14,6 +14,7 @@ TABLES: dict[str, str] = {
     "automation_rules": "social_midia_automation_rules",
     "notifications": "social_midia_notifications",
     "agent_conversations": "social_midia_agent_conversations",
+    "conversation_messages": "social_midia_conversation_messages",
     "content_history": "social_midia_content_history",
     "brand_voice_profiles": "social_midia_brand_voice_profiles",
     "competitor_tracking": "social_midia_competitor_tracking",
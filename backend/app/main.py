@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import time
 from fastapi import Depends, FastAPI, Request
@@ -18,8 +19,29 @@ logger = logging.getLogger("agentesocial")
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("AgenteSocial API starting...")
+    from app.services.hashtag_trends import get_hashtag_trends
+    from app.services.write_queue import get_write_queue
+    get_write_queue().start()
+    app_settings = get_settings()
+    if app_settings.HASHTAG_GRAPH_ENABLED:
+        from app.services.hashtag_graph import get_hashtag_graph
+        graph = await asyncio.to_thread(get_hashtag_graph)  # carrega o .npz
+        get_hashtag_trends().subscribe(graph.ingest_rows, graph.save_if_changed)
+    if app_settings.HASHTAG_TRENDS_ENABLED:
+        get_hashtag_trends().start(app_settings.HASHTAG_TRENDS_REFRESH_SECONDS)
     yield
     logger.info("AgenteSocial API shutting down...")
+    from app.agents.memory_config import dispose_engines
+    from app.services.embedding_service import close_clients
+    from app.services.team_executor import shutdown_team_executor
+    await get_hashtag_trends().stop()
+    if app_settings.HASHTAG_GRAPH_ENABLED:
+        await asyncio.to_thread(graph.save_if_changed)
+    # Flush das gravacoes pendentes antes de derrubar executor e engines
+    await get_write_queue().close(get_settings().WRITE_QUEUE_SHUTDOWN_TIMEOUT)
+    shutdown_team_executor()
+    dispose_engines()
+    await close_clients()
 
 
 settings = get_settings()
@@ -80,11 +102,51 @@ async def health():
     except Exception as e:
         logger.warning(f"Supabase health check failed: {e}")
         checks["supabase"] = "unhealthy"
-    return {"status": "healthy", "service": "agentesocial-api", "version": "0.1.0", "checks": checks}
+
+    from app.agents.memory_config import get_db_pool_stats
+    db_pools = get_db_pool_stats()
+    checks["agno_db"] = "enabled" if db_pools["engines"] else "disabled"
+    return {
+        "status": "healthy",
+        "service": "agentesocial-api",
+        "version": "0.1.0",
+        "checks": checks,
+        "db_pools": db_pools["pools"],
+    }
 
 
 @app.post("/admin/clear-cache")
 async def clear_cache_endpoint(user: dict = Depends(get_current_user)):
     from app.middleware.cache import clear_cache
-    clear_cache()
+    await clear_cache()
     return {"status": "cache_cleared"}
+
+
+@app.get("/admin/metrics")
+async def metrics_endpoint(user: dict = Depends(get_current_user)):
+    from app.agents.memory_config import get_db_pool_stats
+    from app.middleware.cache import get_cache_stats
+    from app.services.embedding_service import get_embedding_stats
+    from app.services.agent_pool import get_agent_pool_stats
+    from app.services.contract_registry import get_schema_stats
+    from app.services.hashtag_graph import get_hashtag_graph_stats
+    from app.services.hashtag_trends import get_hashtag_trends
+    from app.services.semantic_cache import get_semantic_cache_stats
+    from app.services.team_executor import get_team_executor
+    from app.services.team_stream import get_stream_stats
+    from app.services.velocity_tracker import get_velocity_tracker
+    from app.services.write_queue import get_write_queue
+    return {
+        "team_executor": get_team_executor().stats(),
+        "chat_stream": get_stream_stats(),
+        "write_queue": get_write_queue().stats(),
+        "response_cache": get_cache_stats(),
+        "semantic_cache": get_semantic_cache_stats(),
+        "embeddings": get_embedding_stats(),
+        "velocity": get_velocity_tracker().stats(),
+        "hashtag_trends": get_hashtag_trends().stats(),
+        "hashtag_graph": get_hashtag_graph_stats(),
+        "db_pools": get_db_pool_stats(),
+        "agent_pools": get_agent_pool_stats(),
+        "contracts": get_schema_stats(),
+    }
@@ -1,40 +1,333 @@
+import abc
+import asyncio
 import hashlib
 import json
+import logging
+import threading
+import time
+from collections import OrderedDict
 from functools import wraps
-from typing import Optional
+from typing import Any, Optional
 
-# Simple in-memory cache (upgrade to Redis when available)
-_cache: dict[str, tuple[float, any]] = {}
+from fastapi.encoders import jsonable_encoder
 
+logger = logging.getLogger("agentesocial.cache")
 
-def cache_response(ttl_seconds: int = 300, key_prefix: str = ""):
-    """Decorator to cache endpoint responses in memory."""
+# Parameters that are per-request plumbing, never part of the cache key
+_SKIP_TYPES = ("Request", "WebSocket", "Response", "BackgroundTasks")
+_MISSING = object()
+
+
+class CacheBackend(abc.ABC):
+    """Async key/value store with TTL used by cache_response.
+
+    get() returns _MISSING on a miss so cached falsy values (None, [], {})
+    still count as hits.
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+        self.errors = 0
+
+    @abc.abstractmethod
+    async def get(self, key: str) -> Any:
+        ...
+
+    @abc.abstractmethod
+    async def set(self, key: str, value: Any, ttl_seconds: int) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def clear(self, prefix: str = "") -> int:
+        ...
+
+    async def acquire_lock(self, key: str, ttl_seconds: float) -> bool:
+        """Cross-process single-flight lock. In-process misses are coalesced by the decorator."""
+        return True
+
+    async def release_lock(self, key: str) -> None:
+        return None
+
+    def size(self) -> Optional[int]:
+        return None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.name,
+            "size": self.size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expired": self.expired,
+            "errors": self.errors,
+        }
+
+
+class MemoryCache(CacheBackend):
+    """Bounded in-process LRU with per-entry expiry."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 1024):
+        super().__init__()
+        self.max_entries = max(max_entries, 1)
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return _MISSING
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._data[key]
+                self.expired += 1
+                self.misses += 1
+                return _MISSING
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    async def set(self, key: str, value: Any, ttl_seconds: int) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl_seconds, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    async def clear(self, prefix: str = "") -> int:
+        with self._lock:
+            if not prefix:
+                count = len(self._data)
+                self._data.clear()
+                return count
+            keys = [k for k in self._data if k.startswith(prefix)]
+            for k in keys:
+                del self._data[k]
+            return len(keys)
+
+    def size(self) -> int:
+        return len(self._data)
+
+
+class RedisCache(CacheBackend):
+    """Redis backend shared by all workers.
+
+    Values are stored as JSON (jsonable_encoder), so a hit returns the
+    JSON-compatible form of the original response. Redis handles expiry and
+    eviction (maxmemory-policy); evictions are not visible from here.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, namespace: str = "agentesocial:cache:", client=None):
+        super().__init__()
+        self.namespace = namespace
+        if client is None:
+            import redis.asyncio as redis_asyncio
+            client = redis_asyncio.from_url(url)
+        self._client = client
+
+    async def get(self, key: str) -> Any:
+        try:
+            raw = await self._client.get(self.namespace + key)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Redis cache get failed: {e}")
+            return _MISSING
+        if raw is None:
+            self.misses += 1
+            return _MISSING
+        self.hits += 1
+        return json.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl_seconds: int) -> None:
+        try:
+            payload = json.dumps(jsonable_encoder(value))
+            await self._client.set(self.namespace + key, payload, ex=ttl_seconds)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Redis cache set failed: {e}")
+
+    async def clear(self, prefix: str = "") -> int:
+        count = 0
+        try:
+            async for redis_key in self._client.scan_iter(match=f"{self.namespace}{prefix}*", count=500):
+                count += await self._client.delete(redis_key)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Redis cache clear failed after {count} keys: {e}")
+        return count
+
+    async def acquire_lock(self, key: str, ttl_seconds: float) -> bool:
+        try:
+            locked = await self._client.set(
+                f"{self.namespace}lock:{key}", "1", nx=True, px=int(ttl_seconds * 1000),
+            )
+            return bool(locked)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Redis cache lock failed: {e}")
+            return True
+
+    async def release_lock(self, key: str) -> None:
+        try:
+            await self._client.delete(f"{self.namespace}lock:{key}")
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Redis cache unlock failed: {e}")
+
+
+_backend: Optional[CacheBackend] = None
+_backend_lock = threading.Lock()
+_inflight: dict[str, asyncio.Future] = {}
+_coalesced = 0
+
+
+def get_cache_backend() -> CacheBackend:
+    """Process-wide backend selected by CACHE_BACKEND ("memory" or "redis")."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                from app.config import get_settings
+
+                settings = get_settings()
+                if settings.CACHE_BACKEND == "redis":
+                    _backend = RedisCache(settings.REDIS_URL)
+                else:
+                    _backend = MemoryCache(settings.CACHE_MAX_ENTRIES)
+    return _backend
+
+
+def set_cache_backend(backend: Optional[CacheBackend]) -> None:
+    """Replace the backend (None = rebuild from settings on next use)."""
+    global _backend
+    _backend = backend
+
+
+def _canonical(value: Any) -> Any:
+    try:
+        return jsonable_encoder(value)
+    except Exception:
+        return repr(value)
+
+
+def make_cache_key(prefix: str, func_name: str, kwargs: dict, scope: str = "user") -> str:
+    """Deterministic key: prefix:function:scope:sha256(canonical JSON of kwargs).
+
+    With scope="user" the authenticated user (the `user` dict injected by
+    get_current_user, or a `user_id` kwarg) becomes part of the key, so one
+    user's cached response is never served to another.
+    """
+    params = {}
+    user_scope = "global"
+    for name, value in kwargs.items():
+        if name == "user" and isinstance(value, dict):
+            if scope == "user":
+                user_scope = f"u={value.get('id', '')}"
+            continue
+        if type(value).__name__ in _SKIP_TYPES:
+            continue
+        params[name] = _canonical(value)
+    if scope == "user" and user_scope == "global" and kwargs.get("user_id"):
+        user_scope = f"u={kwargs['user_id']}"
+
+    digest = hashlib.sha256(
+        json.dumps(params, sort_keys=True, separators=(",", ":"), default=repr).encode()
+    ).hexdigest()
+    return f"{prefix}:{func_name}:{user_scope}:{digest}"
+
+
+async def _wait_for_peer(backend: CacheBackend, key: str, timeout: float) -> Any:
+    """Another worker holds the lock: poll for its result until timeout."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+        value = await backend.get(key)
+        if value is not _MISSING:
+            return value
+    return _MISSING
+
+
+async def get_or_compute(key: str, ttl_seconds: int, compute) -> Any:
+    """Cache lookup with single-flight: concurrent misses on a key compute once."""
+    global _coalesced
+    backend = get_cache_backend()
+    value = await backend.get(key)
+    if value is not _MISSING:
+        return value
+
+    pending = _inflight.get(key)
+    if pending is not None and not pending.done():
+        _coalesced += 1
+        return await asyncio.shield(pending)
+
+    from app.config import get_settings
+    lock_timeout = get_settings().CACHE_LOCK_TIMEOUT
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    locked = False
+    try:
+        locked = await backend.acquire_lock(key, lock_timeout)
+        if not locked:
+            value = await _wait_for_peer(backend, key, lock_timeout)
+            if value is not _MISSING:
+                future.set_result(value)
+                return value
+        value = await compute()
+        await backend.set(key, value, ttl_seconds)
+        future.set_result(value)
+        return value
+    except BaseException as e:
+        if isinstance(e, asyncio.CancelledError):
+            future.cancel()
+        else:
+            future.set_exception(e)
+            future.exception()  # waiters re-raise it; avoid "never retrieved" noise
+        raise
+    finally:
+        _inflight.pop(key, None)
+        if locked:
+            await backend.release_lock(key)
+
+
+def cache_response(ttl_seconds: int = 300, key_prefix: str = "", scope: str = "user"):
+    """Decorator to cache endpoint responses.
+
+    Args:
+        ttl_seconds: Entry lifetime
+        key_prefix: Namespace used by clear_cache(prefix)
+        scope: "user" (key includes the authenticated user) or "global"
+    """
     def decorator(func):
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            import time
-            # Build cache key from function name + args
-            cache_key = f"{key_prefix}:{func.__name__}:{hashlib.md5(json.dumps(str(kwargs), sort_keys=True).encode()).hexdigest()}"
-
-            # Check cache
-            if cache_key in _cache:
-                cached_time, cached_value = _cache[cache_key]
-                if time.time() - cached_time < ttl_seconds:
-                    return cached_value
-
-            # Execute and cache
-            result = await func(*args, **kwargs)
-            _cache[cache_key] = (time.time(), result)
-            return result
+            cache_key = make_cache_key(key_prefix, func.__name__, kwargs, scope)
+            return await get_or_compute(cache_key, ttl_seconds, lambda: func(*args, **kwargs))
         return wrapper
     return decorator
 
 
-def clear_cache(prefix: str = ""):
-    """Clear cache entries matching prefix."""
-    if not prefix:
-        _cache.clear()
-    else:
-        keys_to_delete = [k for k in _cache if k.startswith(prefix)]
-        for k in keys_to_delete:
-            del _cache[k]
+async def clear_cache(prefix: str = "") -> int:
+    """Clear cache entries matching prefix. Returns how many were removed."""
+    return await get_cache_backend().clear(prefix)
+
+
+def get_cache_stats() -> dict:
+    """Hit/miss/eviction counters of the active backend."""
+    stats = get_cache_backend().stats()
+    stats["coalesced"] = _coalesced
+    stats["in_flight"] = len(_inflight)
+    return stats
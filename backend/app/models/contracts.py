@@ -280,6 +280,9 @@ class PipelineStep(BaseModel):
     started_at: Optional[str] = None
     completed_at: Optional[str] = None
     error: Optional[str] = None
+    duration_ms: Optional[float] = None
+    depends_on: list[str] = Field(default_factory=list, description="Steps dos quais este step dependeu")
+    slot_errors: list[dict] = Field(default_factory=list, description="Falhas por slot (index, error)")
 
 
 class PipelineResult(BaseModel):
@@ -299,5 +302,7 @@ class PipelineResult(BaseModel):
     quality_report: Optional[dict] = None
     content_piece_ids: list[str] = Field(default_factory=list)
     calendar_event_ids: list[str] = Field(default_factory=list)
+    persist_errors: list[dict] = Field(default_factory=list, description="Linhas que falharam ao persistir (table, index, error)")
+    critical_path: list[str] = Field(default_factory=list, description="Steps no caminho critico da run")
     created_at: Optional[str] = None
     completed_at: Optional[str] = None
@@ -9,6 +9,8 @@ class ChatRequest(BaseModel):
     conversation_id: Optional[str] = None
     agent_type: Optional[str] = None
     context: Optional[dict] = None
+    # False ignora o cache semantico (forca nova geracao)
+    use_cache: bool = True
 
 
 class ChatResponse(BaseModel):
@@ -51,6 +53,9 @@ class TrendSearchRequest(BaseModel):
     keywords: list[str]
     platform: Optional[str] = None
     country: str = "BR"
+    niche: Optional[str] = None
+    # Forca a pesquisa na web (trend_analyst) mesmo com o indice de hashtags pronto
+    research: bool = False
 
 
 # Reports
@@ -0,0 +1,184 @@
+"""Pool de instancias de agentes reutilizaveis, por factory.
+
+Cada factory (ex: create_content_writer) monta um Agent com tools, PostgresDb
+e MemoryManager proprios — caro para criar a cada chamada. O AgentPool guarda
+instancias ociosas ja montadas e as empresta uma por vez: um agente nunca e
+usado por duas execucoes simultaneas. Ao devolver, o estado por requisicao
+(user_id, session_id, session_state, ...) volta ao valor original da factory,
+entao nada vaza de um usuario para outro.
+
+Uso:
+    with get_agent_pool(create_content_writer).lease() as agent:
+        agent.run(message=..., user_id=user_id)
+"""
+
+import copy
+import logging
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+logger = logging.getLogger("agentesocial.agent_pool")
+
+# Atributos do agno Agent que carregam estado de uma requisicao
+_REQUEST_ATTRS = (
+    "user_id",
+    "session_id",
+    "session_state",
+    "dependencies",
+    "metadata",
+    "additional_context",
+)
+# Cache interno de sessao do agno (sempre descartado na devolucao)
+_REQUEST_CACHES = ("_cached_session",)
+
+
+class AgentPool:
+    """Instancias ociosas de uma factory, emprestadas com exclusividade.
+
+    Args:
+        factory: Funcao sem argumentos que cria o agente
+        max_idle: Maximo de instancias ociosas guardadas (as excedentes sao descartadas)
+    """
+
+    def __init__(self, factory: Callable[[], Any], max_idle: int = 8):
+        self.factory = factory
+        self.max_idle = max(max_idle, 0)
+        self.name = getattr(factory, "__qualname__", repr(factory))
+        self._idle: list[Any] = []
+        self._baselines: dict[int, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.reuses = 0
+        self.discarded = 0
+        self.build_ms = 0.0
+        self.reuse_ms = 0.0
+
+    def checkout(self) -> Any:
+        """Retorna um agente ocioso ou cria um novo."""
+        started = time.perf_counter()
+        with self._lock:
+            agent = self._idle.pop() if self._idle else None
+            if agent is not None:
+                self.reuses += 1
+                self.reuse_ms += (time.perf_counter() - started) * 1000
+                return agent
+
+        agent = self.factory()
+        elapsed = (time.perf_counter() - started) * 1000
+        baseline = {
+            attr: copy.deepcopy(vars(agent)[attr])
+            for attr in _REQUEST_ATTRS
+            if attr in getattr(agent, "__dict__", {})
+        }
+        with self._lock:
+            self.builds += 1
+            self.build_ms += elapsed
+            self._baselines[id(agent)] = baseline
+        return agent
+
+    def checkin(self, agent: Any) -> None:
+        """Devolve o agente ao pool, limpando o estado da requisicao."""
+        with self._lock:
+            baseline = self._baselines.get(id(agent))
+        if baseline is None:
+            return
+
+        try:
+            for attr, value in baseline.items():
+                setattr(agent, attr, copy.deepcopy(value))
+            for attr in _REQUEST_CACHES:
+                if attr in getattr(agent, "__dict__", {}):
+                    setattr(agent, attr, None)
+        except Exception as e:
+            logger.warning("Agent %s reset failed, discarding: %s", self.name, e)
+            self.discard(agent)
+            return
+
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(agent)
+                return
+            self._baselines.pop(id(agent), None)
+            self.discarded += 1
+
+    def discard(self, agent: Any) -> None:
+        """Descarta o agente (ex: apos erro) em vez de devolve-lo ao pool."""
+        with self._lock:
+            if self._baselines.pop(id(agent), None) is not None:
+                self.discarded += 1
+
+    @contextmanager
+    def lease(self) -> Iterator[Any]:
+        """Empresta um agente durante o bloco e o devolve ao final."""
+        agent = self.checkout()
+        try:
+            yield agent
+        finally:
+            self.checkin(agent)
+
+    def clear(self) -> None:
+        with self._lock:
+            for agent in self._idle:
+                self._baselines.pop(id(agent), None)
+            self._idle.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "idle": len(self._idle),
+                "leased": len(self._baselines) - len(self._idle),
+                "builds": self.builds,
+                "reuses": self.reuses,
+                "discarded": self.discarded,
+                "avg_build_ms": round(self.build_ms / self.builds, 3) if self.builds else 0.0,
+                "avg_reuse_ms": round(self.reuse_ms / self.reuses, 3) if self.reuses else 0.0,
+            }
+
+
+# Chave fraca: factories temporarias (ex: lambdas) liberam o pool junto
+_pools: "weakref.WeakKeyDictionary[Callable, AgentPool]" = weakref.WeakKeyDictionary()
+_pools_lock = threading.Lock()
+
+
+def get_agent_pool(factory: Callable[[], Any]) -> AgentPool:
+    """Retorna o pool da factory, criando-o no primeiro uso."""
+    pool = _pools.get(factory)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(factory)
+            if pool is None:
+                from app.config import get_settings
+
+                pool = AgentPool(factory, max_idle=get_settings().AGENT_POOL_MAX_IDLE)
+                _pools[factory] = pool
+    return pool
+
+
+@contextmanager
+def lease_agent(factory: Callable[[], Any]) -> Iterator[Any]:
+    """Empresta um agente do pool da factory (ou cria um avulso se o pool estiver desligado)."""
+    from app.config import get_settings
+
+    if not get_settings().AGENT_POOL_ENABLED:
+        yield factory()
+        return
+    with get_agent_pool(factory).lease() as agent:
+        yield agent
+
+
+def get_agent_pool_stats() -> dict[str, dict[str, Any]]:
+    """Metricas por factory: instancias criadas/reusadas e tempo medio de cada caminho."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {pool.name: pool.stats() for pool in pools}
+
+
+def clear_agent_pools() -> None:
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.clear()
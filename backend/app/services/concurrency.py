@@ -0,0 +1,64 @@
+"""Limitadores de concorrencia compartilhados pelos servicos.
+
+KeyedLimiter combina um teto global (por processo) com um teto por chave
+(ex: user_id). Usado pelo pipeline para fan-out de slots sem que um unico
+usuario monopolize as chamadas LLM do worker.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+
+class KeyedLimiter:
+    """Semaforo global + semaforos por chave, criados sob demanda.
+
+    Os semaforos por chave sao descartados quando ninguem os esta usando,
+    entao o dicionario interno nao cresce com o numero de usuarios.
+    """
+
+    def __init__(self, global_limit: int, per_key_limit: int):
+        self.global_limit = max(global_limit, 1)
+        self.per_key_limit = max(per_key_limit, 1)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._global: Optional[asyncio.Semaphore] = None
+        self._per_key: dict[str, tuple[asyncio.Semaphore, int]] = {}
+        self.in_flight = 0
+
+    def _bind_loop(self) -> None:
+        # Semaforos ficam presos ao loop em que bloquearam pela primeira vez;
+        # recria se o loop mudou (ex: testes, reload do uvicorn).
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._global = asyncio.Semaphore(self.global_limit)
+            self._per_key = {}
+            self.in_flight = 0
+
+    @asynccontextmanager
+    async def acquire(self, key: str) -> AsyncIterator[None]:
+        """Segura uma vaga global e uma vaga da chave durante o bloco."""
+        self._bind_loop()
+        sem, refs = self._per_key.get(key, (None, 0))
+        if sem is None:
+            sem = asyncio.Semaphore(self.per_key_limit)
+        self._per_key[key] = (sem, refs + 1)
+        try:
+            async with sem:
+                async with self._global:
+                    self.in_flight += 1
+                    try:
+                        yield
+                    finally:
+                        self.in_flight -= 1
+        finally:
+            sem, refs = self._per_key[key]
+            if refs <= 1:
+                del self._per_key[key]
+            else:
+                self._per_key[key] = (sem, refs - 1)
+
+    @property
+    def active_keys(self) -> int:
+        """Quantidade de chaves com pelo menos uma tarefa ativa ou aguardando."""
+        return len(self._per_key)
@@ -0,0 +1,161 @@
+"""Registro de contratos do pipeline com schema e validador pre-computados.
+
+Cada schema Pydantic usado por validate_and_retry e resolvido uma unica vez:
+texto do JSON schema (completo e compacto), TypeAdapter e contagem de tokens.
+O modo compacto remove title/description e espacos, reduzindo o tamanho do
+schema embutido em cada prompt; as economias ficam em get_schema_stats(),
+junto com o desfecho de cada validacao (primeira tentativa, reparo parcial,
+retry completo ou fallback).
+"""
+
+import json
+import logging
+import threading
+from functools import cached_property
+from typing import Any
+
+from pydantic import BaseModel, TypeAdapter
+
+from app.models.contracts import (
+    AuditReport,
+    ContentPieceContract,
+    MonthlyPlan,
+    QualityReport,
+    ScriptReel,
+    WeeklyPlan,
+)
+
+logger = logging.getLogger("agentesocial.contract_registry")
+
+# Chaves de anotacao removidas no modo compacto (nomes de campos sao preservados)
+_PRUNED_KEYS = {"title", "description"}
+
+
+def _count_tokens(text: str) -> int:
+    """Conta tokens com tiktoken; sem tiktoken, estima ~4 chars por token."""
+    try:
+        import tiktoken
+
+        return len(tiktoken.get_encoding("cl100k_base").encode(text))
+    except Exception:
+        return max(len(text) // 4, 1)
+
+
+def _prune_schema(node: Any) -> Any:
+    if isinstance(node, list):
+        return [_prune_schema(item) for item in node]
+    if not isinstance(node, dict):
+        return node
+
+    pruned: dict = {}
+    for key, value in node.items():
+        if key in ("properties", "$defs") and isinstance(value, dict):
+            pruned[key] = {name: _prune_schema(sub) for name, sub in value.items()}
+        elif key in _PRUNED_KEYS and isinstance(value, str):
+            continue
+        else:
+            pruned[key] = _prune_schema(value)
+    return pruned
+
+
+class ContractSpec:
+    """Schema pre-computado de um contrato."""
+
+    def __init__(self, schema: type[BaseModel]):
+        json_schema = schema.model_json_schema()
+        self.schema = schema
+        self.adapter: TypeAdapter = TypeAdapter(schema)
+        self.full_text = json.dumps(json_schema, ensure_ascii=False, indent=2)
+        self.compact_text = json.dumps(
+            _prune_schema(json_schema), ensure_ascii=False, separators=(",", ":"),
+        )
+
+    # Contagens sob demanda: tiktoken carrega o encoding no primeiro uso
+    @cached_property
+    def full_tokens(self) -> int:
+        return _count_tokens(self.full_text)
+
+    @cached_property
+    def compact_tokens(self) -> int:
+        return _count_tokens(self.compact_text)
+
+    def schema_text(self, compact: bool) -> str:
+        return self.compact_text if compact else self.full_text
+
+    def validate_json(self, data: str) -> BaseModel:
+        return self.adapter.validate_json(data)
+
+
+_registry: dict[type[BaseModel], ContractSpec] = {}
+_stats: dict[str, dict[str, int]] = {}
+_lock = threading.Lock()
+
+# Desfechos de validate_and_retry contabilizados por schema
+OUTCOMES = ("first_try", "repaired", "full_retry", "fallback")
+
+
+def _schema_stats(name: str) -> dict[str, int]:
+    return _stats.setdefault(name, {
+        "prompts": 0, "compact_prompts": 0, "tokens_sent": 0, "tokens_saved": 0,
+        "repair_attempts": 0, "repair_successes": 0,
+        **{outcome: 0 for outcome in OUTCOMES},
+    })
+
+
+def get_contract(schema: type[BaseModel]) -> ContractSpec:
+    """Retorna o ContractSpec do schema, criando-o no primeiro uso."""
+    spec = _registry.get(schema)
+    if spec is None:
+        with _lock:
+            spec = _registry.get(schema)
+            if spec is None:
+                spec = ContractSpec(schema)
+                _registry[schema] = spec
+    return spec
+
+
+def record_schema_usage(schema: type[BaseModel], compact: bool) -> None:
+    """Contabiliza um prompt que embutiu o schema (e os tokens economizados)."""
+    spec = get_contract(schema)
+    with _lock:
+        stats = _schema_stats(schema.__name__)
+        stats["prompts"] += 1
+        if compact:
+            stats["compact_prompts"] += 1
+            stats["tokens_sent"] += spec.compact_tokens
+            stats["tokens_saved"] += spec.full_tokens - spec.compact_tokens
+        else:
+            stats["tokens_sent"] += spec.full_tokens
+
+
+def record_repair(schema: type[BaseModel], success: bool) -> None:
+    """Contabiliza uma tentativa de reparo parcial do documento."""
+    with _lock:
+        stats = _schema_stats(schema.__name__)
+        stats["repair_attempts"] += 1
+        if success:
+            stats["repair_successes"] += 1
+
+
+def record_outcome(schema: type[BaseModel], outcome: str) -> None:
+    """Contabiliza o desfecho de validate_and_retry (um de OUTCOMES)."""
+    if outcome not in OUTCOMES:
+        raise ValueError(f"Desfecho invalido: {outcome}")
+    with _lock:
+        _schema_stats(schema.__name__)[outcome] += 1
+
+
+def get_schema_stats() -> dict[str, dict[str, int]]:
+    """Metricas por contrato: prompts, tokens enviados/economizados e desfechos."""
+    with _lock:
+        return {name: dict(stats) for name, stats in _stats.items()}
+
+
+def reset_schema_stats() -> None:
+    with _lock:
+        _stats.clear()
+
+
+# Contratos do pipeline: pre-computados no import
+for _schema in (AuditReport, WeeklyPlan, MonthlyPlan, ContentPieceContract, ScriptReel, QualityReport):
+    get_contract(_schema)
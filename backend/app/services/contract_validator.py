@@ -1,79 +1,489 @@
 """Validador de contratos com retry automatico para agentes do pipeline.
 
 Garante que agentes retornem JSON estruturado validado contra schemas Pydantic.
-Se a validacao falhar, re-prompta o agente com feedback de erro (max 2 retries).
+Se a validacao falhar, tenta primeiro um reparo parcial (re-prompta so os
+sub-objetos invalidos, ex: um PlanSlot) e, se nao bastar, re-prompta o agente
+pedindo o documento inteiro com feedback de erro (max 2 retries).
+Schemas e validadores vem pre-computados de app.services.contract_registry.
 """
 
 import asyncio
 import json
 import logging
 import re
-from typing import Callable, Optional
+import types
+from typing import Any, Callable, Iterable, Optional, Union, get_args, get_origin
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
+
+from app.services.contract_registry import (
+    get_contract,
+    record_outcome,
+    record_repair,
+    record_schema_usage,
+)
 
 logger = logging.getLogger("agentesocial.contract_validator")
 
 
+# Caracteres relevantes para o scanner: fora de JSON so importam aberturas;
+# dentro de JSON, delimitadores e aspas; dentro de strings, aspas e escapes.
+_OPEN_RE = re.compile(r"[{\[]")
+_STRUCT_RE = re.compile(r'[{}\[\]"]')
+_STRING_RE = re.compile(r'["\\]')
+
+
+class JsonStreamExtractor:
+    """Encontra objetos/arrays JSON mais externos em texto, em uma unica passada.
+
+    Aceita o texto inteiro ou pedacos (streaming): feed() retorna os
+    candidatos que se fecharam naquele pedaco. O scanner usa regex para
+    saltar direto aos caracteres relevantes, sem json.loads — a validacao
+    fica a cargo do schema (ContractSpec.validate_json).
+
+    Uso:
+        extractor = JsonStreamExtractor()
+        for chunk in stream:
+            for candidate in extractor.feed(chunk):
+                ...
+    """
+
+    def __init__(self):
+        self._depth = 0
+        self._in_string = False
+        self._skip_next = False
+        self._parts: list[str] = []
+        self._offset = 0  # caracteres ja consumidos em feeds anteriores
+        self._start = 0  # posicao absoluta do candidato aberto
+
+    @property
+    def pending_start(self) -> Optional[int]:
+        """Posicao absoluta do candidato ainda aberto (None se nao ha nenhum)."""
+        return self._start if self._depth > 0 else None
+
+    def feed(self, chunk: str) -> list[str]:
+        found: list[str] = []
+        n = len(chunk)
+        pos = 0
+        seg_start = 0
+
+        if self._skip_next and n:
+            # Caractere escapado que ficou para o proximo pedaco
+            self._skip_next = False
+            pos = 1
+
+        while pos < n:
+            if self._depth == 0:
+                m = _OPEN_RE.search(chunk, pos)
+                if not m:
+                    break
+                self._depth = 1
+                self._parts = []
+                seg_start = m.start()
+                self._start = self._offset + seg_start
+                pos = m.end()
+                continue
+
+            if self._in_string:
+                m = _STRING_RE.search(chunk, pos)
+                if not m:
+                    break
+                if m.group() == "\\":
+                    pos = m.end() + 1
+                    if pos > n:
+                        self._skip_next = True
+                    continue
+                self._in_string = False
+                pos = m.end()
+                continue
+
+            m = _STRUCT_RE.search(chunk, pos)
+            if not m:
+                break
+            ch = m.group()
+            pos = m.end()
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._parts.append(chunk[seg_start:pos])
+                    found.append("".join(self._parts))
+                    self._parts = []
+
+        if self._depth > 0:
+            self._parts.append(chunk[seg_start:])
+        self._offset += n
+        return found
+
+
+def _match_openers(text: str, start: int, ends: dict[int, Optional[int]]) -> None:
+    """Varre a partir da abertura em `start` anotando onde cada abertura fecha.
+
+    ends: {posicao da abertura: posicao logo apos o fechamento, ou None se
+    nunca fecha}. So aberturas fora de strings sao anotadas. Como o
+    fechamento de uma abertura nao depende de onde a varredura comecou,
+    aberturas ja anotadas sao puladas (ou encerram a varredura, se nunca
+    fecham) em vez de varridas de novo.
+    """
+    stack = [start]
+    pos = start + 1
+    n = len(text)
+    in_string = False
+    while pos < n:
+        if in_string:
+            m = _STRING_RE.search(text, pos)
+            if not m:
+                break
+            pos = m.end() + 1 if m.group() == "\\" else m.end()
+            in_string = m.group() != '"'
+            continue
+
+        m = _STRUCT_RE.search(text, pos)
+        if not m:
+            break
+        ch = m.group()
+        pos = m.end()
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            if m.start() not in ends:
+                stack.append(m.start())
+            elif ends[m.start()] is None:
+                break
+            else:
+                pos = ends[m.start()]
+        else:
+            ends[stack.pop()] = pos
+            if not stack:
+                return
+    for opener in stack:
+        ends[opener] = None
+
+
+def iter_json_candidates(text: str) -> list[str]:
+    """Todos os blocos JSON balanceados mais externos do texto, em ordem.
+
+    Uma abertura que nunca fecha (ex: ":-{" em texto livre) nao engole o
+    resto do texto: a busca recomeca na abertura seguinte. As aberturas sem
+    fechamento ficam anotadas, entao o texto e varrido uma vez so mesmo com
+    muitas delas (ex: "{{{{...").
+    """
+    found: list[str] = []
+    ends: dict[int, Optional[int]] = {}
+    pos = 0
+    while text:
+        m = _OPEN_RE.search(text, pos)
+        if not m:
+            break
+        start = m.start()
+        if start not in ends:
+            _match_openers(text, start, ends)
+        end = ends[start]
+        if end is None:
+            pos = start + 1
+        else:
+            found.append(text[start:end])
+            pos = end
+    return found
+
+
+def _is_json(candidate: str) -> bool:
+    try:
+        json.loads(candidate)
+        return True
+    except json.JSONDecodeError:
+        return False
+
+
+def _iter_valid_json(text: str):
+    """Candidatos de iter_json_candidates que sao JSON valido, em ordem.
+
+    Quando um candidato falha no json.loads, procura dentro dele (pode haver
+    JSON valido la dentro, ex: "{isto: {...}}").
+    """
+    for candidate in iter_json_candidates(text):
+        if _is_json(candidate):
+            yield candidate
+        else:
+            yield from _iter_valid_json(candidate[1:-1])
+
+
 def extract_json(text: str) -> Optional[str]:
-    """Extrai o JSON mais externo de um texto que pode conter markdown."""
+    """Extrai o JSON mais externo de um texto que pode conter markdown.
+
+    Usa o mesmo scanner de validate_and_retry (iter_json_candidates), que ja
+    encontra o JSON dentro de blocos ```json; objetos vem antes de arrays.
+    """
     if not text:
         return None
 
-    # Tenta extrair de blocos ```json ... ```
-    json_block = re.search(r"```(?:json)?\s*\n?([\s\S]*?)\n?```", text)
-    if json_block:
-        candidate = json_block.group(1).strip()
-        try:
-            json.loads(candidate)
+    first_array = None
+    for candidate in _iter_valid_json(text):
+        if candidate[0] == "{":
             return candidate
-        except json.JSONDecodeError:
-            pass
+        if first_array is None:
+            first_array = candidate
+    return first_array
 
-    # Procura o objeto/array JSON mais externo
-    # Tenta encontrar { ... } ou [ ... ] balanceado
-    for start_char, end_char in [("{", "}"), ("[", "]")]:
-        start = text.find(start_char)
-        if start == -1:
-            continue
 
-        depth = 0
-        in_string = False
-        escape_next = False
-        end = start
+def _is_syntax_error(error: ValidationError) -> bool:
+    return all(e.get("type") == "json_invalid" for e in error.errors())
 
-        for i in range(start, len(text)):
-            ch = text[i]
-            if escape_next:
-                escape_next = False
-                continue
-            if ch == "\\":
-                escape_next = True
-                continue
-            if ch == '"':
-                in_string = not in_string
-                continue
-            if in_string:
-                continue
-            if ch == start_char:
-                depth += 1
-            elif ch == end_char:
-                depth -= 1
-                if depth == 0:
-                    end = i
-                    break
 
-        if depth == 0:
-            candidate = text[start : end + 1]
-            try:
-                json.loads(candidate)
-                return candidate
-            except json.JSONDecodeError:
-                continue
+def parse_contract(candidates: Iterable[str], schema: type[BaseModel]) -> Optional[BaseModel]:
+    """Valida candidatos JSON direto contra o schema (um unico parse cada).
+
+    Candidatos com JSON invalido (ex: chaves em texto livre) sao ignorados.
+    Se algum candidato for JSON valido mas nao bater com o schema e nenhum
+    outro validar, o primeiro ValidationError e propagado.
+
+    Returns:
+        Modelo validado, ou None se nenhum candidato for JSON.
+    """
+    spec = get_contract(schema)
+    schema_error: Optional[ValidationError] = None
+    for candidate in candidates:
+        try:
+            return spec.validate_json(candidate)
+        except ValidationError as e:
+            if not _is_syntax_error(e) and schema_error is None:
+                schema_error = e
+    if schema_error is not None:
+        raise schema_error
+    return None
+
+
+class ContractStreamValidator:
+    """Valida output de agente em streaming contra um schema.
+
+    feed() repassa cada pedaco ao JsonStreamExtractor e tenta validar cada
+    candidato assim que ele se fecha, sem esperar o fim da geracao.
+    """
+
+    def __init__(self, schema: type[BaseModel]):
+        self.schema = schema
+        self.model: Optional[BaseModel] = None
+        self.error: Optional[ValidationError] = None
+        self._extractor = JsonStreamExtractor()
+        self._chunks: list[str] = []
+
+    @property
+    def text(self) -> str:
+        return "".join(self._chunks)
+
+    def feed(self, chunk: str) -> Optional[BaseModel]:
+        self._chunks.append(chunk)
+        if self.model is not None:
+            return self.model
+        try:
+            self.model = parse_contract(self._extractor.feed(chunk), self.schema)
+        except ValidationError as e:
+            self.error = self.error or e
+        return self.model
+
+
+# --- Reparo parcial ---
 
+Path = tuple[Union[str, int], ...]
+
+
+def _unwrap_optional(annotation: Any) -> Any:
+    if get_origin(annotation) in (Union, types.UnionType):
+        args = [a for a in get_args(annotation) if a is not type(None)]
+        if len(args) == 1:
+            return _unwrap_optional(args[0])
+    return annotation
+
+
+def _as_model(annotation: Any) -> Optional[type[BaseModel]]:
+    annotation = _unwrap_optional(annotation)
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
     return None
 
 
+def _child_annotation(annotation: Any, key: Union[str, int]) -> Any:
+    """Tipo do filho `key` dentro de `annotation` (campo, item de lista ou valor de dict)."""
+    model = _as_model(annotation)
+    if model is not None:
+        field = model.model_fields.get(key) if isinstance(key, str) else None
+        return field.annotation if field else None
+
+    annotation = _unwrap_optional(annotation)
+    origin, args = get_origin(annotation), get_args(annotation)
+    if origin in (list, tuple, set) and isinstance(key, int) and args:
+        return args[0]
+    if origin is dict and isinstance(key, str) and len(args) == 2:
+        return args[1]
+    return None
+
+
+def repair_target(schema: type[BaseModel], loc: Iterable[Union[str, int]]) -> Optional[tuple[Path, type[BaseModel]]]:
+    """Sub-objeto mais profundo (modelo Pydantic) que contem o erro em `loc`.
+
+    Ex: ('weeks', 0, 'slots', 2, 'scheduled_date') em MonthlyPlan aponta
+    para (('weeks', 0, 'slots', 2), PlanSlot). Retorna None quando o erro
+    esta num campo da raiz — nesse caso so um retry completo resolve.
+    """
+    loc = tuple(loc)
+    target = None
+    annotation: Any = schema
+    for i, key in enumerate(loc[:-1]):
+        annotation = _child_annotation(annotation, key)
+        if annotation is None:
+            break
+        model = _as_model(annotation)
+        if model is not None:
+            target = (loc[: i + 1], model)
+    return target
+
+
+def _get_path(data: Any, path: Path) -> Any:
+    for key in path:
+        if isinstance(data, dict) and isinstance(key, str) and key in data:
+            data = data[key]
+        elif isinstance(data, list) and isinstance(key, int) and -len(data) <= key < len(data):
+            data = data[key]
+        else:
+            return None
+    return data
+
+
+def _set_path(data: Any, path: Path, value: Any) -> None:
+    _get_path(data, path[:-1])[path[-1]] = value
+
+
+def _format_path(path: Path) -> str:
+    out = ""
+    for key in path:
+        out += f"[{key}]" if isinstance(key, int) else (f".{key}" if out else str(key))
+    return out
+
+
+def _first_json_document(text: str) -> Optional[Any]:
+    """Primeiro candidato JSON sintaticamente valido (o que falhou no schema)."""
+    for candidate in iter_json_candidates(text):
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+    return None
+
+
+def _collect_repair_targets(
+    schema: type[BaseModel], error: ValidationError,
+) -> Optional[dict[Path, tuple[type[BaseModel], list[str]]]]:
+    """Agrupa os erros por sub-objeto reparavel; None se algum erro nao for reparavel."""
+    found: dict[Path, tuple[type[BaseModel], list[str]]] = {}
+    for err in error.errors():
+        target = repair_target(schema, err.get("loc", ()))
+        if target is None:
+            return None
+        path, model = target
+        issue = f"{_format_path(tuple(err['loc'])[len(path):]) or '(objeto)'}: {err.get('msg', '')}"
+        found.setdefault(path, (model, []))[1].append(issue)
+
+    # Sub-objetos aninhados em outro alvo sao reparados junto com o ancestral
+    targets: dict[Path, tuple[type[BaseModel], list[str]]] = {}
+    for path in sorted(found, key=len):
+        ancestor = next((p for p in targets if path[: len(p)] == p), None)
+        if ancestor is None:
+            targets[path] = found[path]
+        else:
+            prefix = _format_path(path[len(ancestor):])
+            targets[ancestor][1].extend(f"{prefix}.{issue}" for issue in found[path][1])
+    return targets
+
+
+async def _run_agent(
+    agent_creator: Callable,
+    message: str,
+    user_id: str,
+    session_id: Optional[str] = None,
+) -> str:
+    """Roda um agente emprestado do pool da factory (ver agent_pool)."""
+    from app.services.agent_pool import lease_agent
+    from app.services.token_manager import set_current_user_id, clear_current_user_id
+
+    run_kwargs = {"message": message, "user_id": user_id}
+    if session_id:
+        run_kwargs["session_id"] = session_id
+
+    def run() -> str:
+        # Roda na thread do worker: o user_id fica no contexto desta execucao
+        set_current_user_id(user_id)
+        try:
+            with lease_agent(agent_creator) as agent:
+                response = agent.run(**run_kwargs)
+            return response.content if response and response.content else ""
+        finally:
+            clear_current_user_id()
+
+    return await asyncio.to_thread(run)
+
+
+async def _repair_document(
+    agent_creator: Callable,
+    raw_text: str,
+    error: ValidationError,
+    schema: type[BaseModel],
+    user_id: str,
+    session_id: Optional[str],
+    max_targets: int,
+) -> Optional[BaseModel]:
+    """Re-prompta so os sub-objetos invalidos e mescla as respostas no documento.
+
+    Returns:
+        Modelo validado apos o merge, ou None se o reparo nao se aplica ou falha
+        (o chamador cai no retry completo).
+    """
+    document = _first_json_document(raw_text)
+    targets = _collect_repair_targets(schema, error)
+    if document is None or not targets or len(targets) > max_targets:
+        return None
+    if any(not isinstance(_get_path(document, path), dict) for path in targets):
+        return None
+
+    async def repair_one(path: Path, model: type[BaseModel], issues: list[str]) -> Optional[BaseModel]:
+        fragment = json.dumps(_get_path(document, path), ensure_ascii=False)
+        message = (
+            f"O trecho `{_format_path(path)}` do seu JSON anterior nao validou:\n"
+            + "\n".join(f"- {issue}" for issue in issues)
+            + f"\n\nTrecho atual:\n```json\n{fragment}\n```\n"
+            f"Corrija apenas este trecho e retorne APENAS o objeto JSON corrigido "
+            f"seguindo o schema:\n```json\n{get_contract(model).compact_text}\n```"
+        )
+        record_schema_usage(model, compact=True)
+        try:
+            text = await _run_agent(agent_creator, message, user_id, session_id)
+            return parse_contract(iter_json_candidates(text), model)
+        except Exception as e:
+            logger.warning("Repair of %s failed: %s", _format_path(path), e)
+            return None
+
+    paths = list(targets)
+    repaired = await asyncio.gather(*(repair_one(p, *targets[p]) for p in paths))
+    if any(sub is None for sub in repaired):
+        record_repair(schema, success=False)
+        return None
+
+    for path, sub in zip(paths, repaired):
+        _set_path(document, path, sub.model_dump(mode="json"))
+    try:
+        model = get_contract(schema).adapter.validate_python(document)
+    except ValidationError as e:
+        logger.warning("Merged document still invalid for %s: %s", schema.__name__, e)
+        record_repair(schema, success=False)
+        return None
+
+    record_repair(schema, success=True)
+    logger.info("Contract %s repaired (%d sub-objects)", schema.__name__, len(paths))
+    return model
+
+
 async def validate_and_retry(
     agent_creator: Callable,
     prompt: str,
@@ -81,23 +491,43 @@ async def validate_and_retry(
     user_id: str,
     max_retries: int = 2,
     session_id: Optional[str] = None,
+    compact_schema: Optional[bool] = None,
+    partial_repair: Optional[bool] = None,
 ) -> tuple[BaseModel, str]:
     """Executa agente, valida output contra schema Pydantic, com retry em caso de falha.
 
+    Quando o JSON e valido mas alguns sub-objetos nao batem com o schema, tenta
+    antes um reparo parcial: re-prompta so esses trechos e mescla as respostas.
+    O desfecho (first_try, repaired, full_retry, fallback) vai para
+    get_schema_stats().
+
     Args:
-        agent_creator: Funcao que cria uma instancia fresh do agente (ex: create_social_analyst)
+        agent_creator: Factory do agente (ex: create_social_analyst); instancias
+            sao reusadas via agent_pool (AGENT_POOL_ENABLED)
         prompt: Prompt completo para o agente
         schema: Classe Pydantic para validar o output
         user_id: ID do usuario para contexto
         max_retries: Numero maximo de retries em caso de falha de validacao
         session_id: Session ID opcional para o agente
+        compact_schema: Embute o schema compacto no prompt inicial
+            (default: settings.CONTRACT_SCHEMA_COMPACT). Retries usam sempre o compacto.
+        partial_repair: Tenta reparar so os sub-objetos invalidos antes do
+            retry completo (default: settings.CONTRACT_PARTIAL_REPAIR)
 
     Returns:
         Tupla (modelo_validado, texto_raw) — modelo com defaults se todas retries falharem
     """
-    from app.services.token_manager import set_current_user_id, clear_current_user_id
+    from app.config import get_settings
 
-    schema_json = json.dumps(schema.model_json_schema(), ensure_ascii=False, indent=2)
+    settings = get_settings()
+    if compact_schema is None:
+        compact_schema = settings.CONTRACT_SCHEMA_COMPACT
+    if partial_repair is None:
+        partial_repair = settings.CONTRACT_PARTIAL_REPAIR
+
+    spec = get_contract(schema)
+    schema_json = spec.schema_text(compact_schema)
+    retry_schema_json = spec.compact_text
     enriched_prompt = (
         f"{prompt}\n\n"
         f"IMPORTANTE: Retorne APENAS JSON valido seguindo este schema:\n"
@@ -110,18 +540,11 @@ async def validate_and_retry(
 
     for attempt in range(1 + max_retries):
         try:
-            agent = agent_creator()
-            set_current_user_id(user_id)
-
-            run_kwargs = {"message": enriched_prompt, "user_id": user_id}
-            if session_id:
-                run_kwargs["session_id"] = session_id
+            record_schema_usage(schema, compact=compact_schema or attempt > 0)
+            raw_text = await _run_agent(agent_creator, enriched_prompt, user_id, session_id)
 
-            response = await asyncio.to_thread(agent.run, **run_kwargs)
-            raw_text = response.content if response and response.content else ""
-
-            json_str = extract_json(raw_text)
-            if not json_str:
+            model = parse_contract(iter_json_candidates(raw_text), schema)
+            if model is None:
                 last_error = "Nenhum JSON encontrado no output"
                 logger.warning(
                     "Attempt %d/%d: no JSON found in agent output (len=%d)",
@@ -131,12 +554,12 @@ async def validate_and_retry(
                     enriched_prompt = (
                         f"Seu output anterior nao continha JSON valido. {last_error}. "
                         f"Corrija e retorne APENAS JSON valido seguindo o schema fornecido.\n\n"
-                        f"Schema:\n```json\n{schema_json}\n```"
+                        f"Schema:\n```json\n{retry_schema_json}\n```"
                     )
                 continue
 
-            model = schema.model_validate_json(json_str)
             logger.info("Contract validated on attempt %d/%d", attempt + 1, 1 + max_retries)
+            record_outcome(schema, "first_try" if attempt == 0 else "full_retry")
             return model, raw_text
 
         except Exception as e:
@@ -145,17 +568,24 @@ async def validate_and_retry(
                 "Attempt %d/%d validation failed: %s",
                 attempt + 1, 1 + max_retries, last_error,
             )
+            if partial_repair and isinstance(e, ValidationError):
+                model = await _repair_document(
+                    agent_creator, raw_text, e, schema, user_id, session_id,
+                    settings.CONTRACT_REPAIR_MAX_TARGETS,
+                )
+                if model is not None:
+                    record_outcome(schema, "repaired")
+                    return model, raw_text
             if attempt < max_retries:
                 enriched_prompt = (
                     f"Seu output nao validou contra o schema. Erro: {last_error}. "
                     f"Corrija e retorne APENAS JSON valido seguindo o schema:\n\n"
-                    f"```json\n{schema_json}\n```"
+                    f"```json\n{retry_schema_json}\n```"
                 )
-        finally:
-            clear_current_user_id()
 
     # Fallback: retorna modelo com defaults
     logger.error("All %d attempts failed for schema %s. Using defaults.", 1 + max_retries, schema.__name__)
+    record_outcome(schema, "fallback")
     fallback = schema()
     fallback._raw_text = raw_text
     return fallback, raw_text
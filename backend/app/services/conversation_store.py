@@ -0,0 +1,206 @@
+"""Persistencia das conversas do chat em tabela append-only.
+
+Cada mensagem e uma linha de social_midia_conversation_messages com um seq
+por conversa. O append de um turno e uma unica chamada RPC
+(social_midia_append_messages, migration 006): cria a conversa se preciso,
+reserva os seq, atualiza o resumo da conversa (first_message, message_count,
+last_message_at) e insere as mensagens — sem ler o historico. As leituras sao
+fatias paginadas: mensagens por seq, conversas por (updated_at, id).
+
+Funcoes sincronas (cliente Supabase); em rotas async use asyncio.to_thread.
+"""
+
+import base64
+import logging
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from app.constants import TABLES
+from app.database.supabase_client import get_supabase_admin
+
+logger = logging.getLogger("agentesocial.conversation_store")
+
+APPEND_RPC = "social_midia_append_messages"
+MAX_PAGE_SIZE = 200
+# Resumo denormalizado mantido pelo RPC de append (migration 007)
+SUMMARY_COLUMNS = "id,agent_type,first_message,message_count,last_message_at,created_at,updated_at"
+
+
+def append_messages(
+    conversation_id: str,
+    user_id: str,
+    messages: list[dict],
+    agent_type: Optional[str] = None,
+) -> int:
+    """Anexa mensagens a conversa em um round trip.
+
+    Args:
+        conversation_id: ID da conversa (criada se nao existir)
+        user_id: Dono da conversa (append em conversa de outro usuario falha)
+        messages: [{"role": ..., "content": ..., "metadata": {...}}]
+        agent_type: Tipo do agente, usado so na criacao da conversa
+
+    Returns:
+        Ultimo seq da conversa apos o append.
+    """
+    supabase = get_supabase_admin()
+    result = supabase.rpc(APPEND_RPC, {
+        "p_conversation_id": conversation_id,
+        "p_user_id": user_id,
+        "p_agent_type": agent_type or "master",
+        "p_messages": messages,
+    }).execute()
+    return result.data if isinstance(result.data, int) else 0
+
+
+def save_turn(
+    conversation_id: str,
+    user_id: str,
+    agent_type: Optional[str],
+    message: str,
+    response_text: str,
+) -> int:
+    """Anexa a troca usuario/assistente de um turno do chat."""
+    return append_messages(
+        conversation_id,
+        user_id,
+        [
+            {"role": "user", "content": message},
+            {"role": "assistant", "content": response_text},
+        ],
+        agent_type=agent_type,
+    )
+
+
+def save_turns(turns: list[dict]) -> list[dict]:
+    """Handler em lote da fila write-behind (kind "conversation_turn").
+
+    Turnos da mesma conversa viram um unico append (na ordem de chegada),
+    entao o lote custa um RPC por conversa.
+
+    Args:
+        turns: [{"conversation_id", "user_id", "agent_type", "message", "response_text"}]
+
+    Returns:
+        Turnos que falharam (re-tentados pela fila).
+    """
+    grouped: dict[tuple[str, str], list[dict]] = {}
+    for turn in turns:
+        grouped.setdefault((turn["conversation_id"], turn["user_id"]), []).append(turn)
+
+    failed: list[dict] = []
+    for (conversation_id, user_id), group in grouped.items():
+        messages = []
+        for turn in group:
+            messages.append({"role": "user", "content": turn["message"]})
+            messages.append({"role": "assistant", "content": turn["response_text"]})
+        try:
+            append_messages(conversation_id, user_id, messages, agent_type=group[0].get("agent_type"))
+        except Exception as e:
+            logger.warning("Failed to append %d turn(s) to %s: %s", len(group), conversation_id, e)
+            failed.extend(group)
+    return failed
+
+
+def get_messages(
+    conversation_id: str,
+    user_id: str,
+    limit: int = 50,
+    before_seq: Optional[int] = None,
+) -> dict:
+    """Fatia das mensagens mais recentes (antes de before_seq), em ordem cronologica.
+
+    Returns:
+        {"messages": [...], "next_before_seq": seq para a proxima pagina ou None}
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    supabase = get_supabase_admin()
+    query = (
+        supabase.table(TABLES["conversation_messages"])
+        .select("seq,role,content,metadata,created_at")
+        .eq("conversation_id", conversation_id)
+        .eq("user_id", user_id)
+    )
+    if before_seq is not None:
+        query = query.lt("seq", before_seq)
+    result = query.order("seq", desc=True).limit(limit + 1).execute()
+
+    rows = result.data or []
+    has_more = len(rows) > limit
+    page = list(reversed(rows[:limit]))
+    return {
+        "messages": page,
+        "next_before_seq": page[0]["seq"] if has_more and page else None,
+    }
+
+
+def encode_cursor(updated_at: str, conversation_id: str) -> str:
+    """Cursor opaco da listagem: posicao (updated_at, id) do ultimo item da pagina."""
+    raw = f"{updated_at}|{conversation_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    """Inverso de encode_cursor. Raises ValueError se o cursor for invalido."""
+    # Os valores vao para o filtro do PostgREST: so aceita timestamp ISO e UUID
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        updated_at, conversation_id = raw.split("|", 1)
+        datetime.fromisoformat(updated_at)
+        uuid.UUID(conversation_id)
+    except Exception as e:
+        raise ValueError(f"Cursor invalido: {cursor}") from e
+    return updated_at, conversation_id
+
+
+def list_conversations(user_id: str, limit: int = 50, cursor: Optional[str] = None) -> dict:
+    """Pagina de conversas do usuario por (updated_at, id) decrescente (keyset).
+
+    Le apenas as colunas de resumo (first_message, message_count,
+    last_message_at), entao o custo nao depende do tamanho do historico.
+
+    Returns:
+        {"conversations": [...], "next_cursor": cursor da proxima pagina ou None}
+
+    Raises:
+        ValueError: Cursor invalido
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    supabase = get_supabase_admin()
+    query = (
+        supabase.table(TABLES["agent_conversations"])
+        .select(SUMMARY_COLUMNS)
+        .eq("user_id", user_id)
+    )
+    if cursor:
+        updated_at, last_id = decode_cursor(cursor)
+        query = query.or_(
+            f'updated_at.lt."{updated_at}",'
+            f'and(updated_at.eq."{updated_at}",id.lt.{last_id})'
+        )
+    result = (
+        query.order("updated_at", desc=True)
+        .order("id", desc=True)
+        .limit(limit + 1)
+        .execute()
+    )
+
+    rows = result.data or []
+    page = rows[:limit]
+    conversations = [
+        {
+            "id": row["id"],
+            "first_message": row.get("first_message") or "Conversa sem mensagem",
+            "agent_type": row.get("agent_type"),
+            "message_count": row.get("message_count") or 0,
+            "last_message_at": row.get("last_message_at"),
+            "created_at": row.get("created_at"),
+            "updated_at": row.get("updated_at"),
+        }
+        for row in page
+    ]
+    next_cursor = None
+    if len(rows) > limit and page:
+        next_cursor = encode_cursor(page[-1]["updated_at"], page[-1]["id"])
+    return {"conversations": conversations, "next_cursor": next_cursor}
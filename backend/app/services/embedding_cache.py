@@ -0,0 +1,213 @@
+"""Cache de embeddings por conteudo (modelo, dimensoes, sha256 do texto normalizado).
+
+Os mesmos textos sao embedados repetidamente (legendas salvas, buscas
+repetidas). get_embedding/get_embeddings_batch consultam o cache antes da API
+e so enviam os misses, num unico batch.
+
+Dois niveis:
+- memoria: LRU limitado (EMBEDDING_CACHE_MAX_ENTRIES) por processo, vetores
+  em array("f") (6 KB cada, contra ~49 KB de uma list[float] de 1536 dims);
+  a conversao para lista acontece so na resposta;
+- disco: SQLite local (EMBEDDING_CACHE_PATH), compartilhado entre workers e
+  restarts. Vetores gravados como float32 (6 KB por embedding de 1536 dims).
+  Hit no disco e promovido para a memoria. Path vazio desliga o disco.
+
+Tokens economizados sao estimados (~4 caracteres por token) — o custo do
+hit nao deve incluir tokenizacao.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger("agentesocial.embedding_cache")
+
+_WHITESPACE = re.compile(r"\s+")
+_SQL_CHUNK = 500
+
+
+def normalize_text(text: str) -> str:
+    """Normalizacao que nao muda a semantica do embedding: espacos colapsados."""
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def cache_key(model: str, dimensions: int, normalized: str) -> str:
+    digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+    return f"{model}:{dimensions}:{digest}"
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class EmbeddingCache:
+    """LRU em memoria na frente de um store SQLite opcional.
+
+    Args:
+        max_entries: Capacidade do LRU em memoria
+        path: Arquivo SQLite do nivel persistente (None/"" = so memoria)
+    """
+
+    def __init__(self, max_entries: int = 10000, path: Optional[str] = None):
+        self.max_entries = max(max_entries, 1)
+        self.path = path or None
+        self._memory: OrderedDict[str, array] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.tokens_saved = 0
+        self.evictions = 0
+        self.disk_errors = 0
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        if self.path is None:
+            return None
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db = db
+        return self._db
+
+    def _remember(self, key: str, vector: array) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def get_memory(self, keys: dict[str, str]) -> dict[str, list[float]]:
+        """Hits do LRU. keys: {chave: texto normalizado}."""
+        found = {}
+        with self._lock:
+            for key, text in keys.items():
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector.tolist()
+                    self.memory_hits += 1
+                    self.tokens_saved += _estimate_tokens(text)
+        return found
+
+    def get_disk(self, keys: dict[str, str]) -> dict[str, list[float]]:
+        """Hits do SQLite (promovidos para a memoria); o resto conta como miss."""
+        found: dict[str, array] = {}
+        if keys:
+            try:
+                with self._db_lock:
+                    db = self._connection()
+                    if db is not None:
+                        wanted = list(keys)
+                        # Lotes abaixo do limite de parametros do SQLite
+                        for start in range(0, len(wanted), _SQL_CHUNK):
+                            chunk = wanted[start:start + _SQL_CHUNK]
+                            rows = db.execute(
+                                f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                                chunk,
+                            ).fetchall()
+                            found.update((key, array("f", blob)) for key, blob in rows)
+            except (sqlite3.Error, OSError) as e:
+                self.disk_errors += 1
+                logger.warning(f"Embedding cache disk read failed: {e}")
+
+        with self._lock:
+            for key, text in keys.items():
+                if key in found:
+                    self._remember(key, found[key])
+                    self.disk_hits += 1
+                    self.tokens_saved += _estimate_tokens(text)
+                else:
+                    self.misses += 1
+        return {key: vector.tolist() for key, vector in found.items()}
+
+    def put(self, vectors: dict[str, list[float]]) -> None:
+        packed = {key: array("f", vector) for key, vector in vectors.items()}
+        with self._lock:
+            for key, vector in packed.items():
+                self._remember(key, vector)
+        try:
+            with self._db_lock:
+                db = self._connection()
+                if db is not None:
+                    now = time.time()
+                    db.executemany(
+                        "INSERT OR REPLACE INTO embeddings (key, vector, created_at) VALUES (?, ?, ?)",
+                        [(key, vector.tobytes(), now) for key, vector in packed.items()],
+                    )
+                    db.commit()
+        except (sqlite3.Error, OSError) as e:
+            self.disk_errors += 1
+            logger.warning(f"Embedding cache disk write failed: {e}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        with self._db_lock:
+            db = self._connection()
+            if db is not None:
+                db.execute("DELETE FROM embeddings")
+                db.commit()
+
+    def close(self) -> None:
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "memory_entries": len(self._memory),
+            "persistent": self.path is not None,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "tokens_saved": self.tokens_saved,
+            "evictions": self.evictions,
+            "disk_errors": self.disk_errors,
+        }
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Cache do processo, ou None se EMBEDDING_CACHE_ENABLED estiver desligado."""
+    global _cache
+    from app.config import get_settings
+
+    settings = get_settings()
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache(settings.EMBEDDING_CACHE_MAX_ENTRIES, settings.EMBEDDING_CACHE_PATH)
+    return _cache
+
+
+def reset_embedding_cache() -> None:
+    """Fecha e descarta o cache (recriado com as settings atuais no proximo uso)."""
+    global _cache
+    if _cache is not None:
+        _cache.close()
+    _cache = None
@@ -1,43 +1,241 @@
+import asyncio
 import logging
-from openai import OpenAI
+import random
+import threading
+import time
+import weakref
+from array import array
+from typing import Optional
+
+import httpx
+import openai
+from openai import AsyncOpenAI, OpenAI
 from app.config import get_settings
+from app.services.embedding_cache import cache_key, get_embedding_cache, normalize_text, reset_embedding_cache
 
 logger = logging.getLogger("agentesocial.embedding")
 
 EMBEDDING_MODEL = "text-embedding-3-small"
 EMBEDDING_DIMENSIONS = 1536
+MAX_INPUT_CHARS = 32000  # ~8000 tokens
 
+# Transient provider errors worth retrying (429, 5xx, timeouts, dropped connections)
+_RETRYABLE = (
+    openai.RateLimitError,
+    openai.InternalServerError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+)
+
+_sync_client: Optional[OpenAI] = None
+_sync_lock = threading.Lock()
+_sync_limiter: Optional[threading.BoundedSemaphore] = None
+# httpx.AsyncClient and asyncio.Semaphore are bound to the loop that uses them
+_async_resources: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, tuple[AsyncOpenAI, asyncio.Semaphore]]" = (
+    weakref.WeakKeyDictionary()
+)
+_stats = {"requests": 0, "texts": 0, "retries": 0, "failures": 0}
+_stats_lock = threading.Lock()
 
-def get_embedding(text: str) -> list[float]:
-    """Generate embedding for text using OpenAI."""
-    settings = get_settings()
-    if not settings.OPENAI_API_KEY:
-        raise ValueError("OPENAI_API_KEY not configured")
 
-    client = OpenAI(api_key=settings.OPENAI_API_KEY)
+def _timeout(settings) -> httpx.Timeout:
+    return httpx.Timeout(settings.EMBEDDING_TIMEOUT, connect=settings.EMBEDDING_CONNECT_TIMEOUT)
 
-    # Truncate to ~8000 tokens (~32000 chars)
-    truncated = text[:32000]
 
-    response = client.embeddings.create(
-        model=EMBEDDING_MODEL,
-        input=truncated,
+def _limits(settings) -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.EMBEDDING_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.EMBEDDING_MAX_CONNECTIONS,
+        keepalive_expiry=60,
     )
-    return response.data[0].embedding
 
 
-def get_embeddings_batch(texts: list[str]) -> list[list[float]]:
-    """Generate embeddings for multiple texts in a single API call."""
+def _get_sync_client() -> tuple[OpenAI, threading.BoundedSemaphore]:
+    """Shared sync client (pooled keep-alive connections) for thread callers."""
+    global _sync_client, _sync_limiter
+    if _sync_client is None:
+        with _sync_lock:
+            if _sync_client is None:
+                settings = get_settings()
+                if not settings.OPENAI_API_KEY:
+                    raise ValueError("OPENAI_API_KEY not configured")
+                _sync_limiter = threading.BoundedSemaphore(settings.EMBEDDING_MAX_CONCURRENCY)
+                _sync_client = OpenAI(
+                    api_key=settings.OPENAI_API_KEY,
+                    max_retries=0,  # retries with jitter are done here
+                    timeout=_timeout(settings),
+                    http_client=openai.DefaultHttpxClient(limits=_limits(settings), timeout=_timeout(settings)),
+                )
+    return _sync_client, _sync_limiter
+
+
+def _get_async_client() -> tuple[AsyncOpenAI, asyncio.Semaphore]:
+    """Shared AsyncOpenAI client + concurrency limiter for the running loop."""
+    loop = asyncio.get_running_loop()
+    resources = _async_resources.get(loop)
+    if resources is None:
+        settings = get_settings()
+        if not settings.OPENAI_API_KEY:
+            raise ValueError("OPENAI_API_KEY not configured")
+        client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            max_retries=0,
+            timeout=_timeout(settings),
+            http_client=openai.DefaultAsyncHttpxClient(limits=_limits(settings), timeout=_timeout(settings)),
+        )
+        resources = (client, asyncio.Semaphore(settings.EMBEDDING_MAX_CONCURRENCY))
+        _async_resources[loop] = resources
+    return resources
+
+
+def _backoff(attempt: int) -> float:
+    """Full jitter: uniform(0, base * 2^attempt), capped."""
     settings = get_settings()
-    client = OpenAI(api_key=settings.OPENAI_API_KEY)
+    return random.uniform(0, min(settings.EMBEDDING_BACKOFF_CAP, settings.EMBEDDING_BACKOFF_BASE * 2 ** attempt))
 
-    truncated = [t[:32000] for t in texts]
 
-    response = client.embeddings.create(
-        model=EMBEDDING_MODEL,
-        input=truncated,
-    )
-    return [item.embedding for item in response.data]
+def _record(texts: int, retries: int, failed: bool) -> None:
+    with _stats_lock:
+        _stats["requests"] += 1
+        _stats["texts"] += texts
+        _stats["retries"] += retries
+        _stats["failures"] += int(failed)
+
+
+def _embed_sync(texts: list[str]) -> list[list[float]]:
+    client, limiter = _get_sync_client()
+    max_retries = get_settings().EMBEDDING_MAX_RETRIES
+    for attempt in range(max_retries + 1):
+        try:
+            with limiter:
+                response = client.embeddings.create(model=EMBEDDING_MODEL, input=texts)
+            _record(len(texts), attempt, False)
+            return _float32(item.embedding for item in response.data)
+        except _RETRYABLE as e:
+            if attempt == max_retries:
+                _record(len(texts), attempt, True)
+                raise
+            logger.warning(f"Embedding request failed ({e.__class__.__name__}), retrying")
+            time.sleep(_backoff(attempt))
+
+
+async def _embed_async(texts: list[str]) -> list[list[float]]:
+    client, limiter = _get_async_client()
+    max_retries = get_settings().EMBEDDING_MAX_RETRIES
+    for attempt in range(max_retries + 1):
+        try:
+            async with limiter:
+                response = await client.embeddings.create(model=EMBEDDING_MODEL, input=texts)
+            _record(len(texts), attempt, False)
+            return _float32(item.embedding for item in response.data)
+        except _RETRYABLE as e:
+            if attempt == max_retries:
+                _record(len(texts), attempt, True)
+                raise
+            logger.warning(f"Embedding request failed ({e.__class__.__name__}), retrying")
+            await asyncio.sleep(_backoff(attempt))
+
+
+def _float32(vectors) -> list[list[float]]:
+    """Round API vectors to float32, the precision the cache stores, so hits and misses match."""
+    return [array("f", vector).tolist() for vector in vectors]
+
+
+def _plan(texts: list[str]):
+    """Cache lookup plan: (cache, key per input, {key: normalized text} to resolve).
+
+    Blank inputs get key None: the API rejects "", so they are never sent and
+    resolve to a zero vector.
+    """
+    cache = get_embedding_cache()
+    normalized = [normalize_text(t[:MAX_INPUT_CHARS]) for t in texts]
+    if cache is None:
+        keys = [text or None for text in normalized]
+    else:
+        keys = [cache_key(EMBEDDING_MODEL, EMBEDDING_DIMENSIONS, text) if text else None for text in normalized]
+    return cache, keys, {key: text for key, text in zip(keys, normalized) if key is not None}
+
+
+def _assemble(keys: list[Optional[str]], found: dict[str, list[float]]) -> list[list[float]]:
+    return [found[key] if key is not None else [0.0] * EMBEDDING_DIMENSIONS for key in keys]
+
+
+def get_embeddings_batch(texts: list[str]) -> list[list[float]]:
+    """Generate embeddings for multiple texts (sync, for worker threads).
+
+    Cached texts are served from the embedding cache; only the misses are
+    sent to the API, in a single call.
+    """
+    if not texts:
+        return []
+    cache, keys, pending = _plan(texts)
+    if not pending:
+        return _assemble(keys, {})
+    if cache is None:
+        return _assemble(keys, dict(zip(pending, _embed_sync(list(pending.values())))))
+
+    found = cache.get_memory(pending)
+    missing = {k: t for k, t in pending.items() if k not in found}
+    found.update(cache.get_disk(missing))
+    missing = {k: t for k, t in missing.items() if k not in found}
+    if missing:
+        fresh = dict(zip(missing, _embed_sync(list(missing.values()))))
+        cache.put(fresh)
+        found.update(fresh)
+    return _assemble(keys, found)
+
+
+def get_embedding(text: str) -> list[float]:
+    """Generate embedding for text using OpenAI (sync, for worker threads)."""
+    return get_embeddings_batch([text])[0]
+
+
+async def aget_embeddings_batch(texts: list[str]) -> list[list[float]]:
+    """Async get_embeddings_batch (disk tier and writes run in a thread)."""
+    if not texts:
+        return []
+    cache, keys, pending = _plan(texts)
+    if not pending:
+        return _assemble(keys, {})
+    if cache is None:
+        return _assemble(keys, dict(zip(pending, await _embed_async(list(pending.values())))))
+
+    found = cache.get_memory(pending)
+    missing = {k: t for k, t in pending.items() if k not in found}
+    if missing:
+        found.update(await asyncio.to_thread(cache.get_disk, missing))
+        missing = {k: t for k, t in missing.items() if k not in found}
+    if missing:
+        fresh = dict(zip(missing, await _embed_async(list(missing.values()))))
+        await asyncio.to_thread(cache.put, fresh)
+        found.update(fresh)
+    return _assemble(keys, found)
+
+
+async def aget_embedding(text: str) -> list[float]:
+    """Async get_embedding: awaits the shared AsyncOpenAI client."""
+    return (await aget_embeddings_batch([text]))[0]
+
+
+def get_embedding_stats() -> dict:
+    """Provider request counters plus embedding cache hit rate and saved tokens."""
+    with _stats_lock:
+        stats = dict(_stats)
+    cache = get_embedding_cache()
+    stats["cache"] = cache.stats() if cache is not None else {"enabled": False}
+    return stats
+
+
+async def close_clients() -> None:
+    """Close pooled connections (app shutdown)."""
+    global _sync_client
+    resources = _async_resources.pop(asyncio.get_running_loop(), None)
+    if resources is not None:
+        await resources[0].close()
+    if _sync_client is not None:
+        _sync_client.close()
+        _sync_client = None
+    reset_embedding_cache()
 
 
 async def save_with_embedding(
@@ -50,32 +248,60 @@ async def save_with_embedding(
     from app.database.supabase_client import get_supabase
     from app.constants import TABLES
 
+    data = {
+        "user_id": user_id,
+        "content": content,
+        "content_type": content_type,
+        "metadata": metadata or {},
+    }
     try:
-        embedding = get_embedding(content)
-
-        supabase = get_supabase()
-        data = {
-            "user_id": user_id,
-            "content": content,
-            "content_type": content_type,
-            "embedding": embedding,
-            "metadata": metadata or {},
-        }
-        result = supabase.table(TABLES["content_history"]).insert(data).execute()
-        return result.data[0]["id"] if result.data else None
+        data["embedding"] = await aget_embedding(content)
     except Exception as e:
-        logger.error(f"Failed to save with embedding: {e}")
         # Fallback: save without embedding
-        from app.database.supabase_client import get_supabase
-        supabase = get_supabase()
-        data = {
-            "user_id": user_id,
-            "content": content,
-            "content_type": content_type,
-            "metadata": metadata or {},
+        logger.error(f"Failed to save with embedding: {e}")
+
+    supabase = get_supabase()
+    result = await asyncio.to_thread(supabase.table(TABLES["content_history"]).insert(data).execute)
+    return result.data[0]["id"] if result.data else None
+
+
+def save_memories(items: list[dict]) -> list[dict]:
+    """Batch handler for the write-behind queue (kind "memory").
+
+    One embeddings call for the whole batch and one multi-row insert into
+    content_history. If embedding fails the rows are saved without it.
+
+    Args:
+        items: [{"user_id", "content", "content_type", "metadata"}]
+
+    Returns:
+        Items that failed to insert (retried by the queue).
+    """
+    from app.database.supabase_client import get_supabase
+    from app.constants import TABLES
+
+    rows = [
+        {
+            "user_id": item["user_id"],
+            "content": item["content"],
+            "content_type": item["content_type"],
+            "metadata": item.get("metadata") or {},
         }
-        result = supabase.table(TABLES["content_history"]).insert(data).execute()
-        return result.data[0]["id"] if result.data else None
+        for item in items
+    ]
+    try:
+        embeddings = get_embeddings_batch([row["content"] for row in rows])
+        for row, embedding in zip(rows, embeddings):
+            row["embedding"] = embedding
+    except Exception as e:
+        logger.error(f"Failed to embed {len(rows)} memories, saving without embedding: {e}")
+
+    try:
+        get_supabase().table(TABLES["content_history"]).insert(rows).execute()
+    except Exception as e:
+        logger.error(f"Failed to save {len(rows)} memories: {e}")
+        return items
+    return []
 
 
 async def semantic_search(
@@ -87,25 +313,26 @@ async def semantic_search(
     """Search content by semantic similarity using embeddings."""
     from app.database.supabase_client import get_supabase
 
+    supabase = get_supabase()
     try:
-        embedding = get_embedding(query)
-
-        supabase = get_supabase()
-        result = supabase.rpc("match_content_by_embedding", {
-            "query_embedding": embedding,
-            "match_count": limit,
-            "filter_user_id": user_id,
-            "similarity_threshold": threshold,
-        }).execute()
-
+        embedding = await aget_embedding(query)
+        result = await asyncio.to_thread(
+            supabase.rpc("match_content_by_embedding", {
+                "query_embedding": embedding,
+                "match_count": limit,
+                "filter_user_id": user_id,
+                "similarity_threshold": threshold,
+            }).execute
+        )
         return result.data or []
     except Exception as e:
         logger.warning(f"Semantic search failed, falling back to text: {e}")
         # Fallback to text search
-        supabase = get_supabase()
-        result = supabase.rpc("match_content", {
-            "query_text": query,
-            "match_count": limit,
-            "filter_user_id": user_id,
-        }).execute()
+        result = await asyncio.to_thread(
+            supabase.rpc("match_content", {
+                "query_text": query,
+                "match_count": limit,
+                "filter_user_id": user_id,
+            }).execute
+        )
         return result.data or []
@@ -0,0 +1,440 @@
+"""Indice de co-ocorrencia de hashtags para recomendar conjuntos prontos.
+
+Em vez de pedir ao LLM "5-15 hashtags em 3 faixas de volume" a cada
+geracao, o indice guarda quais hashtags aparecem juntas (posts gerados,
+conteudo viral e hashtags relacionadas das pesquisas) e, dadas hashtags
+semente ou um tema, devolve um conjunto ranqueado e balanceado por faixa.
+
+Estrutura (compacta, ids inteiros):
+- vocabulario: hashtag -> id (lista + dict), frequencia por id (float32) e
+  volume conhecido da pesquisa (int64, -1 = desconhecido);
+- adjacencia CSR em arrays NumPy (indptr int64, indices int32, pesos
+  float32), simetrica, vizinhos ordenados por id;
+- delta: pares novos acumulam num dict por no e sao fundidos no CSR quando
+  passam de HASHTAG_GRAPH_PENDING_MAX (ou ao salvar).
+
+Score de um vizinho n: soma sobre as sementes s de w(s, n) / sqrt(df(s) *
+df(n)) — hashtags genericas que aparecem com tudo nao dominam. Faixas:
+alto volume (>= 500K posts), medio (50K-500K), nicho (< 50K), pelo volume da
+pesquisa; sem volume, pela frequencia no indice (top 10% = alto, ate a
+mediana = medio). Mix padrao 30/40/30, como nos prompts do Hashtag Hunter.
+
+Persistencia: .npz (sem pickle) em HASHTAG_GRAPH_PATH, gravado de forma
+atomica no compact/shutdown e carregado no startup. As marcas d'agua das
+fontes vao junto, para o backfill nao contar as mesmas linhas de novo.
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+import unicodedata
+from array import array
+from typing import Iterable, Optional
+
+import numpy as np
+
+from app.services.hashtag_trends import normalize_hashtag
+
+logger = logging.getLogger("agentesocial.hashtag_graph")
+
+HIGH_VOLUME = 500_000
+MEDIUM_VOLUME = 50_000
+TIERS = ("high", "medium", "niche")
+DEFAULT_MIX = (0.3, 0.4, 0.3)
+_MAX_TAGS_PER_POST = 30
+_FORMAT_VERSION = 1
+
+
+def _fold(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def tier_quotas(count: int, mix: tuple = DEFAULT_MIX) -> list[int]:
+    """Vagas por faixa (maiores restos), somando exatamente `count`."""
+    raw = [count * share for share in mix]
+    quotas = [int(value) for value in raw]
+    by_remainder = sorted(range(len(mix)), key=lambda i: raw[i] - quotas[i], reverse=True)
+    for i in by_remainder[:count - sum(quotas)]:
+        quotas[i] += 1
+    return quotas
+
+
+class HashtagGraph:
+    """Grafo de co-ocorrencia com CSR + delta em memoria.
+
+    Args:
+        pending_max: Pares no delta antes de fundir no CSR
+        path: Arquivo .npz de persistencia (None/"" = so memoria)
+    """
+
+    def __init__(self, pending_max: int = 100_000, path: Optional[str] = None):
+        self.pending_max = max(pending_max, 1)
+        self.path = path or None
+        self._ids: dict[str, int] = {}
+        self._tags: list[str] = []
+        self._df = array("f")
+        self._volume = array("q")
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._indices = np.zeros(0, dtype=np.int32)
+        self._weights = np.zeros(0, dtype=np.float32)
+        self._pending: dict[int, dict[int, float]] = {}
+        self._pending_pairs = 0
+        self._df_thresholds = (math.inf, math.inf)
+        self._thresholds_dirty = False
+        self._unsaved = False
+        self.watermarks: dict[str, str] = {}
+        # ids ja ingeridos com tempo == watermark (o feed le com >=)
+        self.boundary_ids: dict[str, list] = {}
+        self._lock = threading.RLock()
+        self.compactions = 0
+
+    # --- construcao -----------------------------------------------------
+
+    def _id(self, tag: str) -> int:
+        tag_id = self._ids.get(tag)
+        if tag_id is None:
+            tag_id = self._ids[tag] = len(self._tags)
+            self._tags.append(tag)
+            self._df.append(0.0)
+            self._volume.append(-1)
+        return tag_id
+
+    def _link(self, a: int, b: int, weight: float) -> None:
+        for src, dst in ((a, b), (b, a)):
+            row = self._pending.get(src)
+            if row is None:
+                row = self._pending[src] = {}
+            if dst not in row:
+                self._pending_pairs += 1
+            row[dst] = row.get(dst, 0.0) + weight
+
+    def add_post(self, hashtags: Iterable, weight: float = 1.0) -> None:
+        """Todas as hashtags do post co-ocorrem entre si."""
+        tags = list(dict.fromkeys(t for t in map(normalize_hashtag, hashtags or ()) if t))[:_MAX_TAGS_PER_POST]
+        if not tags:
+            return
+        with self._lock:
+            ids = [self._id(tag) for tag in tags]
+            self._thresholds_dirty = self._unsaved = True
+            for i, a in enumerate(ids):
+                self._df[a] += weight
+                for b in ids[i + 1:]:
+                    self._link(a, b, weight)
+            if self._pending_pairs >= self.pending_max:
+                self.compact()
+
+    def add_research(self, hashtag, related: Iterable = (), volume: Optional[int] = None, weight: float = 1.0) -> None:
+        """Linha de pesquisa: hashtag -> relacionadas (estrela, sem pares entre relacionadas)."""
+        tag = normalize_hashtag(hashtag)
+        if tag is None:
+            return
+        related_tags = [t for t in dict.fromkeys(map(normalize_hashtag, related or ())) if t and t != tag]
+        with self._lock:
+            self._thresholds_dirty = self._unsaved = True
+            center = self._id(tag)
+            self._df[center] += weight
+            if isinstance(volume, int) and volume >= 0:
+                self._volume[center] = volume
+            for other in related_tags[:_MAX_TAGS_PER_POST]:
+                other_id = self._id(other)
+                self._df[other_id] += weight
+                self._link(center, other_id, weight)
+            if self._pending_pairs >= self.pending_max:
+                self.compact()
+
+    def ingest_rows(self, source: str, rows: list[dict], time_column: str) -> int:
+        """Consome linhas do feed do hashtag_trends (pula as ja vistas antes de um restart)."""
+        since = self.watermarks.get(source)
+        seen = set(self.boundary_ids.get(source, ()))
+        added = 0
+        for row in rows:
+            at = row.get(time_column)
+            if not at or (since is not None and (at < since or (at == since and row.get("id") in seen))):
+                continue
+            if source == "hashtag_research":
+                self.add_research(row.get("hashtag"), row.get("related_hashtags") or (), row.get("volume"))
+            elif source == "viral_content":
+                # Conteudo viral pesa mais: 1 + score/100
+                score = row.get("virality_score") or 0
+                self.add_post(row.get("hashtags") or (), 1.0 + float(score) / 100)
+            else:
+                self.add_post(row.get("hashtags") or ())
+            added += 1
+        if rows:
+            latest = max((row.get(time_column) or "" for row in rows), default="")
+            if latest and (since is None or latest >= since):
+                ids = {row.get("id") for row in rows if row.get(time_column) == latest}
+                if latest == since:
+                    ids |= seen
+                self.watermarks[source] = latest
+                self.boundary_ids[source] = sorted(ids, key=str)
+        return added
+
+    def compact(self) -> None:
+        """Funde o delta no CSR (ordenado por origem e vizinho)."""
+        with self._lock:
+            size = len(self._tags)
+            old_rows = np.repeat(
+                np.arange(len(self._indptr) - 1, dtype=np.int64), np.diff(self._indptr)
+            )
+            pending_rows, pending_cols, pending_weights = [], [], []
+            for src, row in self._pending.items():
+                pending_rows.extend([src] * len(row))
+                pending_cols.extend(row.keys())
+                pending_weights.extend(row.values())
+
+            rows = np.concatenate([old_rows, np.array(pending_rows, dtype=np.int64)])
+            cols = np.concatenate([self._indices.astype(np.int64), np.array(pending_cols, dtype=np.int64)])
+            weights = np.concatenate([self._weights, np.array(pending_weights, dtype=np.float32)])
+
+            keys, inverse = np.unique(rows * size + cols, return_inverse=True)
+            merged = np.bincount(inverse, weights=weights).astype(np.float32)
+            counts = np.bincount(keys // size, minlength=size) if size else np.zeros(0, dtype=np.int64)
+
+            self._indptr = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+            self._indices = (keys % size).astype(np.int32) if size else np.zeros(0, dtype=np.int32)
+            self._weights = merged
+            self._pending = {}
+            self._pending_pairs = 0
+            self._refresh_thresholds()
+            self.compactions += 1
+
+    def _refresh_thresholds(self) -> None:
+        if len(self._df):
+            df = np.frombuffer(self._df, dtype=np.float32)
+            self._df_thresholds = (float(np.quantile(df, 0.9)), float(np.quantile(df, 0.5)))
+            del df  # solta o buffer (o array("f") nao cresce com export ativo)
+        self._thresholds_dirty = False
+
+    # --- consulta -------------------------------------------------------
+
+    def _neighbors(self, tag_id: int) -> tuple[np.ndarray, np.ndarray]:
+        if tag_id + 1 < len(self._indptr):
+            start, end = self._indptr[tag_id], self._indptr[tag_id + 1]
+            ids, weights = self._indices[start:end].astype(np.int64), self._weights[start:end].astype(np.float64)
+        else:
+            ids, weights = np.zeros(0, dtype=np.int64), np.zeros(0)
+        pending = self._pending.get(tag_id)
+        if pending:
+            ids = np.concatenate([ids, np.fromiter(pending.keys(), dtype=np.int64, count=len(pending))])
+            weights = np.concatenate([weights, np.fromiter(pending.values(), dtype=np.float64, count=len(pending))])
+        return ids, weights
+
+    def _tier(self, tag_id: int) -> str:
+        volume = self._volume[tag_id]
+        if volume >= 0:
+            return "high" if volume >= HIGH_VOLUME else "medium" if volume >= MEDIUM_VOLUME else "niche"
+        df = self._df[tag_id]
+        high, medium = self._df_thresholds
+        return "high" if df >= high else "medium" if df >= medium else "niche"
+
+    def _topic_seeds(self, topic: str, limit: int = 5) -> list[int]:
+        """Hashtags que contem as palavras do tema, as mais frequentes primeiro."""
+        raw = [w for w in topic.lower().replace("#", " ").split() if len(w) >= 3]
+        words = list(dict.fromkeys(raw + [_fold(w) for w in raw]))
+        if not words:
+            return []
+        exact = self._ids.get(f"#{''.join(raw)}")
+        matches = [
+            tag_id for tag_id, tag in enumerate(self._tags)
+            if any(word in tag for word in words)
+        ]
+        matches.sort(key=lambda tag_id: self._df[tag_id], reverse=True)
+        seeds = ([exact] if exact is not None else []) + [m for m in matches if m != exact]
+        return seeds[:limit]
+
+    def recommend(
+        self,
+        seeds: Iterable = (),
+        topic: Optional[str] = None,
+        count: int = 15,
+        mix: tuple = DEFAULT_MIX,
+    ) -> list[dict]:
+        """Conjunto ranqueado e balanceado por faixa (alto/medio/nicho).
+
+        As sementes conhecidas entram no conjunto; o resto sao vizinhos por
+        score. Faixas sem candidatos suficientes sao completadas pelos
+        melhores restantes.
+        """
+        with self._lock:
+            seed_ids = [self._ids[t] for t in dict.fromkeys(map(normalize_hashtag, seeds or ())) if t in self._ids]
+            if not seed_ids and topic:
+                seed_ids = self._topic_seeds(topic)
+            if not seed_ids:
+                return []
+            if self._thresholds_dirty:
+                self._refresh_thresholds()
+
+            df = np.frombuffer(self._df, dtype=np.float32).astype(np.float64)
+            parts_ids, parts_scores = [], []
+            for seed in seed_ids:
+                ids, weights = self._neighbors(seed)
+                if len(ids):
+                    parts_ids.append(ids)
+                    parts_scores.append(weights / np.sqrt(max(df[seed], 1.0) * np.maximum(df[ids], 1.0)))
+
+            ranked: list[tuple[int, float]] = [(seed, math.inf) for seed in seed_ids]
+            if parts_ids:
+                ids = np.concatenate(parts_ids)
+                unique, inverse = np.unique(ids, return_inverse=True)
+                scores = np.bincount(inverse, weights=np.concatenate(parts_scores))
+                keep = ~np.isin(unique, seed_ids)
+                unique, scores = unique[keep], scores[keep]
+                order = np.argsort(-scores, kind="stable")[: count * 4]
+                ranked += [(int(unique[i]), float(scores[i])) for i in order]
+
+            quotas = dict(zip(TIERS, tier_quotas(count, mix)))
+            chosen: list[tuple[int, float, str]] = []
+            leftovers = []
+            for tag_id, score in ranked:
+                tier = self._tier(tag_id)
+                if quotas[tier] > 0:
+                    quotas[tier] -= 1
+                    chosen.append((tag_id, score, tier))
+                else:
+                    leftovers.append((tag_id, score, tier))
+            chosen += leftovers[: max(count - len(chosen), 0)]
+            chosen = chosen[:count]
+
+            return [
+                {
+                    "hashtag": self._tags[tag_id],
+                    "tier": tier,
+                    "score": None if math.isinf(score) else round(score, 4),
+                    "seed": math.isinf(score),
+                    "volume": self._volume[tag_id] if self._volume[tag_id] >= 0 else None,
+                }
+                for tag_id, score, tier in sorted(chosen, key=lambda c: TIERS.index(c[2]))
+            ]
+
+    # --- persistencia ---------------------------------------------------
+
+    def save(self) -> bool:
+        if self.path is None:
+            return False
+        with self._lock:
+            self.compact()
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            meta = {"version": _FORMAT_VERSION, "watermarks": self.watermarks, "boundary_ids": self.boundary_ids}
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "wb") as fh:
+                np.savez(
+                    fh,
+                    tags=np.array(self._tags, dtype=np.str_),
+                    df=np.frombuffer(self._df, dtype=np.float32),
+                    volume=np.frombuffer(self._volume, dtype=np.int64),
+                    indptr=self._indptr,
+                    indices=self._indices,
+                    weights=self._weights,
+                    meta=np.array(json.dumps(meta)),
+                )
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.replace(tmp, self.path)
+            self._unsaved = False
+        return True
+
+    def save_if_changed(self) -> bool:
+        """Grava so se houve ingestao desde o ultimo save (fim de cada refresh do feed)."""
+        return self.save() if self._unsaved else False
+
+    def load(self) -> bool:
+        """Carrega o .npz salvo. Arquivo ausente, de outra versao ou corrompido
+        (ex: truncado por um crash) deixa o grafo vazio — nunca levanta."""
+        if self.path is None or not os.path.exists(self.path):
+            return False
+        try:
+            # Le tudo antes de trocar o estado: falha no meio nao deixa grafo parcial
+            with np.load(self.path, allow_pickle=False) as data:
+                meta = json.loads(str(data["meta"]))
+                if meta.get("version") != _FORMAT_VERSION:
+                    return False
+                tags = data["tags"].tolist()
+                df = array("f", data["df"].tobytes())
+                volume = array("q", data["volume"].tobytes())
+                indptr = data["indptr"].astype(np.int64)
+                indices = data["indices"].astype(np.int32)
+                weights = data["weights"].astype(np.float32)
+        except Exception as e:
+            logger.warning(f"Hashtag graph: failed to load {self.path}, starting empty: {e}")
+            return False
+        with self._lock:
+            self._tags = tags
+            self._ids = {tag: i for i, tag in enumerate(tags)}
+            self._df = df
+            self._volume = volume
+            self._indptr = indptr
+            self._indices = indices
+            self._weights = weights
+            self._pending = {}
+            self._pending_pairs = 0
+            self.watermarks = meta.get("watermarks", {})
+            self.boundary_ids = meta.get("boundary_ids", {})
+            self._refresh_thresholds()
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hashtags": len(self._tags),
+                "edges": int(len(self._indices)),
+                "pending_pairs": self._pending_pairs,
+                "compactions": self.compactions,
+                "memory_bytes": int(
+                    self._indptr.nbytes + self._indices.nbytes + self._weights.nbytes
+                    + len(self._df) * 4 + len(self._volume) * 8
+                ),
+                "persistent": self.path is not None,
+            }
+
+
+_graph: Optional[HashtagGraph] = None
+_graph_lock = threading.Lock()
+
+
+def get_hashtag_graph() -> HashtagGraph:
+    """Indice do processo (carregado do disco na primeira chamada)."""
+    global _graph
+    if _graph is None:
+        with _graph_lock:
+            if _graph is None:
+                from app.config import get_settings
+
+                settings = get_settings()
+                graph = HashtagGraph(settings.HASHTAG_GRAPH_PENDING_MAX, settings.HASHTAG_GRAPH_PATH)
+                if graph.load():
+                    logger.info(f"Hashtag graph loaded: {graph.stats()['hashtags']} hashtags")
+                _graph = graph
+    return _graph
+
+
+def recommend_hashtags(
+    seeds: Iterable = (),
+    topic: Optional[str] = None,
+    count: int = 15,
+) -> list[dict]:
+    """Recomendacao do indice do processo ([] se HASHTAG_GRAPH_ENABLED estiver desligado)."""
+    from app.config import get_settings
+
+    if not get_settings().HASHTAG_GRAPH_ENABLED:
+        return []
+    return get_hashtag_graph().recommend(seeds, topic, count)
+
+
+def get_hashtag_graph_stats() -> dict:
+    """Stats do indice, sem carrega-lo se HASHTAG_GRAPH_ENABLED estiver desligado."""
+    from app.config import get_settings
+
+    if not get_settings().HASHTAG_GRAPH_ENABLED:
+        return {"enabled": False}
+    return {"enabled": True, **get_hashtag_graph().stats()}
+
+
+def reset_hashtag_graph() -> None:
+    global _graph
+    _graph = None
@@ -0,0 +1,417 @@
+"""Deteccao incremental de hashtags em alta por nicho.
+
+Cada (nicho, hashtag) tem contagens por bucket de tempo
+(HASHTAG_TRENDS_BUCKET_MINUTES) e uma linha de base EWMA da media e da
+variancia das contagens por bucket (meia-vida em buckets). Uma hashtag esta
+"em alta" quando a contagem recente (bucket atual + anterior) passa a base:
+
+    z = (recente - 2*media) / sqrt(max(2*var, 2*media, 1))   >= Z_THRESHOLD
+    lift = (recente + 1) / (2*media + 1)                      >= LIFT_THRESHOLD
+    recente >= MIN_COUNT
+
+(o piso de Poisson no desvio evita que uma hashtag nova com 1 mencao vire
+pico). Buckets vazios sao aplicados de forma preguicosa no proximo evento
+ou leitura, entao cada mencao custa O(1) e a lista de cada nicho e mantida
+a cada evento — rising() so reavalia as hashtags ja marcadas.
+
+Fontes: linhas de social_midia_hashtag_research (cada pesquisa conta como
+mencao), hashtags de social_midia_viral_content e de
+social_midia_content_pieces. Uma task de fundo (lifespan) le as linhas novas
+de cada tabela desde a ultima marca d'agua a cada
+HASHTAG_TRENDS_REFRESH_SECONDS; a primeira leitura cobre
+HASHTAG_TRENDS_BACKFILL_DAYS para formar a base. O indice vive na memoria
+de cada worker. Toda mencao tambem entra na particao "" (todos os nichos).
+"""
+
+import asyncio
+import logging
+import math
+import threading
+import time
+import unicodedata
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable, Optional
+
+logger = logging.getLogger("agentesocial.hashtag_trends")
+
+_ALL = ""
+_MAX_ZERO_STEPS = 64
+_PAGE_SIZE = 1000
+
+
+def normalize_hashtag(tag) -> Optional[str]:
+    """'#MarketingDigital ' -> '#marketingdigital' (None se vazio)."""
+    if not isinstance(tag, str):
+        return None
+    text = tag.strip().lstrip("#").strip().lower()
+    return f"#{text}" if text else None
+
+
+def normalize_niche(niche) -> str:
+    if not isinstance(niche, str):
+        return _ALL
+    text = unicodedata.normalize("NFKD", niche.strip().lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def _parse_time(value) -> Optional[float]:
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        moment = value
+    elif isinstance(value, str):
+        try:
+            moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    else:
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+class _TagStats:
+    """Contagem do bucket atual/anterior + base EWMA de uma hashtag num nicho."""
+
+    __slots__ = ("bucket", "count", "prev", "mean", "var", "total", "volume")
+
+    def __init__(self, bucket: int):
+        self.bucket = bucket
+        self.count = 0.0
+        self.prev = 0.0
+        self.mean = 0.0
+        self.var = 0.0
+        self.total = 0.0
+        self.volume: Optional[int] = None
+
+    def _fold(self, x: float, alpha: float) -> None:
+        diff = x - self.mean
+        incr = alpha * diff
+        self.mean += incr
+        self.var = (1 - alpha) * (self.var + diff * incr)
+
+    def roll(self, bucket: int, alpha: float) -> None:
+        """Fecha os buckets ate `bucket` (os vazios entram como contagem zero)."""
+        gap = bucket - self.bucket
+        if gap <= 0:
+            return
+        self._fold(self.count, alpha)
+        self.prev = self.count if gap == 1 else 0.0
+        zeros = gap - 1
+        for _ in range(min(zeros, _MAX_ZERO_STEPS)):
+            self._fold(0.0, alpha)
+        if zeros > _MAX_ZERO_STEPS:
+            decay = (1 - alpha) ** (zeros - _MAX_ZERO_STEPS)
+            self.mean *= decay
+            self.var *= decay
+        self.count = 0.0
+        self.bucket = bucket
+
+    def score(self) -> tuple[float, float, float]:
+        recent = self.count + self.prev
+        expected = 2 * self.mean
+        z = (recent - expected) / math.sqrt(max(2 * self.var, expected, 1.0))
+        return recent, z, (recent + 1) / (expected + 1)
+
+
+class HashtagTrendDetector:
+    """Contagens por bucket + base EWMA por (nicho, hashtag), em memoria.
+
+    Args:
+        bucket_seconds: Largura do bucket de contagem
+        halflife_buckets: Meia-vida (em buckets) da media/variancia da base
+        z_threshold, lift_threshold, min_count: Criterios de "em alta"
+    """
+
+    def __init__(
+        self,
+        bucket_seconds: float = 3600,
+        halflife_buckets: float = 72,
+        z_threshold: float = 3.0,
+        lift_threshold: float = 2.0,
+        min_count: float = 3,
+    ):
+        self.bucket_seconds = bucket_seconds
+        self.alpha = 1 - 0.5 ** (1 / max(halflife_buckets, 1))
+        self.z_threshold = z_threshold
+        self.lift_threshold = lift_threshold
+        self.min_count = min_count
+        self._stats: dict[tuple[str, str], _TagStats] = {}
+        self._rising: dict[str, set[str]] = {}
+        self._lock = threading.Lock()
+        self.events = 0
+        self.stale = 0
+
+    def _bucket(self, at: float) -> int:
+        return int(at // self.bucket_seconds)
+
+    def _is_rising(self, stats: _TagStats) -> bool:
+        recent, z, lift = stats.score()
+        return recent >= self.min_count and z >= self.z_threshold and lift >= self.lift_threshold
+
+    def observe(
+        self,
+        hashtags: Iterable,
+        niche: Optional[str] = None,
+        at=None,
+        weight: float = 1.0,
+        volume: Optional[int] = None,
+    ) -> None:
+        """Registra mencoes (um post/pesquisa) no nicho e na particao geral."""
+        moment = _parse_time(at) if at is not None else time.time()
+        if moment is None:
+            return
+        bucket = self._bucket(moment)
+        tags = {tag for tag in map(normalize_hashtag, hashtags or ()) if tag}
+        partitions = {normalize_niche(niche), _ALL}
+        with self._lock:
+            for tag in tags:
+                for partition in partitions:
+                    key = (partition, tag)
+                    stats = self._stats.get(key)
+                    if stats is None:
+                        stats = self._stats[key] = _TagStats(bucket)
+                    elif bucket < stats.bucket:
+                        # Evento de um bucket ja fechado: conta no atual
+                        self.stale += 1
+                    stats.roll(bucket, self.alpha)
+                    stats.count += weight
+                    stats.total += weight
+                    if volume is not None:
+                        stats.volume = volume
+                    rising = self._rising.setdefault(partition, set())
+                    if self._is_rising(stats):
+                        rising.add(tag)
+                    else:
+                        rising.discard(tag)
+            self.events += 1
+
+    def rising(self, niche: Optional[str] = None, limit: int = 20, now: Optional[float] = None) -> list[dict]:
+        """Hashtags em alta no nicho (None/"" = todos), do maior z ao menor."""
+        partition = normalize_niche(niche)
+        bucket = self._bucket(now if now is not None else time.time())
+        found = []
+        with self._lock:
+            tags = self._rising.get(partition)
+            if not tags:
+                return []
+            for tag in list(tags):
+                stats = self._stats[(partition, tag)]
+                stats.roll(bucket, self.alpha)
+                if not self._is_rising(stats):
+                    tags.discard(tag)
+                    continue
+                recent, z, lift = stats.score()
+                found.append({
+                    "hashtag": tag,
+                    "recent_count": round(recent, 1),
+                    "baseline": round(2 * stats.mean, 2),
+                    "z_score": round(z, 2),
+                    "lift": round(lift, 2),
+                    "total_mentions": round(stats.total, 1),
+                    "volume": stats.volume,
+                })
+        found.sort(key=lambda item: (item["z_score"], item["lift"]), reverse=True)
+        return found[:limit]
+
+    def prune(self, now: Optional[float] = None, min_mean: float = 1e-3) -> int:
+        """Descarta hashtags cuja base decaiu a ~zero e sem mencoes recentes."""
+        bucket = self._bucket(now if now is not None else time.time())
+        removed = 0
+        with self._lock:
+            for key in list(self._stats):
+                stats = self._stats[key]
+                stats.roll(bucket, self.alpha)
+                if stats.count == 0 and stats.prev == 0 and stats.mean < min_mean:
+                    del self._stats[key]
+                    self._rising.get(key[0], set()).discard(key[1])
+                    removed += 1
+        return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "tracked": len(self._stats),
+                "events": self.events,
+                "stale_events": self.stale,
+                "rising": {niche or "*": len(tags) for niche, tags in self._rising.items() if tags},
+            }
+
+
+# Fontes lidas pelo refresh: (tabela, colunas, coluna de tempo)
+_SOURCES = (
+    ("hashtag_research", "id,hashtag,niche,volume,related_hashtags,last_researched_at", "last_researched_at"),
+    ("viral_content", "id,hashtags,niche,virality_score,detected_at", "detected_at"),
+    ("content_pieces", "id,hashtags,metadata,created_at", "created_at"),
+)
+
+
+def _row_event(source: str, row: dict, time_column: str) -> Optional[tuple]:
+    """(instante, hashtags, nicho, volume) de uma linha de uma das fontes."""
+    at = _parse_time(row.get(time_column))
+    if at is None:
+        return None
+    if source == "hashtag_research":
+        return at, [row.get("hashtag")], row.get("niche"), row.get("volume")
+    niche = row.get("niche")
+    if niche is None and isinstance(row.get("metadata"), dict):
+        niche = row["metadata"].get("niche")
+    return at, row.get("hashtags") or [], niche, None
+
+
+class HashtagTrendService:
+    """Alimenta um HashtagTrendDetector com as linhas novas do Supabase.
+
+    Outros indices podem assinar o mesmo feed (subscribe): recebem as linhas
+    de cada fonte (on_rows(source, rows, time_column), numa thread) e um
+    aviso no fim de cada refresh.
+    """
+
+    def __init__(self, detector: HashtagTrendDetector, backfill_days: float = 14):
+        self.detector = detector
+        self.backfill_days = backfill_days
+        self.watermarks: dict[str, str] = {}
+        # ids ja lidos com tempo == watermark (a leitura seguinte usa >=)
+        self._boundary_ids: dict[str, set] = {}
+        self._subscribers: list[tuple[Callable, Optional[Callable]]] = []
+        self.last_refresh: Optional[float] = None
+        self.errors = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def _fetch(self, source: str, columns: str, time_column: str) -> list[dict]:
+        """Linhas com tempo >= watermark, sem as ja lidas no proprio watermark.
+
+        Com > uma linha commitada depois com o mesmo timestamp da ultima
+        lida seria pulada para sempre.
+        """
+        from app.constants import TABLES
+        from app.database.supabase_client import get_supabase_admin
+
+        since = self.watermarks.get(source) or (
+            datetime.now(timezone.utc) - timedelta(days=self.backfill_days)
+        ).isoformat()
+        supabase = get_supabase_admin()
+        rows: list[dict] = []
+        while True:
+            page = (
+                supabase.table(TABLES[source])
+                .select(columns)
+                .gte(time_column, since)
+                .order(time_column)
+                .range(len(rows), len(rows) + _PAGE_SIZE - 1)
+                .execute()
+            ).data or []
+            rows.extend(page)
+            if len(page) < _PAGE_SIZE:
+                break
+        if rows:
+            latest = rows[-1][time_column]
+            seen = self._boundary_ids.get(source, set())
+            self._boundary_ids[source] = {row.get("id") for row in rows if row[time_column] == latest}
+            self.watermarks[source] = latest
+            rows = [row for row in rows if not (row[time_column] == since and row.get("id") in seen)]
+        return rows
+
+    def subscribe(self, on_rows: Callable, after_refresh: Optional[Callable] = None) -> None:
+        self._subscribers.append((on_rows, after_refresh))
+
+    async def refresh(self) -> int:
+        """Le as linhas novas de todas as fontes e alimenta o detector em ordem de tempo."""
+        events = []
+        for source, columns, time_column in _SOURCES:
+            try:
+                rows = await asyncio.to_thread(self._fetch, source, columns, time_column)
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"Hashtag trends: failed to read {source}: {e}")
+                continue
+            for on_rows, _ in self._subscribers:
+                try:
+                    await asyncio.to_thread(on_rows, source, rows, time_column)
+                except Exception as e:
+                    self.errors += 1
+                    logger.warning(f"Hashtag trends: subscriber failed on {source}: {e}")
+            for row in rows:
+                event = _row_event(source, row, time_column)
+                if event is not None:
+                    events.append(event)
+
+        events.sort(key=lambda event: event[0])
+        for at, hashtags, niche, volume in events:
+            self.detector.observe(hashtags, niche, at, volume=volume)
+        self.detector.prune()
+        for _, after_refresh in self._subscribers:
+            if after_refresh is not None:
+                try:
+                    await asyncio.to_thread(after_refresh)
+                except Exception as e:
+                    self.errors += 1
+                    logger.warning(f"Hashtag trends: subscriber refresh hook failed: {e}")
+        self.last_refresh = time.time()
+        return len(events)
+
+    async def _run(self, interval: float) -> None:
+        while True:
+            try:
+                count = await self.refresh()
+                if count:
+                    logger.info(f"Hashtag trends: {count} new mentions")
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Hashtag trends refresh failed: {e}")
+            await asyncio.sleep(interval)
+
+    def start(self, interval: float) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run(interval))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            **self.detector.stats(),
+            "running": self._task is not None and not self._task.done(),
+            "last_refresh": self.last_refresh,
+            "errors": self.errors,
+        }
+
+
+_service: Optional[HashtagTrendService] = None
+_service_lock = threading.Lock()
+
+
+def get_hashtag_trends() -> HashtagTrendService:
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                from app.config import get_settings
+
+                settings = get_settings()
+                detector = HashtagTrendDetector(
+                    bucket_seconds=settings.HASHTAG_TRENDS_BUCKET_MINUTES * 60,
+                    halflife_buckets=settings.HASHTAG_TRENDS_HALFLIFE_BUCKETS,
+                    z_threshold=settings.HASHTAG_TRENDS_Z_THRESHOLD,
+                    lift_threshold=settings.HASHTAG_TRENDS_LIFT_THRESHOLD,
+                    min_count=settings.HASHTAG_TRENDS_MIN_COUNT,
+                )
+                _service = HashtagTrendService(detector, settings.HASHTAG_TRENDS_BACKFILL_DAYS)
+    return _service
+
+
+def get_rising_hashtags(niche: Optional[str] = None, limit: int = 20) -> list[dict]:
+    """Lista pronta do indice em memoria (sem consultar banco ou web)."""
+    return get_hashtag_trends().detector.rising(niche, limit)
+
+
+def reset_hashtag_trends() -> None:
+    global _service
+    _service = None
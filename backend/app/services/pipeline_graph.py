@@ -0,0 +1,221 @@
+"""Motor de execucao do pipeline como grafo de steps.
+
+Cada step declara os dados que consome (inputs) e os que produz (outputs).
+O StepGraph resolve as dependencias pelos nomes dos dados e executa em
+paralelo todos os steps cujas entradas ja estao prontas. Steps desligados
+(ex: video_scripts com include_video=False) simplesmente nao sao adicionados.
+Steps ja concluidos numa execucao anterior podem ser restaurados (restored)
+sem rodar de novo; on_step_done permite salvar checkpoint a cada step.
+
+Uso:
+    graph = StepGraph(result, notify)
+    graph.add(StepNode("audit", run_audit, outputs=("audit_result",)))
+    graph.add(StepNode("plan", run_plan, inputs=("audit_result",), outputs=("plan_slots",)))
+    data = await graph.run({"user_id": user_id})
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Optional
+
+from app.models.contracts import PipelineResult, PipelineStep
+
+logger = logging.getLogger("agentesocial.pipeline_graph")
+
+StepFn = Callable[..., Awaitable[dict]]
+
+
+class StepGraphError(ValueError):
+    """Grafo invalido: input sem produtor, output duplicado ou ciclo."""
+
+
+class StepNode:
+    """Step do pipeline.
+
+    Args:
+        name: Nome do step (vira PipelineStep.name)
+        fn: Coroutine fn(step, **inputs) -> dict com os outputs declarados
+        inputs: Dados obrigatorios (produzidos por outro step ou no contexto inicial)
+        optional_inputs: Dados consumidos somente se algum step ativo os produzir
+        outputs: Dados produzidos pelo step
+        fallback: Outputs usados pelos dependentes se o step falhar
+        message: Mensagem de progresso enviada ao iniciar
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: StepFn,
+        inputs: tuple[str, ...] = (),
+        optional_inputs: tuple[str, ...] = (),
+        outputs: tuple[str, ...] = (),
+        fallback: Optional[dict] = None,
+        message: str = "",
+    ):
+        self.name = name
+        self.fn = fn
+        self.inputs = tuple(inputs)
+        self.optional_inputs = tuple(optional_inputs)
+        self.outputs = tuple(outputs)
+        self.fallback = fallback or {}
+        self.message = message
+
+
+class StepGraph:
+    """Executa StepNodes respeitando dependencias de dados."""
+
+    def __init__(
+        self,
+        result: PipelineResult,
+        notify: Optional[Callable[[str, str], Awaitable[None]]] = None,
+        on_step_done: Optional[Callable[[PipelineStep, dict], Awaitable[None]]] = None,
+    ):
+        self.result = result
+        self.notify = notify
+        self.on_step_done = on_step_done
+        self.nodes: dict[str, StepNode] = {}
+        self.timings: dict[str, float] = {}
+
+    def add(self, node: StepNode, when: bool = True) -> None:
+        """Adiciona um step ao grafo; when=False pula o step."""
+        if not when:
+            return
+        if node.name in self.nodes:
+            raise StepGraphError(f"Step duplicado: {node.name}")
+        self.nodes[node.name] = node
+
+    def _dependencies(self, initial: dict) -> dict[str, list[str]]:
+        producers: dict[str, str] = {}
+        for node in self.nodes.values():
+            for out in node.outputs:
+                if out in producers:
+                    raise StepGraphError(f"'{out}' produzido por {producers[out]} e {node.name}")
+                producers[out] = node.name
+
+        deps: dict[str, list[str]] = {}
+        for node in self.nodes.values():
+            node_deps: list[str] = []
+            for name in node.inputs:
+                if name in producers:
+                    node_deps.append(producers[name])
+                elif name not in initial:
+                    raise StepGraphError(f"Step {node.name}: input '{name}' sem produtor")
+            for name in node.optional_inputs:
+                if name in producers:
+                    node_deps.append(producers[name])
+            deps[node.name] = list(dict.fromkeys(node_deps))
+        return deps
+
+    def _topological_order(self, deps: dict[str, list[str]]) -> list[str]:
+        order: list[str] = []
+        state: dict[str, int] = {}  # 1 = visitando, 2 = concluido
+
+        def visit(name: str) -> None:
+            if state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                raise StepGraphError(f"Ciclo detectado em {name}")
+            state[name] = 1
+            for dep in deps[name]:
+                visit(dep)
+            state[name] = 2
+            order.append(name)
+
+        # Ordem de insercao define a ordem de PipelineResult.steps entre irmaos
+        for name in self.nodes:
+            visit(name)
+        return order
+
+    async def run(
+        self,
+        initial: Optional[dict] = None,
+        restored: Optional[dict[str, dict]] = None,
+    ) -> dict:
+        """Executa o grafo e retorna o dicionario com todos os dados produzidos.
+
+        Args:
+            initial: Dados disponiveis antes do primeiro step
+            restored: Outputs de steps ja concluidos ({step: outputs}); esses
+                steps nao rodam e ficam com status "restored"
+        """
+        data: dict[str, Any] = dict(initial or {})
+        restored = restored or {}
+        deps = self._dependencies(data)
+        order = self._topological_order(deps)
+        tasks: dict[str, asyncio.Task] = {}
+
+        async def run_node(node: StepNode) -> None:
+            if deps[node.name]:
+                await asyncio.gather(*(tasks[d] for d in deps[node.name]))
+
+            if node.name in restored:
+                self.result.steps.append(PipelineStep(
+                    name=node.name, status="restored", depends_on=deps[node.name],
+                ))
+                self.timings[node.name] = 0.0
+                for out in node.outputs:
+                    data[out] = restored[node.name].get(out, node.fallback.get(out))
+                return
+
+            if self.notify and node.message:
+                await self.notify(node.name, node.message)
+            step = PipelineStep(
+                name=node.name,
+                status="running",
+                started_at=datetime.utcnow().isoformat(),
+                depends_on=deps[node.name],
+            )
+            self.result.steps.append(step)
+
+            kwargs = {k: data[k] for k in node.inputs}
+            kwargs.update({k: data[k] for k in node.optional_inputs if k in data})
+
+            started = time.perf_counter()
+            try:
+                outputs = await node.fn(step, **kwargs) or {}
+                if step.status == "running":
+                    step.status = "completed"
+            except Exception as e:
+                logger.error("Step %s failed: %s", node.name, e)
+                step.status = "failed"
+                step.error = str(e)
+                outputs = dict(node.fallback)
+            finally:
+                step.duration_ms = round((time.perf_counter() - started) * 1000, 1)
+                step.completed_at = datetime.utcnow().isoformat()
+                self.timings[node.name] = step.duration_ms
+
+            for out in node.outputs:
+                data[out] = outputs.get(out, node.fallback.get(out))
+
+            if self.on_step_done:
+                await self.on_step_done(step, outputs)
+
+        for name in order:
+            tasks[name] = asyncio.create_task(run_node(self.nodes[name]))
+        await asyncio.gather(*tasks.values())
+
+        self.result.critical_path = self.critical_path(deps)
+        return data
+
+    def critical_path(self, deps: dict[str, list[str]]) -> list[str]:
+        """Caminho de maior duracao acumulada (em ordem de execucao)."""
+        finish: dict[str, float] = {}
+        prev: dict[str, Optional[str]] = {}
+        order = self._topological_order(deps)
+        for name in order:
+            slowest = max(deps[name], key=lambda d: finish[d], default=None)
+            prev[name] = slowest
+            finish[name] = (finish[slowest] if slowest else 0.0) + self.timings.get(name, 0.0)
+
+        if not finish:
+            return []
+        # Em empate, prefere o step mais ao fim do grafo
+        node: Optional[str] = max(reversed(order), key=finish.get)
+        path: list[str] = []
+        while node:
+            path.append(node)
+            node = prev[node]
+        return list(reversed(path))
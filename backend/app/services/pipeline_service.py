@@ -1,14 +1,20 @@
 """Orquestrador do pipeline de conteudo.
 
-Executa a sequencia: AUDIT -> PLAN -> CONTENT -> SCRIPTS -> QUALITY GATE -> PERSIST.
+Executa o grafo: AUDIT -> PLAN -> (CONTENT || SCRIPTS) -> QUALITY GATE -> PERSIST.
+Os steps sao declarados como StepNodes (app.services.pipeline_graph) e
+steps independentes rodam em paralelo.
 Cada step usa validate_and_retry para garantir output JSON estruturado.
+CONTENT e SCRIPTS fazem fan-out por slot com concorrencia limitada
+(PIPELINE_MAX_CONCURRENCY global e PIPELINE_MAX_CONCURRENCY_PER_USER).
 """
 
 import asyncio
 import logging
 import uuid
 from datetime import datetime, timedelta
-from typing import Awaitable, Callable, Optional
+from typing import Awaitable, Callable, Iterable, Optional
+
+from pydantic import BaseModel
 
 from app.agents.calendar_planner import create_calendar_planner
 from app.agents.content_writer import create_content_writer
@@ -36,35 +42,102 @@ from app.prompts.quality.v1 import PROMPT_VERSION as QUALITY_V
 from app.prompts.quality.v1 import build_prompt as build_quality_prompt
 from app.prompts.scripts.v1 import PROMPT_VERSION as SCRIPTS_V
 from app.prompts.scripts.v1 import build_prompt as build_scripts_prompt
+from app.services.concurrency import KeyedLimiter
 from app.services.contract_validator import validate_and_retry
+from app.services.pipeline_graph import StepGraph, StepNode
 
 logger = logging.getLogger("agentesocial.pipeline")
 
 ProgressCallback = Callable[[str, str], Awaitable[None]]
 
 
+def _build_slot_limiter() -> KeyedLimiter:
+    from app.config import get_settings
+    settings = get_settings()
+    return KeyedLimiter(
+        settings.PIPELINE_MAX_CONCURRENCY,
+        settings.PIPELINE_MAX_CONCURRENCY_PER_USER,
+    )
+
+
+# Limite compartilhado por todas as runs do processo
+_slot_limiter = _build_slot_limiter()
+
+# Linhas por insert multi-row em content_pieces/calendar_events
+_PERSIST_CHUNK_SIZE = 500
+
+# Namespace dos ids deterministicos de content_pieces/calendar_events
+_PERSIST_NAMESPACE = uuid.UUID("5f0c8a5e-2d7b-4c1e-9a43-8b6f3e1d7c20")
+
+# Runs em execucao neste processo (evita retomar uma run que ainda esta rodando)
+_active_runs: set[str] = set()
+
+
+def is_run_active(pipeline_id: str) -> bool:
+    return pipeline_id in _active_runs
+
+
+class RunCheckpoint:
+    """Estado de retomada de uma run, salvo em pipeline_runs.checkpoint.
+
+    - completed_steps: steps concluidos cujos outputs ja estao na linha da run
+    - plan_slots: slots extraidos do plano (necessarios para CONTENT/SCRIPTS)
+    - slot_results: resultados por slot dos steps em andamento ({step: {idx: dict}})
+    - content_persisted: content_pieces/calendar_events ja foram gravados
+      (so apos uma run sem slots falhos; numa run "partial" os slots com
+      erro ficam de fora ate a retomada)
+      (se a run cair antes deste checkpoint, a regravacao e idempotente:
+      ids deterministicos por run/slot + upsert ignorando duplicados)
+    """
+
+    def __init__(self, data: Optional[dict] = None):
+        data = data or {}
+        self.completed_steps: list[str] = list(data.get("completed_steps") or [])
+        self.plan_slots: list[dict] = list(data.get("plan_slots") or [])
+        self.slot_results: dict[str, dict[str, dict]] = {
+            step: dict(slots) for step, slots in (data.get("slot_results") or {}).items()
+        }
+        self.content_persisted: bool = bool(data.get("content_persisted", False))
+        self.content_piece_ids: list[str] = list(data.get("content_piece_ids") or [])
+        self.calendar_event_ids: list[str] = list(data.get("calendar_event_ids") or [])
+        self.lock = asyncio.Lock()
+        # Linha da run ja existe em pipeline_runs (nao serializado)
+        self.recorded = False
+
+    def to_dict(self) -> dict:
+        return {
+            "completed_steps": self.completed_steps,
+            "plan_slots": self.plan_slots,
+            "slot_results": self.slot_results,
+            "content_persisted": self.content_persisted,
+            "content_piece_ids": self.content_piece_ids,
+            "calendar_event_ids": self.calendar_event_ids,
+        }
+
+
 class PipelineService:
     async def execute(
         self,
         user_id: str,
         config: dict,
         progress_cb: Optional[ProgressCallback] = None,
+        resume_from: Optional[dict] = None,
     ) -> PipelineResult:
         """Executa o pipeline completo de geracao de conteudo.
 
+        A run e gravada em pipeline_runs logo no inicio e recebe checkpoint
+        apos cada step e cada slot de CONTENT/SCRIPTS.
+
         Args:
             user_id: ID do usuario
-            config: Configuracao do pipeline (period, platforms, focus_topics, include_video)
+            config: Configuracao do pipeline (period, platforms, focus_topics, include_video, parallel)
             progress_cb: Callback async para enviar progresso (step_name, message)
+            resume_from: Linha de pipeline_runs a retomar (ver resume())
 
         Returns:
             PipelineResult com todos os outputs dos steps
         """
-        pipeline_id = str(uuid.uuid4())
-        period = config.get("period", "weekly")
-        platforms = config.get("platforms", ["instagram", "youtube", "tiktok", "linkedin"])
-        focus_topics = config.get("focus_topics")
-        include_video = config.get("include_video", True)
+        pipeline_id = resume_from["id"] if resume_from else str(uuid.uuid4())
 
         result = PipelineResult(
             pipeline_id=pipeline_id,
@@ -79,190 +152,414 @@ class PipelineService:
             },
             created_at=datetime.utcnow().isoformat(),
         )
+        checkpoint = RunCheckpoint()
+        if resume_from:
+            checkpoint = RunCheckpoint(resume_from.get("checkpoint"))
+            result.version = resume_from.get("version") or 1
+            result.created_at = resume_from.get("created_at") or result.created_at
+            result.audit_result = resume_from.get("audit_result")
+            result.plan_result = resume_from.get("plan_result")
+            result.content_results = resume_from.get("content_results") or []
+            result.script_results = resume_from.get("script_results") or []
+            result.quality_report = resume_from.get("quality_report")
+            result.content_piece_ids = checkpoint.content_piece_ids
+            result.calendar_event_ids = checkpoint.calendar_event_ids
+
+        _active_runs.add(pipeline_id)
+        try:
+            return await self._run(result, checkpoint, progress_cb, resume=bool(resume_from))
+        finally:
+            _active_runs.discard(pipeline_id)
+
+    async def resume(
+        self,
+        run: dict,
+        progress_cb: Optional[ProgressCallback] = None,
+    ) -> PipelineResult:
+        """Retoma uma run interrompida a partir do ultimo step/slot salvo."""
+        return await self.execute(
+            user_id=run["user_id"],
+            config=run.get("config") or {},
+            progress_cb=progress_cb,
+            resume_from=run,
+        )
+
+    async def _run(
+        self,
+        result: PipelineResult,
+        checkpoint: RunCheckpoint,
+        progress_cb: Optional[ProgressCallback],
+        resume: bool = False,
+    ) -> PipelineResult:
+        user_id = result.user_id
+        config = result.config
+        period = config.get("period", "weekly")
+        platforms = config.get("platforms", ["instagram", "youtube", "tiktok", "linkedin"])
+        focus_topics = config.get("focus_topics")
+        include_video = config.get("include_video", True)
+        parallel = config.get("parallel", True)
 
         async def notify(step: str, message: str):
             if progress_cb:
                 await progress_cb(step, message)
 
-        # --- Step 1: AUDIT ---
-        await notify("audit", "Auditando perfil...")
-        audit_step = PipelineStep(name="audit", status="running", started_at=datetime.utcnow().isoformat())
-        result.steps.append(audit_step)
+        await self._start_run(result, checkpoint, resume)
 
-        try:
+        # Com parallel=False todos os slots da run (CONTENT e SCRIPTS) rodam um a um
+        run_gate = None if parallel else asyncio.Semaphore(1)
+
+        async def save_slot(step_name: str, idx: int, data: dict) -> None:
+            checkpoint.slot_results.setdefault(step_name, {})[str(idx)] = data
+            await self._checkpoint(result, checkpoint)
+
+        async def save_step(step: PipelineStep, outputs: dict) -> None:
+            # Step com slots falhos fica pendente: a retomada regera so esses slots
+            if step.status == "completed" and not step.slot_errors:
+                checkpoint.completed_steps.append(step.name)
+                if "plan_slots" in outputs:
+                    checkpoint.plan_slots = outputs["plan_slots"]
+                # Resultados por slot agora vivem nas colunas da run
+                checkpoint.slot_results.pop(step.name, None)
+            await self._checkpoint(result, checkpoint)
+
+        async def run_audit(step: PipelineStep) -> dict:
             audit_prompt = build_audit_prompt(user_id, platforms, focus_topics)
             audit_model, _ = await validate_and_retry(
                 create_social_analyst, audit_prompt, AuditReport, user_id,
             )
             result.audit_result = audit_model.model_dump()
-            audit_step.status = "completed"
-            audit_step.completed_at = datetime.utcnow().isoformat()
-        except Exception as e:
-            logger.error("Audit step failed: %s", e)
-            audit_step.status = "failed"
-            audit_step.error = str(e)
-            audit_step.completed_at = datetime.utcnow().isoformat()
-            result.audit_result = AuditReport().model_dump()
-
-        # --- Step 2: PLAN ---
-        await notify("plan", "Gerando plano editorial...")
-        plan_step = PipelineStep(name="plan", status="running", started_at=datetime.utcnow().isoformat())
-        result.steps.append(plan_step)
+            return {"audit_result": result.audit_result}
 
-        plan_schema = MonthlyPlan if period == "monthly" else WeeklyPlan
-        plan_slots: list[dict] = []
-
-        try:
-            audit_summary = result.audit_result or {}
-            plan_prompt = build_plan_prompt(audit_summary, period, platforms, focus_topics)
+        async def run_plan(step: PipelineStep, audit_result: dict) -> dict:
+            plan_schema = MonthlyPlan if period == "monthly" else WeeklyPlan
+            plan_prompt = build_plan_prompt(audit_result or {}, period, platforms, focus_topics)
             plan_model, _ = await validate_and_retry(
                 create_calendar_planner, plan_prompt, plan_schema, user_id,
             )
             result.plan_result = plan_model.model_dump()
-            plan_step.status = "completed"
-            plan_step.completed_at = datetime.utcnow().isoformat()
 
             # Extrair slots para os proximos steps
+            plan_slots: list[dict] = []
             if period == "monthly" and hasattr(plan_model, "weeks"):
                 for week in plan_model.weeks:
                     plan_slots.extend([s.model_dump() for s in week.slots])
             elif hasattr(plan_model, "slots"):
                 plan_slots = [s.model_dump() for s in plan_model.slots]
-        except Exception as e:
-            logger.error("Plan step failed: %s", e)
-            plan_step.status = "failed"
-            plan_step.error = str(e)
-            plan_step.completed_at = datetime.utcnow().isoformat()
+            return {"plan_slots": plan_slots}
 
-        # --- Step 3: CONTENT ---
-        await notify("content", "Criando conteudo...")
-        content_step = PipelineStep(name="content", status="running", started_at=datetime.utcnow().isoformat())
-        result.steps.append(content_step)
-
-        try:
-            for slot in plan_slots:
-                content_prompt = build_content_prompt(slot)
-                content_model, _ = await validate_and_retry(
-                    create_content_writer, content_prompt, ContentPieceContract, user_id,
-                )
-                result.content_results.append(content_model.model_dump())
-            content_step.status = "completed"
-            content_step.completed_at = datetime.utcnow().isoformat()
-        except Exception as e:
-            logger.error("Content step failed: %s", e)
-            content_step.status = "failed"
-            content_step.error = str(e)
-            content_step.completed_at = datetime.utcnow().isoformat()
-
-        # --- Step 4: SCRIPTS (se include_video) ---
-        if include_video:
-            await notify("video_scripts", "Escrevendo roteiros...")
-            scripts_step = PipelineStep(name="video_scripts", status="running", started_at=datetime.utcnow().isoformat())
-            result.steps.append(scripts_step)
+        async def generate_content(slot: dict) -> dict:
+            content_prompt = build_content_prompt(slot)
+            content_model, _ = await validate_and_retry(
+                create_content_writer, content_prompt, ContentPieceContract, user_id,
+            )
+            return content_model.model_dump()
 
-            try:
-                video_types = {"reel", "shorts", "video_longo", "tiktok"}
-                video_slots = [s for s in plan_slots if s.get("content_type", "").lower().replace(" ", "_") in video_types]
-
-                for slot in video_slots:
-                    ct = slot.get("content_type", "reel").lower().replace(" ", "_")
-                    script_type = "youtube" if ct in ("video_longo", "shorts") else "reel"
-                    scripts_prompt = build_scripts_prompt(slot, script_type)
-                    script_model, _ = await validate_and_retry(
-                        create_video_script_writer, scripts_prompt, ScriptReel, user_id,
-                    )
-                    result.script_results.append(script_model.model_dump())
-                scripts_step.status = "completed"
-                scripts_step.completed_at = datetime.utcnow().isoformat()
-            except Exception as e:
-                logger.error("Scripts step failed: %s", e)
-                scripts_step.status = "failed"
-                scripts_step.error = str(e)
-                scripts_step.completed_at = datetime.utcnow().isoformat()
+        async def run_content(step: PipelineStep, plan_slots: list[dict]) -> dict:
+            outcomes = await self._fan_out(
+                user_id, plan_slots, generate_content, step.name, notify, run_gate,
+                done=checkpoint.slot_results.setdefault(step.name, {}),
+                on_slot_done=save_slot,
+            )
+            result.content_results = self._collect_slot_outcomes(
+                outcomes, step, ContentPieceContract,
+            )
+            return {"content_results": result.content_results}
+
+        async def generate_script(slot: dict) -> dict:
+            ct = slot.get("content_type", "reel").lower().replace(" ", "_")
+            script_type = "youtube" if ct in ("video_longo", "shorts") else "reel"
+            scripts_prompt = build_scripts_prompt(slot, script_type)
+            script_model, _ = await validate_and_retry(
+                create_video_script_writer, scripts_prompt, ScriptReel, user_id,
+            )
+            return script_model.model_dump()
 
-        # --- Step 5: QUALITY GATE ---
-        await notify("quality_gate", "Validando qualidade...")
-        qg_step = PipelineStep(name="quality_gate", status="running", started_at=datetime.utcnow().isoformat())
-        result.steps.append(qg_step)
+        async def run_scripts(step: PipelineStep, plan_slots: list[dict]) -> dict:
+            video_types = {"reel", "shorts", "video_longo", "tiktok"}
+            video_slots = [s for s in plan_slots if s.get("content_type", "").lower().replace(" ", "_") in video_types]
 
-        try:
-            all_content = result.content_results + result.script_results
+            outcomes = await self._fan_out(
+                user_id, video_slots, generate_script, step.name, notify, run_gate,
+                done=checkpoint.slot_results.setdefault(step.name, {}),
+                on_slot_done=save_slot,
+            )
+            result.script_results = self._collect_slot_outcomes(
+                outcomes, step, ScriptReel,
+            )
+            return {"script_results": result.script_results}
+
+        async def run_quality(
+            step: PipelineStep,
+            plan_slots: list[dict],
+            content_results: list[dict],
+            script_results: Optional[list[dict]] = None,
+        ) -> dict:
+            all_content = content_results + (script_results or [])
             quality_prompt = build_quality_prompt(all_content, plan_slots)
             qr_model, _ = await validate_and_retry(
                 create_quality_gate, quality_prompt, QualityReport, user_id,
             )
             result.quality_report = qr_model.model_dump()
-            qg_step.status = "completed"
-            qg_step.completed_at = datetime.utcnow().isoformat()
-        except Exception as e:
-            logger.error("Quality gate step failed: %s", e)
-            qg_step.status = "failed"
-            qg_step.error = str(e)
-            qg_step.completed_at = datetime.utcnow().isoformat()
+            return {}
+
+        # AUDIT -> PLAN -> (CONTENT || SCRIPTS) -> QUALITY GATE
+        graph = StepGraph(result, notify, on_step_done=save_step)
+        graph.add(StepNode(
+            "audit", run_audit,
+            outputs=("audit_result",),
+            fallback={"audit_result": AuditReport().model_dump()},
+            message="Auditando perfil...",
+        ))
+        graph.add(StepNode(
+            "plan", run_plan,
+            inputs=("audit_result",),
+            outputs=("plan_slots",),
+            fallback={"plan_slots": []},
+            message="Gerando plano editorial...",
+        ))
+        graph.add(StepNode(
+            "content", run_content,
+            inputs=("plan_slots",),
+            outputs=("content_results",),
+            fallback={"content_results": []},
+            message="Criando conteudo...",
+        ))
+        graph.add(StepNode(
+            "video_scripts", run_scripts,
+            inputs=("plan_slots",),
+            outputs=("script_results",),
+            fallback={"script_results": []},
+            message="Escrevendo roteiros...",
+        ), when=include_video)
+        graph.add(StepNode(
+            "quality_gate", run_quality,
+            inputs=("plan_slots", "content_results"),
+            optional_inputs=("script_results",),
+            message="Validando qualidade...",
+        ))
+
+        restored = {
+            name: self._restored_outputs(name, result, checkpoint)
+            for name in checkpoint.completed_steps
+            if name in graph.nodes
+        }
+        data = await graph.run(restored=restored)
+        plan_slots: list[dict] = data["plan_slots"]
+        if result.audit_result is None:
+            result.audit_result = data["audit_result"]
 
         # --- Step 6: PERSIST ---
-        result.status = "completed"
+        # Slots falhos deixam a run "partial": resume regera so esses slots
+        partial = any(step.slot_errors for step in result.steps)
+        result.status = "partial" if partial else "completed"
         result.completed_at = datetime.utcnow().isoformat()
 
-        # Calcula version auto-increment
-        version = await self._next_version(user_id)
-        result.version = version
-
-        await self._persist(result)
-        await self._persist_content_and_calendar(result, plan_slots)
+        if not checkpoint.content_persisted:
+            failed_content = {
+                e["index"] for step in result.steps if step.name == "content" for e in step.slot_errors
+            }
+            # Regravacao e idempotente e reporta todas as linhas: ids recomecam
+            result.content_piece_ids = []
+            result.calendar_event_ids = []
+            await self._persist_content_and_calendar(result, plan_slots, skip=failed_content)
+            checkpoint.content_persisted = not partial
+            checkpoint.content_piece_ids = result.content_piece_ids
+            checkpoint.calendar_event_ids = result.calendar_event_ids
+        await self._persist(result, checkpoint)
 
         return result
 
-    async def _next_version(self, user_id: str) -> int:
-        """Calcula proximo version para o usuario."""
+    @staticmethod
+    def _restored_outputs(step_name: str, result: PipelineResult, checkpoint: RunCheckpoint) -> dict:
+        """Outputs de um step ja concluido, reconstruidos da linha da run."""
+        if step_name == "audit":
+            return {"audit_result": result.audit_result or AuditReport().model_dump()}
+        if step_name == "plan":
+            return {"plan_slots": checkpoint.plan_slots}
+        if step_name == "content":
+            return {"content_results": result.content_results}
+        if step_name == "video_scripts":
+            return {"script_results": result.script_results}
+        return {}
+
+    async def _fan_out(
+        self,
+        user_id: str,
+        slots: list[dict],
+        worker: Callable[[dict], Awaitable[dict]],
+        step_name: str,
+        notify: Callable[[str, str], Awaitable[None]],
+        run_gate: Optional[asyncio.Semaphore] = None,
+        done: Optional[dict[str, dict]] = None,
+        on_slot_done: Optional[Callable[[str, int, dict], Awaitable[None]]] = None,
+    ) -> list[tuple[Optional[dict], Optional[str]]]:
+        """Executa worker para cada slot com concorrencia limitada.
+
+        Respeita o limite global e por usuario de _slot_limiter. run_gate e
+        um limite extra compartilhado pela run (Semaphore(1) quando
+        config.parallel=False). Falha de um slot nao aborta os demais.
+        Slots presentes em done (indice em str, vindos do checkpoint) nao
+        sao regerados; on_slot_done e chamado a cada slot gerado com sucesso.
+
+        Returns:
+            Lista (resultado, erro) alinhada por indice com slots.
+        """
+        total = len(slots)
+        finished = 0
+        done = done or {}
+        run_gate = run_gate or asyncio.Semaphore(total or 1)
+
+        async def run_slot(idx: int, slot: dict) -> tuple[Optional[dict], Optional[str]]:
+            nonlocal finished
+            if str(idx) in done:
+                outcome = (done[str(idx)], None)
+            else:
+                async with run_gate, _slot_limiter.acquire(user_id):
+                    try:
+                        outcome = (await worker(slot), None)
+                    except Exception as e:
+                        logger.warning("%s slot %d failed: %s", step_name, idx, e)
+                        outcome = (None, str(e))
+                if outcome[1] is None and on_slot_done:
+                    await on_slot_done(step_name, idx, outcome[0])
+            finished += 1
+            await notify(step_name, f"Slot {finished}/{total} concluido")
+            return outcome
+
+        return list(await asyncio.gather(*(run_slot(i, s) for i, s in enumerate(slots))))
+
+    @staticmethod
+    def _collect_slot_outcomes(
+        outcomes: list[tuple[Optional[dict], Optional[str]]],
+        step: PipelineStep,
+        schema: type[BaseModel],
+    ) -> list[dict]:
+        """Converte outcomes do fan-out em resultados alinhados com os slots.
+
+        Slots que falharam recebem o modelo com defaults (mesmo fallback de
+        validate_and_retry) e o erro fica registrado em step.slot_errors.
+        O step so e marcado como failed se todos os slots falharem.
+        """
+        results: list[dict] = []
+        for idx, (data, error) in enumerate(outcomes):
+            if error is not None:
+                step.slot_errors.append({"index": idx, "error": error})
+                results.append(schema().model_dump())
+            else:
+                results.append(data)
+
+        if outcomes and len(step.slot_errors) == len(outcomes):
+            step.status = "failed"
+            step.error = f"Todos os {len(outcomes)} slots falharam"
+        else:
+            step.status = "completed"
+        return results
+
+    @staticmethod
+    def _run_row(result: PipelineResult, checkpoint: RunCheckpoint) -> dict:
+        """Colunas mutaveis de pipeline_runs (snapshot atual da run)."""
+        return {
+            "status": result.status,
+            "audit_result": result.audit_result,
+            "plan_result": result.plan_result,
+            "content_results": result.content_results,
+            "script_results": result.script_results,
+            "quality_report": result.quality_report,
+            "steps": [step.model_dump() for step in result.steps],
+            "checkpoint": checkpoint.to_dict(),
+            "completed_at": result.completed_at,
+            "updated_at": datetime.utcnow().isoformat(),
+        }
+
+    def _insert_row(self, result: PipelineResult, checkpoint: RunCheckpoint) -> dict:
+        return {
+            "id": result.pipeline_id,
+            "user_id": result.user_id,
+            "config": result.config,
+            "created_at": result.created_at,
+            **self._run_row(result, checkpoint),
+        }
+
+    async def _start_run(self, result: PipelineResult, checkpoint: RunCheckpoint, resume: bool) -> None:
+        """Grava a linha da run antes do primeiro step (ou reabre uma run retomada).
+
+        Se o insert falhar, checkpoint.recorded fica False e o proximo
+        _checkpoint tenta criar a linha (upsert) em vez de um update vazio.
+        """
+        if resume:
+            checkpoint.recorded = True
         try:
             from app.database.supabase_client import get_supabase_admin
             supabase = get_supabase_admin()
-            res = (
-                supabase.table(TABLES["pipeline_runs"])
-                .select("version")
-                .eq("user_id", user_id)
-                .order("version", desc=True)
-                .limit(1)
-                .execute()
+            if resume:
+                await asyncio.to_thread(
+                    supabase.table(TABLES["pipeline_runs"])
+                    .update({"status": "running", "updated_at": datetime.utcnow().isoformat()})
+                    .eq("id", result.pipeline_id)
+                    .execute
+                )
+                logger.info(
+                    "Pipeline %s resumed (steps done: %s)",
+                    result.pipeline_id, ", ".join(checkpoint.completed_steps) or "-",
+                )
+                return
+
+            # version e atribuido pelo trigger social_midia_assign_pipeline_version
+            # no proprio INSERT (lock por usuario), sem leitura previa do max.
+            res = await asyncio.to_thread(
+                supabase.table(TABLES["pipeline_runs"]).insert(self._insert_row(result, checkpoint)).execute
             )
+            checkpoint.recorded = True
             if res.data:
-                return res.data[0]["version"] + 1
-            return 1
+                result.version = res.data[0].get("version") or result.version
         except Exception as e:
-            logger.warning("Could not fetch version, defaulting to 1: %s", e)
-            return 1
+            logger.error("Failed to start pipeline run %s: %s", result.pipeline_id, e)
 
-    async def _persist(self, result: PipelineResult) -> None:
-        """Persiste o resultado do pipeline no Supabase."""
-        try:
-            from app.database.supabase_client import get_supabase_admin
-            supabase = get_supabase_admin()
-            supabase.table(TABLES["pipeline_runs"]).insert({
-                "id": result.pipeline_id,
-                "user_id": result.user_id,
-                "version": result.version,
-                "status": result.status,
-                "config": result.config,
-                "audit_result": result.audit_result,
-                "plan_result": result.plan_result,
-                "content_results": result.content_results,
-                "quality_report": result.quality_report,
-                "created_at": result.created_at,
-                "completed_at": result.completed_at,
-            }).execute()
-            logger.info("Pipeline %s persisted (version=%d)", result.pipeline_id, result.version)
-        except Exception as e:
-            logger.error("Failed to persist pipeline result: %s", e)
+    async def _checkpoint(self, result: PipelineResult, checkpoint: RunCheckpoint) -> None:
+        """Atualiza a linha da run com o estado atual.
+
+        Writes sao serializados pelo lock do checkpoint para que um snapshot
+        antigo nunca sobrescreva um mais novo (slots terminam em paralelo).
+        Enquanto a linha nao existe (insert inicial falhou), grava com upsert
+        por id — um update casaria zero linhas e a run se perderia.
+        """
+        async with checkpoint.lock:
+            try:
+                from app.database.supabase_client import get_supabase_admin
+                supabase = get_supabase_admin()
+                table = supabase.table(TABLES["pipeline_runs"])
+                if checkpoint.recorded:
+                    query = table.update(self._run_row(result, checkpoint)).eq("id", result.pipeline_id)
+                    await asyncio.to_thread(query.execute)
+                else:
+                    res = await asyncio.to_thread(
+                        table.upsert(self._insert_row(result, checkpoint), on_conflict="id").execute
+                    )
+                    checkpoint.recorded = True
+                    if res.data:
+                        result.version = res.data[0].get("version") or result.version
+            except Exception as e:
+                logger.warning("Failed to checkpoint pipeline %s: %s", result.pipeline_id, e)
+
+    async def _persist(self, result: PipelineResult, checkpoint: RunCheckpoint) -> None:
+        """Persiste o resultado final do pipeline no Supabase."""
+        await self._checkpoint(result, checkpoint)
+        logger.info("Pipeline %s persisted (version=%d)", result.pipeline_id, result.version)
 
     async def _persist_content_and_calendar(
-        self, result: PipelineResult, plan_slots: list[dict]
+        self, result: PipelineResult, plan_slots: list[dict], skip: Iterable[int] = (),
     ) -> None:
         """Persiste content_pieces e calendar_events derivados do pipeline.
 
-        Insere um content_piece para cada content_result e um calendar_event
-        correspondente linkado via content_id. Falhas sao logadas mas NAO
-        quebram o pipeline (resultado ja foi salvo em pipeline_runs).
+        Monta todas as linhas antes e grava cada tabela com inserts multi-row
+        (em chunks de _PERSIST_CHUNK_SIZE). Se um chunk falhar, cai para
+        insert linha a linha naquele chunk. Os ids sao derivados de
+        (pipeline_id, slot) e os inserts ignoram linhas ja existentes, entao
+        uma run retomada apos crash nesta etapa nao duplica nada. Cada calendar_event e linkado ao
+        content_piece via content_id; slots cujo content_piece falhou nao
+        geram evento. Slots em skip (geracao falhou) nao sao gravados. Falhas
+        ficam em result.persist_errors e NAO quebram o pipeline (resultado ja
+        foi salvo em pipeline_runs).
         """
         if not result.content_results:
             return
@@ -274,87 +571,157 @@ class PipelineService:
             logger.warning("Could not get supabase client for content/calendar persist: %s", e)
             return
 
+        content_rows: list[dict] = []
+        event_rows: list[dict] = []
+        row_slots: list[int] = []  # indice do slot de cada linha
+        skip = set(skip)
         for i, content in enumerate(result.content_results):
+            if i in skip:
+                continue
             slot = plan_slots[i] if i < len(plan_slots) else {}
-            content_piece_id = str(uuid.uuid4())
+            content_row = self._content_piece_row(result, content, i)
+            content_rows.append(content_row)
+            row_slots.append(i)
+            event_rows.append(self._calendar_event_row(result, content, slot, content_row["id"], i))
+
+        inserted, failures = await self._bulk_insert(supabase, TABLES["content_pieces"], content_rows)
+        result.content_piece_ids.extend(content_rows[i]["id"] for i in inserted)
+        result.persist_errors.extend(
+            {"table": "content_pieces", "index": row_slots[i], "error": err} for i, err in failures
+        )
+
+        # So agenda eventos de content_pieces que existem
+        linked = [event_rows[i] for i in inserted]
+        linked_slots = [row_slots[i] for i in inserted]
+        inserted_events, event_failures = await self._bulk_insert(
+            supabase, TABLES["content_calendar"], linked,
+        )
+        result.calendar_event_ids.extend(linked[i]["id"] for i in inserted_events)
+        result.persist_errors.extend(
+            {"table": "content_calendar", "index": linked_slots[i], "error": err}
+            for i, err in event_failures
+        )
 
-            # --- Insert content_piece ---
+        logger.info(
+            "Persisted %d/%d content pieces and %d calendar events for pipeline %s",
+            len(result.content_piece_ids), len(content_rows),
+            len(result.calendar_event_ids), result.pipeline_id,
+        )
+
+    @staticmethod
+    async def _bulk_insert(
+        supabase, table: str, rows: list[dict], chunk_size: int = 0,
+    ) -> tuple[list[int], list[tuple[int, str]]]:
+        """Insere rows em chunks multi-row com fallback linha a linha.
+
+        Usa upsert com ON CONFLICT (id) DO NOTHING: linhas que ja existem
+        (gravadas antes de um crash) contam como inseridas e nao mudam.
+
+        Returns:
+            (indices inseridos, [(indice, erro)] das linhas que falharam)
+        """
+        chunk_size = chunk_size or _PERSIST_CHUNK_SIZE
+        inserted: list[int] = []
+        failures: list[tuple[int, str]] = []
+
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start : start + chunk_size]
             try:
-                body = content.get("body") or ""
-                if not body:
-                    hook = content.get("hook", "")
-                    caption = content.get("caption", "")
-                    body = f"{hook}\n\n{caption}".strip() if hook or caption else ""
-
-                metadata = {
-                    "hook": content.get("hook", ""),
-                    "cta": content.get("cta", ""),
-                    "slides": content.get("slides", []),
-                    "story_frames": content.get("story_frames", []),
-                    "thread_tweets": content.get("thread_tweets", []),
-                    "word_count": content.get("word_count", 0),
-                    "pipeline_run_id": result.pipeline_id,
-                }
-
-                supabase.table(TABLES["content_pieces"]).insert({
-                    "id": content_piece_id,
-                    "user_id": result.user_id,
-                    "content_type": content.get("content_type", ""),
-                    "platform": content.get("platform", ""),
-                    "title": content.get("title", ""),
-                    "body": body,
-                    "caption": content.get("caption", ""),
-                    "hashtags": content.get("hashtags", []),
-                    "visual_suggestion": content.get("visual_suggestion", ""),
-                    "status": "draft",
-                    "metadata": metadata,
-                }).execute()
-
-                result.content_piece_ids.append(content_piece_id)
-                logger.info("Content piece %s created (slot %d)", content_piece_id, i)
+                await asyncio.to_thread(
+                    supabase.table(table).upsert(chunk, on_conflict="id", ignore_duplicates=True).execute
+                )
+                inserted.extend(range(start, start + len(chunk)))
+                continue
             except Exception as e:
-                logger.warning("Failed to insert content_piece for slot %d: %s", i, e)
-                continue  # skip calendar event if content_piece failed
+                logger.warning(
+                    "Bulk insert into %s failed for rows %d-%d, retrying row by row: %s",
+                    table, start, start + len(chunk) - 1, e,
+                )
 
-            # --- Insert calendar_event ---
-            try:
-                scheduled_at = None
-                sched_date = slot.get("scheduled_date", "")
-                sched_time = slot.get("scheduled_time", "")
-                if sched_date and sched_time:
-                    scheduled_at = f"{sched_date}T{sched_time}"
-                elif sched_date:
-                    scheduled_at = f"{sched_date}T09:00:00"
-
-                if not scheduled_at:
-                    fallback_dt = datetime.utcnow().replace(
-                        hour=9, minute=0, second=0, microsecond=0
+            for offset, row in enumerate(chunk):
+                idx = start + offset
+                try:
+                    await asyncio.to_thread(
+                        supabase.table(table).upsert(row, on_conflict="id", ignore_duplicates=True).execute
                     )
-                    fallback_dt = fallback_dt + timedelta(hours=i * 6)
-                    scheduled_at = fallback_dt.isoformat()
-
-                title = slot.get("title", "")
-                if not title:
-                    plat = slot.get("platform", content.get("platform", ""))
-                    ctype = slot.get("content_type", content.get("content_type", ""))
-                    title = f"{plat} - {ctype}".strip(" -")
-
-                notes = slot.get("notes") or slot.get("topic", "")
-
-                calendar_event_id = str(uuid.uuid4())
-
-                supabase.table(TABLES["content_calendar"]).insert({
-                    "id": calendar_event_id,
-                    "user_id": result.user_id,
-                    "title": title,
-                    "content_id": content_piece_id,
-                    "platform": slot.get("platform", content.get("platform", "")),
-                    "scheduled_at": scheduled_at,
-                    "status": "scheduled",
-                    "notes": notes,
-                }).execute()
-
-                result.calendar_event_ids.append(calendar_event_id)
-                logger.info("Calendar event %s created for content %s", calendar_event_id, content_piece_id)
-            except Exception as e:
-                logger.warning("Failed to insert calendar_event for slot %d: %s", i, e)
+                    inserted.append(idx)
+                except Exception as e:
+                    logger.warning("Failed to insert row %d into %s: %s", idx, table, e)
+                    failures.append((idx, str(e)))
+
+        return inserted, failures
+
+    @staticmethod
+    def _row_id(result: PipelineResult, table: str, i: int) -> str:
+        """Id estavel da linha do slot i desta run (mesmo valor ao retomar)."""
+        return str(uuid.uuid5(_PERSIST_NAMESPACE, f"{result.pipeline_id}:{table}:{i}"))
+
+    @classmethod
+    def _content_piece_row(cls, result: PipelineResult, content: dict, i: int) -> dict:
+        body = content.get("body") or ""
+        if not body:
+            hook = content.get("hook", "")
+            caption = content.get("caption", "")
+            body = f"{hook}\n\n{caption}".strip() if hook or caption else ""
+
+        metadata = {
+            "hook": content.get("hook", ""),
+            "cta": content.get("cta", ""),
+            "slides": content.get("slides", []),
+            "story_frames": content.get("story_frames", []),
+            "thread_tweets": content.get("thread_tweets", []),
+            "word_count": content.get("word_count", 0),
+            "pipeline_run_id": result.pipeline_id,
+        }
+
+        return {
+            "id": cls._row_id(result, "content_pieces", i),
+            "user_id": result.user_id,
+            "content_type": content.get("content_type", ""),
+            "platform": content.get("platform", ""),
+            "title": content.get("title", ""),
+            "body": body,
+            "caption": content.get("caption", ""),
+            "hashtags": content.get("hashtags", []),
+            "visual_suggestion": content.get("visual_suggestion", ""),
+            "status": "draft",
+            "metadata": metadata,
+        }
+
+    @classmethod
+    def _calendar_event_row(
+        cls, result: PipelineResult, content: dict, slot: dict, content_piece_id: str, i: int,
+    ) -> dict:
+        scheduled_at = None
+        sched_date = slot.get("scheduled_date", "")
+        sched_time = slot.get("scheduled_time", "")
+        if sched_date and sched_time:
+            scheduled_at = f"{sched_date}T{sched_time}"
+        elif sched_date:
+            scheduled_at = f"{sched_date}T09:00:00"
+
+        if not scheduled_at:
+            fallback_dt = datetime.utcnow().replace(
+                hour=9, minute=0, second=0, microsecond=0
+            )
+            fallback_dt = fallback_dt + timedelta(hours=i * 6)
+            scheduled_at = fallback_dt.isoformat()
+
+        title = slot.get("title", "")
+        if not title:
+            plat = slot.get("platform", content.get("platform", ""))
+            ctype = slot.get("content_type", content.get("content_type", ""))
+            title = f"{plat} - {ctype}".strip(" -")
+
+        notes = slot.get("notes") or slot.get("topic", "")
+
+        return {
+            "id": cls._row_id(result, "content_calendar", i),
+            "user_id": result.user_id,
+            "title": title,
+            "content_id": content_piece_id,
+            "platform": slot.get("platform", content.get("platform", "")),
+            "scheduled_at": scheduled_at,
+            "status": "scheduled",
+            "notes": notes,
+        }
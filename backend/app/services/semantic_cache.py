@@ -0,0 +1,309 @@
+"""Cache semantico de respostas do chat (opt-in, na frente de get_team_response).
+
+Pedidos quase identicos ("gere 5 ideias de post sobre X") reusam a resposta
+anterior sem rodar o roteador nem os membros do team. A mensagem e
+normalizada (minusculas, sem acentos, espacos colapsados) e:
+
+1. Igualdade exata do texto normalizado: hit sem chamar a API de embeddings.
+2. Senao, embedding (embedding_service) e similaridade de cosseno contra as
+   entradas da particao; hit acima de SEMANTIC_CACHE_THRESHOLD.
+
+Particoes: por usuario (padrao) e, se SEMANTIC_CACHE_GLOBAL, uma global
+compartilhada — so para instalacoes em que as respostas nao dependem de
+dados do usuario. agent_type e context fazem parte da particao, entao
+"ideias para instagram" nao responde um pedido com contexto de tiktok.
+Mensagens dentro de uma conversa existente ("continue", "sim", "mais 3")
+dependem do historico e nao passam pelo cache (ver
+app.agents.team.lookup_cached_response).
+
+Cache em memoria do processo: LRU por particao com TTL por escopo. Os
+embeddings de cada particao ficam numa matriz float32 (reconstruida quando
+a particao muda), e a busca por similaridade e um unico matriz @ vetor.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+logger = logging.getLogger("agentesocial.semantic_cache")
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCT = re.compile(r"[\s.!?;:,]+$")
+
+
+def normalize_message(message: str) -> str:
+    """Forma canonica usada na chave exata e no embedding."""
+    text = unicodedata.normalize("NFKD", message)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = _WHITESPACE.sub(" ", text.lower()).strip()
+    return _TRAILING_PUNCT.sub("", text)
+
+
+Vector = Union[Sequence[float], np.ndarray]
+
+
+def _unit(vector: Vector) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(array))
+    return array / norm if norm else array
+
+
+@dataclass
+class CacheEntry:
+    normalized: str
+    embedding: Optional[np.ndarray]
+    response: str
+    expires_at: float
+
+
+@dataclass
+class CacheHit:
+    response: str
+    scope: str
+    similarity: float
+
+    def metadata(self) -> dict:
+        return {"hit": True, "scope": self.scope, "similarity": round(self.similarity, 4)}
+
+
+class SemanticCache:
+    """Particoes LRU de (texto normalizado, embedding unitario, resposta).
+
+    Args:
+        threshold: Similaridade de cosseno minima para hit
+        user_ttl: TTL (s) das entradas por usuario
+        global_ttl: TTL (s) das entradas globais
+        max_entries: Entradas por particao (LRU)
+        use_global: Consulta/grava tambem a particao global
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        user_ttl: int = 3600,
+        global_ttl: int = 86400,
+        max_entries: int = 256,
+        use_global: bool = False,
+    ):
+        self.threshold = threshold
+        self.ttls = {"user": user_ttl, "global": global_ttl}
+        self.max_entries = max(max_entries, 1)
+        self.use_global = use_global
+        self._partitions: dict[str, OrderedDict[str, CacheEntry]] = {}
+        # particao -> (entradas com embedding, matriz float32 linha a linha)
+        self._matrices: dict[str, tuple[list[CacheEntry], np.ndarray]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.exact_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.embedding_errors = 0
+
+    def scopes(self, user_id: str, agent_type: Optional[str], context: Optional[dict]) -> list[tuple[str, str]]:
+        variant = hashlib.sha256(
+            json.dumps([agent_type or "master", context or {}], sort_keys=True, default=str).encode()
+        ).hexdigest()[:16]
+        scopes = [("user", f"u:{user_id}:{variant}")]
+        if self.use_global:
+            scopes.append(("global", f"g:{variant}"))
+        return scopes
+
+    def _live(self, partition: str, now: float) -> OrderedDict[str, CacheEntry]:
+        entries = self._partitions.get(partition)
+        if entries is None:
+            return OrderedDict()
+        expired = [k for k, e in entries.items() if e.expires_at <= now]
+        if expired:
+            for key in expired:
+                del entries[key]
+            self._matrices.pop(partition, None)
+        return entries
+
+    def _matrix(self, partition: str, entries: OrderedDict[str, CacheEntry]) -> tuple[list[CacheEntry], np.ndarray]:
+        cached = self._matrices.get(partition)
+        if cached is None:
+            rows = [e for e in entries.values() if e.embedding is not None]
+            matrix = np.stack([e.embedding for e in rows]) if rows else np.zeros((0, 0), dtype=np.float32)
+            cached = self._matrices[partition] = (rows, matrix)
+        return cached
+
+    def lookup_exact(self, normalized: str, scopes: list[tuple[str, str]]) -> Optional[CacheHit]:
+        now = time.monotonic()
+        with self._lock:
+            for scope, partition in scopes:
+                entries = self._live(partition, now)
+                entry = entries.get(normalized)
+                if entry is not None:
+                    entries.move_to_end(normalized)
+                    self.hits += 1
+                    self.exact_hits += 1
+                    return CacheHit(entry.response, scope, 1.0)
+        return None
+
+    def lookup_similar(self, embedding: Vector, scopes: list[tuple[str, str]]) -> Optional[CacheHit]:
+        now = time.monotonic()
+        query = np.asarray(embedding, dtype=np.float32)
+        best: Optional[tuple[float, str, str, CacheEntry]] = None
+        with self._lock:
+            for scope, partition in scopes:
+                entries = self._live(partition, now)
+                if not entries:
+                    continue
+                rows, matrix = self._matrix(partition, entries)
+                if not rows or matrix.shape[1] != query.shape[0]:
+                    continue
+                similarities = matrix @ query
+                i = int(np.argmax(similarities))
+                similarity = float(similarities[i])
+                if similarity >= self.threshold and (best is None or similarity > best[0]):
+                    best = (similarity, scope, partition, rows[i])
+            if best is None:
+                self.misses += 1
+                return None
+            similarity, scope, partition, entry = best
+            self._partitions[partition].move_to_end(entry.normalized)
+            self.hits += 1
+        return CacheHit(entry.response, scope, similarity)
+
+    def store(
+        self,
+        normalized: str,
+        embedding: Optional[Vector],
+        response: str,
+        scopes: list[tuple[str, str]],
+    ) -> None:
+        now = time.monotonic()
+        if embedding is not None:
+            embedding = np.asarray(embedding, dtype=np.float32)
+        with self._lock:
+            for scope, partition in scopes:
+                entries = self._partitions.setdefault(partition, OrderedDict())
+                self._matrices.pop(partition, None)
+                entries[normalized] = CacheEntry(normalized, embedding, response, now + self.ttls[scope])
+                entries.move_to_end(normalized)
+                while len(entries) > self.max_entries:
+                    entries.popitem(last=False)
+                    self.evictions += 1
+            self.stores += 1
+
+    def clear(self, user_id: Optional[str] = None) -> None:
+        with self._lock:
+            if user_id is None:
+                self._partitions.clear()
+                self._matrices.clear()
+                return
+            for partition in [p for p in self._partitions if p.startswith(f"u:{user_id}:")]:
+                del self._partitions[partition]
+                self._matrices.pop(partition, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = sum(len(entries) for entries in self._partitions.values())
+            partitions = len(self._partitions)
+        lookups = self.hits + self.misses
+        return {
+            "enabled": True,
+            "partitions": partitions,
+            "entries": size,
+            "hits": self.hits,
+            "exact_hits": self.exact_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "embedding_errors": self.embedding_errors,
+        }
+
+
+class ChatCacheLookup:
+    """Resultado de lookup(): o hit (se houver) e o necessario para store()."""
+
+    def __init__(self, cache: SemanticCache, normalized: str, scopes: list[tuple[str, str]]):
+        self.cache = cache
+        self.normalized = normalized
+        self.scopes = scopes
+        self.embedding: Optional[np.ndarray] = None
+        self.hit: Optional[CacheHit] = None
+
+    def store(self, response: str) -> None:
+        self.cache.store(self.normalized, self.embedding, response, self.scopes)
+
+
+async def lookup(
+    message: str,
+    user_id: str,
+    agent_type: Optional[str] = None,
+    context: Optional[dict] = None,
+) -> Optional[ChatCacheLookup]:
+    """Consulta o cache para a mensagem. None se o cache estiver desligado."""
+    cache = get_semantic_cache()
+    if cache is None:
+        return None
+
+    normalized = normalize_message(message)
+    result = ChatCacheLookup(cache, normalized, cache.scopes(user_id, agent_type, context))
+    if not normalized:
+        return result
+
+    result.hit = cache.lookup_exact(normalized, result.scopes)
+    if result.hit is not None:
+        return result
+
+    from app.services.embedding_service import aget_embedding
+
+    try:
+        result.embedding = _unit(await aget_embedding(normalized))
+    except Exception as e:
+        cache.embedding_errors += 1
+        cache.misses += 1
+        logger.warning(f"Semantic cache embedding failed, treating as miss: {e}")
+        return result
+
+    result.hit = cache.lookup_similar(result.embedding, result.scopes)
+    return result
+
+
+_cache: Optional[SemanticCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """Cache do processo, ou None se SEMANTIC_CACHE_ENABLED estiver desligado."""
+    global _cache
+    from app.config import get_settings
+
+    settings = get_settings()
+    if not settings.SEMANTIC_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SemanticCache(
+                    threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+                    user_ttl=settings.SEMANTIC_CACHE_TTL,
+                    global_ttl=settings.SEMANTIC_CACHE_GLOBAL_TTL,
+                    max_entries=settings.SEMANTIC_CACHE_MAX_ENTRIES,
+                    use_global=settings.SEMANTIC_CACHE_GLOBAL,
+                )
+    return _cache
+
+
+def reset_semantic_cache() -> None:
+    """Descarta o cache (recriado com as settings atuais no proximo uso)."""
+    global _cache
+    _cache = None
+
+
+def get_semantic_cache_stats() -> dict:
+    cache = get_semantic_cache()
+    return cache.stats() if cache is not None else {"enabled": False}
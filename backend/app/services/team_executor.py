@@ -0,0 +1,141 @@
+"""Executor dedicado para rodar o team do chat fora do event loop.
+
+team.run() do agno e sincrono e leva o round trip inteiro do LLM. Rodar isso
+direto numa rota async congela o worker do uvicorn. O TeamExecutor usa um
+ThreadPoolExecutor proprio com N workers (TEAM_MAX_CONCURRENCY) e uma fila
+limitada (TEAM_MAX_QUEUE): acima disso novas execucoes sao recusadas com
+TeamExecutorBusy em vez de acumular. O contexto (ex: user_id do
+token_manager) e copiado para a thread do worker.
+
+Uso:
+    response = await get_team_executor().run(team.run, message, user_id=user_id)
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger("agentesocial.team_executor")
+
+
+class TeamExecutorBusy(RuntimeError):
+    """Fila do executor cheia: a requisicao deve ser recusada (ex: HTTP 503)."""
+
+
+class TeamExecutor:
+    """ThreadPoolExecutor limitado com metricas de fila.
+
+    Args:
+        max_workers: Execucoes simultaneas por worker do uvicorn
+        max_queue: Execucoes aguardando um worker livre antes de recusar
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max(max_workers, 1)
+        self.max_queue = max(max_queue, 0)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="team")
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.peak_queue_depth = 0
+        self.wait_ms = 0.0
+        self.run_ms = 0.0
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Executa fn(*args, **kwargs) num worker e aguarda sem bloquear o loop."""
+        with self._lock:
+            if self.queued + self.running >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise TeamExecutorBusy(
+                    f"Team executor cheio ({self.running} rodando, {self.queued} na fila)"
+                )
+            self.queued += 1
+            self.peak_queue_depth = max(self.peak_queue_depth, self._queue_depth())
+
+        submitted = time.perf_counter()
+        ctx = contextvars.copy_context()
+        call = functools.partial(fn, *args, **kwargs)
+
+        def work() -> Any:
+            started = time.perf_counter()
+            with self._lock:
+                self.queued -= 1
+                self.running += 1
+                self.wait_ms += (started - submitted) * 1000
+            try:
+                result = ctx.run(call)
+            except BaseException:
+                with self._lock:
+                    self.failed += 1
+                raise
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.completed += 1
+                    self.run_ms += (time.perf_counter() - started) * 1000
+            return result
+
+        loop = asyncio.get_running_loop()
+        try:
+            future = loop.run_in_executor(self._pool, work)
+        except RuntimeError as e:
+            # Executor ja encerrado (shutdown)
+            with self._lock:
+                self.queued -= 1
+            raise TeamExecutorBusy(str(e)) from e
+        return await future
+
+    def _queue_depth(self) -> int:
+        # Tarefas aceitas que ainda nao pegaram um worker
+        return max(self.queued + self.running - self.max_workers, 0)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": self.running,
+                "queue_depth": self._queue_depth(),
+                "peak_queue_depth": self.peak_queue_depth,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self.wait_ms / self.completed, 1) if self.completed else 0.0,
+                "avg_run_ms": round(self.run_ms / self.completed, 1) if self.completed else 0.0,
+            }
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+_executor: Optional[TeamExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_team_executor() -> TeamExecutor:
+    """Executor do processo, criado no primeiro uso com os limites das settings."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                from app.config import get_settings
+
+                settings = get_settings()
+                _executor = TeamExecutor(settings.TEAM_MAX_CONCURRENCY, settings.TEAM_MAX_QUEUE)
+    return _executor
+
+
+def shutdown_team_executor() -> None:
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown()
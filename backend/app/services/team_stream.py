@@ -0,0 +1,197 @@
+"""Streaming real do team do chat (deltas do modelo repassados ao cliente).
+
+team.run(stream=True) do agno e um gerador sincrono de eventos. stream_team()
+o consome numa thread do TeamExecutor e repassa os eventos ao event loop por
+uma asyncio.Queue, ja traduzidos para o formato do chat:
+
+    {"type": "routed_to", "member_id": ..., "member": ...}
+    {"type": "chunk", "content": ..., "agent": ...}
+    {"type": "completed", "content": ...}
+
+Se o consumidor parar de ler (cliente desconectou), o gerador do agno e
+fechado no proximo evento e o worker e liberado. StreamMetrics mede
+time-to-first-byte e tokens/s de cada requisicao.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, AsyncIterator, Optional
+
+logger = logging.getLogger("agentesocial.team_stream")
+
+_DONE = object()
+
+# Eventos do agno que interessam ao chat
+_CONTENT_EVENTS = ("TeamRunContent", "RunContent")
+_COMPLETED_EVENT = "TeamRunCompleted"
+_TOOL_STARTED_EVENT = "TeamToolCallStarted"
+_DELEGATE_TOOLS = ("delegate_task_to_member", "delegate_task_to_members")
+
+
+def _member_name(team: Any, member_id: str) -> str:
+    for member in getattr(team, "members", None) or []:
+        if member_id in (getattr(member, "id", None), getattr(member, "name", None)):
+            return member.name
+    return member_id
+
+
+def translate_event(event: Any, team: Any) -> Optional[dict]:
+    """Converte um evento do agno no evento do chat (ou None se irrelevante)."""
+    kind = getattr(event, "event", "")
+    team_name = getattr(event, "team_name", "")
+    is_root = team_name == team.name
+
+    if kind in _CONTENT_EVENTS:
+        content = getattr(event, "content", None)
+        if not isinstance(content, str) or not content:
+            return None
+        return {
+            "type": "chunk",
+            "content": content,
+            "agent": team_name or getattr(event, "agent_name", "") or team.name,
+        }
+
+    if kind == _TOOL_STARTED_EVENT and is_root:
+        tool = getattr(event, "tool", None)
+        if tool is None or tool.tool_name not in _DELEGATE_TOOLS:
+            return None
+        member_id = (tool.tool_args or {}).get("member_id", "")
+        return {
+            "type": "routed_to",
+            "member_id": member_id or "all",
+            "member": _member_name(team, member_id) if member_id else "all",
+        }
+
+    if kind == _COMPLETED_EVENT and is_root:
+        content = getattr(event, "content", None)
+        return {"type": "completed", "content": content if isinstance(content, str) else ""}
+
+    return None
+
+
+async def stream_team(
+    message: str,
+    session_id: str,
+    user_id: str,
+    stop: Optional[threading.Event] = None,
+) -> AsyncIterator[dict]:
+    """Roda o team em streaming no TeamExecutor e produz eventos do chat.
+
+    Args:
+        message: Mensagem completa (com prefixo de contexto)
+        session_id: ID da conversa (sessao do agno)
+        user_id: ID do usuario
+        stop: Evento opcional para abortar a execucao de fora (ex: cancel do WebSocket)
+
+    Raises:
+        TeamExecutorBusy: Fila do executor cheia
+    """
+    from app.agents.team import get_team
+    from app.services.team_executor import get_team_executor
+
+    team = get_team()
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = stop or threading.Event()
+
+    def emit(item: Any) -> None:
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            # Loop encerrado: ninguem mais esta lendo
+            stop.set()
+
+    def pump() -> None:
+        stream = team.run(
+            message,
+            session_id=session_id,
+            user_id=user_id,
+            stream=True,
+            stream_events=True,
+        )
+        try:
+            for event in stream:
+                if stop.is_set():
+                    logger.info("Team stream stopped for session %s", session_id)
+                    break
+                translated = translate_event(event, team)
+                if translated is not None:
+                    emit(translated)
+        finally:
+            close = getattr(stream, "close", None)
+            if close:
+                close()
+
+    task = asyncio.ensure_future(get_team_executor().run(pump))
+    # Callbacks rodam no loop depois dos emit() ja agendados: _DONE chega por ultimo
+    task.add_done_callback(lambda _: queue.put_nowait(_DONE))
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            yield item
+        task.result()
+    finally:
+        stop.set()
+
+
+class StreamMetrics:
+    """TTFB e throughput de uma resposta em streaming.
+
+    Cada delta de conteudo do modelo corresponde a ~1 token, entao tokens/s
+    e medido pela quantidade de chunks emitidos.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_chunk: Optional[float] = None
+        self.tokens = 0
+
+    def chunk(self) -> None:
+        if self.first_chunk is None:
+            self.first_chunk = time.perf_counter()
+        self.tokens += 1
+
+    def finish(self) -> dict:
+        ended = time.perf_counter()
+        ttfb_ms = round((self.first_chunk - self.started) * 1000, 1) if self.first_chunk else None
+        generating = ended - self.first_chunk if self.first_chunk else 0.0
+        metrics = {
+            "ttfb_ms": ttfb_ms,
+            "duration_ms": round((ended - self.started) * 1000, 1),
+            "tokens": self.tokens,
+            "tokens_per_sec": round(self.tokens / generating, 1) if generating > 0 else 0.0,
+        }
+        _record(metrics)
+        return metrics
+
+
+_stats = {"streams": 0, "ttfb_ms": 0.0, "tokens": 0, "generating_s": 0.0}
+_stats_lock = threading.Lock()
+
+
+def _record(metrics: dict) -> None:
+    if metrics["ttfb_ms"] is None:
+        return
+    with _stats_lock:
+        _stats["streams"] += 1
+        _stats["ttfb_ms"] += metrics["ttfb_ms"]
+        _stats["tokens"] += metrics["tokens"]
+        _stats["generating_s"] += (metrics["duration_ms"] - metrics["ttfb_ms"]) / 1000
+
+
+def get_stream_stats() -> dict:
+    """Medias do processo: TTFB e tokens/s das respostas em streaming."""
+    with _stats_lock:
+        streams = _stats["streams"]
+        return {
+            "streams": streams,
+            "avg_ttfb_ms": round(_stats["ttfb_ms"] / streams, 1) if streams else 0.0,
+            "tokens": _stats["tokens"],
+            "avg_tokens_per_sec": (
+                round(_stats["tokens"] / _stats["generating_s"], 1) if _stats["generating_s"] > 0 else 0.0
+            ),
+        }
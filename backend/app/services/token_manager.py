@@ -4,7 +4,7 @@ Resolution order: context user_id -> explicit user_id -> env var fallback -> Non
 """
 
 import logging
-import threading
+from contextvars import ContextVar
 from datetime import datetime, timedelta, timezone
 
 from app.config import get_settings
@@ -13,23 +13,23 @@ from app.database.supabase_client import get_supabase_admin
 
 logger = logging.getLogger("agentesocial.token_manager")
 
-# Thread-local storage for current user context
-_context = threading.local()
+# Context-local user (isolated per asyncio task; copied into asyncio.to_thread workers)
+_current_user_id: ContextVar[str] = ContextVar("current_user_id", default="")
 
 
 def set_current_user_id(user_id: str) -> None:
-    """Set the current user_id for this thread. Call before running agent."""
-    _context.user_id = user_id
+    """Set the current user_id for this context. Call before running agent."""
+    _current_user_id.set(user_id)
 
 
 def get_current_user_id() -> str:
-    """Get the current user_id from thread-local context."""
-    return getattr(_context, "user_id", "")
+    """Get the current user_id from the active context."""
+    return _current_user_id.get()
 
 
 def clear_current_user_id() -> None:
     """Clear the current user_id context."""
-    _context.user_id = ""
+    _current_user_id.set("")
 
 
 def get_user_instagram_credentials(user_id: str = "") -> tuple[str, str] | None:
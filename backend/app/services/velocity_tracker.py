@@ -0,0 +1,291 @@
+"""Velocidade de engajamento por post a partir de snapshots (insights/webhooks).
+
+calculate_virality_score estima a velocidade como engajamento total / horas
+desde a publicacao: um post que explodiu na 2a hora e um que cresce devagar
+ha dias recebem o mesmo score. Aqui cada post guarda uma serie de amostras
+(instante, engajamento total) e mantem, a cada snapshot:
+
+- derivadas em janelas de 1h/6h/24h: (E_atual - E_base) / horas, com E_base
+  a ultima amostra no inicio da janela (ou a mais antiga, se o post e mais
+  novo que a janela);
+- duas EWMAs da taxa instantanea (constantes de tempo curta e longa, alpha
+  ajustado ao intervalo entre snapshots); "acelerando" = a curta passa a
+  longa por VELOCITY_ACCEL_MARGIN.
+
+Custo por snapshot O(1) amortizado: as amostras ficam num ring buffer
+(array de doubles, no maximo VELOCITY_BUFFER_SIZE) e cada janela tem um
+ponteiro que so anda para frente. Snapshots mais proximos que
+VELOCITY_MIN_SAMPLE_INTERVAL atualizam o valor atual sem ocupar slot.
+Snapshots fora de ordem sao descartados.
+"""
+
+import math
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional, Union
+
+_EPOCH = datetime(1970, 1, 1)
+WINDOWS = (("1h", 3600), ("6h", 21600), ("24h", 86400))
+
+
+class PostVelocity(NamedTuple):
+    post_id: str
+    engagement: float
+    updated_at: float
+    rate_1h: Optional[float]
+    rate_6h: Optional[float]
+    rate_24h: Optional[float]
+    ewma_fast: Optional[float]
+    ewma_slow: Optional[float]
+    accelerating: bool
+    samples: int
+
+    @property
+    def recent_rate(self) -> Optional[float]:
+        """Engajamento/hora da menor janela com dados (para o score de viralidade)."""
+        for rate in (self.rate_1h, self.rate_6h, self.rate_24h):
+            if rate is not None:
+                return rate
+        return None
+
+    def to_dict(self) -> dict:
+        data = self._asdict()
+        data["updated_at"] = datetime.fromtimestamp(self.updated_at, timezone.utc).isoformat()
+        for key in ("rate_1h", "rate_6h", "rate_24h", "ewma_fast", "ewma_slow"):
+            if data[key] is not None:
+                data[key] = round(data[key], 2)
+        return data
+
+
+def epoch_seconds(at: Union[datetime, float, None]) -> float:
+    """Instante em segundos desde a epoch (None = agora)."""
+    if at is None:
+        return time.time()
+    if isinstance(at, datetime):
+        if at.tzinfo is not None:
+            return at.timestamp()
+        return (at - _EPOCH).total_seconds()  # naive = UTC, como o resto do app
+    return float(at)
+
+
+def engagement_from_insights(payload: dict) -> Optional[float]:
+    """Engajamento total de uma resposta de /{media_id}/insights do Graph API."""
+    for metric in payload.get("data") or ():
+        if metric.get("name") in ("engagement", "total_interactions"):
+            values = metric.get("values") or [{}]
+            value = values[-1].get("value", metric.get("total_value", {}).get("value"))
+            if isinstance(value, (int, float)):
+                return float(value)
+    return None
+
+
+class _PostSeries:
+    """Ring buffer de amostras de um post + estado incremental das janelas."""
+
+    __slots__ = (
+        "times", "values", "start", "end", "bases",
+        "last_t", "last_e", "fast", "slow", "rates",
+    )
+
+    def __init__(self):
+        self.times = array("d")
+        self.values = array("d")
+        self.start = 0  # seq da amostra mais antiga ainda no buffer
+        self.end = 0  # proximo seq
+        self.bases = [0] * len(WINDOWS)  # seq da amostra base de cada janela
+        self.last_t = -math.inf
+        self.last_e = 0.0
+        self.fast: Optional[float] = None
+        self.slow: Optional[float] = None
+        self.rates: list[Optional[float]] = [None] * len(WINDOWS)
+
+    def _append(self, t: float, e: float, capacity: int) -> None:
+        if len(self.times) < capacity:
+            self.times.append(t)
+            self.values.append(e)
+        else:
+            slot = self.end % capacity
+            self.times[slot] = t
+            self.values[slot] = e
+            self.start = self.end - capacity + 1
+        self.end += 1
+
+    def update(self, t: float, e: float, tracker: "VelocityTracker") -> None:
+        dt = t - self.last_t
+        if self.end:
+            rate = (e - self.last_e) / dt * 3600 if dt > 0 else None
+            if rate is not None:
+                if self.fast is None:
+                    self.fast = self.slow = rate
+                else:
+                    self.fast += (1 - math.exp(-dt / tracker.fast_tau)) * (rate - self.fast)
+                    self.slow += (1 - math.exp(-dt / tracker.slow_tau)) * (rate - self.slow)
+
+        self.last_t, self.last_e = t, e
+        capacity = tracker.capacity
+        if not self.end or t - self.times[(self.end - 1) % capacity] >= tracker.min_interval:
+            self._append(t, e, capacity)
+
+        times, values = self.times, self.values
+        newest = self.end - 1
+        for i, (_, width) in enumerate(WINDOWS):
+            cutoff = t - width
+            base = max(self.bases[i], self.start)
+            # Ponteiro monotono: avanca enquanto a proxima amostra ainda e <= inicio da janela
+            while base < newest and times[(base + 1) % capacity] <= cutoff:
+                base += 1
+            self.bases[i] = base
+            span = t - times[base % capacity]
+            self.rates[i] = (e - values[base % capacity]) / span * 3600 if span > 0 else None
+
+    def snapshot(self, post_id: str, tracker: "VelocityTracker") -> PostVelocity:
+        accelerating = (
+            self.fast is not None
+            and self.fast >= tracker.min_rate
+            and self.fast > self.slow * (1 + tracker.accel_margin)
+        )
+        return PostVelocity(
+            post_id, self.last_e, self.last_t, *self.rates,
+            self.fast, self.slow, accelerating, self.end - self.start,
+        )
+
+
+class VelocityTracker:
+    """Series de engajamento por (owner, post), em memoria do processo.
+
+    Args:
+        capacity: Amostras por post no ring buffer
+        min_interval: Intervalo minimo (s) entre amostras guardadas
+        fast_tau, slow_tau: Constantes de tempo (s) das EWMAs da taxa
+        accel_margin: Quanto a EWMA curta precisa passar a longa para "acelerando"
+        min_rate: Taxa minima (engajamento/hora) para marcar aceleracao
+        max_posts: Posts acompanhados; acima disso sai o atualizado ha mais tempo
+    """
+
+    def __init__(
+        self,
+        capacity: int = 300,
+        min_interval: float = 300,
+        fast_tau: float = 1800,
+        slow_tau: float = 21600,
+        accel_margin: float = 0.25,
+        min_rate: float = 1.0,
+        max_posts: int = 50000,
+    ):
+        self.capacity = max(capacity, 2)
+        self.min_interval = min_interval
+        self.fast_tau = fast_tau
+        self.slow_tau = slow_tau
+        self.accel_margin = accel_margin
+        self.min_rate = min_rate
+        self.max_posts = max(max_posts, 1)
+        self._series: OrderedDict[tuple[str, str], _PostSeries] = OrderedDict()
+        self._lock = threading.Lock()
+        self.updates = 0
+        self.dropped = 0
+        self.evictions = 0
+
+    def record(
+        self,
+        post_id: str,
+        engagement: float,
+        at: Union[datetime, float, None] = None,
+        owner: str = "",
+    ) -> Optional[PostVelocity]:
+        """Registra um snapshot (engajamento total acumulado do post).
+
+        Returns:
+            Velocidade atualizada, ou None se o snapshot e anterior ao ultimo.
+        """
+        t = epoch_seconds(at)
+        key = (owner, post_id)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _PostSeries()
+                while len(self._series) > self.max_posts:
+                    self._series.popitem(last=False)
+                    self.evictions += 1
+            elif t < series.last_t:
+                self.dropped += 1
+                return None
+            else:
+                self._series.move_to_end(key)
+            series.update(t, float(engagement), self)
+            self.updates += 1
+            return series.snapshot(post_id, self)
+
+    def get(self, post_id: str, owner: str = "") -> Optional[PostVelocity]:
+        with self._lock:
+            series = self._series.get((owner, post_id))
+            return series.snapshot(post_id, self) if series is not None else None
+
+    def accelerating(self, owner: Optional[str] = None, limit: int = 20) -> list[PostVelocity]:
+        """Posts acelerando agora, do maior salto (EWMA curta / longa) ao menor."""
+        with self._lock:
+            found = [
+                series.snapshot(post_id, self)
+                for (series_owner, post_id), series in self._series.items()
+                if owner is None or series_owner == owner
+            ]
+        found = [v for v in found if v.accelerating]
+        found.sort(key=lambda v: v.ewma_fast / max(v.ewma_slow, 1e-9), reverse=True)
+        return found[:limit]
+
+    def prune(self, max_idle: float, now: Optional[float] = None) -> int:
+        """Remove posts sem snapshot ha mais de max_idle segundos."""
+        cutoff = (now if now is not None else time.time()) - max_idle
+        removed = 0
+        with self._lock:
+            # Ordem do OrderedDict = ultima atualizacao; para no primeiro recente
+            while self._series:
+                key, series = next(iter(self._series.items()))
+                if series.last_t >= cutoff:
+                    break
+                del self._series[key]
+                removed += 1
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "posts": len(self._series),
+                "updates": self.updates,
+                "dropped_out_of_order": self.dropped,
+                "evictions": self.evictions,
+            }
+
+
+_tracker: Optional[VelocityTracker] = None
+_tracker_lock = threading.Lock()
+
+
+def get_velocity_tracker() -> VelocityTracker:
+    global _tracker
+    if _tracker is None:
+        with _tracker_lock:
+            if _tracker is None:
+                from app.config import get_settings
+
+                settings = get_settings()
+                _tracker = VelocityTracker(
+                    capacity=settings.VELOCITY_BUFFER_SIZE,
+                    min_interval=settings.VELOCITY_MIN_SAMPLE_INTERVAL,
+                    fast_tau=settings.VELOCITY_FAST_TAU,
+                    slow_tau=settings.VELOCITY_SLOW_TAU,
+                    accel_margin=settings.VELOCITY_ACCEL_MARGIN,
+                    max_posts=settings.VELOCITY_MAX_POSTS,
+                )
+    return _tracker
+
+
+def reset_velocity_tracker() -> None:
+    global _tracker
+    _tracker = None
@@ -1,9 +1,42 @@
 from datetime import datetime, timedelta
 from collections import Counter
+from operator import itemgetter
+from typing import NamedTuple, Optional
+import heapq
 import logging
 
+import numpy as np
+
 logger = logging.getLogger("agentesocial.viral_detection")
 
+_EPOCH = datetime(1970, 1, 1)
+_CLASSIFICATIONS = np.array(["normal", "above_average", "viral", "super_viral"], dtype=object)
+# Abaixo de 2^51 os inteiros (e somas de quatro deles) sao exatos em float64
+_MAX_EXACT_INT = 2 ** 51
+# Campos do resultado, na ordem do dict de calculate_virality_score
+_SCORE_FIELDS = (
+    "virality_score",
+    "classification",
+    "engagement_rate",
+    "velocity_score",
+    "share_score",
+    "save_score",
+    "hours_since_post",
+    "total_engagement",
+)
+_VIRAL_CLASSES = ("viral", "super_viral")
+_US_PER_HOUR = 3_600_000_000
+_US_PER_DAY = 86_400_000_000
+_EPOCH_WEEKDAY = 3  # 1970-01-01 foi quinta-feira (segunda = 0)
+# Nomes como strftime("%A"), indexados por weekday()
+_DAY_NAMES = [datetime(2024, 1, 1 + i).strftime("%A") for i in range(7)]
+_INT_LITERALS = (
+    ("velocity_score", "velocity_capped", 100),
+    ("share_score", "share_capped", 100),
+    ("save_score", "save_capped", 100),
+    ("hours_since_post", "hours_floored", 1),
+)
+
 
 def calculate_virality_score(
     likes: int,
@@ -13,6 +46,8 @@ def calculate_virality_score(
     views: int,
     posted_at: datetime,
     followers: int,
+    now: Optional[datetime] = None,
+    engagement_velocity: Optional[float] = None,
 ) -> dict:
     """
     Calcula score de viralidade de um conteudo.
@@ -24,14 +59,23 @@ def calculate_virality_score(
       31-60: Acima da media
       61-80: Viral
       81-100: Super viral
+
+    Versao escalar (um item). Para lotes use score_virality_arrays /
+    classify_content_batch, que produzem os mesmos valores.
+
+    engagement_velocity (engajamento/hora recente, ex.: PostVelocity.recent_rate
+    do velocity_tracker) substitui a media desde a publicacao.
     """
-    hours_since_post = max((datetime.utcnow() - posted_at).total_seconds() / 3600, 1)
+    hours_since_post = max(((now or datetime.utcnow()) - posted_at).total_seconds() / 3600, 1)
 
     total_engagement = likes + comments + shares + saves
     engagement_rate = (total_engagement / max(followers, 1)) * 100
 
     # Velocidade de engajamento (engajamento/hora normalizado)
-    engagement_velocity = total_engagement / hours_since_post
+    if engagement_velocity is None:
+        engagement_velocity = total_engagement / hours_since_post
+    else:
+        engagement_velocity = max(engagement_velocity, 0)
     velocity_score = min(engagement_velocity / max(followers * 0.01, 1) * 100, 100)
 
     # Taxa de compartilhamento
@@ -69,35 +113,126 @@ def calculate_virality_score(
     }
 
 
-def classify_content_batch(items: list) -> list[dict]:
+def _round(values: np.ndarray, digits: int) -> np.ndarray:
+    """np.rint em escala, com o mesmo resultado do round() do Python.
+
+    So os valores a ~meio passo de um empate podem divergir (erro da
+    multiplicacao pela escala); esses poucos sao arredondados com round().
     """
-    Classifica uma lista de conteudos por viralidade em lote.
+    scale = 10.0 ** digits
+    scaled = values * scale
+    rounded = np.rint(scaled) / scale
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) <= 1e-9 * np.maximum(np.abs(scaled), 1.0)
+    for i in np.flatnonzero(near_tie):
+        rounded[i] = round(float(values[i]), digits)
+    return rounded
+
+
+def _to_us(moment: datetime) -> int:
+    """Microssegundos desde a epoch (datetime sem timezone, em UTC)."""
+    delta = moment - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def score_virality_arrays(
+    likes,
+    comments,
+    shares,
+    saves,
+    followers,
+    posted_at,
+    now: Optional[datetime] = None,
+    engagement_velocity=None,
+) -> dict[str, np.ndarray]:
+    """
+    Versao colunar de calculate_virality_score (mesma formula, mesmos valores).
 
-    Cada item no list deve conter:
-    - likes (int)
-    - comments (int)
-    - shares (int)
-    - saves (int)
-    - views (int)
-    - posted_at (datetime or ISO string)
-    - followers (int)
-    - id (str, optional) - identificador do conteudo
-    - caption (str, optional) - texto do post
+    Args:
+        likes, comments, shares, saves, followers: Sequencias/arrays de inteiros
+        posted_at: datetime64 (UTC, sem timezone) ou int64 em microssegundos desde a epoch
+        now: Instante de referencia unico do lote (padrao: utcnow)
+        engagement_velocity: Engajamento/hora recente por post (NaN = media
+            desde a publicacao), como no escalar
 
     Returns:
-        Lista de dicts com score de viralidade, ordenada do mais viral ao menos viral.
+        Arrays por coluna: virality_score, classification, engagement_rate,
+        velocity_score, share_score, save_score, hours_since_post,
+        total_engagement. velocity_capped/share_capped/save_capped/hours_floored
+        marcam onde o escalar devolveria o int do min()/max() (100 ou 1).
     """
-    results = []
+    likes = np.asarray(likes, dtype=np.int64)
+    comments = np.asarray(comments, dtype=np.int64)
+    shares = np.asarray(shares, dtype=np.int64)
+    saves = np.asarray(saves, dtype=np.int64)
+    followers = np.asarray(followers, dtype=np.int64)
+    posted_us = np.asarray(posted_at)
+    if posted_us.dtype.kind == "M":
+        posted_us = posted_us.astype("datetime64[us]").astype(np.int64)
+    posted_us = posted_us.astype(np.int64, copy=False)
+
+    raw_hours = (_to_us(now or datetime.utcnow()) - posted_us) / 1e6 / 3600
+    hours = np.maximum(raw_hours, 1)
+
+    total_engagement = likes + comments + shares + saves
+    engagement_rate = total_engagement / np.maximum(followers, 1) * 100
+
+    velocity = total_engagement / hours
+    if engagement_velocity is not None:
+        recent = np.asarray(engagement_velocity, dtype=np.float64)
+        velocity = np.where(np.isnan(recent), velocity, np.maximum(recent, 0))
+    raw_velocity = velocity / np.maximum(followers * 0.01, 1) * 100
+    velocity_score = np.minimum(raw_velocity, 100)
+
+    engagement_floor = np.maximum(total_engagement, 1)
+    raw_share = shares / engagement_floor * 100 * 5
+    share_score = np.minimum(raw_share, 100)
+    raw_save = saves / engagement_floor * 100 * 5
+    save_score = np.minimum(raw_save, 100)
+
+    final_score = _round(velocity_score * 0.4 + share_score * 0.3 + save_score * 0.3, 1)
+    class_index = (final_score >= 31).astype(np.int8) + (final_score >= 61) + (final_score >= 81)
+
+    return {
+        "virality_score": final_score,
+        "classification": _CLASSIFICATIONS[class_index],
+        "engagement_rate": _round(engagement_rate, 2),
+        "velocity_score": _round(velocity_score, 1),
+        "share_score": _round(share_score, 1),
+        "save_score": _round(save_score, 1),
+        "hours_since_post": _round(hours, 1),
+        "total_engagement": total_engagement,
+        "velocity_capped": raw_velocity > 100,
+        "share_capped": raw_share > 100,
+        "save_capped": raw_save > 100,
+        "hours_floored": raw_hours < 1,
+    }
+
 
+def _parse_posted_at(posted_at, now: datetime) -> datetime:
+    # Parse posted_at if it's a string
+    if isinstance(posted_at, str):
+        return datetime.fromisoformat(posted_at.replace("Z", "+00:00").replace("+00:00", ""))
+    if posted_at is None:
+        return now
+    return posted_at
+
+
+def _error_row(item: dict, idx: int, error: Exception) -> dict:
+    logger.warning(f"Error classifying item {idx}: {error}")
+    return {
+        "content_id": item.get("id", f"item_{idx}"),
+        "virality_score": 0,
+        "classification": "error",
+        "error": str(error),
+    }
+
+
+def _classify_scalar(items: list, now: datetime) -> list[dict]:
+    """Caminho item a item (fallback para inteiros fora da faixa exata do float64)."""
+    results = []
     for idx, item in enumerate(items):
         try:
-            # Parse posted_at if it's a string
-            posted_at = item.get("posted_at")
-            if isinstance(posted_at, str):
-                posted_at = datetime.fromisoformat(posted_at.replace("Z", "+00:00").replace("+00:00", ""))
-            elif posted_at is None:
-                posted_at = datetime.utcnow()
-
+            posted_at = _parse_posted_at(item.get("posted_at"), now)
             score_data = calculate_virality_score(
                 likes=int(item.get("likes", 0)),
                 comments=int(item.get("comments", 0)),
@@ -106,31 +241,412 @@ def classify_content_batch(items: list) -> list[dict]:
                 views=int(item.get("views", 0)),
                 posted_at=posted_at,
                 followers=int(item.get("followers", 1)),
+                now=now,
             )
-
-            # Add original item metadata
             score_data["content_id"] = item.get("id", f"item_{idx}")
             score_data["caption"] = item.get("caption", "")[:200]
             score_data["platform"] = item.get("platform", "unknown")
             score_data["media_type"] = item.get("media_type", "unknown")
-
             results.append(score_data)
+        except Exception as e:
+            results.append(_error_row(item, idx, e))
+    return results
+
+
+def _posted_us(posted_at, now: datetime, now_us: int) -> int:
+    # now - posted_at como no escalar (mesmos erros para datetime com timezone)
+    if isinstance(posted_at, str):
+        posted_at = datetime.fromisoformat(posted_at.replace("Z", "+00:00").replace("+00:00", ""))
+    elif posted_at is None:
+        return now_us
+    delta = now - posted_at
+    return now_us - ((delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds)
+
 
+def _columns(items: list, now: datetime, now_us: int) -> tuple[list, list[int], list[Optional[dict]]]:
+    """Converte os itens em colunas uma unica vez.
+
+    Caminho rapido: uma list comprehension por coluna. Se algum item for
+    invalido, refaz item a item na ordem de validacao do escalar para gerar
+    a mesma linha de erro.
+
+    Returns:
+        (colunas [likes, comments, shares, saves, followers, posted_us],
+        indices validos, linhas por indice ja preenchidas com os erros)
+    """
+    rows: list[Optional[dict]] = [None] * len(items)
+    try:
+        posted = [_posted_us(item.get("posted_at"), now, now_us) for item in items]
+        counts = [
+            [int(item.get(field, 0)) for item in items]
+            for field in ("likes", "comments", "shares", "saves", "views")
+        ]
+        followers = [int(item.get("followers", 1)) for item in items]
+        return counts[:4] + [followers, posted], list(range(len(items))), rows
+    except (TypeError, ValueError, AttributeError, OverflowError):
+        # Algum item invalido: cai no caminho item a item abaixo, que gera
+        # as linhas de erro
+        pass
+
+    columns: list[list] = [[], [], [], [], [], []]
+    valid: list[int] = []
+    for idx, item in enumerate(items):
+        try:
+            posted_at = _parse_posted_at(item.get("posted_at"), now)
+            values = [
+                int(item.get("likes", 0)),
+                int(item.get("comments", 0)),
+                int(item.get("shares", 0)),
+                int(item.get("saves", 0)),
+            ]
+            int(item.get("views", 0))
+            values.append(int(item.get("followers", 1)))
+            values.append(_posted_us(posted_at, now, now_us))
         except Exception as e:
-            logger.warning(f"Error classifying item {idx}: {e}")
-            results.append({
-                "content_id": item.get("id", f"item_{idx}"),
-                "virality_score": 0,
-                "classification": "error",
-                "error": str(e),
-            })
+            rows[idx] = _error_row(item, idx, e)
+            continue
+        for column, value in zip(columns, values):
+            column.append(value)
+        valid.append(idx)
+    return columns, valid, rows
+
+
+def _score_items(items: list, now: datetime):
+    """Scores por item, em ordem de entrada.
+
+    Returns:
+        (indices validos, colunas de _SCORE_FIELDS alinhadas a eles, linhas de
+        erro por indice, posted_us dos validos) — ou None se algum contador
+        estiver fora da faixa exata do float64 (use _classify_scalar).
+    """
+    columns, valid, rows = _columns(items, now, _to_us(now))
+    if not valid:
+        return valid, [[] for _ in _SCORE_FIELDS], rows, []
+
+    try:
+        counts = np.array(columns[:5], dtype=np.int64)
+    except OverflowError:
+        return None
+    if np.abs(counts).max() >= _MAX_EXACT_INT:
+        return None
+
+    scores = score_virality_arrays(*counts, posted_at=np.array(columns[5], dtype=np.int64), now=now)
+    columns_out = [scores[name].tolist() for name in _SCORE_FIELDS]
+    # min()/max() do escalar devolvem o int literal quando limitam o valor
+    for field, mask, literal in _INT_LITERALS:
+        column = columns_out[_SCORE_FIELDS.index(field)]
+        for i in np.flatnonzero(scores[mask]):
+            column[i] = literal
+    return valid, columns_out, rows, columns[5]
+
+
+def classify_content_batch(items: list, now: Optional[datetime] = None) -> list[dict]:
+    """
+    Classifica uma lista de conteudos por viralidade em lote.
 
-    # Sort by virality score descending
-    results.sort(key=lambda x: x.get("virality_score", 0), reverse=True)
+    Cada item no list deve conter:
+    - likes (int)
+    - comments (int)
+    - shares (int)
+    - saves (int)
+    - views (int)
+    - posted_at (datetime or ISO string)
+    - followers (int)
+    - id (str, optional) - identificador do conteudo
+    - caption (str, optional) - texto do post
+
+    Os itens sao convertidos em colunas uma unica vez e pontuados por
+    score_virality_arrays; o resultado e o mesmo de calculate_virality_score
+    item a item (com um unico `now` para o lote).
+
+    Returns:
+        Lista de dicts com score de viralidade, ordenada do mais viral ao menos viral.
+    """
+    now = now or datetime.utcnow()
+    scored = _score_items(items, now)
+    if scored is None:
+        # Fora da faixa em que int64/float64 reproduzem a aritmetica do Python
+        results = _classify_scalar(items, now)
+        results.sort(key=lambda x: x.get("virality_score", 0), reverse=True)
+        return results
+
+    valid, columns_out, results, _ = scored
+    for idx, score, classification, rate, velocity, share, save, hours, engagement in zip(valid, *columns_out):
+        item = items[idx]
+        try:
+            results[idx] = {
+                "virality_score": score,
+                "classification": classification,
+                "engagement_rate": rate,
+                "velocity_score": velocity,
+                "share_score": share,
+                "save_score": save,
+                "hours_since_post": hours,
+                "total_engagement": engagement,
+                # Add original item metadata
+                "content_id": item["id"] if "id" in item else f"item_{idx}",
+                "caption": item.get("caption", "")[:200],
+                "platform": item.get("platform", "unknown"),
+                "media_type": item.get("media_type", "unknown"),
+            }
+        except Exception as e:
+            results[idx] = _error_row(item, idx, e)
+
+    # Sort by virality score descending (estavel: empates na ordem de entrada)
+    results.sort(key=itemgetter("virality_score"), reverse=True)
     return results
 
 
-def detect_trending_patterns(content_list: list) -> dict:
+class PostRecord(NamedTuple):
+    """Registro compacto de um post para agregacao (id estavel = content_id)."""
+
+    post_id: str
+    virality_score: float
+    classification: str
+    engagement_rate: float
+    velocity_score: float
+    share_score: float
+    save_score: float
+    media_type: str
+    hashtags: tuple
+    hour: Optional[int]
+    weekday: Optional[int]
+    caption: str
+
+
+def _record_from_row(row: dict, item: dict) -> PostRecord:
+    """Registro a partir de uma linha do caminho escalar (erros e fallback)."""
+    hour = weekday = None
+    posted_at = item.get("posted_at")
+    try:
+        if isinstance(posted_at, str):
+            posted_at = datetime.fromisoformat(posted_at.replace("Z", "+00:00").replace("+00:00", ""))
+    except (ValueError, TypeError):
+        posted_at = None
+    if isinstance(posted_at, datetime):
+        hour, weekday = posted_at.hour, posted_at.weekday()
+    return PostRecord(
+        row["content_id"],
+        row.get("virality_score", 0),
+        row.get("classification", "normal"),
+        row.get("engagement_rate", 0),
+        row.get("velocity_score", 0),
+        row.get("share_score", 0),
+        row.get("save_score", 0),
+        row.get("media_type", "unknown"),
+        tuple(item.get("hashtags") or ()),
+        hour,
+        weekday,
+        row.get("caption", ""),
+    )
+
+
+def build_post_records(content_list: list, now: Optional[datetime] = None) -> list[PostRecord]:
+    """
+    Pontua os conteudos e devolve um PostRecord por item, na ordem de entrada.
+
+    posted_at e interpretado uma unica vez (no score); hora e dia da semana
+    saem vetorizados dos mesmos timestamps. Itens sem posted_at ficam sem
+    hora/dia (fora da analise de horarios).
+    """
+    now = now or datetime.utcnow()
+    scored = _score_items(content_list, now)
+    if scored is None:
+        return [_record_from_row(row, item) for row, item in zip(_classify_scalar(content_list, now), content_list)]
+
+    valid, columns_out, rows, posted_us = scored
+    records: list[Optional[PostRecord]] = [None] * len(content_list)
+    posted = np.array(posted_us, dtype=np.int64)
+    hours = (posted // _US_PER_HOUR % 24).tolist()
+    weekdays = ((posted // _US_PER_DAY + _EPOCH_WEEKDAY) % 7).tolist()
+
+    for idx, score, classification, rate, velocity, share, save, _, _, hour, weekday in zip(
+        valid, *columns_out, hours, weekdays
+    ):
+        item = content_list[idx]
+        try:
+            caption = item.get("caption", "")[:200]
+        except Exception as e:
+            rows[idx] = _error_row(item, idx, e)
+            continue
+        timed = isinstance(item.get("posted_at"), (str, datetime))
+        records[idx] = PostRecord(
+            item["id"] if "id" in item else f"item_{idx}",
+            score,
+            classification,
+            rate,
+            velocity,
+            share,
+            save,
+            item.get("media_type", "unknown"),
+            tuple(item.get("hashtags") or ()),
+            hour if timed else None,
+            weekday if timed else None,
+            caption,
+        )
+
+    for idx, row in enumerate(rows):
+        if row is not None:
+            records[idx] = _record_from_row(row, content_list[idx])
+    return records
+
+
+class TrendAggregator:
+    """Agregacao de padroes em uma unica passada (O(1) por post, exceto hashtags).
+
+    add() acumula contadores por classe, tipo de midia, hashtag (viral vs
+    demais), hora e dia da semana, somas de engajamento e o top 5; result()
+    monta o relatorio de detect_trending_patterns.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.classes: Counter = Counter()
+        self.media: dict[str, list] = {}
+        self.viral_tags: Counter = Counter()
+        self.other_tags: Counter = Counter()
+        self.hours: dict[int, list] = {}
+        self.weekdays: dict[int, list] = {}
+        self.engagement_rate_sum = 0.0
+        self.score_sum = 0.0
+        self.share_driven = 0
+        self.save_driven = 0
+        self.velocity_driven = 0
+        self._top: list[tuple] = []
+
+    def add(self, record: PostRecord) -> None:
+        score = record.virality_score
+        self.total += 1
+        self.classes[record.classification] += 1
+        self.engagement_rate_sum += record.engagement_rate
+        self.score_sum += score
+
+        bucket = self.media.get(record.media_type)
+        if bucket is None:
+            self.media[record.media_type] = [score, 1]
+        else:
+            bucket[0] += score
+            bucket[1] += 1
+
+        if record.classification in _VIRAL_CLASSES:
+            self.viral_tags.update(record.hashtags)
+            if record.share_score > record.save_score:
+                self.share_driven += 1
+            elif record.save_score > record.share_score:
+                self.save_driven += 1
+            if record.velocity_score > 60:
+                self.velocity_driven += 1
+        elif record.hashtags:
+            self.other_tags.update(record.hashtags)
+
+        if record.hour is not None:
+            for buckets, key in ((self.hours, record.hour), (self.weekdays, record.weekday)):
+                bucket = buckets.get(key)
+                if bucket is None:
+                    buckets[key] = [score, 1]
+                else:
+                    bucket[0] += score
+                    bucket[1] += 1
+
+        # Top 5 por score; empate fica com o post que chegou primeiro
+        entry = (score, -self.total, record)
+        if len(self._top) < 5:
+            heapq.heappush(self._top, entry)
+        elif entry[:2] > self._top[0][:2]:
+            heapq.heapreplace(self._top, entry)
+
+    def result(self) -> dict:
+        total = self.total
+        viral_count = self.classes["viral"] + self.classes["super_viral"]
+        normal_count = self.classes["normal"]
+        viral_ratio = viral_count / max(total, 1) * 100
+
+        media_type_avg = {mt: round(acc / n, 1) for mt, (acc, n) in self.media.items()}
+        top_media_type = max(media_type_avg, key=media_type_avg.get) if media_type_avg else "unknown"
+
+        # Hashtags desproporcionalmente presentes no conteudo viral
+        trending_hashtags = []
+        for tag, count in self.viral_tags.most_common(10):
+            viral_frequency = count / max(viral_count, 1)
+            normal_frequency = self.other_tags.get(tag, 0) / max(normal_count, 1)
+            trending_hashtags.append({
+                "hashtag": tag,
+                "viral_count": count,
+                "lift_vs_normal": round(viral_frequency / max(normal_frequency, 0.01), 2),
+            })
+        trending_hashtags.sort(key=lambda x: x["lift_vs_normal"], reverse=True)
+
+        def averages(buckets: dict, label) -> dict:
+            avgs = {label(key): round(acc / n, 1) for key, (acc, n) in buckets.items()}
+            return dict(sorted(avgs.items(), key=lambda x: x[1], reverse=True))
+
+        timing_analysis = {
+            "best_hours": averages(self.hours, lambda hour: f"{hour:02d}:00"),
+            "best_days": averages(self.weekdays, _DAY_NAMES.__getitem__),
+        }
+
+        engagement_patterns = {
+            "avg_engagement_rate": round(self.engagement_rate_sum / max(total, 1), 2),
+            "avg_virality_score": round(self.score_sum / max(total, 1), 1),
+            "share_driven": self.share_driven,
+            "save_driven": self.save_driven,
+            "velocity_driven": self.velocity_driven,
+        }
+
+        # Generate recommendations
+        recommendations = []
+        if top_media_type != "unknown":
+            recommendations.append(f"Priorize conteudo tipo '{top_media_type}' - melhor media de viralidade ({media_type_avg[top_media_type]})")
+
+        if engagement_patterns["share_driven"] > engagement_patterns["save_driven"]:
+            recommendations.append("Seu conteudo viral tende a ser impulsionado por compartilhamentos. Foque em conteudo opinativo, polemico (saudavel) e compartilhavel.")
+        elif engagement_patterns["save_driven"] > engagement_patterns["share_driven"]:
+            recommendations.append("Seu conteudo viral tende a ser impulsionado por salvamentos. Foque em conteudo educativo, tutoriais e listas uteis.")
+
+        if viral_ratio < 10:
+            recommendations.append("Menos de 10% do seu conteudo atinge status viral. Experimente formatos diferentes e hooks mais fortes nos primeiros 3 segundos.")
+        elif viral_ratio > 30:
+            recommendations.append(f"Excelente taxa de viralidade ({viral_ratio:.0f}%)! Mantenha a estrategia atual e documente os padroes que funcionam.")
+
+        if trending_hashtags:
+            top_tags = [t["hashtag"] for t in trending_hashtags[:3]]
+            recommendations.append(f"Hashtags com maior correlacao com viralidade: {', '.join(top_tags)}")
+
+        best_hour = next(iter(timing_analysis["best_hours"]), None)
+        best_day = next(iter(timing_analysis["best_days"]), None)
+        if best_hour and best_day:
+            recommendations.append(f"Melhor horario para publicar: {best_hour} | Melhor dia: {best_day}")
+
+        top = sorted(self._top, reverse=True)
+        return {
+            "total_analyzed": total,
+            "classification_breakdown": {
+                "super_viral": self.classes["super_viral"],
+                "viral": self.classes["viral"],
+                "above_average": self.classes["above_average"],
+                "normal": normal_count,
+                "error": self.classes["error"],
+            },
+            "viral_content_ratio": round(viral_ratio, 1),
+            "top_performing_type": top_media_type,
+            "media_type_avg_scores": media_type_avg,
+            "engagement_patterns": engagement_patterns,
+            "trending_hashtags": trending_hashtags[:10],
+            "timing_analysis": timing_analysis,
+            "recommendations": recommendations,
+            "top_viral_content": [
+                {
+                    "content_id": record.post_id,
+                    "virality_score": record.virality_score,
+                    "classification": record.classification,
+                    "caption": record.caption[:100],
+                }
+                for _, _, record in top
+            ],
+        }
+
+
+def detect_trending_patterns(content_list: list, now: Optional[datetime] = None) -> dict:
     """
     Analisa uma lista de conteudos e detecta padroes de tendencias e viralidade.
 
@@ -147,6 +663,10 @@ def detect_trending_patterns(content_list: list) -> dict:
     - hashtags (list[str], optional) - hashtags usadas
     - platform (str, optional) - plataforma de origem
 
+    Cada post vira um PostRecord (com seu proprio id e score) e o relatorio
+    sai de uma unica passada do TrendAggregator — hashtags e horarios sao
+    atribuidos ao score do proprio post.
+
     Returns:
         Dict com analise de padroes incluindo:
         - top_performing_type: tipo de midia com melhor desempenho
@@ -159,163 +679,7 @@ def detect_trending_patterns(content_list: list) -> dict:
     if not content_list:
         return {"error": "Lista de conteudos vazia", "patterns": {}}
 
-    # First, classify all content
-    classified = classify_content_batch(content_list)
-
-    # Separate viral and non-viral
-    viral_items = [c for c in classified if c.get("classification") in ("viral", "super_viral")]
-    above_avg_items = [c for c in classified if c.get("classification") == "above_average"]
-    normal_items = [c for c in classified if c.get("classification") == "normal"]
-
-    total = len(classified)
-    viral_ratio = len(viral_items) / max(total, 1) * 100
-
-    # Analyze media types
-    media_type_scores: dict[str, list] = {}
-    for item in classified:
-        mt = item.get("media_type", "unknown")
-        if mt not in media_type_scores:
-            media_type_scores[mt] = []
-        media_type_scores[mt].append(item.get("virality_score", 0))
-
-    media_type_avg = {}
-    for mt, scores in media_type_scores.items():
-        media_type_avg[mt] = round(sum(scores) / len(scores), 1)
-
-    top_media_type = max(media_type_avg, key=media_type_avg.get) if media_type_avg else "unknown"
-
-    # Analyze hashtags in viral content
-    viral_hashtags: list[str] = []
-    normal_hashtags: list[str] = []
-    for idx, item in enumerate(content_list):
-        tags = item.get("hashtags", [])
-        classification = classified[idx].get("classification", "normal") if idx < len(classified) else "normal"
-        if classification in ("viral", "super_viral"):
-            viral_hashtags.extend(tags)
-        else:
-            normal_hashtags.extend(tags)
-
-    viral_hashtag_counts = Counter(viral_hashtags).most_common(10)
-    normal_hashtag_counts = Counter(normal_hashtags)
-
-    # Find hashtags that appear disproportionately in viral content
-    trending_hashtags = []
-    for tag, viral_count in viral_hashtag_counts:
-        normal_count = normal_hashtag_counts.get(tag, 0)
-        viral_frequency = viral_count / max(len(viral_items), 1)
-        normal_frequency = normal_count / max(len(normal_items), 1)
-        lift = viral_frequency / max(normal_frequency, 0.01)
-        trending_hashtags.append({
-            "hashtag": tag,
-            "viral_count": viral_count,
-            "lift_vs_normal": round(lift, 2),
-        })
-
-    trending_hashtags.sort(key=lambda x: x["lift_vs_normal"], reverse=True)
-
-    # Analyze timing patterns
-    timing_analysis = {"best_hours": {}, "best_days": {}}
-    hour_scores: dict[int, list] = {}
-    day_scores: dict[str, list] = {}
-
-    for idx, item in enumerate(content_list):
-        posted_at = item.get("posted_at")
-        if isinstance(posted_at, str):
-            try:
-                posted_at = datetime.fromisoformat(posted_at.replace("Z", "+00:00").replace("+00:00", ""))
-            except (ValueError, TypeError):
-                continue
-        elif not isinstance(posted_at, datetime):
-            continue
-
-        score = classified[idx].get("virality_score", 0) if idx < len(classified) else 0
-        hour = posted_at.hour
-        day_name = posted_at.strftime("%A")
-
-        if hour not in hour_scores:
-            hour_scores[hour] = []
-        hour_scores[hour].append(score)
-
-        if day_name not in day_scores:
-            day_scores[day_name] = []
-        day_scores[day_name].append(score)
-
-    for hour, scores in hour_scores.items():
-        timing_analysis["best_hours"][f"{hour:02d}:00"] = round(sum(scores) / len(scores), 1)
-
-    for day, scores in day_scores.items():
-        timing_analysis["best_days"][day] = round(sum(scores) / len(scores), 1)
-
-    # Sort timing data
-    if timing_analysis["best_hours"]:
-        timing_analysis["best_hours"] = dict(
-            sorted(timing_analysis["best_hours"].items(), key=lambda x: x[1], reverse=True)
-        )
-    if timing_analysis["best_days"]:
-        timing_analysis["best_days"] = dict(
-            sorted(timing_analysis["best_days"].items(), key=lambda x: x[1], reverse=True)
-        )
-
-    # Engagement pattern analysis
-    engagement_patterns = {
-        "avg_engagement_rate": round(
-            sum(c.get("engagement_rate", 0) for c in classified) / max(total, 1), 2
-        ),
-        "avg_virality_score": round(
-            sum(c.get("virality_score", 0) for c in classified) / max(total, 1), 1
-        ),
-        "share_driven": sum(1 for c in viral_items if c.get("share_score", 0) > c.get("save_score", 0)),
-        "save_driven": sum(1 for c in viral_items if c.get("save_score", 0) > c.get("share_score", 0)),
-        "velocity_driven": sum(1 for c in viral_items if c.get("velocity_score", 0) > 60),
-    }
-
-    # Generate recommendations
-    recommendations = []
-    if top_media_type != "unknown":
-        recommendations.append(f"Priorize conteudo tipo '{top_media_type}' - melhor media de viralidade ({media_type_avg[top_media_type]})")
-
-    if engagement_patterns["share_driven"] > engagement_patterns["save_driven"]:
-        recommendations.append("Seu conteudo viral tende a ser impulsionado por compartilhamentos. Foque em conteudo opinativo, polemico (saudavel) e compartilhavel.")
-    elif engagement_patterns["save_driven"] > engagement_patterns["share_driven"]:
-        recommendations.append("Seu conteudo viral tende a ser impulsionado por salvamentos. Foque em conteudo educativo, tutoriais e listas uteis.")
-
-    if viral_ratio < 10:
-        recommendations.append("Menos de 10% do seu conteudo atinge status viral. Experimente formatos diferentes e hooks mais fortes nos primeiros 3 segundos.")
-    elif viral_ratio > 30:
-        recommendations.append(f"Excelente taxa de viralidade ({viral_ratio:.0f}%)! Mantenha a estrategia atual e documente os padroes que funcionam.")
-
-    if trending_hashtags:
-        top_tags = [t["hashtag"] for t in trending_hashtags[:3]]
-        recommendations.append(f"Hashtags com maior correlacao com viralidade: {', '.join(top_tags)}")
-
-    best_hour = list(timing_analysis["best_hours"].keys())[0] if timing_analysis["best_hours"] else None
-    best_day = list(timing_analysis["best_days"].keys())[0] if timing_analysis["best_days"] else None
-    if best_hour and best_day:
-        recommendations.append(f"Melhor horario para publicar: {best_hour} | Melhor dia: {best_day}")
-
-    return {
-        "total_analyzed": total,
-        "classification_breakdown": {
-            "super_viral": sum(1 for c in classified if c.get("classification") == "super_viral"),
-            "viral": sum(1 for c in classified if c.get("classification") == "viral"),
-            "above_average": len(above_avg_items),
-            "normal": len(normal_items),
-            "error": sum(1 for c in classified if c.get("classification") == "error"),
-        },
-        "viral_content_ratio": round(viral_ratio, 1),
-        "top_performing_type": top_media_type,
-        "media_type_avg_scores": media_type_avg,
-        "engagement_patterns": engagement_patterns,
-        "trending_hashtags": trending_hashtags[:10],
-        "timing_analysis": timing_analysis,
-        "recommendations": recommendations,
-        "top_viral_content": [
-            {
-                "content_id": c["content_id"],
-                "virality_score": c["virality_score"],
-                "classification": c["classification"],
-                "caption": c.get("caption", "")[:100],
-            }
-            for c in classified[:5]
-        ],
-    }
+    aggregator = TrendAggregator()
+    for record in build_post_records(content_list, now):
+        aggregator.add(record)
+    return aggregator.result()
@@ -0,0 +1,248 @@
+"""Fila write-behind para gravacoes fire-and-forget (fora da latencia da requisicao).
+
+Gravacoes que o usuario nao precisa esperar — turno da conversa, memoria com
+embedding — entram num buffer limitado e sao gravadas por uma task de fundo
+em lotes agrupados por tipo (kind). Cada handler recebe a lista de payloads
+do lote e devolve os que falharam; esses sao re-tentados com backoff
+exponencial (com jitter) ate WRITE_QUEUE_MAX_RETRIES e depois descartados
+com log de erro.
+
+Backpressure: com o buffer cheio (ou a fila parada), submit() grava inline
+no lugar de descartar. O lifespan do app inicia a fila e faz flush no
+shutdown. enqueue() pode ser chamado de qualquer thread (ex: tools de
+agentes rodando no TeamExecutor).
+
+Uso:
+    await get_write_queue().submit("conversation_turn", payload)
+"""
+
+import asyncio
+import logging
+import random
+import threading
+from collections import deque
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger("agentesocial.write_queue")
+
+# handler(payloads) -> payloads que falharam (levantar excecao = todos falharam)
+Handler = Callable[[list[Any]], Optional[list[Any]]]
+
+
+class WriteBehindQueue:
+    """Buffer limitado + worker assincrono que grava em lotes com retry.
+
+    Args:
+        handlers: Funcoes sincronas de gravacao por kind (rodam em asyncio.to_thread)
+        max_size: Capacidade do buffer; acima disso enqueue() recusa
+        batch_size: Maximo de itens por chamada de handler
+        flush_interval: Janela (s) para acumular itens antes de gravar
+        max_retries: Retries por item antes de descartar
+        base_backoff: Backoff inicial (s), dobra a cada retry
+    """
+
+    def __init__(
+        self,
+        handlers: dict[str, Handler],
+        max_size: int = 1000,
+        batch_size: int = 50,
+        flush_interval: float = 0.05,
+        max_retries: int = 3,
+        base_backoff: float = 0.2,
+    ):
+        self.handlers = handlers
+        self.max_size = max(max_size, 1)
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval = max(flush_interval, 0.0)
+        self.max_retries = max(max_retries, 0)
+        self.base_backoff = base_backoff
+        self._buffer: deque[tuple[str, Any]] = deque()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._inflight = 0
+        self.enqueued = 0
+        self.written = 0
+        self.retried = 0
+        self.failed = 0
+        self.rejected = 0
+        self.batches = 0
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    def start(self) -> None:
+        """Inicia o worker no event loop atual (idempotente)."""
+        loop = asyncio.get_running_loop()
+        if self.running and self._loop is loop:
+            return
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._worker = loop.create_task(self._run())
+        if self._buffer:
+            self._wakeup.set()
+
+    def enqueue(self, kind: str, payload: Any) -> bool:
+        """Agenda a gravacao. Retorna False se a fila estiver cheia ou parada."""
+        if kind not in self.handlers:
+            raise ValueError(f"Kind sem handler: {kind}")
+        if not self.running:
+            return False
+        with self._lock:
+            if len(self._buffer) >= self.max_size:
+                self.rejected += 1
+                return False
+            self._buffer.append((kind, payload))
+            self.enqueued += 1
+        self._signal()
+        return True
+
+    async def submit(self, kind: str, payload: Any) -> None:
+        """Agenda a gravacao; se nao houver espaco, grava inline (sem descartar)."""
+        if self.enqueue(kind, payload):
+            return
+        logger.warning("Write queue unavailable or full, writing %s inline", kind)
+        await self._write(kind, [payload])
+
+    def _signal(self) -> None:
+        loop = self._loop
+        if loop is None or self._wakeup is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._wakeup.set()
+        else:
+            try:
+                loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                # Loop encerrado: o item fica no buffer ate o proximo start()
+                pass
+
+    def _take(self) -> list[tuple[str, Any]]:
+        with self._lock:
+            count = min(self.batch_size, len(self._buffer))
+            return [self._buffer.popleft() for _ in range(count)]
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if self.flush_interval:
+                await asyncio.sleep(self.flush_interval)
+            while True:
+                batch = self._take()
+                if not batch:
+                    break
+                self._inflight += len(batch)
+                try:
+                    await self._process(batch)
+                finally:
+                    self._inflight -= len(batch)
+
+    async def _process(self, batch: list[tuple[str, Any]]) -> None:
+        by_kind: dict[str, list[Any]] = {}
+        for kind, payload in batch:
+            by_kind.setdefault(kind, []).append(payload)
+        for kind, payloads in by_kind.items():
+            self.batches += 1
+            await self._write(kind, payloads)
+
+    async def _write(self, kind: str, payloads: list[Any]) -> None:
+        handler = self.handlers[kind]
+        pending = payloads
+        for attempt in range(self.max_retries + 1):
+            try:
+                failed = await asyncio.to_thread(handler, pending) or []
+            except Exception as e:
+                logger.warning("Write handler %s failed (attempt %d): %s", kind, attempt + 1, e)
+                failed = pending
+            self.written += len(pending) - len(failed)
+            if not failed:
+                return
+            pending = failed
+            if attempt < self.max_retries:
+                self.retried += len(pending)
+                delay = self.base_backoff * (2 ** attempt) * (0.5 + random.random())
+                await asyncio.sleep(min(delay, 5.0))
+
+        self.failed += len(pending)
+        logger.error("Dropping %d %s write(s) after %d retries", len(pending), kind, self.max_retries)
+
+    async def flush(self, timeout: float = 10.0) -> bool:
+        """Aguarda o buffer esvaziar. Retorna False se estourar o timeout."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+        deadline = asyncio.get_running_loop().time() + timeout
+        while self._buffer or self._inflight:
+            if not self.running or asyncio.get_running_loop().time() >= deadline:
+                return False
+            await asyncio.sleep(0.01)
+        return True
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """Flush e para o worker (shutdown do app)."""
+        flushed = await self.flush(timeout)
+        if not flushed:
+            logger.error("Write queue closed with %d pending write(s)", len(self._buffer) + self._inflight)
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            pending = len(self._buffer)
+        return {
+            "running": self.running,
+            "pending": pending,
+            "in_flight": self._inflight,
+            "max_size": self.max_size,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "retried": self.retried,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "batches": self.batches,
+            "avg_batch_size": round(self.written / self.batches, 1) if self.batches else 0.0,
+        }
+
+
+def _default_handlers() -> dict[str, Handler]:
+    from app.services.conversation_store import save_turns
+    from app.services.embedding_service import save_memories
+
+    return {
+        "conversation_turn": save_turns,
+        "memory": save_memories,
+    }
+
+
+_queue: Optional[WriteBehindQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_write_queue() -> WriteBehindQueue:
+    """Fila do processo, criada no primeiro uso com os limites das settings."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                from app.config import get_settings
+
+                settings = get_settings()
+                _queue = WriteBehindQueue(
+                    _default_handlers(),
+                    max_size=settings.WRITE_QUEUE_MAX_SIZE,
+                    batch_size=settings.WRITE_QUEUE_BATCH_SIZE,
+                    flush_interval=settings.WRITE_QUEUE_FLUSH_INTERVAL_MS / 1000,
+                    max_retries=settings.WRITE_QUEUE_MAX_RETRIES,
+                )
+    return _queue
@@ -1,6 +1,7 @@
 import httpx
 from agno.tools import tool
 from app.services.token_manager import get_user_instagram_credentials
+from app.services.velocity_tracker import engagement_from_insights, get_velocity_tracker
 
 GRAPH_API_BASE = "https://graph.instagram.com/v25.0"
 
@@ -72,10 +73,16 @@ def get_instagram_insights(media_id: str, user_id: str = "") -> str:
     try:
         resp = httpx.get(url, params=params, timeout=30)
         resp.raise_for_status()
-        return str(resp.json())
+        data = resp.json()
     except Exception as e:
         return f"Erro ao buscar insights: {e}"
 
+    # Cada pull de insights vira um snapshot da serie de velocidade do post
+    engagement = engagement_from_insights(data)
+    if engagement is not None:
+        get_velocity_tracker().record(media_id, engagement, owner=user_id)
+    return str(data)
+
 
 @tool
 def search_instagram_hashtag(hashtag: str, user_id: str = "") -> str:
@@ -41,36 +41,25 @@ def search_content_memory(query: str, user_id: str, limit: int = 10) -> str:
 @tool
 def save_to_memory(user_id: str, content: str, content_type: str, metadata: dict = None) -> str:
     """Salva conteudo na memoria episodica com embedding vetorial."""
+    from app.services.write_queue import get_write_queue
+
+    item = {
+        "user_id": user_id,
+        "content": content,
+        "content_type": content_type,
+        "metadata": metadata or {},
+    }
+    # Embedding + insert saem da latencia do agente (fila write-behind, em lote)
+    if get_write_queue().enqueue("memory", item):
+        return "Agendado para salvar na memoria."
+
     try:
-        from app.services.embedding_service import get_embedding
-        from app.database.supabase_client import get_supabase
+        from app.services.embedding_service import save_memories
 
-        embedding = get_embedding(content)
-        supabase = get_supabase()
-        data = {
-            "user_id": user_id,
-            "content": content,
-            "content_type": content_type,
-            "embedding": embedding,
-            "metadata": metadata or {},
-        }
-        result = supabase.table(TABLES["content_history"]).insert(data).execute()
-        return f"Salvo na memoria: {result.data[0]['id']}" if result.data else "Erro ao salvar."
-    except Exception:
-        # Fallback without embedding
-        try:
-            from app.database.supabase_client import get_supabase
-            supabase = get_supabase()
-            data = {
-                "user_id": user_id,
-                "content": content,
-                "content_type": content_type,
-                "metadata": metadata or {},
-            }
-            result = supabase.table(TABLES["content_history"]).insert(data).execute()
-            return f"Salvo na memoria (sem embedding): {result.data[0]['id']}" if result.data else "Erro ao salvar."
-        except Exception as e:
-            return f"Erro ao salvar na memoria: {e}"
+        failed = save_memories([item])
+        return "Erro ao salvar." if failed else "Salvo na memoria."
+    except Exception as e:
+        return f"Erro ao salvar na memoria: {e}"
 
 
 @tool
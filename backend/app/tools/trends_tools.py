@@ -1,3 +1,5 @@
+from typing import Optional
+
 from agno.tools import tool
 
 
@@ -158,8 +160,32 @@ def get_related_topics(keyword: str, geo: str = "BR") -> str:
         return f"Erro ao buscar topicos relacionados: {e}"
 
 
+@tool
+def get_rising_hashtags(niche: str = "", limit: int = 20) -> str:
+    """Hashtags em alta no nicho (indice interno atualizado continuamente a partir das pesquisas de hashtags e posts). Consulte antes de pesquisar na web; niche vazio = todos os nichos."""
+    from app.services.hashtag_trends import get_rising_hashtags as rising_hashtags
+
+    rising = rising_hashtags(niche or None, limit)
+    if not rising:
+        return f"Nenhuma hashtag em alta no indice para o nicho '{niche or 'todos'}'."
+    return str({"niche": niche or "todos", "rising_hashtags": rising})
+
+
+@tool
+def recommend_hashtag_set(seeds: Optional[list[str]] = None, topic: str = "", count: int = 15) -> str:
+    """Monta um conjunto de hashtags balanceado por volume (30% alto, 40% medio, 30% nicho) a partir de hashtags semente e/ou de um tema, usando o indice interno de co-ocorrencia (posts, conteudo viral e pesquisas). Resposta imediata."""
+    from app.services.hashtag_graph import recommend_hashtags
+
+    recommended = recommend_hashtags(seeds or (), topic or None, max(1, min(count, 30)))
+    if not recommended:
+        return "Indice de hashtags sem dados para essas sementes/tema. Pesquise com as demais ferramentas."
+    return str({"seeds": seeds or [], "topic": topic, "hashtags": recommended})
+
+
 def get_trends_tools():
     return [
+        get_rising_hashtags,
+        recommend_hashtag_set,
         get_google_trends,
         get_related_queries,
         get_trending_searches,
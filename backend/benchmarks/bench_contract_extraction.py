@@ -0,0 +1,132 @@
+"""
+Micro-benchmark: extracao + validacao de JSON do output de agentes.
+
+Compara a implementacao anterior (regex de bloco ```json + loop caractere a
+caractere + json.loads + model_validate_json) com o scanner de passada unica
+(iter_json_candidates + parse_contract) para outputs de 50 KB a 500 KB.
+
+Usage:
+    cd backend && python -m benchmarks.bench_contract_extraction
+"""
+
+import json
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.models.contracts import MonthlyPlan
+from app.services.contract_validator import (
+    ContractStreamValidator,
+    iter_json_candidates,
+    parse_contract,
+)
+
+
+def legacy_extract_json(text: str) -> Optional[str]:
+    """Copia da implementacao anterior de extract_json (referencia)."""
+    json_block = re.search(r"```(?:json)?\s*\n?([\s\S]*?)\n?```", text)
+    if json_block:
+        candidate = json_block.group(1).strip()
+        try:
+            json.loads(candidate)
+            return candidate
+        except json.JSONDecodeError:
+            pass
+
+    for start_char, end_char in [("{", "}"), ("[", "]")]:
+        start = text.find(start_char)
+        if start == -1:
+            continue
+        depth = 0
+        in_string = False
+        escape_next = False
+        end = start
+        for i in range(start, len(text)):
+            ch = text[i]
+            if escape_next:
+                escape_next = False
+                continue
+            if ch == "\\":
+                escape_next = True
+                continue
+            if ch == '"':
+                in_string = not in_string
+                continue
+            if in_string:
+                continue
+            if ch == start_char:
+                depth += 1
+            elif ch == end_char:
+                depth -= 1
+                if depth == 0:
+                    end = i
+                    break
+        if depth == 0:
+            candidate = text[start : end + 1]
+            try:
+                json.loads(candidate)
+                return candidate
+            except json.JSONDecodeError:
+                continue
+    return None
+
+
+def build_output(target_kb: int) -> str:
+    """Gera um output de agente com um MonthlyPlan de ~target_kb KB."""
+    slot = {
+        "title": "Post sobre \"tendencias\" {com chaves} no texto",
+        "platform": "instagram",
+        "content_type": "carrossel",
+        "scheduled_date": "2026-03-02",
+        "scheduled_time": "18:00",
+        "topic": "marketing digital",
+        "pillar": "educacao",
+        "notes": "x" * 200,
+    }
+    slot_size = len(json.dumps(slot))
+    n_slots = max(target_kb * 1024 // slot_size, 1)
+    weeks = [{"week_number": w + 1, "slots": []} for w in range(4)]
+    for i in range(n_slots):
+        weeks[i % 4]["slots"].append(slot)
+    plan = {"month": "marco", "year": 2026, "weeks": weeks, "total_posts": n_slots}
+    return "Aqui esta o plano solicitado:\n\n" + json.dumps(plan, ensure_ascii=False) + "\n\nBom trabalho!"
+
+
+def bench(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    print(f"{'size':>8} {'legacy ms':>10} {'single-pass ms':>15} {'streaming ms':>13} {'speedup':>8}")
+    for kb in (50, 100, 250, 500):
+        text = build_output(kb)
+
+        def legacy(text=text):
+            MonthlyPlan.model_validate_json(legacy_extract_json(text))
+
+        def single_pass(text=text):
+            parse_contract(iter_json_candidates(text), MonthlyPlan)
+
+        def streaming(text=text):
+            validator = ContractStreamValidator(MonthlyPlan)
+            for i in range(0, len(text), 64):
+                validator.feed(text[i : i + 64])
+            assert validator.model is not None
+
+        t_legacy = bench(legacy)
+        t_new = bench(single_pass)
+        t_stream = bench(streaming)
+        print(f"{len(text) // 1024:>6}KB {t_legacy:>10.1f} {t_new:>15.1f} {t_stream:>13.1f} {t_legacy / t_new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
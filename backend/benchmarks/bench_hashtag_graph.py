@@ -0,0 +1,64 @@
+"""
+Benchmark: indice de co-ocorrencia de hashtags.
+
+Constroi o HashtagGraph a partir de posts sinteticos (vocabulario de 50k
+hashtags com cauda longa, 3-15 hashtags por post) e mede ingestao,
+compactacao, latencia de recommend() por sementes e por tema, tamanho em
+memoria dos arrays e tempo de save/load do .npz.
+
+Usage:
+    cd backend && python -m benchmarks.bench_hashtag_graph
+"""
+
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.hashtag_graph import HashtagGraph
+
+TAGS = [f"#tag{i}" for i in range(50_000)]
+
+
+def build_posts(n: int, seed: int = 7) -> list[list[str]]:
+    rng = random.Random(seed)
+    return [
+        [TAGS[min(int(rng.paretovariate(0.8)) - 1, len(TAGS) - 1)] for _ in range(rng.randint(3, 15))]
+        for _ in range(n)
+    ]
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    print(f"{'posts':>8} {'ingest s':>9} {'compact ms':>11} {'edges':>9} {'MB':>6} "
+          f"{'seeds ms':>9} {'topic ms':>9} {'save ms':>8} {'load ms':>8}")
+    rng = random.Random(1)
+    for n in (20_000, 100_000, 200_000):
+        posts = build_posts(n)
+        with tempfile.TemporaryDirectory() as tmp:
+            graph = HashtagGraph(path=f"{tmp}/graph.npz")
+            t_ingest = timed(lambda graph=graph, posts=posts: [graph.add_post(post) for post in posts]) / 1000
+            t_compact = timed(graph.compact)
+
+            queries = [rng.sample(TAGS[:500], 3) for _ in range(50)]
+            t_seeds = timed(lambda graph=graph, queries=queries: [graph.recommend(q) for q in queries]) / len(queries)
+            t_topic = timed(lambda graph=graph: [graph.recommend(topic=f"tag{rng.randint(0, 999)}") for _ in range(20)]) / 20
+
+            t_save = timed(graph.save)
+            loaded = HashtagGraph(path=graph.path)
+            t_load = timed(loaded.load)
+            stats = graph.stats()
+            print(f"{n:>8} {t_ingest:>9.2f} {t_compact:>11.1f} {stats['edges']:>9} "
+                  f"{stats['memory_bytes'] / 2**20:>6.1f} {t_seeds:>9.2f} {t_topic:>9.2f} {t_save:>8.1f} {t_load:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
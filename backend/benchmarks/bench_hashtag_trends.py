@@ -0,0 +1,62 @@
+"""
+Benchmark: ingestao e leitura do indice de hashtags em alta.
+
+Alimenta o HashtagTrendDetector com 14 dias de mencoes sinteticas (20 nichos,
+20k hashtags com cauda longa, picos injetados no ultimo dia) e mede:
+- custo por post ingerido (cada post atualiza nicho + particao geral);
+- latencia de rising() por nicho, servido da memoria.
+
+Usage:
+    cd backend && python -m benchmarks.bench_hashtag_trends
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.hashtag_trends import HashtagTrendDetector
+
+HOUR = 3600
+T0 = 1_800_000_000.0 - 1_800_000_000.0 % HOUR
+NICHES = [f"nicho{i}" for i in range(20)]
+TAGS = [f"#tag{i}" for i in range(20_000)]
+
+
+def build_posts(per_hour: int, seed: int = 7) -> list[tuple]:
+    rng = random.Random(seed)
+    spikes = {niche: rng.sample(TAGS[:2000], 3) for niche in NICHES}
+    posts = []
+    for h in range(14 * 24):
+        for _ in range(per_hour):
+            niche = rng.choice(NICHES)
+            tags = [TAGS[min(int(rng.paretovariate(1.2)) - 1, len(TAGS) - 1)] for _ in range(rng.randint(3, 12))]
+            if h >= 13 * 24 and rng.random() < 0.6:
+                tags.append(rng.choice(spikes[niche]))
+            posts.append((tags, niche, T0 + h * HOUR + rng.uniform(0, HOUR)))
+    posts.sort(key=lambda post: post[2])
+    return posts
+
+
+def main():
+    print(f"{'posts':>8} {'ingest us/post':>15} {'tracked':>8} {'rising() ms':>12} {'rising/niche':>13}")
+    for per_hour in (50, 200, 600):
+        posts = build_posts(per_hour)
+        detector = HashtagTrendDetector()
+        start = time.perf_counter()
+        for tags, niche, at in posts:
+            detector.observe(tags, niche, at)
+        ingest = (time.perf_counter() - start) / len(posts) * 1e6
+
+        now = posts[-1][2]
+        start = time.perf_counter()
+        found = [detector.rising(niche, now=now) for niche in NICHES]
+        read = (time.perf_counter() - start) / len(NICHES) * 1000
+        avg = sum(map(len, found)) / len(NICHES)
+        print(f"{len(posts):>8} {ingest:>15.2f} {detector.stats()['tracked']:>8} {read:>12.3f} {avg:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
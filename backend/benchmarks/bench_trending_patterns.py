@@ -0,0 +1,250 @@
+"""
+Benchmark: detect_trending_patterns anterior (varias passadas sobre listas
+de dicts, join por indice) vs PostRecord + TrendAggregator em passada unica.
+
+Roda 10k / 50k / 100k posts sinteticos para mostrar a escala linear e
+confere que os dois produzem o mesmo relatorio quando a entrada ja vem
+ordenada por score (unico caso em que o join por indice do codigo anterior
+acerta o post).
+
+Usage:
+    cd backend && python -m benchmarks.bench_trending_patterns
+"""
+
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.viral_detection import (
+    classify_content_batch,
+    detect_trending_patterns,
+)
+
+NOW = datetime(2026, 3, 1, 12, 0)
+TAGS = [f"#tag{i}" for i in range(500)]
+
+
+def legacy_detect_trending_patterns(content_list: list, now: datetime) -> dict:
+    """Copia do detect_trending_patterns anterior (varias passadas, join por indice)."""
+    if not content_list:
+        return {"error": "Lista de conteudos vazia", "patterns": {}}
+
+    # First, classify all content
+    classified = classify_content_batch(content_list, now=now)
+
+    # Separate viral and non-viral
+    viral_items = [c for c in classified if c.get("classification") in ("viral", "super_viral")]
+    above_avg_items = [c for c in classified if c.get("classification") == "above_average"]
+    normal_items = [c for c in classified if c.get("classification") == "normal"]
+
+    total = len(classified)
+    viral_ratio = len(viral_items) / max(total, 1) * 100
+
+    # Analyze media types
+    media_type_scores: dict[str, list] = {}
+    for item in classified:
+        mt = item.get("media_type", "unknown")
+        if mt not in media_type_scores:
+            media_type_scores[mt] = []
+        media_type_scores[mt].append(item.get("virality_score", 0))
+
+    media_type_avg = {}
+    for mt, scores in media_type_scores.items():
+        media_type_avg[mt] = round(sum(scores) / len(scores), 1)
+
+    top_media_type = max(media_type_avg, key=media_type_avg.get) if media_type_avg else "unknown"
+
+    # Analyze hashtags in viral content
+    viral_hashtags: list[str] = []
+    normal_hashtags: list[str] = []
+    for idx, item in enumerate(content_list):
+        tags = item.get("hashtags", [])
+        classification = classified[idx].get("classification", "normal") if idx < len(classified) else "normal"
+        if classification in ("viral", "super_viral"):
+            viral_hashtags.extend(tags)
+        else:
+            normal_hashtags.extend(tags)
+
+    viral_hashtag_counts = Counter(viral_hashtags).most_common(10)
+    normal_hashtag_counts = Counter(normal_hashtags)
+
+    # Find hashtags that appear disproportionately in viral content
+    trending_hashtags = []
+    for tag, viral_count in viral_hashtag_counts:
+        normal_count = normal_hashtag_counts.get(tag, 0)
+        viral_frequency = viral_count / max(len(viral_items), 1)
+        normal_frequency = normal_count / max(len(normal_items), 1)
+        lift = viral_frequency / max(normal_frequency, 0.01)
+        trending_hashtags.append({
+            "hashtag": tag,
+            "viral_count": viral_count,
+            "lift_vs_normal": round(lift, 2),
+        })
+
+    trending_hashtags.sort(key=lambda x: x["lift_vs_normal"], reverse=True)
+
+    # Analyze timing patterns
+    timing_analysis = {"best_hours": {}, "best_days": {}}
+    hour_scores: dict[int, list] = {}
+    day_scores: dict[str, list] = {}
+
+    for idx, item in enumerate(content_list):
+        posted_at = item.get("posted_at")
+        if isinstance(posted_at, str):
+            try:
+                posted_at = datetime.fromisoformat(posted_at.replace("Z", "+00:00").replace("+00:00", ""))
+            except (ValueError, TypeError):
+                continue
+        elif not isinstance(posted_at, datetime):
+            continue
+
+        score = classified[idx].get("virality_score", 0) if idx < len(classified) else 0
+        hour = posted_at.hour
+        day_name = posted_at.strftime("%A")
+
+        if hour not in hour_scores:
+            hour_scores[hour] = []
+        hour_scores[hour].append(score)
+
+        if day_name not in day_scores:
+            day_scores[day_name] = []
+        day_scores[day_name].append(score)
+
+    for hour, scores in hour_scores.items():
+        timing_analysis["best_hours"][f"{hour:02d}:00"] = round(sum(scores) / len(scores), 1)
+
+    for day, scores in day_scores.items():
+        timing_analysis["best_days"][day] = round(sum(scores) / len(scores), 1)
+
+    # Sort timing data
+    if timing_analysis["best_hours"]:
+        timing_analysis["best_hours"] = dict(
+            sorted(timing_analysis["best_hours"].items(), key=lambda x: x[1], reverse=True)
+        )
+    if timing_analysis["best_days"]:
+        timing_analysis["best_days"] = dict(
+            sorted(timing_analysis["best_days"].items(), key=lambda x: x[1], reverse=True)
+        )
+
+    # Engagement pattern analysis
+    engagement_patterns = {
+        "avg_engagement_rate": round(
+            sum(c.get("engagement_rate", 0) for c in classified) / max(total, 1), 2
+        ),
+        "avg_virality_score": round(
+            sum(c.get("virality_score", 0) for c in classified) / max(total, 1), 1
+        ),
+        "share_driven": sum(1 for c in viral_items if c.get("share_score", 0) > c.get("save_score", 0)),
+        "save_driven": sum(1 for c in viral_items if c.get("save_score", 0) > c.get("share_score", 0)),
+        "velocity_driven": sum(1 for c in viral_items if c.get("velocity_score", 0) > 60),
+    }
+
+    # Generate recommendations
+    recommendations = []
+    if top_media_type != "unknown":
+        recommendations.append(f"Priorize conteudo tipo '{top_media_type}' - melhor media de viralidade ({media_type_avg[top_media_type]})")
+
+    if engagement_patterns["share_driven"] > engagement_patterns["save_driven"]:
+        recommendations.append("Seu conteudo viral tende a ser impulsionado por compartilhamentos. Foque em conteudo opinativo, polemico (saudavel) e compartilhavel.")
+    elif engagement_patterns["save_driven"] > engagement_patterns["share_driven"]:
+        recommendations.append("Seu conteudo viral tende a ser impulsionado por salvamentos. Foque em conteudo educativo, tutoriais e listas uteis.")
+
+    if viral_ratio < 10:
+        recommendations.append("Menos de 10% do seu conteudo atinge status viral. Experimente formatos diferentes e hooks mais fortes nos primeiros 3 segundos.")
+    elif viral_ratio > 30:
+        recommendations.append(f"Excelente taxa de viralidade ({viral_ratio:.0f}%)! Mantenha a estrategia atual e documente os padroes que funcionam.")
+
+    if trending_hashtags:
+        top_tags = [t["hashtag"] for t in trending_hashtags[:3]]
+        recommendations.append(f"Hashtags com maior correlacao com viralidade: {', '.join(top_tags)}")
+
+    best_hour = list(timing_analysis["best_hours"].keys())[0] if timing_analysis["best_hours"] else None
+    best_day = list(timing_analysis["best_days"].keys())[0] if timing_analysis["best_days"] else None
+    if best_hour and best_day:
+        recommendations.append(f"Melhor horario para publicar: {best_hour} | Melhor dia: {best_day}")
+
+    return {
+        "total_analyzed": total,
+        "classification_breakdown": {
+            "super_viral": sum(1 for c in classified if c.get("classification") == "super_viral"),
+            "viral": sum(1 for c in classified if c.get("classification") == "viral"),
+            "above_average": len(above_avg_items),
+            "normal": len(normal_items),
+            "error": sum(1 for c in classified if c.get("classification") == "error"),
+        },
+        "viral_content_ratio": round(viral_ratio, 1),
+        "top_performing_type": top_media_type,
+        "media_type_avg_scores": media_type_avg,
+        "engagement_patterns": engagement_patterns,
+        "trending_hashtags": trending_hashtags[:10],
+        "timing_analysis": timing_analysis,
+        "recommendations": recommendations,
+        "top_viral_content": [
+            {
+                "content_id": c["content_id"],
+                "virality_score": c["virality_score"],
+                "classification": c["classification"],
+                "caption": c.get("caption", "")[:100],
+            }
+            for c in classified[:5]
+        ],
+    }
+
+
+def build_posts(n: int, seed: int = 7) -> list[dict]:
+    rng = random.Random(seed)
+    posts = []
+    for i in range(n):
+        followers = rng.randint(100, 2_000_000)
+        likes = int(followers * rng.uniform(0.001, 0.2))
+        posted_at = NOW - timedelta(seconds=rng.randint(0, 30 * 86400))
+        posts.append({
+            "id": f"post_{i}",
+            "likes": likes,
+            "comments": likes // rng.randint(5, 50),
+            "shares": likes // rng.randint(2, 40),
+            "saves": likes // rng.randint(2, 40),
+            "views": 0,
+            "followers": followers,
+            "posted_at": posted_at.isoformat(),
+            "media_type": rng.choice(["IMAGE", "VIDEO", "CAROUSEL_ALBUM"]),
+            "hashtags": rng.sample(TAGS, rng.randint(0, 8)),
+            "caption": "post de teste",
+        })
+    return posts
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def check_equivalence(posts: list[dict]) -> bool:
+    scores = {row["content_id"]: row["virality_score"] for row in classify_content_batch(posts, now=NOW)}
+    ordered = sorted(posts, key=lambda p: scores[p["id"]], reverse=True)
+    old = legacy_detect_trending_patterns(ordered, NOW)
+    new = detect_trending_patterns(ordered, now=NOW)
+    # Empates de score podem trocar a ordem de insercao do dict de midias
+    old["media_type_avg_scores"] = dict(sorted(old["media_type_avg_scores"].items()))
+    new["media_type_avg_scores"] = dict(sorted(new["media_type_avg_scores"].items()))
+    return old == new
+
+
+def main():
+    print(f"equivalente na entrada ordenada: {check_equivalence(build_posts(5_000, seed=1))}")
+    print(f"{'posts':>8} {'old ms':>10} {'new ms':>10} {'speedup':>8} {'new us/post':>12}")
+    for n in (10_000, 50_000, 100_000):
+        posts = build_posts(n)
+        t_old = timed(lambda posts=posts: legacy_detect_trending_patterns(posts, NOW))
+        t_new = timed(lambda posts=posts: detect_trending_patterns(posts, now=NOW))
+        print(f"{n:>8} {t_old:>10.1f} {t_new:>10.1f} {t_old / t_new:>7.1f}x {t_new * 1000 / n:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Benchmark: custo por snapshot do VelocityTracker.
+
+Simula N posts ativos re-pontuados a cada 5 min por 48h (576 snapshots por
+post, o buffer padrao guarda ~25h). O custo por update deve ficar constante
+com o numero de posts e com o historico acumulado — a base de cada janela
+anda para frente em O(1) amortizado em vez de buscar na serie.
+
+Usage:
+    cd backend && python -m benchmarks.bench_velocity_tracker
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.velocity_tracker import VelocityTracker
+
+T0 = 1_800_000_000.0
+STEP = 300
+ROUNDS = 576
+
+
+def run(posts: int) -> tuple[float, float, int]:
+    rng = random.Random(posts)
+    tracker = VelocityTracker()
+    engagement = [0.0] * posts
+    rates = [rng.uniform(1, 500) for _ in range(posts)]
+    first_half = second_half = 0.0
+    for r in range(ROUNDS):
+        t = T0 + r * STEP
+        start = time.perf_counter()
+        for i in range(posts):
+            engagement[i] += rates[i] * rng.uniform(0.5, 1.5) * STEP / 3600
+            tracker.record(f"post_{i}", engagement[i], t)
+        elapsed = time.perf_counter() - start
+        if r < ROUNDS // 2:
+            first_half += elapsed
+        else:
+            second_half += elapsed
+    half = posts * (ROUNDS // 2)
+    return first_half / half * 1e6, second_half / half * 1e6, len(tracker.accelerating(limit=posts))
+
+
+def main():
+    print(f"{'posts':>7} {'us/update 0-24h':>16} {'us/update 24-48h':>17} {'accelerating':>13}")
+    for posts in (100, 1_000, 5_000):
+        early, late, accelerating = run(posts)
+        print(f"{posts:>7} {early:>16.2f} {late:>17.2f} {accelerating:>13}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark: score de viralidade escalar vs colunar.
+
+Compara, para 1k / 100k / 1M posts:
+- escalar: calculate_virality_score item a item (como o classify_content_batch anterior);
+- colunar: score_virality_arrays sobre arrays NumPy;
+- lote de dicts: classify_content_batch (conversao unica para colunas) vs o
+  caminho item a item. Limitado a 100k — 1M dicts de entrada e saida
+  dominam a memoria e nao o calculo.
+
+Usage:
+    cd backend && python -m benchmarks.bench_virality_scoring
+"""
+
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.viral_detection import (
+    _classify_scalar,
+    calculate_virality_score,
+    classify_content_batch,
+    score_virality_arrays,
+)
+
+NOW = datetime(2026, 3, 1, 12, 0)
+DICT_LIMIT = 100_000
+
+
+def build_columns(n: int, seed: int = 7) -> dict[str, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    followers = rng.integers(100, 2_000_000, n)
+    likes = (followers * rng.uniform(0.001, 0.2, n)).astype(np.int64)
+    age_us = rng.integers(0, 30 * 86400 * 10**6, n)
+    return {
+        "likes": likes,
+        "comments": likes // rng.integers(5, 50, n),
+        "shares": likes // rng.integers(2, 40, n),
+        "saves": likes // rng.integers(2, 40, n),
+        "followers": followers,
+        "posted_at": np.datetime64(NOW, "us") - age_us.astype("timedelta64[us]"),
+    }
+
+
+def build_items(columns: dict[str, np.ndarray]) -> list[dict]:
+    posted = columns["posted_at"].astype(datetime)
+    return [
+        {
+            "id": f"post_{i}",
+            "likes": int(columns["likes"][i]),
+            "comments": int(columns["comments"][i]),
+            "shares": int(columns["shares"][i]),
+            "saves": int(columns["saves"][i]),
+            "views": 0,
+            "followers": int(columns["followers"][i]),
+            "posted_at": posted[i].isoformat(),
+            "caption": "post de teste",
+        }
+        for i in range(len(posted))
+    ]
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    print(f"{'rows':>9} {'scalar ms':>11} {'arrays ms':>10} {'speedup':>8} {'dicts old ms':>13} {'dicts new ms':>13} {'speedup':>8}")
+    for n in (1_000, 100_000, 1_000_000):
+        columns = build_columns(n)
+        posted = columns["posted_at"].astype(datetime)
+        rows = list(zip(*(columns[k].tolist() for k in ("likes", "comments", "shares", "saves", "followers"))))
+
+        def scalar(rows=rows, posted=posted):
+            for (likes, comments, shares, saves, followers), posted_at in zip(rows, posted):
+                calculate_virality_score(likes, comments, shares, saves, 0, posted_at, followers, now=NOW)
+
+        def arrays(columns=columns):
+            score_virality_arrays(
+                columns["likes"], columns["comments"], columns["shares"], columns["saves"],
+                columns["followers"], columns["posted_at"], now=NOW,
+            )
+
+        t_scalar = timed(scalar)
+        t_arrays = timed(arrays)
+        line = f"{n:>9} {t_scalar:>11.1f} {t_arrays:>10.1f} {t_scalar / t_arrays:>7.1f}x"
+
+        if n <= DICT_LIMIT:
+            items = build_items(columns)
+            t_old = timed(lambda items=items: _classify_scalar(items, NOW))
+            t_new = timed(lambda items=items: classify_content_batch(items, now=NOW))
+            line += f" {t_old:>13.1f} {t_new:>13.1f} {t_old / t_new:>7.1f}x"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+-- Pipeline runs: checkpoint por step/slot para retomada de runs interrompidas
+-- A linha e criada no inicio da run (status 'running') e atualizada apos
+-- cada step e cada slot de CONTENT/SCRIPTS.
+ALTER TABLE social_midia_pipeline_runs
+    ADD COLUMN IF NOT EXISTS script_results JSONB,
+    ADD COLUMN IF NOT EXISTS steps JSONB DEFAULT '[]',
+    ADD COLUMN IF NOT EXISTS checkpoint JSONB DEFAULT '{}',
+    ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT now();
+
+-- Runs que ficaram em 'running' apos um restart sao candidatas a resume
+CREATE INDEX IF NOT EXISTS idx_pipeline_runs_user_status
+    ON social_midia_pipeline_runs (user_id, status);
@@ -0,0 +1,28 @@
+-- Pipeline runs: version atribuido atomicamente no INSERT
+-- Substitui o "SELECT max(version) + 1" feito pela aplicacao, que custava um
+-- round trip extra e dava a mesma versao para runs concorrentes do mesmo usuario.
+-- O advisory lock (por transacao, por usuario) serializa apenas inserts do
+-- mesmo user_id; UNIQUE(user_id, version) continua como garantia final.
+
+CREATE OR REPLACE FUNCTION social_midia_assign_pipeline_version()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  PERFORM pg_advisory_xact_lock(hashtext('social_midia_pipeline_runs'), hashtext(NEW.user_id::TEXT));
+
+  SELECT COALESCE(MAX(version), 0) + 1
+    INTO NEW.version
+    FROM social_midia_pipeline_runs
+   WHERE user_id = NEW.user_id;
+
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_pipeline_runs_version ON social_midia_pipeline_runs;
+
+CREATE TRIGGER trg_pipeline_runs_version
+  BEFORE INSERT ON social_midia_pipeline_runs
+  FOR EACH ROW
+  EXECUTE FUNCTION social_midia_assign_pipeline_version();
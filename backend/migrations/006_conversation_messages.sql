@@ -0,0 +1,86 @@
+-- Mensagens de conversa em tabela append-only (uma linha por mensagem)
+-- Substitui o read-modify-write do array JSONB social_midia_agent_conversations.messages:
+-- cada turno era um SELECT do array inteiro + UPDATE do array inteiro (O(n) por
+-- turno) e turnos concorrentes na mesma conversa perdiam mensagens.
+-- A coluna messages fica como legado (nao e mais escrita) ate a remocao.
+
+ALTER TABLE social_midia_agent_conversations
+    ADD COLUMN IF NOT EXISTS last_seq INTEGER NOT NULL DEFAULT 0;
+
+CREATE TABLE IF NOT EXISTS social_midia_conversation_messages (
+    id BIGSERIAL PRIMARY KEY,
+    conversation_id UUID NOT NULL REFERENCES social_midia_agent_conversations(id) ON DELETE CASCADE,
+    user_id UUID NOT NULL REFERENCES auth.users(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL DEFAULT '',
+    metadata JSONB DEFAULT '{}',
+    created_at TIMESTAMPTZ DEFAULT now(),
+    UNIQUE (conversation_id, seq)
+);
+
+CREATE INDEX IF NOT EXISTS idx_social_midia_conversation_messages_user
+    ON social_midia_conversation_messages (user_id, conversation_id, seq);
+
+ALTER TABLE social_midia_conversation_messages ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "social_midia_conversation_messages_select" ON social_midia_conversation_messages;
+CREATE POLICY "social_midia_conversation_messages_select"
+    ON social_midia_conversation_messages FOR SELECT
+    USING (auth.uid() = user_id);
+
+-- Append em um round trip: cria a conversa se preciso e reserva os seq com um
+-- UPDATE ... RETURNING (o lock da linha serializa turnos da mesma conversa).
+-- p_messages: [{"role": "user", "content": "...", "metadata": {...}}, ...]
+CREATE OR REPLACE FUNCTION social_midia_append_messages(
+    p_conversation_id UUID,
+    p_user_id UUID,
+    p_agent_type TEXT,
+    p_messages JSONB
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_count INTEGER := jsonb_array_length(p_messages);
+    v_last_seq INTEGER;
+BEGIN
+    INSERT INTO social_midia_agent_conversations (id, user_id, agent_type, last_seq)
+    VALUES (p_conversation_id, p_user_id, COALESCE(p_agent_type, 'master'), v_count)
+    ON CONFLICT (id) DO UPDATE
+        SET last_seq = social_midia_agent_conversations.last_seq + v_count,
+            updated_at = now()
+        WHERE social_midia_agent_conversations.user_id = p_user_id
+    RETURNING last_seq INTO v_last_seq;
+
+    IF v_last_seq IS NULL THEN
+        RAISE EXCEPTION 'conversation % does not belong to user %', p_conversation_id, p_user_id;
+    END IF;
+
+    INSERT INTO social_midia_conversation_messages (conversation_id, user_id, seq, role, content, metadata)
+    SELECT p_conversation_id,
+           p_user_id,
+           v_last_seq - v_count + m.ord::INTEGER,
+           m.value->>'role',
+           COALESCE(m.value->>'content', ''),
+           COALESCE(m.value->'metadata', '{}'::JSONB)
+      FROM jsonb_array_elements(p_messages) WITH ORDINALITY AS m(value, ord);
+
+    RETURN v_last_seq;
+END;
+$$;
+
+-- Migra o historico existente (idempotente)
+INSERT INTO social_midia_conversation_messages (conversation_id, user_id, seq, role, content, created_at)
+SELECT c.id,
+       c.user_id,
+       m.ord::INTEGER,
+       COALESCE(m.value->>'role', 'user'),
+       COALESCE(m.value->>'content', ''),
+       c.created_at
+  FROM social_midia_agent_conversations c
+ CROSS JOIN LATERAL jsonb_array_elements(COALESCE(c.messages, '[]'::JSONB)) WITH ORDINALITY AS m(value, ord)
+    ON CONFLICT (conversation_id, seq) DO NOTHING;
+
+UPDATE social_midia_agent_conversations
+   SET last_seq = GREATEST(last_seq, jsonb_array_length(COALESCE(messages, '[]'::JSONB)));
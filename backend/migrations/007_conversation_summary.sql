@@ -0,0 +1,80 @@
+-- Resumo denormalizado das conversas para a listagem do chat
+-- A listagem lia o array messages inteiro de cada conversa so para montar
+-- first_message. Agora o resumo fica em colunas mantidas pelo append
+-- (social_midia_append_messages) e a listagem pagina por (updated_at, id).
+
+ALTER TABLE social_midia_agent_conversations
+    ADD COLUMN IF NOT EXISTS first_message TEXT,
+    ADD COLUMN IF NOT EXISTS message_count INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS last_message_at TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS idx_social_midia_agent_conversations_user_updated
+    ON social_midia_agent_conversations (user_id, updated_at DESC, id DESC);
+
+CREATE OR REPLACE FUNCTION social_midia_append_messages(
+    p_conversation_id UUID,
+    p_user_id UUID,
+    p_agent_type TEXT,
+    p_messages JSONB
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_count INTEGER := jsonb_array_length(p_messages);
+    v_first TEXT;
+    v_last_seq INTEGER;
+BEGIN
+    SELECT LEFT(m.value->>'content', 100)
+      INTO v_first
+      FROM jsonb_array_elements(p_messages) AS m(value)
+     WHERE m.value->>'role' = 'user'
+     LIMIT 1;
+
+    INSERT INTO social_midia_agent_conversations
+        (id, user_id, agent_type, last_seq, message_count, first_message, last_message_at)
+    VALUES
+        (p_conversation_id, p_user_id, COALESCE(p_agent_type, 'master'), v_count, v_count, v_first, now())
+    ON CONFLICT (id) DO UPDATE
+        SET last_seq = social_midia_agent_conversations.last_seq + v_count,
+            message_count = social_midia_agent_conversations.message_count + v_count,
+            first_message = COALESCE(social_midia_agent_conversations.first_message, v_first),
+            last_message_at = now(),
+            updated_at = now()
+        WHERE social_midia_agent_conversations.user_id = p_user_id
+    RETURNING last_seq INTO v_last_seq;
+
+    IF v_last_seq IS NULL THEN
+        RAISE EXCEPTION 'conversation % does not belong to user %', p_conversation_id, p_user_id;
+    END IF;
+
+    INSERT INTO social_midia_conversation_messages (conversation_id, user_id, seq, role, content, metadata)
+    SELECT p_conversation_id,
+           p_user_id,
+           v_last_seq - v_count + m.ord::INTEGER,
+           m.value->>'role',
+           COALESCE(m.value->>'content', ''),
+           COALESCE(m.value->'metadata', '{}'::JSONB)
+      FROM jsonb_array_elements(p_messages) WITH ORDINALITY AS m(value, ord);
+
+    RETURN v_last_seq;
+END;
+$$;
+
+-- Backfill a partir das mensagens ja migradas (006)
+-- A 006 gravou as mensagens migradas com o created_at da conversa, entao o
+-- MAX(created_at) delas e so a data de criacao; updated_at da conversa e que
+-- reflete a ultima atividade anterior a migracao.
+UPDATE social_midia_agent_conversations c
+   SET message_count = s.message_count,
+       last_message_at = GREATEST(c.updated_at, s.last_message_at),
+       first_message = COALESCE(c.first_message, s.first_message)
+  FROM (
+        SELECT conversation_id,
+               COUNT(*) AS message_count,
+               MAX(created_at) AS last_message_at,
+               LEFT((ARRAY_AGG(content ORDER BY seq) FILTER (WHERE role = 'user'))[1], 100) AS first_message
+          FROM social_midia_conversation_messages
+         GROUP BY conversation_id
+       ) s
+ WHERE c.id = s.conversation_id;
@@ -0,0 +1,9 @@
+-- Pipeline runs: status 'partial' para runs concluidas com slots falhos
+-- Essas runs podem ser retomadas (POST /runs/{id}/resume regera so os slots
+-- com erro); 'completed' fica reservado para runs sem falhas.
+ALTER TABLE social_midia_pipeline_runs
+    DROP CONSTRAINT IF EXISTS social_midia_pipeline_runs_status_check;
+
+ALTER TABLE social_midia_pipeline_runs
+    ADD CONSTRAINT social_midia_pipeline_runs_status_check
+    CHECK (status IN ('running', 'completed', 'partial', 'failed'));
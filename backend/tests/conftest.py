@@ -16,6 +16,11 @@ def mock_env(monkeypatch):
     monkeypatch.setenv("SUPABASE_JWT_SECRET", "test-jwt-secret")
     # DATABASE_URL vazio — degradacao graciosa (sem memoria persistente nos testes)
     monkeypatch.setenv("DATABASE_URL", "")
+    # Cache de embeddings so em memoria (sem SQLite no diretorio do repo)
+    monkeypatch.setenv("EMBEDDING_CACHE_PATH", "")
+    # Sem leitura periodica do Supabase para o indice de hashtags
+    monkeypatch.setenv("HASHTAG_TRENDS_ENABLED", "false")
+    monkeypatch.setenv("HASHTAG_GRAPH_PATH", "")
 
 
 @pytest.fixture
@@ -0,0 +1,75 @@
+"""Testes do pool de agentes (reuso de instancias e isolamento por requisicao)."""
+
+import asyncio
+from unittest.mock import MagicMock
+
+from app.services.agent_pool import AgentPool, get_agent_pool, get_agent_pool_stats
+from app.services.token_manager import get_current_user_id
+
+
+class FakeAgent:
+    def __init__(self):
+        self.user_id = None
+        self.session_id = None
+        self.session_state = {"step": 0}
+        self._cached_session = None
+
+
+def test_pool_reuses_instances_and_resets_request_state():
+    built: list[FakeAgent] = []
+
+    def factory():
+        built.append(FakeAgent())
+        return built[-1]
+
+    pool = AgentPool(factory, max_idle=2)
+    with pool.lease() as agent:
+        agent.user_id = "user-a"
+        agent.session_id = "sessao-a"
+        agent.session_state["step"] = 5
+        agent._cached_session = object()
+
+    with pool.lease() as again:
+        assert again is agent
+        assert again.user_id is None and again.session_id is None
+        assert again.session_state == {"step": 0}
+        assert again._cached_session is None
+
+    stats = pool.stats()
+    assert stats["builds"] == 1 and stats["reuses"] == 1 and stats["idle"] == 1
+
+
+def test_pool_never_shares_an_instance_between_concurrent_leases():
+    pool = AgentPool(FakeAgent, max_idle=1)
+    with pool.lease() as first, pool.lease() as second:
+        assert first is not second
+        assert pool.stats()["leased"] == 2
+    stats = pool.stats()
+    assert stats["idle"] == 1 and stats["discarded"] == 1
+
+
+async def test_validate_and_retry_reuses_pooled_agent_with_isolated_user():
+    from app.models.contracts import PlanSlot
+    from app.services.contract_validator import validate_and_retry
+
+    seen_users: list[str] = []
+
+    def run(**kwargs):
+        seen_users.append((kwargs["user_id"], get_current_user_id()))
+        return MagicMock(content='{"title": "ok"}')
+
+    def create_agent():
+        agent = MagicMock()
+        agent.run.side_effect = run
+        return agent
+
+    await asyncio.gather(*(
+        validate_and_retry(create_agent, "Crie", PlanSlot, f"user-{i}") for i in range(4)
+    ))
+    await validate_and_retry(create_agent, "Crie", PlanSlot, "user-9")
+
+    assert all(arg == ctx for arg, ctx in seen_users)
+    stats = get_agent_pool_stats()[create_agent.__qualname__]
+    assert stats["builds"] + stats["reuses"] == 5
+    assert stats["reuses"] >= 1
+    assert get_agent_pool(create_agent).stats()["leased"] == 0
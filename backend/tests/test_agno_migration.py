@@ -34,6 +34,43 @@ class TestMemoryConfigGracefulDegradation:
         assert result is None
 
 
+class TestSharedEngineRegistry:
+    """Testa que agentes compartilham um unico engine/PostgresDb por processo."""
+
+    def test_create_db_shares_engine_and_instance(self, monkeypatch, tmp_path):
+        import sys
+        import types
+
+        from app.agents import memory_config
+        from app.config import get_settings
+
+        class FakePostgresDb:
+            def __init__(self, db_engine=None, **tables):
+                self.db_engine = db_engine
+                self.tables = tables
+
+        fake_module = types.ModuleType("agno.db.postgres")
+        fake_module.PostgresDb = FakePostgresDb
+        monkeypatch.setitem(sys.modules, "agno.db.postgres", fake_module)
+        monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path}/agno.db")
+        monkeypatch.setenv("AGNO_DB_POOL_SIZE", "3")
+        get_settings.cache_clear()
+
+        try:
+            db = memory_config.create_db()
+            assert memory_config.create_db() is db
+            other = memory_config.create_db(session_table="custom_sessions")
+            assert other is not db
+            assert other.db_engine is db.db_engine
+
+            stats = memory_config.get_db_pool_stats()
+            assert stats["engines"] == 1 and stats["databases"] == 2
+            assert stats["pools"][0]["size"] == 3
+        finally:
+            memory_config.dispose_engines()
+            get_settings.cache_clear()
+
+
 class TestTeamCreationWithoutDatabase:
     """Testa que o team principal cria sem Postgres."""
 
@@ -0,0 +1,201 @@
+"""Testes do contract_validator (extracao de JSON e validacao por schema)."""
+
+import pytest
+from pydantic import ValidationError
+
+from app.models.contracts import PlanSlot, WeeklyPlan
+from app.services.contract_validator import (
+    ContractStreamValidator,
+    JsonStreamExtractor,
+    extract_json,
+    iter_json_candidates,
+    parse_contract,
+)
+
+AGENT_OUTPUT = (
+    "Claro! Use {placeholder} no texto.\n"
+    "```json\n"
+    '{"week_number": 2, "slots": [{"title": "Dica \\"rapida\\" {1}", "notes": "a\\\\b"}]}\n'
+    "```\n"
+    "Qualquer duvida, fale comigo."
+)
+
+
+def test_extract_json_skips_prose_braces():
+    assert extract_json(AGENT_OUTPUT).startswith('{"week_number": 2')
+    assert iter_json_candidates(AGENT_OUTPUT)[0] == "{placeholder}"
+    assert extract_json("sem json aqui") is None
+    assert extract_json('{"aberto": ') is None
+
+
+def test_extract_json_returns_outermost_array():
+    assert extract_json('lista: [{"a": 1}, {"a": 2}] fim') == '[{"a": 1}, {"a": 2}]'
+
+
+def test_extract_json_restarts_after_unclosed_or_invalid_candidate():
+    assert extract_json('Resposta :-{ segue\n```json\n{"a": 1}\n```') == '{"a": 1}'
+    assert extract_json('nota [1] e depois {"a": 1}') == '{"a": 1}'
+    assert extract_json('sorriso :-{ e depois {"a": 1}') == '{"a": 1}'
+    assert extract_json('veja {isto: {"a": 1}} ok') == '{"a": 1}'
+    assert iter_json_candidates('x :-{ y {"a": 1}') == ['{"a": 1}']
+
+
+def test_unclosed_openers_are_scanned_once():
+    text = "{ [" * 20000 + '{"a": [1]} ' + '"{' * 20000
+    assert iter_json_candidates(text) == ['{"a": [1]}']
+    assert extract_json(text) == '{"a": [1]}'
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64])
+def test_stream_extractor_matches_single_pass(chunk_size):
+    extractor = JsonStreamExtractor()
+    found: list[str] = []
+    for i in range(0, len(AGENT_OUTPUT), chunk_size):
+        found.extend(extractor.feed(AGENT_OUTPUT[i : i + chunk_size]))
+    assert found == iter_json_candidates(AGENT_OUTPUT)
+
+
+def test_parse_contract_validates_against_schema():
+    plan = parse_contract(iter_json_candidates(AGENT_OUTPUT), WeeklyPlan)
+    assert plan.week_number == 2
+    assert plan.slots[0].title == 'Dica "rapida" {1}'
+    assert plan.slots[0].notes == "a\\b"
+
+    with pytest.raises(ValidationError):
+        parse_contract(['{"week_number": "nao e numero"}'], WeeklyPlan)
+    assert parse_contract(["{placeholder}"], WeeklyPlan) is None
+
+
+def test_contract_stream_validator_validates_before_stream_ends():
+    validator = ContractStreamValidator(PlanSlot)
+    chunks = ['Segue: {"title": "A', 'BC", "platform": "tiktok"}', " e mais texto", " depois"]
+
+    assert validator.feed(chunks[0]) is None
+    model = validator.feed(chunks[1])
+    assert model is not None and model.title == "ABC"
+    validator.feed(chunks[2])
+    assert validator.text == "".join(chunks[:3])
+
+
+def test_compact_schema_keeps_field_names_and_drops_annotations():
+    import json
+
+    from app.models.contracts import AuditReport, ContentPieceContract
+    from app.services.contract_registry import get_contract
+
+    spec = get_contract(ContentPieceContract)
+    compact = json.loads(spec.compact_text)
+    assert "title" in compact["properties"]
+    assert "description" not in compact["properties"]["hook"]
+    assert "title" not in compact
+    assert len(spec.compact_text) < len(spec.full_text)
+    assert get_contract(ContentPieceContract) is spec
+    assert "Pilares de conteudo" in get_contract(AuditReport).full_text
+
+
+async def test_validate_and_retry_uses_compact_schema_and_counts_savings():
+    from unittest.mock import MagicMock
+
+    from app.services.contract_registry import (
+        get_contract,
+        get_schema_stats,
+        reset_schema_stats,
+    )
+    from app.services.contract_validator import validate_and_retry
+
+    outputs = iter(["nada de json", '{"title": "ok", "platform": "instagram"}'])
+    prompts: list[str] = []
+
+    def run(**kwargs):
+        prompts.append(kwargs["message"])
+        return MagicMock(content=next(outputs))
+
+    agent = MagicMock()
+    agent.run.side_effect = run
+    reset_schema_stats()
+
+    model, _ = await validate_and_retry(lambda: agent, "Crie um post", PlanSlot, "user-1", compact_schema=False)
+
+    spec = get_contract(PlanSlot)
+    assert model.title == "ok"
+    assert spec.full_text in prompts[0]
+    assert spec.compact_text in prompts[1]
+    stats = get_schema_stats()["PlanSlot"]
+    assert stats["prompts"] == 2
+    assert stats["compact_prompts"] == 1
+    assert stats["tokens_saved"] == spec.full_tokens - spec.compact_tokens
+
+
+def test_repair_target_points_to_deepest_submodel():
+    from app.models.contracts import MonthlyPlan
+    from app.services.contract_validator import repair_target
+
+    assert repair_target(MonthlyPlan, ("weeks", 0, "slots", 2, "scheduled_date")) == (
+        ("weeks", 0, "slots", 2), PlanSlot,
+    )
+    assert repair_target(MonthlyPlan, ("weeks", 1, "week_number")) == (("weeks", 1), WeeklyPlan)
+    assert repair_target(MonthlyPlan, ("year",)) is None
+
+
+def _scripted_agent(outputs):
+    from unittest.mock import MagicMock
+
+    outputs = iter(outputs)
+    prompts: list[str] = []
+
+    def run(**kwargs):
+        prompts.append(kwargs["message"])
+        return MagicMock(content=next(outputs))
+
+    agent = MagicMock()
+    agent.run.side_effect = run
+    return agent, prompts
+
+
+async def test_validate_and_retry_repairs_only_invalid_slot():
+    import json
+
+    from app.services.contract_registry import get_schema_stats, reset_schema_stats
+    from app.services.contract_validator import validate_and_retry
+
+    document = {
+        "week_number": 3,
+        "slots": [
+            {"title": "Slot bom", "platform": "instagram"},
+            {"title": "Slot ruim", "scheduled_date": {"dia": 2}},
+        ],
+    }
+    agent, prompts = _scripted_agent([
+        json.dumps(document),
+        '{"title": "Slot ruim", "scheduled_date": "2026-03-02"}',
+    ])
+    reset_schema_stats()
+
+    model, _ = await validate_and_retry(lambda: agent, "Planeje a semana", WeeklyPlan, "user-1")
+
+    assert len(prompts) == 2
+    assert "slots[1]" in prompts[1] and "Slot bom" not in prompts[1]
+    assert model.week_number == 3
+    assert model.slots[0].title == "Slot bom"
+    assert model.slots[1].scheduled_date == "2026-03-02"
+    stats = get_schema_stats()["WeeklyPlan"]
+    assert stats["repaired"] == 1 and stats["full_retry"] == 0
+    assert stats["repair_attempts"] == stats["repair_successes"] == 1
+
+
+async def test_validate_and_retry_falls_back_to_full_retry_on_root_error():
+    from app.services.contract_registry import get_schema_stats, reset_schema_stats
+    from app.services.contract_validator import validate_and_retry
+
+    agent, prompts = _scripted_agent([
+        '{"week_number": "terceira", "slots": []}',
+        '{"week_number": 3, "slots": []}',
+    ])
+    reset_schema_stats()
+
+    model, _ = await validate_and_retry(lambda: agent, "Planeje a semana", WeeklyPlan, "user-1")
+
+    assert model.week_number == 3
+    assert "nao validou contra o schema" in prompts[1]
+    stats = get_schema_stats()["WeeklyPlan"]
+    assert stats["full_retry"] == 1 and stats["repair_attempts"] == 0
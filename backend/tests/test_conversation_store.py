@@ -0,0 +1,72 @@
+"""Testes do armazenamento append-only de mensagens de conversa."""
+
+from unittest.mock import MagicMock, patch
+
+from app.services import conversation_store
+
+
+def test_save_turn_appends_both_messages_in_one_rpc():
+    supabase = MagicMock()
+    supabase.rpc.return_value.execute.return_value = MagicMock(data=6)
+
+    with patch("app.services.conversation_store.get_supabase_admin", return_value=supabase):
+        last_seq = conversation_store.save_turn("conv-1", "user-1", None, "Oi", "Ola!")
+
+    assert last_seq == 6
+    supabase.rpc.assert_called_once_with(conversation_store.APPEND_RPC, {
+        "p_conversation_id": "conv-1",
+        "p_user_id": "user-1",
+        "p_agent_type": "master",
+        "p_messages": [
+            {"role": "user", "content": "Oi"},
+            {"role": "assistant", "content": "Ola!"},
+        ],
+    })
+    supabase.table.assert_not_called()
+
+
+def test_get_messages_returns_chronological_page_with_cursor(mock_supabase):
+    table = mock_supabase.table.return_value
+    # Consulta em ordem decrescente de seq, com 1 linha extra para detectar mais paginas
+    table.execute.return_value = MagicMock(data=[
+        {"seq": s, "role": "user", "content": f"m{s}"} for s in (10, 9, 8)
+    ])
+
+    with patch("app.services.conversation_store.get_supabase_admin", return_value=mock_supabase):
+        page = conversation_store.get_messages("conv-1", "user-1", limit=2, before_seq=11)
+
+    assert [m["seq"] for m in page["messages"]] == [9, 10]
+    assert page["next_before_seq"] == 9
+    table.lt.assert_called_once_with("seq", 11)
+    table.limit.assert_called_once_with(3)
+
+
+def test_list_conversations_reads_summary_columns_with_keyset_cursor(mock_supabase):
+    table = mock_supabase.table.return_value
+    rows = [
+        {"id": f"00000000-0000-0000-0000-00000000000{i}", "first_message": f"Oi {i}",
+         "message_count": 2 * i, "updated_at": f"2026-03-0{i}T10:00:00+00:00"}
+        for i in (3, 2, 1)
+    ]
+    table.execute.return_value = MagicMock(data=rows)
+
+    with patch("app.services.conversation_store.get_supabase_admin", return_value=mock_supabase):
+        page = conversation_store.list_conversations("user-1", limit=2)
+        table.select.assert_called_with(conversation_store.SUMMARY_COLUMNS)
+        assert [c["first_message"] for c in page["conversations"]] == ["Oi 3", "Oi 2"]
+        assert page["conversations"][0]["message_count"] == 6
+
+        updated_at, last_id = conversation_store.decode_cursor(page["next_cursor"])
+        assert (updated_at, last_id) == (rows[1]["updated_at"], rows[1]["id"])
+
+        table.or_ = MagicMock(return_value=table)
+        conversation_store.list_conversations("user-1", limit=2, cursor=page["next_cursor"])
+        assert f'id.lt.{rows[1]["id"]}' in table.or_.call_args.args[0]
+
+
+def test_list_conversations_rejects_tampered_cursor():
+    import pytest
+
+    bad = conversation_store.encode_cursor("2026-03-01T10:00:00", "x),user_id.neq.0")
+    with pytest.raises(ValueError):
+        conversation_store.decode_cursor(bad)
@@ -0,0 +1,179 @@
+"""Testes do cliente de embeddings (async compartilhado, retry com jitter, limite)."""
+
+import asyncio
+import threading
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import httpx
+import openai
+import pytest
+
+from app.services import embedding_service
+from app.services.embedding_cache import (
+    EmbeddingCache,
+    get_embedding_cache,
+    reset_embedding_cache,
+)
+
+
+def _response(texts):
+    return SimpleNamespace(data=[SimpleNamespace(embedding=[float(len(t))]) for t in texts])
+
+
+class FakeAsyncEmbeddings:
+    def __init__(self, failures=0, delay=0.0):
+        self.failures = failures
+        self.delay = delay
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+
+    async def create(self, model, input):
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.failures:
+                self.failures -= 1
+                raise openai.APIConnectionError(request=httpx.Request("POST", "https://api.openai.com"))
+            return _response(input)
+        finally:
+            self.active -= 1
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff():
+    reset_embedding_cache()
+    with patch.object(embedding_service, "_backoff", return_value=0):
+        yield
+    reset_embedding_cache()
+
+
+def _async_client(embeddings, limit=4):
+    return patch.object(
+        embedding_service, "_get_async_client",
+        return_value=(SimpleNamespace(embeddings=embeddings), asyncio.Semaphore(limit)),
+    )
+
+
+def _sync_client(client):
+    return patch.object(embedding_service, "_get_sync_client", return_value=(client, threading.BoundedSemaphore(1)))
+
+
+async def test_retries_transient_errors():
+    embeddings = FakeAsyncEmbeddings(failures=2)
+    with _async_client(embeddings):
+        assert await embedding_service.aget_embedding("abc") == [3.0]
+    assert embeddings.calls == 3
+
+
+async def test_gives_up_after_max_retries():
+    embeddings = FakeAsyncEmbeddings(failures=10)
+    with _async_client(embeddings), pytest.raises(openai.APIConnectionError):
+        await embedding_service.aget_embeddings_batch(["a", "b"])
+    assert embeddings.calls == embedding_service.get_settings().EMBEDDING_MAX_RETRIES + 1
+
+
+async def test_concurrency_is_limited():
+    embeddings = FakeAsyncEmbeddings(delay=0.02)
+    with _async_client(embeddings, limit=2):
+        await asyncio.gather(*(embedding_service.aget_embedding(str(i)) for i in range(8)))
+    assert embeddings.calls == 8
+    assert embeddings.peak == 2
+
+
+async def test_async_client_is_shared_per_loop():
+    embedding_service._async_resources.clear()
+    first, limiter = embedding_service._get_async_client()
+    second, _ = embedding_service._get_async_client()
+    assert first is second
+    assert limiter._value == embedding_service.get_settings().EMBEDDING_MAX_CONCURRENCY
+    await embedding_service.close_clients()
+
+
+def test_sync_path_uses_shared_client():
+    client = MagicMock()
+    client.embeddings.create.side_effect = lambda model, input: _response(input)
+    with _sync_client(client):
+        assert embedding_service.get_embeddings_batch(["ab", "abc"]) == [[2.0], [3.0]]
+        assert embedding_service.get_embeddings_batch([]) == []
+    assert client.embeddings.create.call_count == 1
+
+
+def test_cache_sends_only_misses_in_one_batch():
+    client = MagicMock()
+    client.embeddings.create.side_effect = lambda model, input: _response(input)
+    with _sync_client(client):
+        embedding_service.get_embedding("legenda  um")
+        result = embedding_service.get_embeddings_batch(["legenda um", "dois", "dois", " tres "])
+
+    assert result == [[10.0], [4.0], [4.0], [4.0]]
+    sent = [c.kwargs["input"] for c in client.embeddings.create.call_args_list]
+    assert sent == [["legenda um"], ["dois", "tres"]]
+    stats = embedding_service.get_embedding_stats()["cache"]
+    assert stats["memory_hits"] == 1 and stats["misses"] == 3
+    assert stats["tokens_saved"] == 2
+
+
+async def test_async_path_uses_cache():
+    embeddings = FakeAsyncEmbeddings()
+    with _async_client(embeddings):
+        await embedding_service.aget_embedding("busca repetida")
+        await embedding_service.aget_embedding("busca   repetida")
+    assert embeddings.calls == 1
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "cache" / "embeddings.sqlite3")
+    first = EmbeddingCache(max_entries=10, path=path)
+    first.put({"k": [0.5, 0.25]})
+    first.close()
+
+    second = EmbeddingCache(max_entries=10, path=path)
+    assert second.get_memory({"k": "texto"}) == {}
+    assert second.get_disk({"k": "texto", "other": "x"}) == {"k": [0.5, 0.25]}
+    assert second.get_memory({"k": "texto"}) == {"k": [0.5, 0.25]}
+    stats = second.stats()
+    assert stats["disk_hits"] == 1 and stats["memory_hits"] == 1 and stats["misses"] == 1
+    second.close()
+
+
+def test_memory_tier_stores_packed_float32():
+    cache = EmbeddingCache(max_entries=10)
+    cache.put({"k": [0.5, 0.25]})
+    assert cache._memory["k"].typecode == "f"
+    result = cache.get_memory({"k": "texto"})
+    assert result == {"k": [0.5, 0.25]} and isinstance(result["k"], list)
+
+
+def test_cache_can_be_disabled(monkeypatch):
+    monkeypatch.setenv("EMBEDDING_CACHE_ENABLED", "false")
+    embedding_service.get_settings.cache_clear()
+    try:
+        assert get_embedding_cache() is None
+        assert embedding_service.get_embedding_stats()["cache"] == {"enabled": False}
+    finally:
+        embedding_service.get_settings.cache_clear()
+
+
+def test_blank_inputs_are_not_sent():
+    client = MagicMock()
+    client.embeddings.create.side_effect = lambda model, input: _response(input)
+    with _sync_client(client):
+        assert embedding_service.get_embeddings_batch(["", "   "]) == [[0.0] * embedding_service.EMBEDDING_DIMENSIONS] * 2
+        result = embedding_service.get_embeddings_batch([" \n", "dois"])
+
+    assert result[0] == [0.0] * embedding_service.EMBEDDING_DIMENSIONS and result[1] == [4.0]
+    assert [c.kwargs["input"] for c in client.embeddings.create.call_args_list] == [["dois"]]
+
+
+def test_hits_and_misses_share_float32_precision():
+    client = MagicMock()
+    client.embeddings.create.return_value = SimpleNamespace(data=[SimpleNamespace(embedding=[0.1])])
+    with _sync_client(client):
+        miss = embedding_service.get_embedding("texto")
+        hit = embedding_service.get_embedding("texto")
+    assert miss == hit != [0.1]
+    assert client.embeddings.create.call_count == 1
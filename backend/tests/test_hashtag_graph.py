@@ -0,0 +1,158 @@
+"""Testes do indice de co-ocorrencia de hashtags."""
+
+from app.services.hashtag_graph import HashtagGraph, tier_quotas
+
+
+def _graph(**kwargs) -> HashtagGraph:
+    graph = HashtagGraph(**kwargs)
+    for _ in range(5):
+        graph.add_post(["#cafe", "#barista", "#espresso", "#cafeteria"])
+    for _ in range(3):
+        graph.add_post(["#cafe", "#receita", "#brunch"])
+    graph.add_post(["#moda", "#look"])
+    graph.add_research("#cafe", ["#cafeespecial", "#latteart"], volume=2_000_000)
+    graph.add_research("#barista", [], volume=120_000)
+    graph.add_research("#latteart", [], volume=30_000)
+    return graph
+
+
+def test_tier_quotas():
+    assert tier_quotas(15) == [5, 6, 4]
+    assert sum(tier_quotas(7)) == 7 and tier_quotas(0) == [0, 0, 0]
+
+
+def test_neighbors_ranked_and_unrelated_excluded():
+    graph = _graph()
+    result = graph.recommend(["#Cafe"], count=30)
+    tags = [r["hashtag"] for r in result]
+
+    assert "#cafe" in tags and next(r for r in result if r["hashtag"] == "#cafe")["seed"]
+    assert "#moda" not in tags and "#look" not in tags
+    scores = {r["hashtag"]: r["score"] for r in result if not r["seed"]}
+    assert scores["#barista"] > scores["#brunch"]
+
+
+def test_tiers_use_research_volume():
+    result = {r["hashtag"]: r for r in _graph().recommend(["#cafe"], count=30)}
+    assert result["#cafe"]["tier"] == "high" and result["#cafe"]["volume"] == 2_000_000
+    assert result["#barista"]["tier"] == "medium"
+    assert result["#latteart"]["tier"] == "niche"
+
+
+def test_tier_balance_and_backfill():
+    graph = HashtagGraph()
+    high = [f"#h{i}" for i in range(10)]
+    medium = [f"#m{i}" for i in range(10)]
+    for tag in high:
+        graph.add_research(tag, [], volume=1_000_000)
+    for tag in medium:
+        graph.add_research(tag, [], volume=100_000)
+    graph.add_post(["#seed", *high, *medium])
+
+    result = graph.recommend(["#seed"], count=10)
+    tiers = [r["tier"] for r in result]
+    assert len(result) == 10
+    # Sem hashtags de nicho alem da semente: vagas completadas pelas melhores restantes
+    assert tiers.count("niche") == 1 and tiers.count("medium") >= 4 and tiers.count("high") >= 3
+    assert tiers == sorted(tiers, key=("high", "medium", "niche").index)
+
+
+def test_compaction_keeps_results_and_pending_merges():
+    lazy = _graph()
+    eager = _graph(pending_max=1)
+    assert eager.stats()["pending_pairs"] == 0 and eager.stats()["compactions"] > 0
+    assert lazy.recommend(["#cafe"], count=30) == eager.recommend(["#cafe"], count=30)
+
+    lazy.compact()
+    lazy.add_post(["#cafe", "#novidade"])
+    assert "#novidade" in [r["hashtag"] for r in lazy.recommend(["#cafe"], count=30)]
+
+
+def test_topic_seeds():
+    graph = _graph()
+    tags = [r["hashtag"] for r in graph.recommend(topic="Café especial para barista", count=10)]
+    assert "#cafeespecial" in tags and "#barista" in tags
+    assert graph.recommend(topic="xy") == []
+    assert graph.recommend(["#desconhecida"]) == []
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    path = str(tmp_path / "graph.npz")
+    graph = _graph(path=path)
+    graph.ingest_rows("viral_content", [{"hashtags": ["#cafe", "#viral"], "virality_score": 90, "detected_at": "2026-03-01T10:00:00+00:00"}], "detected_at")
+    expected = graph.recommend(["#cafe"], count=30)
+    assert graph.save_if_changed() and not graph.save_if_changed()
+
+    loaded = HashtagGraph(path=path)
+    assert loaded.load()
+    assert loaded.recommend(["#cafe"], count=30) == expected
+    assert loaded.stats()["edges"] == graph.stats()["edges"]
+    # Linhas ja ingeridas antes do restart nao contam de novo
+    assert loaded.ingest_rows("viral_content", [{"hashtags": ["#cafe"], "detected_at": "2026-03-01T10:00:00+00:00"}], "detected_at") == 0
+    assert HashtagGraph(path=str(tmp_path / "missing.npz")).load() is False
+
+
+def test_corrupt_file_starts_empty(tmp_path):
+    path = tmp_path / "graph.npz"
+    _graph(path=str(path)).save()
+    path.write_bytes(path.read_bytes()[:200])
+
+    graph = HashtagGraph(path=str(path))
+    assert graph.load() is False
+    assert graph.stats()["hashtags"] == 0
+
+
+def test_stats_skip_loading_when_disabled(monkeypatch):
+    from app.config import get_settings
+    from app.services import hashtag_graph
+
+    monkeypatch.setenv("HASHTAG_GRAPH_ENABLED", "false")
+    get_settings.cache_clear()
+    hashtag_graph.reset_hashtag_graph()
+    try:
+        assert hashtag_graph.get_hashtag_graph_stats() == {"enabled": False}
+        assert hashtag_graph._graph is None
+    finally:
+        get_settings.cache_clear()
+
+
+def test_recommend_endpoint_is_empty_when_disabled(client, auth_headers, monkeypatch):
+    from app.config import get_settings
+    from app.services import hashtag_graph
+
+    monkeypatch.setenv("HASHTAG_GRAPH_ENABLED", "false")
+    get_settings.cache_clear()
+    hashtag_graph.reset_hashtag_graph()
+    try:
+        response = client.get("/api/v1/analysis/hashtags/recommend?seeds=%23cafe", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["hashtags"] == []
+        assert hashtag_graph._graph is None
+    finally:
+        get_settings.cache_clear()
+
+
+def test_ingest_research_rows():
+    graph = HashtagGraph()
+    rows = [{"hashtag": "cafe", "related_hashtags": ["#barista", "cafe"], "volume": 600_000, "last_researched_at": "2026-03-01T10:00:00+00:00"}]
+    assert graph.ingest_rows("hashtag_research", rows, "last_researched_at") == 1
+    assert graph.watermarks["hashtag_research"] == "2026-03-01T10:00:00+00:00"
+    assert [r["hashtag"] for r in graph.recommend(["#cafe"])] == ["#cafe", "#barista"]
+
+
+def test_ingest_keeps_late_rows_with_the_boundary_timestamp(tmp_path):
+    at = "2026-03-01T10:00:00+00:00"
+    path = tmp_path / "graph.npz"
+    graph = _graph(path=str(path))
+    assert graph.ingest_rows("posts", [{"id": "a", "hashtags": ["#cafe", "#barista"], "created_at": at}], "created_at") == 1
+    graph.save()
+
+    loaded = HashtagGraph(path=str(path))
+    assert loaded.load() is True
+    rows = [
+        {"id": "a", "hashtags": ["#cafe", "#barista"], "created_at": at},
+        {"id": "b", "hashtags": ["#cafe", "#latte"], "created_at": at},
+    ]
+    assert loaded.ingest_rows("posts", rows, "created_at") == 1
+    assert loaded.boundary_ids["posts"] == ["a", "b"]
+    assert loaded.ingest_rows("posts", rows, "created_at") == 0
@@ -0,0 +1,149 @@
+"""Testes do detector incremental de hashtags em alta."""
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+from app.services.hashtag_trends import (
+    HashtagTrendDetector,
+    HashtagTrendService,
+    normalize_hashtag,
+    normalize_niche,
+)
+
+HOUR = 3600
+T0 = 1_800_000_000.0 - 1_800_000_000.0 % HOUR
+
+
+def _baseline(detector: HashtagTrendDetector, tag: str, niche: str, hours: int, per_hour: int = 1):
+    for h in range(hours):
+        for _ in range(per_hour):
+            detector.observe([tag], niche, T0 + h * HOUR)
+
+
+def test_normalization():
+    assert normalize_hashtag(" #MarketingDigital ") == "#marketingdigital"
+    assert normalize_hashtag("##") is None and normalize_hashtag(None) is None
+    assert normalize_niche(" Educação ") == "educacao"
+
+
+def test_spike_over_baseline_is_rising():
+    detector = HashtagTrendDetector()
+    _baseline(detector, "#cafe", "gastronomia", hours=96)
+    _baseline(detector, "#receita", "gastronomia", hours=96)
+    for _ in range(12):
+        detector.observe(["#Receita"], "Gastronomia", T0 + 96 * HOUR)
+
+    rising = detector.rising("gastronomia", now=T0 + 96 * HOUR)
+    assert [r["hashtag"] for r in rising] == ["#receita"]
+    assert rising[0]["z_score"] >= 3 and rising[0]["lift"] >= 2
+    # Tambem aparece na particao geral; nao em outro nicho
+    assert [r["hashtag"] for r in detector.rising(now=T0 + 96 * HOUR)] == ["#receita"]
+    assert detector.rising("moda", now=T0 + 96 * HOUR) == []
+
+
+def test_steady_volume_and_single_mentions_are_not_rising():
+    detector = HashtagTrendDetector()
+    _baseline(detector, "#cafe", "gastronomia", hours=96, per_hour=5)
+    detector.observe(["#novidade"], "gastronomia", T0 + 96 * HOUR)
+
+    assert detector.rising("gastronomia", now=T0 + 96 * HOUR) == []
+
+
+def test_spike_fades_after_quiet_buckets():
+    detector = HashtagTrendDetector()
+    for _ in range(10):
+        detector.observe(["#nova"], "moda", T0)
+    assert detector.rising("moda", now=T0 + HOUR)  # bucket atual + anterior
+    assert detector.rising("moda", now=T0 + 2 * HOUR) == []
+
+    detector.observe(["#outra"], "moda", T0 + 1000 * HOUR)
+    assert detector.prune(now=T0 + 1000 * HOUR) == 2  # #nova em "moda" e em ""
+    assert detector.stats()["tracked"] == 2
+
+
+def test_long_gap_decays_baseline_in_bounded_steps():
+    detector = HashtagTrendDetector(halflife_buckets=10)
+    _baseline(detector, "#tag", "x", hours=50, per_hour=4)
+    stats = detector._stats[("x", "#tag")]
+    stats.roll(stats.bucket + 10_000, detector.alpha)
+    assert stats.mean < 1e-6 and stats.var < 1e-6
+
+
+async def test_refresh_reads_sources_in_time_order_and_advances_watermarks():
+    now = datetime.now(timezone.utc)
+    at = [(now - timedelta(hours=h)).isoformat() for h in (3, 2, 1)]
+    rows = {
+        "social_midia_hashtag_research": [
+            {"hashtag": "#b", "niche": "moda", "volume": 1200, "last_researched_at": at[1]},
+        ],
+        "social_midia_viral_content": [
+            {"hashtags": ["#a", "#b"], "niche": "moda", "detected_at": at[0]},
+        ],
+        "social_midia_content_pieces": [
+            {"hashtags": ["#b"], "metadata": {"niche": "moda"}, "created_at": at[2]},
+        ],
+    }
+    supabase = MagicMock()
+
+    def table(name):
+        query = MagicMock()
+        chain = query.select.return_value.gte.return_value.order.return_value.range.return_value
+        chain.execute.return_value.data = rows[name]
+        return query
+
+    supabase.table.side_effect = table
+    service = HashtagTrendService(HashtagTrendDetector(min_count=1, z_threshold=0, lift_threshold=0))
+    with patch("app.database.supabase_client.get_supabase_admin", return_value=supabase):
+        assert await service.refresh() == 3
+
+    assert service.watermarks["viral_content"] == at[0]
+    assert service.detector._stats[("moda", "#b")].total == 3
+    assert service.detector._stats[("moda", "#b")].volume == 1200
+    assert service.detector.stats()["stale_events"] == 0
+
+
+def test_fetch_keeps_late_rows_with_the_boundary_timestamp():
+    at = "2026-03-01T10:00:00+00:00"
+    pages = [
+        [{"id": 1, "detected_at": "2026-03-01T09:00:00+00:00"}, {"id": 2, "detected_at": at}],
+        # Linha 3 foi commitada depois com o mesmo timestamp da ultima lida
+        [{"id": 2, "detected_at": at}, {"id": 3, "detected_at": at}],
+        [{"id": 2, "detected_at": at}, {"id": 3, "detected_at": at}],
+    ]
+    query = MagicMock()
+    chain = query.gte.return_value.order.return_value.range.return_value
+    chain.execute.side_effect = [MagicMock(data=page) for page in pages]
+    supabase = MagicMock()
+    supabase.table.return_value.select.return_value = query
+    service = HashtagTrendService(HashtagTrendDetector())
+
+    with patch("app.database.supabase_client.get_supabase_admin", return_value=supabase):
+        first = service._fetch("viral_content", "id,detected_at", "detected_at")
+        second = service._fetch("viral_content", "id,detected_at", "detected_at")
+        third = service._fetch("viral_content", "id,detected_at", "detected_at")
+
+    assert [row["id"] for row in first] == [1, 2]
+    assert [row["id"] for row in second] == [3]
+    assert third == []
+    assert query.gte.call_args.args == ("detected_at", at)
+
+
+RISING = [{"hashtag": "#b", "recent_count": 6.0, "baseline": 1.0, "z_score": 4.0, "lift": 6.0, "total_mentions": 9.0, "volume": None}]
+
+
+def test_trends_endpoint_serves_index_without_team(client, auth_headers):
+    from unittest.mock import AsyncMock
+
+    team = AsyncMock(return_value={"response": "pesquisa", "conversation_id": "c", "agent_type": "trend_analyst", "metadata": {}})
+    with patch("app.services.hashtag_trends.get_rising_hashtags", return_value=RISING), \
+         patch("app.agents.team.get_team_response", team):
+        indexed = client.post("/api/v1/analysis/trends", json={"keywords": ["moda"], "niche": "moda"}, headers=auth_headers)
+        researched = client.post(
+            "/api/v1/analysis/trends", json={"keywords": ["moda"], "niche": "moda", "research": True}, headers=auth_headers,
+        )
+
+    assert indexed.status_code == 200
+    assert indexed.json()["metadata"]["source"] == "index"
+    assert "#b" in indexed.json()["response"]
+    assert researched.json()["response"] == "pesquisa"
+    assert team.await_count == 1
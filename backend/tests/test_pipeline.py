@@ -0,0 +1,435 @@
+"""Testes do PipelineService (fan-out de slots, ordenacao e falhas parciais)."""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.models.contracts import (
+    AuditReport,
+    ContentPieceContract,
+    PlanSlot,
+    QualityReport,
+    ScriptReel,
+    WeeklyPlan,
+)
+from app.services.concurrency import KeyedLimiter
+
+
+def _weekly_plan(n_slots: int, content_type: str = "post") -> WeeklyPlan:
+    return WeeklyPlan(
+        slots=[
+            PlanSlot(title=f"slot-{i}", platform="instagram", content_type=content_type)
+            for i in range(n_slots)
+        ]
+    )
+
+
+def _fake_validate(plan: WeeklyPlan, fail_titles: set[str] = frozenset(), delay: float = 0.0):
+    """Substitui validate_and_retry retornando contratos a partir do prompt."""
+    state = {"in_flight": 0, "peak": 0}
+
+    async def fake(agent_creator, prompt, schema, user_id, **kwargs):
+        if schema is AuditReport:
+            return AuditReport(), ""
+        if schema is WeeklyPlan:
+            return plan, ""
+        if schema is QualityReport:
+            return QualityReport(), ""
+
+        title = next(s.title for s in plan.slots if f"Titulo sugerido: {s.title}\n" in prompt)
+        state["in_flight"] += 1
+        state["peak"] = max(state["peak"], state["in_flight"])
+        try:
+            # Slots iniciais demoram mais para embaralhar a ordem de conclusao
+            await asyncio.sleep(delay * (len(plan.slots) - int(title.split("-")[1])))
+            if title in fail_titles:
+                raise RuntimeError(f"boom {title}")
+            return schema(title=title), ""
+        finally:
+            state["in_flight"] -= 1
+
+    return fake, state
+
+
+@pytest.fixture
+def pipeline_service():
+    from app.services.pipeline_service import PipelineService
+
+    service = PipelineService()
+    service._start_run = AsyncMock()
+    service._checkpoint = AsyncMock()
+    service._persist_content_and_calendar = AsyncMock()
+    return service
+
+
+async def test_content_fan_out_preserves_slot_order(pipeline_service):
+    plan = _weekly_plan(6)
+    fake, state = _fake_validate(plan, delay=0.01)
+
+    with patch("app.services.pipeline_service.validate_and_retry", side_effect=fake), \
+         patch("app.services.pipeline_service._slot_limiter", KeyedLimiter(8, 3)):
+        result = await pipeline_service.execute("user-1", {"include_video": False})
+
+    assert [c["title"] for c in result.content_results] == [f"slot-{i}" for i in range(6)]
+    assert state["peak"] == 3
+
+
+async def test_content_slot_failure_does_not_abort_step(pipeline_service):
+    plan = _weekly_plan(4)
+    fake, _ = _fake_validate(plan, fail_titles={"slot-1"})
+
+    with patch("app.services.pipeline_service.validate_and_retry", side_effect=fake):
+        result = await pipeline_service.execute("user-1", {"include_video": False})
+
+    content_step = next(s for s in result.steps if s.name == "content")
+    assert content_step.status == "completed"
+    assert content_step.slot_errors == [{"index": 1, "error": "boom slot-1"}]
+    assert len(result.content_results) == 4
+    assert result.content_results[1] == ContentPieceContract().model_dump()
+    assert result.content_results[2]["title"] == "slot-2"
+
+
+async def test_sequential_mode_and_progress_per_slot(pipeline_service):
+    plan = _weekly_plan(3, content_type="reel")
+    fake, state = _fake_validate(plan)
+    messages: list[tuple[str, str]] = []
+
+    async def progress_cb(step: str, message: str):
+        messages.append((step, message))
+
+    with patch("app.services.pipeline_service.validate_and_retry", side_effect=fake):
+        result = await pipeline_service.execute(
+            "user-1", {"parallel": False}, progress_cb=progress_cb,
+        )
+
+    assert state["peak"] == 1
+    assert [s["title"] for s in result.script_results] == ["slot-0", "slot-1", "slot-2"]
+    assert result.script_results[0] == ScriptReel(title="slot-0").model_dump()
+    assert ("content", "Slot 3/3 concluido") in messages
+    assert ("video_scripts", "Slot 3/3 concluido") in messages
+
+
+async def test_keyed_limiter_caps_per_key_and_global():
+    limiter = KeyedLimiter(global_limit=3, per_key_limit=2)
+    peaks = {"a": 0, "b": 0, "total": 0}
+    current = {"a": 0, "b": 0, "total": 0}
+
+    async def job(key: str):
+        async with limiter.acquire(key):
+            current[key] += 1
+            current["total"] += 1
+            peaks[key] = max(peaks[key], current[key])
+            peaks["total"] = max(peaks["total"], current["total"])
+            await asyncio.sleep(0.01)
+            current[key] -= 1
+            current["total"] -= 1
+
+    await asyncio.gather(*(job("a") for _ in range(5)), *(job("b") for _ in range(5)))
+
+    assert peaks["a"] == 2
+    assert peaks["b"] == 2
+    assert peaks["total"] == 3
+    assert limiter.active_keys == 0
+
+
+async def test_include_video_false_skips_scripts_node(pipeline_service):
+    plan = _weekly_plan(2, content_type="reel")
+    fake, _ = _fake_validate(plan)
+
+    with patch("app.services.pipeline_service.validate_and_retry", side_effect=fake):
+        result = await pipeline_service.execute("user-1", {"include_video": False})
+
+    assert [s.name for s in result.steps] == ["audit", "plan", "content", "quality_gate"]
+    assert result.script_results == []
+    quality = result.steps[-1]
+    assert quality.depends_on == ["plan", "content"]
+    assert all(s.duration_ms is not None for s in result.steps)
+    assert result.critical_path == ["audit", "plan", "content", "quality_gate"]
+
+
+async def test_step_graph_runs_independent_steps_concurrently():
+    from app.models.contracts import PipelineResult
+    from app.services.pipeline_graph import StepGraph, StepNode
+
+    running: set[str] = set()
+    overlaps: list[set[str]] = []
+
+    def sleeper(name: str, seconds: float, output: str):
+        async def fn(step, **inputs):
+            running.add(name)
+            overlaps.append(set(running))
+            await asyncio.sleep(seconds)
+            running.discard(name)
+            return {output: name}
+        return fn
+
+    result = PipelineResult()
+    graph = StepGraph(result)
+    graph.add(StepNode("a", sleeper("a", 0.01, "x"), outputs=("x",)))
+    graph.add(StepNode("b", sleeper("b", 0.05, "y"), inputs=("x",), outputs=("y",)))
+    graph.add(StepNode("c", sleeper("c", 0.01, "z"), inputs=("x",), outputs=("z",)))
+    graph.add(StepNode("d", sleeper("d", 0.0, "w"), inputs=("y", "z"), outputs=("w",)))
+
+    data = await graph.run()
+
+    assert data == {"x": "a", "y": "b", "z": "c", "w": "d"}
+    assert {"b", "c"} in overlaps
+    assert result.critical_path == ["a", "b", "d"]
+
+
+async def test_step_graph_failure_uses_fallback_and_rejects_missing_inputs():
+    from app.models.contracts import PipelineResult
+    from app.services.pipeline_graph import StepGraph, StepGraphError, StepNode
+
+    async def boom(step):
+        raise RuntimeError("falhou")
+
+    async def consume(step, x):
+        return {"y": x + 1}
+
+    result = PipelineResult()
+    graph = StepGraph(result)
+    graph.add(StepNode("a", boom, outputs=("x",), fallback={"x": 1}))
+    graph.add(StepNode("b", consume, inputs=("x",), outputs=("y",)))
+    data = await graph.run()
+
+    assert data["y"] == 2
+    assert result.steps[0].status == "failed"
+    assert result.steps[0].error == "falhou"
+    assert result.steps[1].status == "completed"
+
+    broken = StepGraph(PipelineResult())
+    broken.add(StepNode("b", consume, inputs=("x",), outputs=("y",)))
+    with pytest.raises(StepGraphError):
+        await broken.run()
+
+
+async def test_resume_regenerates_only_missing_units(pipeline_service):
+    import copy
+
+    plan = _weekly_plan(3)
+    fake, _ = _fake_validate(plan, fail_titles={"slot-2"})
+    snapshots: list[dict] = []
+
+    async def capture(result, checkpoint):
+        snapshots.append({
+            "id": result.pipeline_id,
+            "user_id": result.user_id,
+            "version": result.version,
+            "status": "running",
+            "config": result.config,
+            "audit_result": result.audit_result,
+            "plan_result": result.plan_result,
+            "content_results": result.content_results,
+            "script_results": result.script_results,
+            "quality_report": result.quality_report,
+            "checkpoint": copy.deepcopy(checkpoint.to_dict()),
+        })
+
+    pipeline_service._checkpoint = capture
+    with patch("app.services.pipeline_service.validate_and_retry", side_effect=fake):
+        first = await pipeline_service.execute("user-1", {"include_video": False})
+
+    # Simula um crash logo apos o checkpoint do step content
+    crashed = next(s for s in snapshots if s["content_results"] and s["quality_report"] is None)
+    assert crashed["checkpoint"]["completed_steps"] == ["audit", "plan"]
+    assert set(crashed["checkpoint"]["slot_results"]["content"]) == {"0", "1"}
+
+    fake_ok, _ = _fake_validate(plan)
+    calls: list[type] = []
+
+    async def tracking(agent_creator, prompt, schema, user_id, **kwargs):
+        calls.append(schema)
+        return await fake_ok(agent_creator, prompt, schema, user_id, **kwargs)
+
+    pipeline_service._checkpoint = AsyncMock()
+    with patch("app.services.pipeline_service.validate_and_retry", side_effect=tracking):
+        resumed = await pipeline_service.resume(crashed)
+
+    assert first.status == "partial"
+    assert resumed.status == "completed"
+    assert resumed.pipeline_id == first.pipeline_id
+    assert calls == [ContentPieceContract, QualityReport]
+    assert [c["title"] for c in resumed.content_results] == ["slot-0", "slot-1", "slot-2"]
+    assert [s.status for s in resumed.steps[:2]] == ["restored", "restored"]
+
+
+def test_resume_endpoint_rejects_completed_and_missing_runs(client, auth_headers, mock_supabase):
+    table = mock_supabase.table.return_value
+    with patch("app.database.supabase_client.get_supabase_admin", return_value=mock_supabase):
+        table.execute.return_value.data = None
+        missing = client.post("/api/v1/pipeline/runs/run-1/resume", headers=auth_headers)
+
+        table.execute.return_value.data = {"id": "run-1", "user_id": "test-user-123", "status": "completed"}
+        completed = client.post("/api/v1/pipeline/runs/run-1/resume", headers=auth_headers)
+
+    assert missing.status_code == 404
+    assert completed.status_code == 409
+
+
+def test_resume_endpoint_accepts_partial_runs(client, auth_headers, mock_supabase):
+    from app.models.contracts import PipelineResult
+
+    table = mock_supabase.table.return_value
+    table.execute.return_value.data = {"id": "run-1", "user_id": "test-user-123", "status": "partial"}
+    resume = AsyncMock(return_value=PipelineResult(pipeline_id="run-1", status="completed"))
+    with patch("app.database.supabase_client.get_supabase_admin", return_value=mock_supabase), \
+         patch("app.api.v1.pipeline.PipelineService.resume", resume):
+        response = client.post("/api/v1/pipeline/runs/run-1/resume", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "completed"
+    assert resume.await_args.args[0]["status"] == "partial"
+
+
+def test_resume_endpoint_claims_run_atomically(client, auth_headers, mock_supabase):
+    from unittest.mock import MagicMock
+
+    table = mock_supabase.table.return_value
+    table.execute.return_value.data = {"id": "run-1", "user_id": "test-user-123", "status": "running"}
+    claim = table.update.return_value.eq.return_value.eq.return_value.neq.return_value.or_.return_value
+    claim.execute.return_value = MagicMock(data=[])
+    resume = AsyncMock()
+    with patch("app.database.supabase_client.get_supabase_admin", return_value=mock_supabase), \
+         patch("app.api.v1.pipeline.PipelineService.resume", resume):
+        response = client.post("/api/v1/pipeline/runs/run-1/resume", headers=auth_headers)
+
+    assert response.status_code == 409
+    resume.assert_not_called()
+    assert table.update.call_args.args[0]["status"] == "running"
+    assert claim.execute.called
+
+
+async def test_persist_skips_failed_slots(mock_supabase):
+    from app.models.contracts import PipelineResult
+    from app.services.pipeline_service import PipelineService
+
+    result = PipelineResult(
+        pipeline_id="run-1",
+        user_id="user-1",
+        content_results=[{"title": f"c{i}"} for i in range(3)],
+    )
+    with patch("app.database.supabase_client.get_supabase_admin", return_value=mock_supabase):
+        await PipelineService()._persist_content_and_calendar(result, [], skip={1})
+
+    content_rows = mock_supabase.table.return_value.upsert.call_args_list[0].args[0]
+    assert [row["title"] for row in content_rows] == ["c0", "c2"]
+    assert len(result.calendar_event_ids) == 2
+
+
+async def test_persist_content_and_calendar_uses_one_insert_per_table(mock_supabase):
+    from app.models.contracts import PipelineResult
+    from app.services.pipeline_service import PipelineService
+
+    result = PipelineResult(
+        pipeline_id="run-1",
+        user_id="user-1",
+        content_results=[{"title": f"c{i}", "hook": "h", "caption": "c"} for i in range(30)],
+    )
+    slots = [{"title": f"s{i}", "scheduled_date": "2026-01-01"} for i in range(30)]
+
+    with patch("app.database.supabase_client.get_supabase_admin", return_value=mock_supabase):
+        await PipelineService()._persist_content_and_calendar(result, slots)
+
+    table = mock_supabase.table.return_value
+    assert table.upsert.call_count == 2
+    assert table.upsert.call_args.kwargs == {"on_conflict": "id", "ignore_duplicates": True}
+    content_rows = table.upsert.call_args_list[0].args[0]
+    event_rows = table.upsert.call_args_list[1].args[0]
+    assert len(content_rows) == 30
+    assert content_rows[0]["body"] == "h\n\nc"
+    assert [e["content_id"] for e in event_rows] == result.content_piece_ids
+    assert event_rows[0]["scheduled_at"] == "2026-01-01T09:00:00"
+    assert len(result.calendar_event_ids) == 30
+    assert result.persist_errors == []
+
+
+async def test_persist_falls_back_to_row_inserts_and_reports_failures(mock_supabase):
+    from unittest.mock import MagicMock
+
+    from app.models.contracts import PipelineResult
+    from app.services.pipeline_service import PipelineService
+
+    result = PipelineResult(
+        pipeline_id="run-1",
+        user_id="user-1",
+        content_results=[{"title": f"c{i}"} for i in range(3)],
+    )
+
+    def insert(payload):
+        query = MagicMock()
+        if isinstance(payload, list) or payload.get("title") == "c1":
+            query.execute.side_effect = RuntimeError("insert falhou")
+        return query
+
+    mock_supabase.table.return_value.upsert.side_effect = lambda payload, **kwargs: insert(payload)
+    with patch("app.database.supabase_client.get_supabase_admin", return_value=mock_supabase):
+        await PipelineService()._persist_content_and_calendar(result, [])
+
+    # Slot 1 falhou no content_piece: sem calendar_event para ele
+    assert len(result.content_piece_ids) == 2
+    assert len(result.calendar_event_ids) == 2
+    assert result.persist_errors == [{"table": "content_pieces", "index": 1, "error": "insert falhou"}]
+
+
+async def test_persist_reuses_row_ids_when_run_is_resumed(mock_supabase):
+    from app.models.contracts import PipelineResult
+    from app.services.pipeline_service import PipelineService
+
+    def persist_once() -> PipelineResult:
+        return PipelineResult(
+            pipeline_id="run-1",
+            user_id="user-1",
+            content_results=[{"title": f"c{i}"} for i in range(3)],
+        )
+
+    first, resumed = persist_once(), persist_once()
+    with patch("app.database.supabase_client.get_supabase_admin", return_value=mock_supabase):
+        await PipelineService()._persist_content_and_calendar(first, [])
+        await PipelineService()._persist_content_and_calendar(resumed, [])
+
+    assert resumed.content_piece_ids == first.content_piece_ids
+    assert resumed.calendar_event_ids == first.calendar_event_ids
+    assert len(set(first.content_piece_ids + first.calendar_event_ids)) == 6
+
+
+async def test_start_run_takes_version_from_insert(mock_supabase):
+    from app.models.contracts import PipelineResult
+    from app.services.pipeline_service import PipelineService, RunCheckpoint
+
+    table = mock_supabase.table.return_value
+    table.execute.return_value.data = [{"id": "run-1", "version": 7}]
+    result = PipelineResult(pipeline_id="run-1", user_id="user-1")
+
+    with patch("app.database.supabase_client.get_supabase_admin", return_value=mock_supabase):
+        await PipelineService()._start_run(result, RunCheckpoint(), resume=False)
+
+    assert result.version == 7
+    table.select.assert_not_called()
+    assert "version" not in table.insert.call_args.args[0]
+
+
+async def test_checkpoint_creates_run_row_when_start_insert_failed(mock_supabase):
+    from app.models.contracts import PipelineResult
+    from app.services.pipeline_service import PipelineService, RunCheckpoint
+
+    table = mock_supabase.table.return_value
+    table.insert.side_effect = RuntimeError("supabase fora")
+    table.upsert.return_value = table
+    table.execute.return_value.data = [{"id": "run-1", "version": 3}]
+    result = PipelineResult(pipeline_id="run-1", user_id="user-1")
+    checkpoint = RunCheckpoint()
+    service = PipelineService()
+
+    with patch("app.database.supabase_client.get_supabase_admin", return_value=mock_supabase):
+        await service._start_run(result, checkpoint, resume=False)
+        assert checkpoint.recorded is False
+        await service._checkpoint(result, checkpoint)
+        await service._checkpoint(result, checkpoint)
+
+    row = table.upsert.call_args.args[0]
+    assert table.upsert.call_count == 1 and table.upsert.call_args.kwargs == {"on_conflict": "id"}
+    assert row["id"] == "run-1" and row["user_id"] == "user-1"
+    assert result.version == 3 and checkpoint.recorded is True
+    assert table.update.call_count == 1
@@ -0,0 +1,161 @@
+"""Testes do cache de respostas (LRU em memoria, Redis, chaves e single-flight)."""
+
+import asyncio
+
+import pytest
+from pydantic import BaseModel
+
+from app.middleware import cache
+from app.middleware.cache import MemoryCache, RedisCache, cache_response, make_cache_key
+
+
+@pytest.fixture(autouse=True)
+def memory_backend():
+    backend = MemoryCache(max_entries=2)
+    cache.set_cache_backend(backend)
+    yield backend
+    cache.set_cache_backend(None)
+
+
+class Filters(BaseModel):
+    platform: str
+    limit: int = 10
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, px=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def delete(self, key):
+        return 1 if self.data.pop(key, None) is not None else 0
+
+    async def scan_iter(self, match, count=None):
+        prefix = match.rstrip("*")
+        for key in list(self.data):
+            if key.startswith(prefix):
+                yield key
+
+
+async def test_lru_evicts_least_recently_used(memory_backend):
+    await memory_backend.set("a", 1, 60)
+    await memory_backend.set("b", 2, 60)
+    assert await memory_backend.get("a") == 1
+    await memory_backend.set("c", 3, 60)
+
+    assert await memory_backend.get("b") is cache._MISSING
+    assert await memory_backend.get("a") == 1
+    stats = memory_backend.stats()
+    assert stats["evictions"] == 1 and stats["size"] == 2
+
+
+async def test_expired_entries_are_misses(memory_backend):
+    await memory_backend.set("a", None, 0)
+    assert await memory_backend.get("a") is cache._MISSING
+    assert memory_backend.stats()["expired"] == 1
+
+
+def test_key_is_deterministic_and_user_scoped():
+    user = {"id": "u1", "email": "a@b.c"}
+    key1 = make_cache_key("p", "fn", {"user": user, "filters": Filters(platform="ig"), "days": 7})
+    key2 = make_cache_key("p", "fn", {"days": 7, "filters": Filters(platform="ig"), "user": dict(user)})
+    other = make_cache_key("p", "fn", {"user": {"id": "u2"}, "filters": Filters(platform="ig"), "days": 7})
+
+    assert key1 == key2
+    assert key1 != other
+    assert ":u=u1:" in key1
+    shared = make_cache_key("p", "fn", {"user": user, "days": 7}, scope="global")
+    assert ":global:" in shared
+
+
+async def test_concurrent_misses_compute_once():
+    calls = 0
+
+    @cache_response(ttl_seconds=60, key_prefix="t")
+    async def endpoint(user: dict, days: int):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"days": days}
+
+    coalesced = cache.get_cache_stats()["coalesced"]
+    results = await asyncio.gather(*(endpoint(user={"id": "u"}, days=7) for _ in range(10)))
+    assert all(r == {"days": 7} for r in results)
+    assert calls == 1
+    assert cache.get_cache_stats()["coalesced"] - coalesced == 9
+
+    await endpoint(user={"id": "u"}, days=7)
+    assert calls == 1
+
+
+async def test_cached_falsy_values_are_hits():
+    calls = 0
+
+    @cache_response(ttl_seconds=60)
+    async def endpoint(user: dict):
+        nonlocal calls
+        calls += 1
+        return []
+
+    await endpoint(user={"id": "u"})
+    await endpoint(user={"id": "u"})
+    assert calls == 1
+
+
+async def test_errors_are_not_cached():
+    @cache_response(ttl_seconds=60)
+    async def endpoint(user: dict):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await endpoint(user={"id": "u"})
+    assert cache._inflight == {}
+
+
+async def test_redis_backend_roundtrip_and_clear():
+    backend = RedisCache("redis://unused", client=FakeRedis())
+    cache.set_cache_backend(backend)
+
+    await backend.set("analysis:a", Filters(platform="ig"), 60)
+    await backend.set("other:b", 1, 60)
+    assert await backend.get("analysis:a") == {"platform": "ig", "limit": 10}
+
+    assert await backend.acquire_lock("k", 1) is True
+    assert await backend.acquire_lock("k", 1) is False
+    await backend.release_lock("k")
+
+    assert await cache.clear_cache("analysis:") == 1
+    assert await backend.get("analysis:a") is cache._MISSING
+    assert await backend.get("other:b") == 1
+
+
+async def test_redis_clear_swallows_errors():
+    class BrokenRedis(FakeRedis):
+        async def scan_iter(self, match, count=None):
+            raise ConnectionError("redis fora")
+            yield
+
+    backend = RedisCache("redis://unused", client=BrokenRedis())
+    assert await backend.clear("analysis:") == 0
+    assert backend.stats()["errors"] == 1
+
+
+def test_cache_backend_is_abstract():
+    with pytest.raises(TypeError):
+        cache.CacheBackend()
+
+
+def test_clear_cache_endpoint(client, auth_headers, memory_backend):
+    asyncio.run(memory_backend.set("x", 1, 60))
+    response = client.post("/admin/clear-cache", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json() == {"status": "cache_cleared"}
+    assert memory_backend.size() == 0
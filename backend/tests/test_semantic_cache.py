@@ -0,0 +1,125 @@
+"""Testes do cache semantico do chat (opt-in na frente de get_team_response)."""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.config import get_settings
+from app.services import semantic_cache
+from app.services.semantic_cache import SemanticCache, normalize_message
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setenv("SEMANTIC_CACHE_ENABLED", "true")
+    monkeypatch.setenv("SEMANTIC_CACHE_THRESHOLD", "0.9")
+    get_settings.cache_clear()
+    semantic_cache.reset_semantic_cache()
+    yield
+    semantic_cache.reset_semantic_cache()
+    get_settings.cache_clear()
+
+
+def _fake_embedding(text):
+    # Vetor 2D por tema: mensagens sobre cafe ficam proximas entre si
+    return [1.0, 0.1] if "cafe" in text else [0.0, 1.0]
+
+
+def test_normalize_message():
+    assert normalize_message("  Gere 5 IDEIAS de post sobre Café!! ") == "gere 5 ideias de post sobre cafe"
+
+
+def test_partitions_by_context_and_expire():
+    cache = SemanticCache(user_ttl=0)
+    scopes = cache.scopes("u1", None, {"platform": "instagram"})
+    assert scopes != cache.scopes("u1", None, {"platform": "tiktok"})
+    assert scopes != cache.scopes("u2", None, {"platform": "instagram"})
+
+    cache.store("oi", [1.0, 0.0], "resposta", scopes)
+    assert cache.lookup_exact("oi", scopes) is None
+
+
+def test_global_scope_is_shared_between_users():
+    cache = SemanticCache(use_global=True)
+    cache.store("oi", [1.0, 0.0], "resposta", cache.scopes("u1", None, None))
+
+    hit = cache.lookup_exact("oi", cache.scopes("u2", None, None))
+    assert hit.scope == "global" and hit.response == "resposta"
+
+
+async def test_disabled_by_default():
+    semantic_cache.reset_semantic_cache()
+    assert await semantic_cache.lookup("oi", "u1") is None
+    assert semantic_cache.get_semantic_cache_stats() == {"enabled": False}
+
+
+async def test_exact_hit_skips_embedding(enabled):
+    with patch("app.services.embedding_service.aget_embedding", AsyncMock(side_effect=_fake_embedding)) as embed:
+        first = await semantic_cache.lookup("Ideias sobre cafe", "u1")
+        assert first.hit is None
+        first.store("5 ideias")
+        second = await semantic_cache.lookup("ideias   sobre CAFE!", "u1")
+
+    assert second.hit.response == "5 ideias" and second.hit.similarity == 1.0
+    assert embed.call_count == 1
+
+
+async def test_similar_hit_above_threshold(enabled):
+    with patch("app.services.embedding_service.aget_embedding", AsyncMock(side_effect=_fake_embedding)):
+        (await semantic_cache.lookup("ideias sobre cafe", "u1")).store("5 ideias")
+        similar = await semantic_cache.lookup("posts para cafeteria", "u1")
+        unrelated = await semantic_cache.lookup("ideias sobre academia", "u1")
+        other_user = await semantic_cache.lookup("posts para cafeteria", "u2")
+
+    assert similar.hit.response == "5 ideias" and similar.hit.similarity > 0.9
+    assert unrelated.hit is None
+    assert other_user.hit is None
+
+
+async def test_get_team_response_hit_and_bypass(enabled):
+    from app.agents import team
+
+    run = AsyncMock(return_value=SimpleNamespace(content="resposta do team"))
+    with patch("app.services.embedding_service.aget_embedding", AsyncMock(side_effect=_fake_embedding)), \
+         patch.object(team, "run_team", run), \
+         patch.object(team, "save_conversation", AsyncMock()):
+        first = await team.get_team_response("Ideias sobre cafe", "u1")
+        cached = await team.get_team_response("ideias sobre cafe", "u1")
+        bypass = await team.get_team_response("ideias sobre cafe", "u1", use_cache=False)
+
+    assert "semantic_cache" not in (first["metadata"] or {})
+    assert cached["response"] == "resposta do team"
+    assert cached["metadata"]["semantic_cache"]["hit"] is True
+    assert bypass["metadata"] is None
+    assert run.await_count == 2
+
+
+async def test_cache_hit_survives_save_failure(enabled):
+    from app.agents import team
+
+    run = AsyncMock(return_value=SimpleNamespace(content="resposta do team"))
+    with patch("app.services.embedding_service.aget_embedding", AsyncMock(side_effect=_fake_embedding)), \
+         patch.object(team, "run_team", run), \
+         patch.object(team, "save_conversation", AsyncMock(side_effect=[None, RuntimeError("fila")])):
+        await team.get_team_response("Ideias sobre cafe", "u1")
+        cached = await team.get_team_response("ideias sobre cafe", "u1")
+
+    assert cached["response"] == "resposta do team"
+    assert cached["metadata"]["semantic_cache"]["hit"] is True
+
+
+async def test_follow_ups_in_a_conversation_bypass_cache(enabled):
+    from app.agents import team
+
+    run = AsyncMock(side_effect=[SimpleNamespace(content="mais 3 ideias"), SimpleNamespace(content="outras 3 ideias")])
+    embed = AsyncMock(side_effect=_fake_embedding)
+    with patch("app.services.embedding_service.aget_embedding", embed), \
+         patch.object(team, "run_team", run), \
+         patch.object(team, "save_conversation", AsyncMock()):
+        first = await team.get_team_response("mais 3", "u1", conversation_id="conv-1")
+        second = await team.get_team_response("mais 3", "u1", conversation_id="conv-1")
+
+    assert [first["response"], second["response"]] == ["mais 3 ideias", "outras 3 ideias"]
+    assert run.await_count == 2
+    embed.assert_not_called()
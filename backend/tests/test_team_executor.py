@@ -0,0 +1,70 @@
+"""Testes do TeamExecutor (team.run fora do event loop, com fila limitada)."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.team_executor import TeamExecutor, TeamExecutorBusy
+from app.services.token_manager import (
+    clear_current_user_id,
+    get_current_user_id,
+    set_current_user_id,
+)
+
+
+async def test_blocking_run_does_not_freeze_event_loop():
+    executor = TeamExecutor(max_workers=2, max_queue=0)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        for _ in range(10):
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        executor.run(time.sleep, 0.2),
+        executor.run(time.sleep, 0.2),
+        ticker(),
+    )
+    assert ticks == 10
+    assert time.perf_counter() - started < 0.35
+    stats = executor.stats()
+    assert stats["completed"] == 2 and stats["running"] == 0
+    executor.shutdown()
+
+
+async def test_rejects_when_queue_is_full_and_reports_depth():
+    executor = TeamExecutor(max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    first = asyncio.ensure_future(executor.run(release.wait, 5))
+    second = asyncio.ensure_future(executor.run(release.wait, 5))
+    await asyncio.sleep(0.05)
+
+    assert executor.stats()["queue_depth"] == 1
+    with pytest.raises(TeamExecutorBusy):
+        await executor.run(release.wait, 5)
+
+    release.set()
+    await asyncio.gather(first, second)
+    stats = executor.stats()
+    assert stats["rejected"] == 1 and stats["peak_queue_depth"] == 1
+    executor.shutdown()
+
+
+async def test_user_context_is_copied_to_worker_thread():
+    executor = TeamExecutor(max_workers=2, max_queue=2)
+
+    async def run_as(user_id: str) -> str:
+        set_current_user_id(user_id)
+        try:
+            return await executor.run(get_current_user_id)
+        finally:
+            clear_current_user_id()
+
+    assert await asyncio.gather(run_as("user-a"), run_as("user-b")) == ["user-a", "user-b"]
+    executor.shutdown()
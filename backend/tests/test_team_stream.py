@@ -0,0 +1,196 @@
+"""Testes do streaming real do team no chat (SSE)."""
+
+import json
+import threading
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+
+class FakeTeam:
+    name = "AgenteSocial Team"
+
+    def __init__(self, events):
+        self.members = [SimpleNamespace(id="content-factory", name="Content Factory")]
+        self._events = events
+        self.closed = False
+
+    def run(self, message, stream=False, **kwargs):
+        assert stream is True
+
+        def generate():
+            try:
+                yield from self._events
+            finally:
+                self.closed = True
+
+        return generate()
+
+
+def _events():
+    delegate = SimpleNamespace(tool_name="delegate_task_to_member", tool_args={"member_id": "content-factory"})
+    return [
+        SimpleNamespace(event="TeamRunStarted", team_name="AgenteSocial Team"),
+        SimpleNamespace(event="TeamToolCallStarted", team_name="AgenteSocial Team", tool=delegate),
+        SimpleNamespace(event="RunContent", agent_name="Content Writer", content="Post "),
+        SimpleNamespace(event="TeamRunContent", team_name="AgenteSocial Team", content="Ola"),
+        SimpleNamespace(event="TeamRunContent", team_name="AgenteSocial Team", content=" mundo"),
+        SimpleNamespace(event="TeamRunCompleted", team_name="AgenteSocial Team", content="Ola mundo"),
+    ]
+
+
+def _sse(response):
+    return [json.loads(line[6:]) for line in response.text.splitlines() if line.startswith("data: ")]
+
+
+def test_chat_stream_forwards_deltas_and_routing(client, auth_headers):
+    team = FakeTeam(_events())
+    saved = {}
+
+    def save(conversation_id, user_id, agent_type, message, response_text):
+        saved["text"] = response_text
+
+    with patch("app.agents.team.get_team", return_value=team), \
+         patch("app.api.v1.chat.get_team", return_value=team), \
+         patch("app.api.v1.chat.save_conversation", side_effect=save):
+        response = client.post("/api/v1/chat/stream", json={"message": "Crie um post"}, headers=auth_headers)
+
+    events = _sse(response)
+    assert [e["type"] for e in events] == ["typing", "routed_to", "chunk", "chunk", "chunk", "done"]
+    assert events[1]["member"] == "Content Factory"
+    assert events[2] == {"type": "chunk", "content": "Post ", "agent": "Content Writer"}
+    done = events[-1]
+    assert done["routed_to"] == "Content Factory"
+    assert done["metrics"]["tokens"] == 3 and done["metrics"]["ttfb_ms"] is not None
+    assert saved["text"] == "Ola mundo"
+
+
+async def test_stream_team_stops_agno_run_when_consumer_leaves():
+    from app.services.team_stream import stream_team
+
+    gate = threading.Event()
+
+    def slow_events():
+        yield SimpleNamespace(event="TeamRunContent", team_name="AgenteSocial Team", content="a")
+        gate.wait(2)
+        yield SimpleNamespace(event="TeamRunContent", team_name="AgenteSocial Team", content="b")
+        yield SimpleNamespace(event="TeamRunContent", team_name="AgenteSocial Team", content="c")
+
+    team = FakeTeam(slow_events())
+    with patch("app.agents.team.get_team", return_value=team):
+        stream = stream_team("oi", session_id="s", user_id="u")
+        first = await stream.__anext__()
+        await stream.aclose()
+        gate.set()
+
+    assert first["content"] == "a"
+    for _ in range(100):
+        if team.closed:
+            break
+        threading.Event().wait(0.01)
+    assert team.closed
+
+
+def _ws_token():
+    import time
+
+    from jose import jwt
+
+    payload = {"sub": "test-user-123", "aud": "authenticated", "exp": int(time.time()) + 3600}
+    return jwt.encode(payload, "test-jwt-secret", algorithm="HS256")
+
+
+def _receive_until(ws, frame_type):
+    frames = []
+    while True:
+        frame = ws.receive_json()
+        frames.append(frame)
+        if frame["type"] == frame_type:
+            return frames
+
+
+def test_websocket_streams_delta_and_final_frames(client):
+    team = FakeTeam(_events())
+    with patch("app.agents.team.get_team", return_value=team), \
+         patch("app.api.v1.chat.get_team", return_value=team), \
+         patch("app.api.v1.chat.save_conversation"):
+        with client.websocket_connect(f"/api/v1/chat/ws?token={_ws_token()}") as ws:
+            assert ws.receive_json()["type"] == "authenticated"
+            ws.send_json({"message": "Crie um post", "conversation_id": "conv-1", "stream": True})
+            frames = _receive_until(ws, "final")
+
+    types = [f["type"] for f in frames]
+    assert types == ["typing", "routed_to", "delta", "delta", "delta", "final"]
+    assert all(f["conversation_id"] == "conv-1" for f in frames)
+    assert frames[-1]["data"]["response"] == "Ola mundo"
+
+
+def test_websocket_cancel_aborts_one_of_multiplexed_conversations(client):
+    gate = threading.Event()
+
+    class RoutingTeam(FakeTeam):
+        def run(self, message, stream=False, **kwargs):
+            if kwargs["session_id"] == "lenta":
+                def slow():
+                    try:
+                        yield SimpleNamespace(event="TeamRunContent", team_name=self.name, content="a")
+                        gate.wait(2)
+                        yield SimpleNamespace(event="TeamRunContent", team_name=self.name, content="b")
+                    finally:
+                        self.closed = True
+                return slow()
+            return iter(_events())
+
+    team = RoutingTeam([])
+    with patch("app.agents.team.get_team", return_value=team), \
+         patch("app.api.v1.chat.get_team", return_value=team), \
+         patch("app.api.v1.chat.save_conversation"):
+        with client.websocket_connect(f"/api/v1/chat/ws?token={_ws_token()}") as ws:
+            ws.receive_json()
+            ws.send_json({"message": "demora", "conversation_id": "lenta", "stream": True})
+            assert _receive_until(ws, "delta")[-1]["conversation_id"] == "lenta"
+
+            ws.send_json({"message": "rapida", "conversation_id": "rapida", "stream": True})
+            fast = [f for f in _receive_until(ws, "final") if f["conversation_id"] == "rapida"]
+            assert fast[-1]["data"]["response"] == "Ola mundo"
+
+            ws.send_json({"type": "cancel", "conversation_id": "lenta"})
+            frames = _receive_until(ws, "cancelled")
+            gate.set()
+
+    assert frames[-1]["conversation_id"] == "lenta"
+    for _ in range(100):
+        if team.closed:
+            break
+        threading.Event().wait(0.01)
+    assert team.closed
+
+
+def test_websocket_new_conversations_use_semantic_cache(client, monkeypatch):
+    from app.config import get_settings
+    from app.services import semantic_cache
+
+    monkeypatch.setenv("SEMANTIC_CACHE_ENABLED", "true")
+    get_settings.cache_clear()
+    semantic_cache.reset_semantic_cache()
+    team = FakeTeam(_events())
+    try:
+        with patch("app.agents.team.get_team", return_value=team), \
+             patch("app.api.v1.chat.get_team", return_value=team), \
+             patch("app.api.v1.chat.save_conversation"), \
+             patch("app.services.embedding_service.aget_embedding", AsyncMock(return_value=[1.0, 0.0])):
+            with client.websocket_connect(f"/api/v1/chat/ws?token={_ws_token()}") as ws:
+                ws.receive_json()
+                ws.send_json({"message": "Crie um post"})
+                first = _receive_until(ws, "message")[-1]["data"]
+                ws.send_json({"message": "crie um post"})
+                cached = _receive_until(ws, "message")[-1]["data"]
+                ws.send_json({"message": "crie um post", "use_cache": False})
+                bypass = _receive_until(ws, "message")[-1]["data"]
+    finally:
+        semantic_cache.reset_semantic_cache()
+        get_settings.cache_clear()
+
+    assert first["response"] == cached["response"] == bypass["response"] == "Ola mundo"
+    assert "semantic_cache" not in (first["metadata"] or {})
+    assert cached["metadata"]["semantic_cache"]["hit"] is True
+    assert "semantic_cache" not in (bypass["metadata"] or {})
@@ -0,0 +1,99 @@
+"""Testes da analise de padroes em passada unica (detect_trending_patterns)."""
+
+from datetime import datetime, timedelta
+
+from app.services.viral_detection import (
+    TrendAggregator,
+    build_post_records,
+    classify_content_batch,
+    detect_trending_patterns,
+)
+
+NOW = datetime(2026, 3, 1, 12, 0)
+
+
+def _post(idx: int, likes: int, hashtags: list, posted_at, media_type: str = "IMAGE") -> dict:
+    # Posts com muitos likes tambem recebem shares/saves (score > 60 = viral)
+    return {
+        "id": f"post_{idx}",
+        "likes": likes,
+        "comments": 0,
+        "shares": likes // 2,
+        "saves": likes // 4,
+        "followers": 1000,
+        "posted_at": posted_at,
+        "hashtags": hashtags,
+        "media_type": media_type,
+        "caption": f"legenda {idx}",
+    }
+
+
+def test_hashtags_and_timing_follow_their_own_post():
+    # Ordem de entrada != ordem por score: o viral vem por ultimo
+    normal_time = NOW - timedelta(days=3, hours=2)  # quinta 10:00
+    viral_time = NOW - timedelta(hours=2)  # domingo 10:00 -> 2h de idade
+    posts = [
+        _post(0, 1, ["#normal"], normal_time),
+        _post(1, 2, ["#normal"], normal_time.isoformat()),
+        _post(2, 5000, ["#viral"], viral_time),
+    ]
+    result = detect_trending_patterns(posts, now=NOW)
+
+    assert [t["hashtag"] for t in result["trending_hashtags"]] == ["#viral"]
+    assert result["trending_hashtags"][0]["viral_count"] == 1
+    viral_score = classify_content_batch(posts, now=NOW)[0]["virality_score"]
+    assert result["timing_analysis"]["best_days"]["Sunday"] == round(viral_score, 1)
+    assert list(result["timing_analysis"]["best_days"]) == ["Sunday", "Thursday"]
+    assert result["top_viral_content"][0]["content_id"] == "post_2"
+
+
+def test_records_keep_input_order_and_ids():
+    posts = [_post(i, likes, [], NOW - timedelta(hours=i + 1)) for i, likes in enumerate([3, 900, 40])]
+    posts.append({"likes": "abc", "posted_at": "2026-02-27T08:30:00"})
+    records = build_post_records(posts, now=NOW)
+
+    assert [r.post_id for r in records] == ["post_0", "post_1", "post_2", "item_3"]
+    assert records[3].classification == "error"
+    assert (records[3].hour, records[3].weekday) == (8, 4)
+    assert records[0].hour == (NOW - timedelta(hours=1)).hour
+    assert records[0].weekday == NOW.weekday()
+
+    by_id = {row["content_id"]: row for row in classify_content_batch(posts, now=NOW)}
+    for record in records:
+        assert record.virality_score == by_id[record.post_id]["virality_score"]
+
+
+def test_counts_and_shape():
+    posts = [
+        _post(0, 5000, ["#a", "#b"], NOW - timedelta(hours=1), "VIDEO"),
+        _post(1, 4000, ["#a"], NOW - timedelta(hours=1), "VIDEO"),
+        _post(2, 1, ["#b"], NOW - timedelta(days=5), "IMAGE"),
+        _post(3, 1, [], None, "IMAGE"),
+        {"id": "bad", "likes": "x"},
+    ]
+    result = detect_trending_patterns(posts, now=NOW)
+
+    breakdown = result["classification_breakdown"]
+    assert result["total_analyzed"] == 5
+    assert breakdown["error"] == 1
+    assert sum(breakdown.values()) == 5
+    assert result["top_performing_type"] == "VIDEO"
+    assert set(result["media_type_avg_scores"]) == {"VIDEO", "IMAGE", "unknown"}
+    # O post sem posted_at e o com erro ficam fora dos horarios
+    assert sum(1 for r in build_post_records(posts, now=NOW) if r.hour is not None) == 3
+    assert len(result["top_viral_content"]) == 5
+    assert result["top_viral_content"][0]["content_id"] == "post_0"
+    scores = [c["virality_score"] for c in result["top_viral_content"]]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_aggregator_top_ties_keep_input_order():
+    records = build_post_records([_post(i, 10, [], NOW - timedelta(hours=5)) for i in range(8)], now=NOW)
+    aggregator = TrendAggregator()
+    for record in records:
+        aggregator.add(record)
+    assert [c["content_id"] for c in aggregator.result()["top_viral_content"]] == [f"post_{i}" for i in range(5)]
+
+
+def test_empty_list():
+    assert detect_trending_patterns([]) == {"error": "Lista de conteudos vazia", "patterns": {}}
@@ -0,0 +1,146 @@
+"""Testes do rastreador de velocidade de engajamento (ring buffer + EWMAs)."""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.services.velocity_tracker import VelocityTracker, engagement_from_insights
+from app.services.viral_detection import calculate_virality_score, score_virality_arrays
+
+T0 = 1_800_000_000.0
+HOUR = 3600
+
+
+def _feed(tracker: VelocityTracker, post_id: str, rate_per_hour, hours: float, step: float = 300, start: float = 0):
+    """Amostras a cada `step` s; rate_per_hour(h) = taxa no instante h (horas)."""
+    engagement = 0.0
+    t = 0.0
+    velocity = None
+    while t <= hours * HOUR:
+        velocity = tracker.record(post_id, engagement, T0 + start + t)
+        engagement += rate_per_hour(t / HOUR) * step / HOUR
+        t += step
+    return velocity
+
+
+def test_window_rates_for_constant_growth():
+    tracker = VelocityTracker()
+    velocity = _feed(tracker, "p1", lambda h: 120, hours=30)
+
+    assert velocity.rate_1h == velocity.rate_6h == velocity.rate_24h == 120
+    assert abs(velocity.ewma_fast - 120) < 1e-9 and abs(velocity.ewma_slow - 120) < 1e-9
+    assert velocity.accelerating is False
+
+
+def test_burst_shows_in_short_window_and_flags_acceleration():
+    tracker = VelocityTracker()
+    # 20h devagar, depois um pico na ultima hora
+    velocity = _feed(tracker, "p1", lambda h: 600 if h >= 20 else 10, hours=21)
+
+    assert abs(velocity.rate_1h - 600) < 1e-6
+    assert velocity.rate_1h > velocity.rate_6h > velocity.rate_24h
+    assert velocity.accelerating is True
+    assert [v.post_id for v in tracker.accelerating()] == ["p1"]
+
+
+def test_young_post_uses_available_span():
+    tracker = VelocityTracker()
+    tracker.record("p1", 0, T0)
+    velocity = tracker.record("p1", 50, T0 + 1800)
+
+    # Post com 30 min: todas as janelas usam a amostra mais antiga
+    assert velocity.rate_1h == velocity.rate_24h == 100
+    assert tracker.record("p2", 10, T0).rate_1h is None
+
+
+def test_ring_buffer_is_bounded_and_close_snapshots_coalesce():
+    tracker = VelocityTracker(capacity=10, min_interval=300)
+    for i in range(100):
+        velocity = tracker.record("p1", i * 10, T0 + i * 300)
+    assert velocity.samples == 10
+    # 24h nao cabem no buffer: a base e a amostra mais antiga restante
+    assert velocity.rate_24h == velocity.rate_1h == 120
+
+    tracker.record("p2", 0, T0)
+    tracker.record("p2", 5, T0 + 60)
+    velocity = tracker.record("p2", 10, T0 + 120)
+    assert velocity.samples == 1 and velocity.engagement == 10
+    assert velocity.rate_1h == 300
+
+
+def test_out_of_order_dropped_and_owners_isolated():
+    tracker = VelocityTracker()
+    tracker.record("p1", 10, T0 + 600, owner="u1")
+    assert tracker.record("p1", 5, T0, owner="u1") is None
+    assert tracker.get("p1", owner="u2") is None
+    assert tracker.get("p1", owner="u1").engagement == 10
+    assert tracker.stats()["dropped_out_of_order"] == 1
+
+
+def test_max_posts_and_prune():
+    tracker = VelocityTracker(max_posts=2)
+    tracker.record("a", 1, T0)
+    tracker.record("b", 1, T0 + 10)
+    tracker.record("a", 2, T0 + 20)
+    tracker.record("c", 1, T0 + 30)
+    assert tracker.get("b") is None and tracker.get("a") is not None
+    assert tracker.stats()["evictions"] == 1
+
+    assert tracker.prune(max_idle=15, now=T0 + 40) == 1
+    assert tracker.get("a") is None and tracker.get("c") is not None
+
+
+def test_record_accepts_datetimes():
+    tracker = VelocityTracker()
+    start = datetime(2026, 3, 1, 12, 0)
+    tracker.record("p1", 0, start)
+    assert tracker.record("p1", 30, start + timedelta(minutes=30)).rate_1h == 60
+
+
+def test_engagement_from_insights():
+    payload = {"data": [
+        {"name": "reach", "values": [{"value": 900}]},
+        {"name": "engagement", "values": [{"value": 42}]},
+    ]}
+    assert engagement_from_insights(payload) == 42
+    assert engagement_from_insights({"data": [{"name": "total_interactions", "total_value": {"value": 7}}]}) == 7
+    assert engagement_from_insights({}) is None
+
+
+def test_recent_velocity_overrides_lifetime_average():
+    now = datetime(2026, 3, 1, 12, 0)
+    posted_at = now - timedelta(hours=48)
+    lifetime = calculate_virality_score(900, 50, 30, 20, 0, posted_at, 10_000, now=now)
+    recent = calculate_virality_score(900, 50, 30, 20, 0, posted_at, 10_000, now=now, engagement_velocity=400)
+    assert recent["velocity_score"] > lifetime["velocity_score"]
+
+    scores = score_virality_arrays(
+        [900, 900], [50, 50], [30, 30], [20, 20], [10_000, 10_000],
+        np.array([posted_at, posted_at], dtype="datetime64[us]"),
+        now=now,
+        engagement_velocity=[np.nan, 400],
+    )
+    assert scores["velocity_score"].tolist() == [lifetime["velocity_score"], recent["velocity_score"]]
+    assert scores["virality_score"].tolist() == [lifetime["virality_score"], recent["virality_score"]]
+
+
+def test_endpoint_records_by_capture_time_and_answers_in_request_order(client, auth_headers):
+    from app.services.velocity_tracker import reset_velocity_tracker
+
+    reset_velocity_tracker()
+    snapshots = [
+        {"post_id": "p1", "likes": 30, "captured_at": "2026-03-01T12:30:00"},
+        {"post_id": "p2", "likes": 5, "captured_at": "2026-03-01T12:00:00"},
+        {"post_id": "p1", "likes": 0, "captured_at": "2026-03-01T12:00:00"},
+    ]
+    try:
+        response = client.post("/api/v1/insights/velocity", json={"snapshots": snapshots}, headers=auth_headers)
+    finally:
+        reset_velocity_tracker()
+
+    assert response.status_code == 200
+    posts = response.json()["posts"]
+    assert [p["post_id"] for p in posts] == ["p1", "p2", "p1"]
+    assert response.json()["recorded"] == 3
+    assert posts[0]["velocity"]["rate_1h"] == 60
+    assert posts[0]["velocity"]["updated_at"] == "2026-03-01T12:30:00+00:00"
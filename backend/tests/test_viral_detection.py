@@ -0,0 +1,112 @@
+"""Testes do score de viralidade colunar (mesmos resultados do escalar)."""
+
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.services.viral_detection import (
+    _classify_scalar,
+    calculate_virality_score,
+    classify_content_batch,
+    score_virality_arrays,
+)
+
+NOW = datetime(2026, 3, 1, 12, 0)
+
+
+def _random_item(rng: random.Random, idx: int) -> dict:
+    """Distribuicao larga: zeros, contas pequenas, tetos de 100 e posts no futuro."""
+    magnitude = rng.choice([0, 1, 2, 3, 5, 7])
+    posted_at = NOW - timedelta(
+        seconds=rng.choice([0, 1800, 3600, rng.uniform(-7200, 86400 * 60)]),
+        microseconds=rng.randint(0, 999_999),
+    )
+    item = {
+        "id": f"post_{idx}",
+        "likes": rng.randint(0, 10 ** magnitude),
+        "comments": rng.randint(0, 10 ** rng.choice([0, 2, 4])),
+        "shares": rng.randint(0, 10 ** rng.choice([0, 1, 3, 5])),
+        "saves": rng.randint(0, 10 ** rng.choice([0, 1, 3, 5])),
+        "views": rng.randint(0, 1000),
+        "followers": rng.choice([0, 1, 7, 100, 2500, 10 ** 6, rng.randint(0, 10 ** 7)]),
+        "posted_at": rng.choice([
+            posted_at,
+            posted_at.isoformat(),
+            posted_at.isoformat() + "Z",
+            posted_at.isoformat() + "+00:00",
+            None,
+        ]),
+        "caption": "legenda " * rng.randint(0, 40),
+        "media_type": rng.choice(["IMAGE", "VIDEO", "CAROUSEL_ALBUM"]),
+    }
+    if rng.random() < 0.1:
+        del item["id"]
+    return item
+
+
+def _assert_identical(actual: list[dict], expected: list[dict]) -> None:
+    assert len(actual) == len(expected)
+    for got, want in zip(actual, expected):
+        assert got == want
+        assert list(got) == list(want)
+        # int vs float tambem (100 do min() escalar serializa diferente de 100.0)
+        assert [type(v) for v in got.values()] == [type(v) for v in want.values()]
+
+
+def test_batch_matches_scalar_property():
+    rng = random.Random(20260301)
+    for _ in range(20):
+        items = [_random_item(rng, i) for i in range(rng.randint(1, 400))]
+        expected = _classify_scalar(items, NOW)
+        expected.sort(key=lambda x: x.get("virality_score", 0), reverse=True)
+        _assert_identical(classify_content_batch(items, now=NOW), expected)
+
+
+def test_arrays_match_scalar_function():
+    rng = random.Random(7)
+    items = [_random_item(rng, i) for i in range(2000)]
+    posted = [NOW if not isinstance(i["posted_at"], datetime) else i["posted_at"] for i in items]
+    scores = score_virality_arrays(
+        [i["likes"] for i in items],
+        [i["comments"] for i in items],
+        [i["shares"] for i in items],
+        [i["saves"] for i in items],
+        [i["followers"] for i in items],
+        np.array(posted, dtype="datetime64[us]"),
+        now=NOW,
+    )
+    for n, (item, posted_at) in enumerate(zip(items, posted)):
+        expected = calculate_virality_score(
+            item["likes"], item["comments"], item["shares"], item["saves"],
+            item["views"], posted_at, item["followers"], now=NOW,
+        )
+        for field, value in expected.items():
+            assert scores[field][n] == value, (field, item)
+
+
+def test_invalid_items_produce_same_error_rows():
+    items = [
+        {"likes": "abc", "posted_at": NOW.isoformat()},
+        {"likes": 10, "posted_at": "2026-02-01T10:00:00-03:00"},
+        {"likes": 10, "posted_at": 12345},
+        {"likes": 10, "caption": None},
+        {"likes": 50, "saves": 20, "followers": 10, "posted_at": NOW},
+    ]
+    expected = _classify_scalar(items, NOW)
+    expected.sort(key=lambda x: x.get("virality_score", 0), reverse=True)
+    result = classify_content_batch(items, now=NOW)
+
+    _assert_identical(result, expected)
+    assert [r["classification"] for r in result].count("error") == 4
+
+
+def test_huge_counts_fall_back_to_scalar():
+    items = [{"likes": 2 ** 62, "followers": 3, "posted_at": NOW}, {"likes": 1, "posted_at": NOW}]
+    expected = _classify_scalar(items, NOW)
+    expected.sort(key=lambda x: x.get("virality_score", 0), reverse=True)
+    _assert_identical(classify_content_batch(items, now=NOW), expected)
+
+
+def test_empty_batch():
+    assert classify_content_batch([]) == []
@@ -0,0 +1,117 @@
+"""Testes da fila write-behind (gravacoes em lote fora da latencia do chat)."""
+
+import asyncio
+import threading
+from unittest.mock import MagicMock, patch
+
+from app.services.conversation_store import save_turns
+from app.services.write_queue import WriteBehindQueue
+
+
+async def test_batches_by_kind_and_flushes():
+    calls = []
+
+    def handler(items):
+        calls.append(list(items))
+        return []
+
+    queue = WriteBehindQueue({"a": handler, "b": handler}, batch_size=10, flush_interval=0.01)
+    queue.start()
+    for i in range(5):
+        assert queue.enqueue("a", i)
+    assert queue.enqueue("b", "x")
+
+    assert await queue.flush(timeout=2)
+    assert sorted(calls, key=len) == [["x"], [0, 1, 2, 3, 4]]
+    stats = queue.stats()
+    assert stats["written"] == 6 and stats["batches"] == 2 and stats["pending"] == 0
+    await queue.close()
+
+
+async def test_retries_only_failed_items_then_drops():
+    attempts = []
+
+    def handler(items):
+        attempts.append(list(items))
+        return [item for item in items if item == "bad"]
+
+    queue = WriteBehindQueue({"a": handler}, flush_interval=0, max_retries=2, base_backoff=0.001)
+    queue.start()
+    queue.enqueue("a", "ok")
+    queue.enqueue("a", "bad")
+    await queue.flush(timeout=2)
+
+    assert attempts == [["ok", "bad"], ["bad"], ["bad"]]
+    stats = queue.stats()
+    assert stats["written"] == 1 and stats["retried"] == 2 and stats["failed"] == 1
+    await queue.close()
+
+
+async def test_full_buffer_writes_inline_instead_of_dropping():
+    release = threading.Event()
+    written = []
+
+    def handler(items):
+        release.wait(2)
+        written.extend(items)
+        return []
+
+    queue = WriteBehindQueue({"a": handler}, max_size=1, flush_interval=0)
+    queue.start()
+    queue.enqueue("a", 1)
+    await asyncio.sleep(0.05)  # worker ocupado com o item 1
+    queue.enqueue("a", 2)
+    release.set()
+    await queue.submit("a", 3)  # buffer cheio: grava inline
+
+    await queue.flush(timeout=2)
+    assert sorted(written) == [1, 2, 3]
+    assert queue.stats()["rejected"] == 1
+    await queue.close()
+
+
+async def test_enqueue_from_worker_thread():
+    written = []
+    queue = WriteBehindQueue({"a": lambda items: written.extend(items)}, flush_interval=0)
+    queue.start()
+
+    # Tools dos agentes chamam enqueue de threads do TeamExecutor
+    await asyncio.to_thread(queue.enqueue, "a", "from-thread")
+    assert await queue.flush(timeout=2)
+    assert written == ["from-thread"]
+    await queue.close()
+
+
+async def test_stopped_queue_refuses_enqueue():
+    queue = WriteBehindQueue({"a": lambda items: []})
+    assert queue.enqueue("a", 1) is False
+
+
+def test_save_turns_groups_by_conversation():
+    turns = [
+        {"conversation_id": "c1", "user_id": "u", "agent_type": None, "message": "m1", "response_text": "r1"},
+        {"conversation_id": "c2", "user_id": "u", "agent_type": None, "message": "m2", "response_text": "r2"},
+        {"conversation_id": "c1", "user_id": "u", "agent_type": None, "message": "m3", "response_text": "r3"},
+    ]
+    with patch("app.services.conversation_store.append_messages", MagicMock()) as append:
+        assert save_turns(turns) == []
+
+    assert append.call_count == 2
+    conversation_id, _, messages = append.call_args_list[0].args
+    assert conversation_id == "c1"
+    assert [m["content"] for m in messages] == ["m1", "r1", "m3", "r3"]
+
+
+def test_save_turns_returns_failed_group():
+    turns = [
+        {"conversation_id": "c1", "user_id": "u", "agent_type": None, "message": "m", "response_text": "r"},
+        {"conversation_id": "c2", "user_id": "u", "agent_type": None, "message": "m", "response_text": "r"},
+    ]
+
+    def append(conversation_id, *args, **kwargs):
+        if conversation_id == "c2":
+            raise RuntimeError("rpc down")
+        return 2
+
+    with patch("app.services.conversation_store.append_messages", side_effect=append):
+        assert save_turns(turns) == [turns[1]]
@@ -124,6 +124,53 @@ describe("ConversationHistory", () => {
     });
   });
 
+  it("loads older message pages before selecting a conversation", async () => {
+    const user = userEvent.setup();
+    const onSelectConversation = vi.fn();
+
+    (global.fetch as any).mockImplementation((url: string) => {
+      if (url.includes("before_seq=3")) {
+        return Promise.resolve({
+          ok: true,
+          json: async () => ({ messages: [mockMessages[0]], next_before_seq: null }),
+        });
+      }
+      if (url.includes("/messages")) {
+        return Promise.resolve({
+          ok: true,
+          json: async () => ({ messages: [mockMessages[1]], next_before_seq: 3 }),
+        });
+      }
+      return Promise.resolve({
+        ok: true,
+        json: async () => ({ conversations: mockConversations }),
+      });
+    });
+
+    render(
+      <ConversationHistory
+        {...defaultProps}
+        onSelectConversation={onSelectConversation}
+      />
+    );
+
+    await waitFor(() => {
+      expect(screen.getByText(/Hello, how are you\?/)).toBeInTheDocument();
+    });
+
+    const conversationButton = screen.getByText(/Hello, how are you\?/).closest("button");
+    if (conversationButton) {
+      await user.click(conversationButton);
+    }
+
+    await waitFor(() => {
+      expect(onSelectConversation).toHaveBeenCalledWith("conv-1", [
+        expect.objectContaining({ content: "Hello" }),
+        expect.objectContaining({ content: "Hi there!" }),
+      ]);
+    });
+  });
+
   it("calls onNewConversation when clicking new conversation button", async () => {
     const user = userEvent.setup();
     const onNewConversation = vi.fn();
@@ -17,8 +17,9 @@ export async function GET(
 
     const { id } = await params;
 
+    // Repassa limit/before_seq (paginacao para tras)
     const response = await fetch(
-      `${BACKEND_URL}/api/v1/chat/conversations/${id}/messages`,
+      `${BACKEND_URL}/api/v1/chat/conversations/${id}/messages${request.nextUrl.search}`,
       {
         headers: {
           "Authorization": `Bearer ${session.access_token}`,
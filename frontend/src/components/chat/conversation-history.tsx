@@ -66,12 +66,27 @@ export function ConversationHistory({
     return () => window.removeEventListener("resize", checkMobile);
   }, []);
 
+  // A API devolve as mensagens mais recentes por pagina; segue
+  // next_before_seq para tras ate carregar o historico inteiro
+  const fetchAllMessages = async (id: string): Promise<any[] | null> => {
+    const pages: any[][] = [];
+    let beforeSeq: number | null = null;
+    do {
+      const query: string = beforeSeq ? `?before_seq=${beforeSeq}` : "";
+      const res = await fetch(`/api/chat/conversations/${id}/messages${query}`);
+      if (!res.ok) return null;
+      const data = await res.json();
+      pages.unshift(data.messages || []);
+      beforeSeq = data.next_before_seq ?? null;
+    } while (beforeSeq);
+    return pages.flat();
+  };
+
   const handleSelectConversation = async (id: string) => {
     try {
-      const res = await fetch(`/api/chat/conversations/${id}/messages`);
-      if (res.ok) {
-        const data = await res.json();
-        const messages: Message[] = (data.messages || []).map((msg: any) => ({
+      const rows = await fetchAllMessages(id);
+      if (rows) {
+        const messages: Message[] = rows.map((msg: any) => ({
           role: msg.role,
           content: msg.content,
           timestamp: new Date(msg.created_at),